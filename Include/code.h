@@ -6,6 +6,26 @@
 extern "C" {
 #endif
 
+/* Inline cache entries, see the opcache notes in Python/ceval.c */
+typedef struct {
+    _Py_dict_version_t globals_ver;	/* f_globals version tag */
+    _Py_dict_version_t builtins_ver;	/* f_builtins version tag */
+    PyObject *ptr;		/* cached value (borrowed reference) */
+} _PyOpcache_LoadGlobal;
+
+typedef struct {
+    PyTypeObject *type;		/* type of the instance (borrowed) */
+    unsigned int tp_version_tag;	/* type version, new-style classes only */
+    Py_ssize_t hint;		/* index of the name in the instance dict */
+} _PyOpcache_LoadAttr;
+
+typedef struct {
+    union {
+        _PyOpcache_LoadGlobal lg;
+        _PyOpcache_LoadAttr la;
+    } u;
+} _PyOpcache;
+
 /* Bytecode object */
 typedef struct {
     PyObject_HEAD
@@ -27,6 +47,13 @@ typedef struct {
 				   Objects/lnotab_notes.txt for details. */
     void *co_zombieframe;     /* for optimization only (see frameobject.c) */
     PyObject *co_weakreflist;   /* to support weakrefs to code objects */
+    /* Per opcode inline cache, built lazily once the code object is hot.
+       co_opcache_map maps a byte offset in co_code to a 1-based index into
+       co_opcache (0 means "no cache for this instruction"). */
+    unsigned char *co_opcache_map;
+    _PyOpcache *co_opcache;
+    int co_opcache_flag;	/* run counter, see OPCACHE_MIN_RUNS */
+    int co_opcache_size;	/* number of entries in co_opcache */
 } PyCodeObject;
 
 /* Masks for co_flags above */
@@ -80,6 +107,10 @@ PyCode_NewEmpty(const char *filename, const char *funcname, int firstlineno);
 /* Return the line number associated with the specified bytecode index
    in this code object.  If you just need the line number of a frame,
    use PyFrame_GetLineNumber() instead. */
+/* Allocate the inline cache of a hot code object.  Returns -1 with an
+   exception set on memory error. */
+PyAPI_FUNC(int) _PyCode_InitOpcache(PyCodeObject *);
+
 PyAPI_FUNC(int) PyCode_Addr2Line(PyCodeObject *, int);
 
 /* for internal use only */
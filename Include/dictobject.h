@@ -66,6 +66,33 @@ values == the number of Active items).
 To avoid slowing down lookups on a near-full table, we resize the table when
 it's two-thirds full.
 */
+#ifdef PY_UINT64_T
+typedef PY_UINT64_T _Py_dict_version_t;
+#else
+typedef size_t _Py_dict_version_t;
+#endif
+
+/*
+ma_version_tag is a globally unique number which changes each time the dict
+is created or modified.  It is not exposed to Python code; the interpreter
+uses it to validate the LOAD_GLOBAL inline cache (see Python/ceval.c).
+Resizing the table does not change the version since no key or value is
+added, replaced or removed.
+*/
+/*
+A dict is either "combined" or "split".  A combined table stores keys and
+values together in ma_table; this is how all dicts used to work and is still
+the common case.  A split table keeps only the values (in ma_values, indexed
+like the table) and points ma_table at the entries of ma_keys, a key table
+shared with other split dicts.  The __dict__ of instances of a new-style
+class starts out split and shares the keys cached on the class, so a million
+instances with the same attribute names store those names (and their hashes)
+once.  me_value is never used in a shared key table.  A split dict never has
+dummy entries, only string keys, and is turned into a combined one whenever
+that would not hold or the key table would need to grow.
+*/
+typedef struct _dictkeysobject PyDictKeysObject;
+
 typedef struct _dictobject PyDictObject;
 struct _dictobject {
     PyObject_HEAD
@@ -85,9 +112,17 @@ struct _dictobject {
      */
     PyDictEntry *ma_table;
     PyDictEntry *(*ma_lookup)(PyDictObject *mp, PyObject *key, long hash);
+    _Py_dict_version_t ma_version_tag;
+    PyDictKeysObject *ma_keys;  /* shared keys, NULL if combined */
+    PyObject **ma_values;       /* values of a split table, else NULL */
     PyDictEntry ma_smalltable[PyDict_MINSIZE];
 };
 
+/* The value stored for entry ep of dict mp, for both kinds of tables */
+#define _PyDict_ENTRY_VALUE(mp, ep) \
+    ((mp)->ma_values != NULL ? \
+     (mp)->ma_values[(ep) - (mp)->ma_table] : (ep)->me_value)
+
 PyAPI_DATA(PyTypeObject) PyDict_Type;
 PyAPI_DATA(PyTypeObject) PyDictIterKey_Type;
 PyAPI_DATA(PyTypeObject) PyDictIterValue_Type;
@@ -110,6 +145,14 @@ PyAPI_FUNC(PyObject *) PyDict_New(void);
 PyAPI_FUNC(PyObject *) PyDict_GetItem(PyObject *mp, PyObject *key);
 PyAPI_FUNC(int) PyDict_SetItem(PyObject *mp, PyObject *key, PyObject *item);
 PyAPI_FUNC(int) PyDict_DelItem(PyObject *mp, PyObject *key);
+PyAPI_FUNC(PyObject *) _PyDict_GetItem_KnownHash(PyObject *mp, PyObject *key,
+                                                 long hash);
+PyAPI_FUNC(int) _PyDict_SetItem_KnownHash(PyObject *mp, PyObject *key,
+                                          PyObject *item, long hash);
+PyAPI_FUNC(int) _PyDict_DelItem_KnownHash(PyObject *mp, PyObject *key,
+                                          long hash);
+PyAPI_FUNC(Py_ssize_t) _PyDict_KeyIndex(PyObject *mp, PyObject *key,
+                                        long hash);
 PyAPI_FUNC(void) PyDict_Clear(PyObject *mp);
 PyAPI_FUNC(int) PyDict_Next(
     PyObject *mp, Py_ssize_t *pos, PyObject **key, PyObject **value);
@@ -123,6 +166,14 @@ PyAPI_FUNC(PyObject *) PyDict_Copy(PyObject *mp);
 PyAPI_FUNC(int) PyDict_Contains(PyObject *mp, PyObject *key);
 PyAPI_FUNC(int) _PyDict_Contains(PyObject *mp, PyObject *key, long hash);
 PyAPI_FUNC(PyObject *) _PyDict_NewPresized(Py_ssize_t minused);
+PyAPI_FUNC(Py_ssize_t) _PyDict_GetEntryIndex(PyObject *mp, PyObject *key);
+
+/* Key sharing for the __dict__ of instances of heap types */
+PyAPI_FUNC(PyDictKeysObject *) _PyDict_NewKeysForClass(void);
+PyAPI_FUNC(void) _PyDictKeys_DecRef(PyDictKeysObject *keys);
+PyAPI_FUNC(PyObject *) _PyObjectDict_New(PyTypeObject *tp);
+PyAPI_FUNC(int) _PyObjectDict_SetItem(PyTypeObject *tp, PyObject *dict,
+                                      PyObject *key, PyObject *value);
 PyAPI_FUNC(void) _PyDict_MaybeUntrack(PyObject *mp);
 
 /* PyDict_Update(mp, other) is equivalent to PyDict_Merge(mp, other, 1). */
@@ -62,9 +62,10 @@ PyAPI_FUNC(PyObject *) PyMemoryView_FromBuffer(Py_buffer *info);
    be considered public. Don't access those fields directly, use the macros
    and functions instead! */
 typedef struct {
-    PyObject_HEAD
+    PyObject_VAR_HEAD
     PyObject *base;
     Py_buffer view;
+    Py_ssize_t ob_array[1];     /* shape, strides, suboffsets */
 } PyMemoryViewObject;
 
 
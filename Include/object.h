@@ -206,6 +206,9 @@ typedef void (*releasebufferproc)(PyObject *, Py_buffer *);
 #define PyBUF_FULL (PyBUF_INDIRECT | PyBUF_WRITABLE | PyBUF_FORMAT)
 #define PyBUF_FULL_RO (PyBUF_INDIRECT | PyBUF_FORMAT)
 
+/* Maximum number of dimensions of a buffer */
+#define PyBUF_MAX_NDIM 64
+
 
 #define PyBUF_READ  0x100
 #define PyBUF_WRITE 0x200
@@ -425,6 +428,8 @@ typedef struct _heaptypeobject {
                                       see add_operators() in typeobject.c . */
     PyBufferProcs as_buffer;
     PyObject *ht_name, *ht_slots;
+    struct _dictkeysobject *ht_cached_keys; /* keys shared by the __dict__
+                                               of instances, or NULL */
     /* here are optional user slots, followed by the members. */
 } PyHeapTypeObject;
 
@@ -56,28 +56,12 @@ PyAPI_FUNC(void) PyMem_Free(void *);
 /* Starting from Python 1.6, the wrappers Py_{Malloc,Realloc,Free} are
    no longer supported. They used to call PyErr_NoMemory() on failure. */
 
-/* Macros. */
-#ifdef PYMALLOC_DEBUG
-/* Redirect all memory operations to Python's debugging allocator. */
-#define PyMem_MALLOC		_PyMem_DebugMalloc
-#define PyMem_REALLOC		_PyMem_DebugRealloc
-#define PyMem_FREE		_PyMem_DebugFree
-
-#else	/* ! PYMALLOC_DEBUG */
-
-/* PyMem_MALLOC(0) means malloc(1). Some systems would return NULL
-   for malloc(0), which would be treated as an error. Some platforms
-   would return a pointer with no memory behind it, which would break
-   pymalloc. To solve these problems, allocate an extra byte. */
-/* Returns NULL to indicate error if a negative size or size larger than
-   Py_ssize_t can represent is supplied.  Helps prevents security holes. */
-#define PyMem_MALLOC(n)		((size_t)(n) > (size_t)PY_SSIZE_T_MAX ? NULL \
-				: malloc((n) ? (n) : 1))
-#define PyMem_REALLOC(p, n)	((size_t)(n) > (size_t)PY_SSIZE_T_MAX  ? NULL \
-				: realloc((p), (n) ? (n) : 1))
-#define PyMem_FREE		free
-
-#endif	/* PYMALLOC_DEBUG */
+/* Macros.  They used to expand to direct calls of the platform allocator
+   (or of the debugging allocator in PYMALLOC_DEBUG mode); they go through
+   the functions now, so that PyMem_SetAllocator() sees every call. */
+#define PyMem_MALLOC		PyMem_Malloc
+#define PyMem_REALLOC		PyMem_Realloc
+#define PyMem_FREE		PyMem_Free
 
 /*
  * Type-oriented memory interface
@@ -115,6 +99,47 @@ PyAPI_FUNC(void) PyMem_Free(void *);
 #define PyMem_Del		PyMem_Free
 #define PyMem_DEL		PyMem_FREE
 
+/*
+ * Allocator hooks
+ * ===============
+ *
+ * The functions of each domain call through a PyMemAllocator, which can be
+ * replaced to install a custom allocator, or wrapped to hook allocations
+ * (the _tracemalloc module does this).  A hook should keep the allocator
+ * returned by PyMem_GetAllocator() and forward every call to it.
+ *
+ * PyMem_SetAllocator() must be called before the first allocation of the
+ * domain when installing a new allocator, since blocks are always freed
+ * through the allocator in use at that time.  Installing a hook that
+ * forwards to the previous allocator can be done at any time.
+ */
+
+typedef enum {
+    /* PyMem_Malloc(), PyMem_Realloc() and PyMem_Free() */
+    PYMEM_DOMAIN_MEM,
+    /* PyObject_Malloc(), PyObject_Realloc() and PyObject_Free() */
+    PYMEM_DOMAIN_OBJ
+} PyMemAllocatorDomain;
+
+typedef struct {
+    /* user context passed as the first argument to the 3 functions */
+    void *ctx;
+
+    /* allocate a memory block; size is never larger than PY_SSIZE_T_MAX */
+    void* (*malloc) (void *ctx, size_t size);
+
+    /* allocate or resize a memory block */
+    void* (*realloc) (void *ctx, void *ptr, size_t new_size);
+
+    /* release a memory block (ptr may be NULL) */
+    void (*free) (void *ctx, void *ptr);
+} PyMemAllocator;
+
+PyAPI_FUNC(void) PyMem_GetAllocator(PyMemAllocatorDomain domain,
+                                    PyMemAllocator *allocator);
+PyAPI_FUNC(void) PyMem_SetAllocator(PyMemAllocatorDomain domain,
+                                    PyMemAllocator *allocator);
+
 #ifdef __cplusplus
 }
 #endif
@@ -399,7 +399,8 @@ typedef PY_UNICODE_TYPE Py_UNICODE;
     } while (0)
 
 /* Check if substring matches at given offset.  the offset must be
-   valid, and the substring must not be empty */
+   valid, the substring must not be empty, and the Py_UNICODE buffers of
+   both must have been built by PyUnicode_AS_UNICODE() */
 
 #define Py_UNICODE_MATCH(string, offset, substring) \
     ((*((string)->str + (offset)) == *((substring)->str)) && \
@@ -415,11 +416,15 @@ extern "C" {
 typedef struct {
     PyObject_HEAD
     Py_ssize_t length;          /* Length of raw Unicode data in buffer */
-    Py_UNICODE *str;            /* Raw Unicode buffer */
+    Py_UNICODE *str;            /* Raw Unicode buffer, or compact data
+                                   if kind is not 0 */
     long hash;                  /* Hash value; -1 if not set */
     PyObject *defenc;           /* (Default) Encoded version as Python
                                    string, or NULL; this is used for
                                    implementing the buffer protocol */
+    int kind;                   /* Bytes per character of the compact
+                                   data in str, or 0 if str holds
+                                   Py_UNICODE characters */
 } PyUnicodeObject;
 
 PyAPI_DATA(PyTypeObject) PyUnicode_Type;
@@ -433,10 +438,19 @@ PyAPI_DATA(PyTypeObject) PyUnicode_Type;
     (((PyUnicodeObject *)(op))->length)
 #define PyUnicode_GET_DATA_SIZE(op) \
     (((PyUnicodeObject *)(op))->length * sizeof(Py_UNICODE))
+
+/* Unicode objects whose characters all fit in fewer bytes than a
+   Py_UNICODE (1 byte for Latin-1, 2 bytes for the BMP in UCS4 builds)
+   may store them compact.  Their Py_UNICODE buffer replaces the compact
+   data on first access, so PyUnicode_AS_UNICODE() and PyUnicode_AS_DATA()
+   return NULL with an exception set if it cannot be allocated.  They
+   never fail for objects created by PyUnicode_FromUnicode(NULL, size).
+   Building the buffer frees the compact data, even if the object is
+   shared, and ->str may point to compact data: never read it directly. */
 #define PyUnicode_AS_UNICODE(op) \
-    (((PyUnicodeObject *)(op))->str)
+    PyUnicode_AsUnicode((PyObject *)(op))
 #define PyUnicode_AS_DATA(op) \
-    ((const char *)((PyUnicodeObject *)(op))->str)
+    ((const char *)PyUnicode_AS_UNICODE(op))
 
 /* --- Constants ---------------------------------------------------------- */
 
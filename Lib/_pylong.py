@@ -0,0 +1,188 @@
+"""Asymptotically faster algorithms for very large longs.
+
+The conversions between longs and decimal strings in longobject.c take
+time quadratic in the number of digits.  Above some size, longobject.c
+calls the functions of this module instead: they divide and conquer, so
+that most of the work is done by the Karatsuba multiplication of longs.
+The smaller conversions and divisions they do themselves fall below the
+thresholds of longobject.c.
+
+This module is private: it is only meant to be used by longobject.c.
+"""
+
+# Below this number of decimal digits, str() and long() do the conversions.
+# It must stay below the thresholds of longobject.c.
+_DIGIT_LIMIT = 2000
+
+# Below this number of bits in the quotient, the builtin division is used.
+_DIV_LIMIT = 4000
+
+
+def int_to_decimal_string(n):
+    """Return the decimal representation of the long n, without suffix."""
+    if n < 0:
+        return '-' + int_to_decimal_string(-n)
+    pow10_cache = {}
+
+    def pow10(k):
+        result = pow10_cache.get(k)
+        if result is None:
+            result = pow10_cache[k] = 10 ** k
+        return result
+
+    def inner(n, w):
+        # The w digits of n, with leading zeros
+        if w <= _DIGIT_LIMIT:
+            return str(n).zfill(w)
+        w2 = w >> 1
+        hi, lo = _divmod_pos(n, pow10(w2))
+        return inner(hi, w - w2) + inner(lo, w2)
+
+    # an upper bound of the number of digits: log10(2) < 0.30103
+    w = int(n.bit_length() * 0.30103) + 1
+    return inner(n, w).lstrip('0') or '0'
+
+
+def int_from_string(s):
+    """Return the long whose decimal representation is the string s,
+    which only contains digits."""
+    # 10**w is computed as 5**w << w, since shifts are cheap
+    pow5_cache = {}
+
+    def pow5(w):
+        result = pow5_cache.get(w)
+        if result is None:
+            if w <= _DIGIT_LIMIT:
+                result = 5 ** w
+            elif w & 1:
+                result = pow5(w - 1) * 5
+            else:
+                t = pow5(w >> 1)
+                result = t * t
+            pow5_cache[w] = result
+        return result
+
+    def inner(a, b):
+        # The value of s[a:b]
+        if b - a <= _DIGIT_LIMIT:
+            return long(s[a:b])
+        mid = (a + b + 1) >> 1
+        return inner(mid, b) + ((inner(a, mid) * pow5(b - mid)) << (b - mid))
+
+    return inner(0, len(s))
+
+
+# Division of large numbers, following "Fast Recursive Division" by
+# Christoph Burnikel and Joachim Ziegler.  The divisions of 2n-bit numbers
+# by n-bit numbers are reduced to two divisions of 3n/2-bit numbers by
+# n-bit numbers, which are reduced to divisions of n-bit numbers by
+# n/2-bit numbers and multiplications.
+
+def _div2n1n(a, b, n):
+    """Divide a 2n-bit nonnegative long a by an n-bit positive long b,
+    using a recursive divide and conquer algorithm.
+
+    Inputs:
+      n is a positive integer
+      b is a positive long with exactly n bits
+      a is a nonnegative long such that a < 2**n * b
+
+    Output:
+      (q, r) such that a = b*q+r and 0 <= r < b.
+    """
+    if a.bit_length() - n <= _DIV_LIMIT:
+        return divmod(a, b)
+    pad = n & 1
+    if pad:
+        a <<= 1
+        b <<= 1
+        n += 1
+    half_n = n >> 1
+    mask = (1L << half_n) - 1
+    b1, b2 = b >> half_n, b & mask
+    q1, r = _div3n2n(a >> n, (a >> half_n) & mask, b, b1, b2, half_n)
+    q2, r = _div3n2n(r, a & mask, b, b1, b2, half_n)
+    if pad:
+        r >>= 1
+    return q1 << half_n | q2, r
+
+
+def _div3n2n(a12, a3, b, b1, b2, n):
+    """Helper function for _div2n1n; not intended to be called directly."""
+    if a12 >> n == b1:
+        q, r = (1L << n) - 1, a12 - (b1 << n) + b1
+    else:
+        q, r = _div2n1n(a12, b1, n)
+    r = (r << n | a3) - q * b2
+    while r < 0:
+        q -= 1
+        r += b
+    return q, r
+
+
+def _int2digits(a, n):
+    """Decompose the nonnegative long a into base 2**n.
+
+    Input:
+      a is a nonnegative long
+
+    Output:
+      List of the digits of a in base 2**n in little-endian order,
+      meaning the most significant digit is last.  The most significant
+      digit is guaranteed to be non-zero.  If a is 0 then the output is
+      an empty list.
+    """
+    a_digits = [0] * ((a.bit_length() + n - 1) // n)
+
+    def inner(x, L, R):
+        if L + 1 == R:
+            a_digits[L] = x
+            return
+        mid = (L + R) >> 1
+        shift = (mid - L) * n
+        upper = x >> shift
+        lower = x ^ (upper << shift)
+        inner(lower, L, mid)
+        inner(upper, mid, R)
+
+    if a:
+        inner(a, 0, len(a_digits))
+    return a_digits
+
+
+def _digits2int(digits, n):
+    """Combine base-2**n digits into a long.  This function is the inverse
+    of _int2digits.
+
+    Inputs:
+      n is a positive integer
+      digits is a list of nonnegative longs, in little-endian order
+
+    Output:
+      The long that the digits represent in base 2**n.
+    """
+    def inner(L, R):
+        if L + 1 == R:
+            return digits[L]
+        mid = (L + R) >> 1
+        shift = (mid - L) * n
+        return (inner(mid, R) << shift) + inner(L, mid)
+
+    return inner(0, len(digits)) if digits else 0
+
+
+def _divmod_pos(a, b):
+    """Divide the nonnegative long a by the positive long b, giving
+    quotient and remainder."""
+    # Use grade-school algorithm in base 2**n, n = nbits(b)
+    n = b.bit_length()
+    a_digits = _int2digits(a, n)
+
+    r = 0
+    q_digits = []
+    for a_digit in reversed(a_digits):
+        q_digit, r = _div2n1n((r << n) + a_digit, b, n)
+        q_digits.append(q_digit)
+    q_digits.reverse()
+    q = _digits2int(q_digits, n)
+    return q, r
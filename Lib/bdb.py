@@ -24,6 +24,9 @@ class Bdb:
         self.skip = set(skip) if skip else None
         self.breaks = {}
         self.fncache = {}
+        # (filename, first line, line number table) of a code object ->
+        # breakpoint lines in that code, see _code_breaks()
+        self.codebreaks = {}
 
     def canonic(self, filename):
         if filename == "<" + filename[1:-1] + ">":
@@ -65,6 +68,8 @@ class Bdb:
         if self.stop_here(frame) or self.break_here(frame):
             self.user_line(frame)
             if self.quitting: raise BdbQuit
+            # set_continue() may have stopped tracing the frame
+            return frame.f_trace
         return self.trace_dispatch
 
     def dispatch_call(self, frame, arg):
@@ -84,12 +89,19 @@ class Bdb:
         if self.stop_here(frame) or frame == self.returnframe:
             self.user_return(frame, arg)
             if self.quitting: raise BdbQuit
+        # The caller is not traced if it started or went on running while
+        # continuing, and has no breakpoint: trace it if we stop there.
+        caller = frame.f_back
+        if (caller is not None and caller is not self.botframe and
+            caller.f_trace is None and self.stop_here(caller)):
+            caller.f_trace = self.trace_dispatch
         return self.trace_dispatch
 
     def dispatch_exception(self, frame, arg):
         if self.stop_here(frame):
             self.user_exception(frame, arg)
             if self.quitting: raise BdbQuit
+            return frame.f_trace
         return self.trace_dispatch
 
     # Normally derived classes don't override the following
@@ -110,6 +122,9 @@ class Bdb:
             return False
         if frame is self.stopframe:
             return frame.f_lineno >= self.stoplineno
+        if self.stopframe is self.botframe:
+            # Continuing: the loop below could only end at stopframe.
+            return False
         while frame is not None and frame is not self.stopframe:
             if frame is self.botframe:
                 return True
@@ -117,17 +132,18 @@ class Bdb:
         return False
 
     def break_here(self, frame):
-        filename = self.canonic(frame.f_code.co_filename)
-        if not filename in self.breaks:
+        lines = self._code_breaks(frame.f_code)
+        if not lines:
             return False
         lineno = frame.f_lineno
-        if not lineno in self.breaks[filename]:
+        if not lineno in lines:
             # The line itself has no breakpoint, but maybe the line is the
             # first line of a function with breakpoint set by function name.
             lineno = frame.f_code.co_firstlineno
-            if not lineno in self.breaks[filename]:
+            if not lineno in lines:
                 return False
 
+        filename = self.canonic(frame.f_code.co_filename)
         # flag says ok to delete temp. bp
         (bp, flag) = effective(filename, lineno, frame)
         if bp:
@@ -142,7 +158,34 @@ class Bdb:
         raise NotImplementedError, "subclass of bdb must implement do_clear()"
 
     def break_anywhere(self, frame):
-        return self.canonic(frame.f_code.co_filename) in self.breaks
+        return bool(self._code_breaks(frame.f_code))
+
+    def _code_breaks(self, code):
+        """Return the lines of code having a breakpoint.
+
+        The result is cached in self.codebreaks until the breakpoints
+        change, so that the frames running code without breakpoints
+        are cheaply left untraced.  A code object only owns the lines
+        of its line number table; its first line is added for the
+        breakpoints set by function name.  The cache is keyed by what
+        determines these lines and not by the code object itself: equal
+        code objects may come from different files, and the cache must
+        not keep the code objects alive.
+        """
+        key = (code.co_filename, code.co_firstlineno, code.co_lnotab)
+        try:
+            return self.codebreaks[key]
+        except KeyError:
+            pass
+        lines = frozenset()
+        filename = self.canonic(code.co_filename)
+        if filename in self.breaks:
+            from dis import findlinestarts
+            code_lines = set(line for addr, line in findlinestarts(code))
+            code_lines.add(code.co_firstlineno)
+            lines = frozenset(code_lines.intersection(self.breaks[filename]))
+        self.codebreaks[key] = lines
+        return lines
 
     # Derived classes should override the user_* methods
     # to gain control.
@@ -217,6 +260,15 @@ class Bdb:
             while frame and frame is not self.botframe:
                 del frame.f_trace
                 frame = frame.f_back
+        else:
+            # only trace the frames running code with breakpoints
+            frame = sys._getframe().f_back
+            while frame and frame is not self.botframe:
+                if self.break_anywhere(frame):
+                    frame.f_trace = self.trace_dispatch
+                else:
+                    del frame.f_trace
+                frame = frame.f_back
 
     def set_quit(self):
         self.stopframe = self.botframe
@@ -244,6 +296,7 @@ class Bdb:
         list = self.breaks[filename]
         if not lineno in list:
             list.append(lineno)
+            self.codebreaks.clear()
         bp = Breakpoint(filename, lineno, temporary, cond, funcname)
 
     def clear_break(self, filename, lineno):
@@ -259,6 +312,7 @@ class Bdb:
             bp.deleteMe()
         if (filename, lineno) not in Breakpoint.bplist:
             self.breaks[filename].remove(lineno)
+            self.codebreaks.clear()
         if not self.breaks[filename]:
             del self.breaks[filename]
 
@@ -284,6 +338,7 @@ class Bdb:
             for bp in blist:
                 bp.deleteMe()
         del self.breaks[filename]
+        self.codebreaks.clear()
 
     def clear_all_breaks(self):
         if not self.breaks:
@@ -292,6 +347,7 @@ class Bdb:
             if bp:
                 bp.deleteMe()
         self.breaks = {}
+        self.codebreaks.clear()
 
     def get_break(self, filename, lineno):
         filename = self.canonic(filename)
@@ -17,6 +17,15 @@ def normalize(format):
     format = format.replace(OTHER_ENDIAN, THIS_ENDIAN)
     return re.sub(r"\s", "", format)
 
+def c_strides(shape, itemsize):
+    # The strides of a C-contiguous memory block
+    if not shape:
+        return None
+    strides = [itemsize]
+    for dim in reversed(shape[1:]):
+        strides.insert(0, strides[0] * dim)
+    return tuple(strides)
+
 class Test(unittest.TestCase):
 
     def test_native_types(self):
@@ -32,7 +41,7 @@ class Test(unittest.TestCase):
                 self.assertEqual(v.itemsize, sizeof(itemtp))
                 self.assertEqual(v.shape, shape)
                 # ctypes object always have a non-strided memory block
-                self.assertEqual(v.strides, None)
+                self.assertEqual(v.strides, c_strides(v.shape, v.itemsize))
                 # they are always read/write
                 self.assertFalse(v.readonly)
 
@@ -59,7 +68,7 @@ class Test(unittest.TestCase):
                 self.assertEqual(v.itemsize, sizeof(itemtp))
                 self.assertEqual(v.shape, shape)
                 # ctypes object always have a non-strided memory block
-                self.assertEqual(v.strides, None)
+                self.assertEqual(v.strides, c_strides(v.shape, v.itemsize))
                 # they are always read/write
                 self.assertFalse(v.readonly)
 
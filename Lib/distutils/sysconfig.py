@@ -350,9 +350,8 @@ def expand_makefile_vars(s, vars):
 
 _config_vars = None
 
-def _init_posix():
-    """Initialize the module as appropriate for POSIX systems."""
-    g = {}
+def _parse_posix_vars(g):
+    """Parse the installed Makefile and pyconfig.h into g."""
     # load the installed Makefile:
     try:
         filename = get_makefile_filename()
@@ -374,6 +373,20 @@ def _init_posix():
             my_msg = my_msg + " (%s)" % msg.strerror
 
         raise DistutilsPlatformError(my_msg)
+    return g
+
+
+def _init_posix():
+    """Initialize the module as appropriate for POSIX systems."""
+    g = {}
+    try:
+        # the variables of the Makefile and pyconfig.h, generated at build
+        # time by sysconfig
+        from _sysconfigdata import build_time_vars
+    except ImportError:
+        _parse_posix_vars(g)
+    else:
+        g.update(build_time_vars)
 
     # On MacOSX we need to check the setting of the environment variable
     # MACOSX_DEPLOYMENT_TARGET: configure bases some choices on it so
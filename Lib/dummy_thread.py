@@ -14,10 +14,13 @@ Suggested usage is::
 # Exports only things specified by thread documentation;
 # skipping obsolete synonyms allocate(), start_new(), exit_thread().
 __all__ = ['error', 'start_new_thread', 'exit', 'get_ident', 'allocate_lock',
-           'interrupt_main', 'LockType']
+           'interrupt_main', 'LockType', 'TIMEOUT_MAX']
 
 import traceback as _traceback
 
+# A dummy value
+TIMEOUT_MAX = 2**31
+
 class error(Exception):
     """Dummy implementation of thread.error."""
 
@@ -92,7 +95,7 @@ class LockType(object):
     def __init__(self):
         self.locked_status = False
 
-    def acquire(self, waitflag=None):
+    def acquire(self, waitflag=None, timeout=-1):
         """Dummy implementation of acquire().
 
         For blocking calls, self.locked_status is automatically set to
@@ -111,6 +114,9 @@ class LockType(object):
                 self.locked_status = True
                 return True
             else:
+                if timeout > 0:
+                    import time
+                    time.sleep(timeout)
                 return False
 
     __enter__ = acquire
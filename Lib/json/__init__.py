@@ -99,13 +99,13 @@ Using json.tool from the shell to validate and pretty-print::
 """
 __version__ = '2.0.9'
 __all__ = [
-    'dump', 'dumps', 'load', 'loads',
-    'JSONDecoder', 'JSONEncoder',
+    'dump', 'dumps', 'load', 'loads', 'iterload', 'iterparse',
+    'JSONDecoder', 'JSONEncoder', 'JSONStreamDecoder', 'JSONEventParser',
 ]
 
 __author__ = 'Bob Ippolito <bob@redivi.com>'
 
-from .decoder import JSONDecoder
+from .decoder import JSONDecoder, JSONStreamDecoder, JSONEventParser
 from .encoder import JSONEncoder
 
 _default_encoder = JSONEncoder(
@@ -321,3 +321,75 @@ def loads(s, encoding=None, cls=None, object_hook=None, parse_float=None,
     if parse_constant is not None:
         kw['parse_constant'] = parse_constant
     return cls(encoding=encoding, **kw).decode(s)
+
+
+def _make_decoder(encoding=None, cls=None, object_hook=None,
+        parse_float=None, parse_int=None, parse_constant=None,
+        object_pairs_hook=None, **kw):
+    if (cls is None and encoding is None and object_hook is None and
+            parse_int is None and parse_float is None and
+            parse_constant is None and object_pairs_hook is None and not kw):
+        return _default_decoder
+    if cls is None:
+        cls = JSONDecoder
+    if object_hook is not None:
+        kw['object_hook'] = object_hook
+    if object_pairs_hook is not None:
+        kw['object_pairs_hook'] = object_pairs_hook
+    if parse_float is not None:
+        kw['parse_float'] = parse_float
+    if parse_int is not None:
+        kw['parse_int'] = parse_int
+    if parse_constant is not None:
+        kw['parse_constant'] = parse_constant
+    return cls(encoding=encoding, **kw)
+
+
+def _iterfeed(parser, fp, chunk_size):
+    while True:
+        data = fp.read(chunk_size)
+        if not data:
+            break
+        for result in parser.feed(data):
+            yield result
+    for result in parser.close():
+        yield result
+
+
+def iterload(fp, items=False, chunk_size=65536, **kw):
+    """Deserialize ``fp`` (a ``.read()``-supporting file-like object) to
+    an iterator over Python objects, reading ``chunk_size`` characters at a
+    time so that only the object being decoded is kept in memory.
+
+    If ``items`` is false, ``fp`` contains a sequence of JSON documents
+    separated by optional whitespace (e.g. one document per line) and the
+    iterator yields the documents.  If ``items`` is true, ``fp`` contains
+    a JSON array and the iterator yields its elements.
+
+    The other keyword arguments are those of ``load()``.
+
+    """
+    parser = JSONStreamDecoder(items, _make_decoder(**kw))
+    return _iterfeed(parser, fp, chunk_size)
+
+
+def iterparse(fp, chunk_size=65536, **kw):
+    """Parse ``fp`` (a ``.read()``-supporting file-like object containing
+    one or more JSON documents) to an iterator over ``(prefix, event,
+    value)`` tuples, reading ``chunk_size`` characters at a time.  Only
+    the scalar being decoded is kept in memory.
+
+    ``event`` is one of ``'start_map'``, ``'map_key'``, ``'end_map'``,
+    ``'start_array'``, ``'end_array'``, ``'null'``, ``'boolean'``,
+    ``'number'`` or ``'string'``, and ``value`` is the key or the decoded
+    scalar (None for the other events).  ``prefix`` is the path of the
+    value in the document: the keys leading to it joined by dots, with
+    ``item`` standing for an array element.
+
+    The other keyword arguments are those of ``load()``, of which only
+    ``encoding``, ``cls``, ``parse_float``, ``parse_int`` and
+    ``parse_constant`` have an effect.
+
+    """
+    parser = JSONEventParser(_make_decoder(**kw))
+    return _iterfeed(parser, fp, chunk_size)
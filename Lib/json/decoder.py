@@ -9,8 +9,12 @@ try:
     from _json import scanstring as c_scanstring
 except ImportError:
     c_scanstring = None
+try:
+    from _json import scan_end as c_scan_end
+except ImportError:
+    c_scan_end = None
 
-__all__ = ['JSONDecoder']
+__all__ = ['JSONDecoder', 'JSONStreamDecoder', 'JSONEventParser']
 
 FLAGS = re.VERBOSE | re.MULTILINE | re.DOTALL
 
@@ -62,6 +66,10 @@ BACKSLASH = {
 
 DEFAULT_ENCODING = "utf-8"
 
+# The position at the end of the messages built by errmsg()
+ERRMSG_POSITION = re.compile(r'(.*): line \d+ column \d+ \(char (\d+)\)\Z',
+                             re.DOTALL)
+
 def py_scanstring(s, end, encoding=None, strict=True,
         _b=BACKSLASH, _m=STRINGCHUNK.match):
     """Scan the string s for a JSON string. End is the index of the
@@ -265,6 +273,53 @@ def JSONArray(s_and_end, scan_once, _w=WHITESPACE.match, _ws=WHITESPACE_STR):
 
     return values, end
 
+STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+SCALAR_END = re.compile(r'[^ \t\n\r,:"\[\]{}]*')
+STRUCTURE = re.compile(r'[^"\[\]{}]*')
+
+def py_scan_end(s, idx):
+    """Find the end of the JSON value starting at s[idx], skipping over
+    strings and matching brackets without decoding anything.
+
+    Returns the index of the character in s after the value, or -1 if
+    s ends before the value is known to be complete.  The value is not
+    validated; a scanner must still decode it.
+
+    """
+    depth = 0
+    n = len(s)
+    while idx < n:
+        c = s[idx]
+        if c == '"':
+            m = STRING_END.match(s, idx + 1)
+            if m is None:
+                return -1
+            idx = m.end()
+            if not depth:
+                return idx
+        elif c in '[{':
+            depth += 1
+            idx += 1
+        elif c in ']}':
+            if not depth:
+                return idx
+            idx += 1
+            depth -= 1
+            if not depth:
+                return idx
+        elif not depth:
+            # A scalar ends at the first delimiter after it
+            idx = SCALAR_END.match(s, idx).end()
+            if idx == n:
+                return -1
+            return idx
+        else:
+            idx = STRUCTURE.match(s, idx).end()
+    return -1
+
+scan_end = c_scan_end or py_scan_end
+
+
 class JSONDecoder(object):
     """Simple JSON <http://json.org> decoder
 
@@ -363,3 +418,328 @@ class JSONDecoder(object):
         except StopIteration:
             raise ValueError("No JSON object could be decoded")
         return obj, end
+
+
+class _JSONStream(object):
+    """Common buffering for JSONStreamDecoder and JSONEventParser.
+
+    Subclasses implement _parse(s, pos, final), which handles the buffered
+    text s from pos, appends to self._results and returns the position up
+    to which s has been consumed.  _parse() only updates the state of the
+    parser if it succeeds.
+
+    """
+
+    _RESCAN_SIZE = 65536
+
+    def __init__(self, decoder=None):
+        if decoder is None:
+            decoder = JSONDecoder()
+        self.decoder = decoder
+        self._buffer = ''
+        self._chunks = []       # data fed since the buffer was parsed
+        self._size = 0          # length of the buffer and the chunks
+        self._offset = 0        # position of the buffer in the stream
+        self._lineno = 1        # line of the start of the buffer
+        self._newline = -1      # position of the last newline before it
+        self._wait = 0          # size worth parsing the buffer again
+        self._results = []
+        self._closed = False
+
+    def feed(self, data):
+        """Add data (a ``str`` or ``unicode`` chunk of the stream) and
+        return the list of results it completes.
+
+        """
+        if self._closed:
+            raise ValueError("feed() called after close()")
+        self._chunks.append(data)
+        self._size += len(data)
+        if self._size < self._wait:
+            return []
+        return self._process(False)
+
+    def close(self):
+        """Signal the end of the stream and return the list of remaining
+        results.  Raise ValueError if the stream ends inside a value.
+
+        """
+        if self._closed:
+            return []
+        self._closed = True
+        return self._process(True)
+
+    def _process(self, final):
+        self._chunks.insert(0, self._buffer)
+        s = self._buffer = ''.join(self._chunks)
+        self._chunks = []
+        self._results = []
+        pos = self._parse(s, 0, final)
+        results = self._results
+        self._results = []
+        self._buffer = s[pos:]
+        self._size = len(self._buffer)
+        newline = s.rfind('\n', 0, pos)
+        if newline >= 0:
+            self._lineno += s.count('\n', 0, pos)
+            self._newline = self._offset + newline
+        self._offset += pos
+        # When a large value is incomplete, wait until the buffer is twice
+        # as long before scanning it again, so that a value fed in small
+        # chunks is not scanned a quadratic number of times.
+        if len(self._buffer) > self._RESCAN_SIZE:
+            self._wait = 2 * len(self._buffer)
+        else:
+            self._wait = 0
+        return results
+
+    def _error(self, msg, s, pos):
+        # Like errmsg(), but the position pos of the buffer s is given
+        # from the start of the stream
+        lineno = self._lineno + s.count('\n', 0, pos)
+        newline = s.rfind('\n', 0, pos)
+        if newline >= 0:
+            colno = pos - newline
+        elif lineno == 1:
+            colno = self._offset + pos
+        else:
+            colno = self._offset + pos - self._newline
+        fmt = '{0}: line {1} column {2} (char {3})'
+        return ValueError(fmt.format(msg, lineno, colno, self._offset + pos))
+
+    def _scan_error(self, exc, s):
+        # The errors of the scanner give positions in the buffer s
+        m = None
+        if len(exc.args) == 1 and isinstance(exc.args[0], basestring):
+            m = ERRMSG_POSITION.match(exc.args[0])
+        if m is None:
+            # raised by a hook
+            return exc
+        return self._error(m.group(1), s, int(m.group(2)))
+
+
+class JSONStreamDecoder(_JSONStream):
+    """Incremental decoder of a stream of JSON text.
+
+    The stream is fed in chunks with feed(), and each call returns the
+    list of values completed by the chunk.  close() signals the end of the
+    stream.  If ``items`` is false, the stream is a sequence of JSON
+    documents separated by optional whitespace (e.g. one document per line)
+    and the values are the documents.  If ``items`` is true, the stream is
+    a single JSON array and the values are its elements.  Only the value
+    being decoded is kept in memory.
+
+    ``decoder`` is the JSONDecoder used to decode the values; it defaults
+    to JSONDecoder().
+
+    >>> d = JSONStreamDecoder(items=True)
+    >>> d.feed('[1, {"a": [2')
+    [1]
+    >>> d.feed(', 3]}, 4')
+    [{'a': [2, 3]}]
+    >>> d.feed('2]')
+    [42]
+    >>> d.close()
+    []
+
+    """
+
+    # States
+    _DOCUMENT, _START, _FIRST, _ITEM, _NEXT, _END = range(6)
+
+    def __init__(self, items=False, decoder=None):
+        _JSONStream.__init__(self, decoder)
+        self.items = items
+        self._state = self._START if items else self._DOCUMENT
+
+    def _parse(self, s, pos, final, _w=WHITESPACE.match):
+        scan_once = self.decoder.scan_once
+        append = self._results.append
+        state = self._state
+        n = len(s)
+        while True:
+            pos = _w(s, pos).end()
+            if pos == n:
+                break
+            if state == self._START:
+                if s[pos] != '[':
+                    raise self._error("Expecting '['", s, pos)
+                state = self._FIRST
+                pos += 1
+                continue
+            elif state == self._NEXT:
+                nextchar = s[pos]
+                if nextchar == ']':
+                    state = self._END
+                elif nextchar != ',':
+                    raise self._error("Expecting , delimiter", s, pos)
+                else:
+                    state = self._ITEM
+                pos += 1
+                continue
+            elif state == self._END:
+                raise self._error("Extra data", s, pos)
+            elif state == self._FIRST and s[pos] == ']':
+                state = self._END
+                pos += 1
+                continue
+
+            # A value starts at pos
+            if not final and scan_end(s, pos) < 0:
+                break
+            try:
+                value, pos = scan_once(s, pos)
+            except StopIteration:
+                raise self._error("No JSON object could be decoded", s, pos)
+            except ValueError as e:
+                raise self._scan_error(e, s)
+            append(value)
+            if state != self._DOCUMENT:
+                state = self._NEXT
+        if final and state not in (self._DOCUMENT, self._END):
+            raise self._error("Unterminated array", s, pos)
+        self._state = state
+        return pos
+
+
+class JSONEventParser(_JSONStream):
+    """Incremental parser of a stream of JSON text into events.
+
+    The stream is fed in chunks with feed(), and each call returns the
+    list of events completed by the chunk.  close() signals the end of the
+    stream, which may hold several documents.  Each event is a
+    ``(prefix, event, value)`` tuple.  ``event`` is one of ``'start_map'``,
+    ``'map_key'``, ``'end_map'``, ``'start_array'``, ``'end_array'``,
+    ``'null'``, ``'boolean'``, ``'number'`` or ``'string'``, and ``value``
+    is the key or the decoded scalar (None for the other events).
+    ``prefix`` is the path of the value in the document: the keys leading
+    to it joined by dots, with ``item`` standing for an array element.
+    Only the scalar being decoded is kept in memory, so that arbitrarily
+    large documents can be processed.
+
+    ``decoder`` is the JSONDecoder used to decode the scalars; it defaults
+    to JSONDecoder().
+
+    >>> p = JSONEventParser()
+    >>> for event in p.feed('{"a": [1, true]}'):
+    ...     print event
+    ('', 'start_map', None)
+    ('', 'map_key', 'a')
+    ('a', 'start_array', None)
+    ('a.item', 'number', 1)
+    ('a.item', 'boolean', True)
+    ('a', 'end_array', None)
+    ('', 'end_map', None)
+
+    """
+
+    # States
+    _VALUE, _FIRST_ITEM, _NEXT_ITEM, _FIRST_KEY, _KEY, _COLON, _NEXT_KEY = \
+        range(7)
+
+    _SCALAR_EVENTS = {'"': 'string', 'n': 'null', 't': 'boolean',
+                      'f': 'boolean'}
+
+    def __init__(self, decoder=None):
+        _JSONStream.__init__(self, decoder)
+        self._state = self._VALUE
+        self._prefix = ''           # prefix of the next value
+        self._stack = []            # (is_map, prefix) of the open containers
+
+    def _parse(self, s, pos, final, _w=WHITESPACE.match):
+        decoder = self.decoder
+        scan_once = decoder.scan_once
+        append = self._results.append
+        # The state is only updated on success, so that an error is
+        # raised again if more data is fed
+        stack = list(self._stack)
+        state = self._state
+        prefix = self._prefix
+        n = len(s)
+        while True:
+            pos = _w(s, pos).end()
+            if pos == n:
+                break
+            nextchar = s[pos]
+
+            if state == self._FIRST_KEY or state == self._KEY:
+                if nextchar == '"':
+                    if not final and scan_end(s, pos) < 0:
+                        break
+                    try:
+                        key, pos = decoder.parse_string(s, pos + 1,
+                            decoder.encoding, decoder.strict)
+                    except ValueError as e:
+                        raise self._scan_error(e, s)
+                    append((stack[-1][1], 'map_key', key))
+                    prefix = key if not stack[-1][1] else \
+                        stack[-1][1] + '.' + key
+                    state = self._COLON
+                    continue
+                if nextchar != '}' or state == self._KEY:
+                    raise self._error("Expecting property name", s, pos)
+            elif state == self._COLON:
+                if nextchar != ':':
+                    raise self._error("Expecting : delimiter", s, pos)
+                state = self._VALUE
+                pos += 1
+                continue
+            elif state == self._NEXT_KEY or state == self._NEXT_ITEM:
+                if nextchar == ',':
+                    state = self._KEY if state == self._NEXT_KEY else \
+                        self._VALUE
+                    pos += 1
+                    continue
+                if nextchar != ('}' if state == self._NEXT_KEY else ']'):
+                    raise self._error("Expecting , delimiter", s, pos)
+
+            if state != self._VALUE and (nextchar == '}' or
+                                         nextchar == ']'):
+                # The checks above leave only the end of the container
+                # which is open, or a '}' closing an array
+                is_map, prefix = stack.pop()
+                if is_map != (nextchar == '}'):
+                    raise self._error("Expecting value", s, pos)
+                append((prefix, 'end_map' if is_map else 'end_array',
+                        None))
+                pos += 1
+            elif nextchar == '{':
+                append((prefix, 'start_map', None))
+                stack.append((True, prefix))
+                state = self._FIRST_KEY
+                pos += 1
+                continue
+            elif nextchar == '[':
+                append((prefix, 'start_array', None))
+                stack.append((False, prefix))
+                prefix = prefix + '.item' if prefix else 'item'
+                state = self._FIRST_ITEM
+                pos += 1
+                continue
+            else:
+                if not final and scan_end(s, pos) < 0:
+                    break
+                try:
+                    value, pos = scan_once(s, pos)
+                except StopIteration:
+                    raise self._error("Expecting value", s, pos)
+                except ValueError as e:
+                    raise self._scan_error(e, s)
+                append((prefix,
+                        self._SCALAR_EVENTS.get(nextchar, 'number'),
+                        value))
+
+            # A value was completed
+            if not stack:
+                state = self._VALUE
+            elif stack[-1][0]:
+                state = self._NEXT_KEY
+            else:
+                state = self._NEXT_ITEM
+                prefix = stack[-1][1] + '.item' if stack[-1][1] else 'item'
+        if final and (stack or state != self._VALUE):
+            raise self._error("Unterminated JSON document", s, pos)
+        self._stack = stack
+        self._state = state
+        self._prefix = prefix
+        return pos
@@ -8,6 +8,10 @@ class TestSpeedups(TestCase):
         self.assertEquals(decoder.scanstring.__module__, "_json")
         self.assertTrue(decoder.scanstring is decoder.c_scanstring)
 
+    def test_scan_end(self):
+        self.assertEquals(decoder.scan_end.__module__, "_json")
+        self.assertTrue(decoder.scan_end is decoder.c_scan_end)
+
     def test_encode_basestring_ascii(self):
         self.assertEquals(encoder.encode_basestring_ascii.__module__, "_json")
         self.assertTrue(encoder.encode_basestring_ascii is
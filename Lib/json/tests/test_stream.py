@@ -0,0 +1,212 @@
+from unittest import TestCase
+from StringIO import StringIO
+
+import json
+import json.decoder
+
+
+def feed_chunks(parser, s, size):
+    results = []
+    for i in range(0, len(s), size):
+        results.extend(parser.feed(s[i:i + size]))
+    results.extend(parser.close())
+    return results
+
+def feed_error(parser, s, size):
+    try:
+        feed_chunks(parser, s, size)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError("no error for %r" % (s,))
+
+
+class TestStream(TestCase):
+    docs = [{"a": [1, 2.5, None], "b": {"c": True}}, [], "x\\\"y", 12,
+            {}, [[False]], -1e3, u"\u1234"]
+
+    def test_py_scan_end(self):
+        self._test_scan_end(json.decoder.py_scan_end)
+
+    def test_c_scan_end(self):
+        self._test_scan_end(json.decoder.c_scan_end)
+
+    def _test_scan_end(self, scan_end):
+        for s, end in [('[1, 2]x', 6), ('[1, 2', -1), ('"a\\"b" ', 6),
+                       ('"a\\', -1), ('12', -1), ('12,', 2), ('12]', 2),
+                       ('true ', 4), ('{"a": ["]", "}"]}', 17), ('{}', 2),
+                       (']', 0), (',', 0), ('', -1), ('[[[]]', -1)]:
+            self.assertEqual(scan_end(s, 0), end)
+            self.assertEqual(scan_end(unicode(s), 0), end)
+            self.assertEqual(scan_end('  ' + s, 2), -1 if end < 0 else end + 2)
+        self.assertEqual(scan_end(u'["\u1234"]', 0), 5)
+        self.assertEqual(scan_end('["\xe1\x88\xb4"]', 0), 7)
+
+    def test_documents(self):
+        s = '\n'.join(json.dumps(doc) for doc in self.docs)
+        expected = json.loads('[%s]' % s.replace('\n', ','))
+        for size in (1, 2, 3, 7, 100):
+            d = json.JSONStreamDecoder()
+            self.assertEqual(feed_chunks(d, s, size), expected)
+            d = json.JSONStreamDecoder()
+            self.assertEqual(feed_chunks(d, unicode(s), size), expected)
+        self.assertEqual(feed_chunks(json.JSONStreamDecoder(), '', 1), [])
+        self.assertEqual(feed_chunks(json.JSONStreamDecoder(), '1 2', 1),
+                         [1, 2])
+
+    def test_items(self):
+        s = json.dumps(self.docs)
+        expected = json.loads(s)
+        for size in (1, 2, 3, 7, 100):
+            d = json.JSONStreamDecoder(items=True)
+            self.assertEqual(feed_chunks(d, s, size), expected)
+        self.assertEqual(feed_chunks(json.JSONStreamDecoder(True), ' [ ] ', 1),
+                         [])
+
+    def test_values_returned_early(self):
+        d = json.JSONStreamDecoder(items=True)
+        self.assertEqual(d.feed('[{"a": 1}, "b'), [{"a": 1}])
+        self.assertEqual(d.feed('", 1'), ["b"])
+        # The number could go on
+        self.assertEqual(d.feed('0'), [])
+        self.assertEqual(d.feed(' '), [10])
+        self.assertEqual(d.feed(']'), [])
+        self.assertEqual(d.close(), [])
+
+    def test_hooks(self):
+        d = json.decoder.JSONDecoder(object_pairs_hook=list,
+                                     parse_float=str)
+        d = json.JSONStreamDecoder(items=True, decoder=d)
+        self.assertEqual(feed_chunks(d, '[{"a": 1.5}, 2.5]', 3),
+                         [[("a", "1.5")], "2.5"])
+
+    def test_errors(self):
+        for s in ['[1,]', '[1 2]', '[1', '{"a":', 'tru', '"abc', '1]',
+                  '[1]x', ']', '{1: 2}', '[', '[1,', 'x']:
+            for items in (False, True):
+                d = json.JSONStreamDecoder(items)
+                self.assertRaises(ValueError, feed_chunks, d, s, 1)
+        self.assertRaises(ValueError, feed_chunks,
+                          json.JSONStreamDecoder(True), '', 1)
+        d = json.JSONStreamDecoder()
+        self.assertEqual(d.feed('[1]\n[2'), [[1]])
+        self.assertRaises(ValueError, d.feed, ']]')
+        # The error is raised again
+        self.assertRaises(ValueError, d.feed, '')
+        self.assertRaises(ValueError, d.close)
+        d.close()
+        self.assertRaises(ValueError, d.feed, '1')
+
+    def test_error_positions(self):
+        # The positions are counted from the start of the stream, like
+        # json.loads() does for a document
+        for s, modes in [('[1,\n 2, "a\\q"]', (False, True)),
+                         ('[1, 2\n 3]', (False, True)),
+                         ('{"a": 1', (False,))]:
+            with self.assertRaises(ValueError) as cm:
+                json.loads(s)
+            for items in modes:
+                for size in (1, 4, 100):
+                    d = json.JSONStreamDecoder(items)
+                    self.assertEqual(feed_error(d, s, size),
+                                     str(cm.exception))
+        d = json.JSONStreamDecoder(True)
+        self.assertEqual(feed_error(d, '[1,\n 2]\n x', 2),
+                         'Extra data: line 3 column 2 (char 9)')
+        d = json.JSONStreamDecoder()
+        self.assertEqual(feed_error(d, '1 2\n 3\n  {"a": 1', 3),
+                         'Expecting object: line 3 column 9 (char 15)')
+
+    def test_bounded_buffer(self):
+        d = json.JSONStreamDecoder(items=True)
+        d.feed('[')
+        chunk = ', '.join(['{"key": "value", "n": [1, 2, 3]}'] * 10)
+        for i in range(100):
+            self.assertEqual(len(d.feed(chunk + ', ')), 10)
+            self.assertLess(len(d._buffer), 40)
+
+    def test_iterload(self):
+        s = '\n'.join(json.dumps(doc) for doc in self.docs)
+        expected = json.loads('[%s]' % s.replace('\n', ','))
+        self.assertEqual(list(json.iterload(StringIO(s), chunk_size=5)),
+                         expected)
+        s = json.dumps(self.docs)
+        self.assertEqual(list(json.iterload(StringIO(s), items=True,
+                                            chunk_size=5)),
+                         expected)
+        self.assertEqual(list(json.iterload(StringIO('[1.5]'), items=True,
+                                            parse_float=str)),
+                         ['1.5'])
+
+
+class TestEvents(TestCase):
+    doc = ('{"a": [1, {"b": null, "c": []}, "x"], "d": {"e": false}, '
+           '"f": -2.5}')
+    events = [
+        ('', 'start_map', None),
+        ('', 'map_key', 'a'),
+        ('a', 'start_array', None),
+        ('a.item', 'number', 1),
+        ('a.item', 'start_map', None),
+        ('a.item', 'map_key', 'b'),
+        ('a.item.b', 'null', None),
+        ('a.item', 'map_key', 'c'),
+        ('a.item.c', 'start_array', None),
+        ('a.item.c', 'end_array', None),
+        ('a.item', 'end_map', None),
+        ('a.item', 'string', 'x'),
+        ('a', 'end_array', None),
+        ('', 'map_key', 'd'),
+        ('d', 'start_map', None),
+        ('d', 'map_key', 'e'),
+        ('d.e', 'boolean', False),
+        ('d', 'end_map', None),
+        ('', 'map_key', 'f'),
+        ('f', 'number', -2.5),
+        ('', 'end_map', None),
+    ]
+
+    def test_events(self):
+        for size in (1, 2, 3, 7, 100):
+            p = json.JSONEventParser()
+            self.assertEqual(feed_chunks(p, self.doc, size), self.events)
+            p = json.JSONEventParser()
+            self.assertEqual(feed_chunks(p, unicode(self.doc), size),
+                             self.events)
+
+    def test_documents(self):
+        p = json.JSONEventParser()
+        self.assertEqual(feed_chunks(p, '1 [true] "a"', 1),
+                         [('', 'number', 1),
+                          ('', 'start_array', None),
+                          ('item', 'boolean', True),
+                          ('', 'end_array', None),
+                          ('', 'string', 'a')])
+
+    def test_errors(self):
+        for s in ['[1,]', '{"a" 1}', '{"a": 1,}', '[1 2]', '}', ']', '{]',
+                  '[}', '[1', '{"a":', 'tru', '"abc', '{"a": 1}}', '{1: 2}',
+                  ',', '{,}']:
+            p = json.JSONEventParser()
+            self.assertRaises(ValueError, feed_chunks, p, s, 1)
+
+    def test_error_positions(self):
+        for s in ['[1,\n 2, "a\\q"]', '{"a": 1,\n "b\\q": 2}']:
+            with self.assertRaises(ValueError) as cm:
+                json.loads(s)
+            for size in (1, 4, 100):
+                p = json.JSONEventParser()
+                self.assertEqual(feed_error(p, s, size), str(cm.exception))
+        for size in (1, 4, 100):
+            p = json.JSONEventParser()
+            self.assertEqual(feed_error(p, '[1]\n{"a" 1}', size),
+                             'Expecting : delimiter: line 2 column 6 (char 9)')
+
+    def test_iterparse(self):
+        self.assertEqual(list(json.iterparse(StringIO(self.doc),
+                                             chunk_size=4)),
+                         self.events)
+        self.assertEqual(list(json.iterparse(StringIO('[1.5]'),
+                                             parse_float=str)),
+                         [('', 'start_array', None),
+                          ('item', 'number', '1.5'),
+                          ('', 'end_array', None)])
@@ -0,0 +1,333 @@
+#! /usr/bin/env python
+
+"""Statistical profiler sampling the Python stack on SIGPROF.
+
+Instead of hooking every call and return like profile and cProfile, the
+profiler asks the kernel for a SIGPROF signal every 'interval' seconds of
+CPU time and records the stack of the main thread each time.  Functions
+which run longer are sampled more often; the overhead only depends on the
+sampling rate, so it is low enough to profile production code.
+
+The samples can be analyzed with pstats, like the results of cProfile, or
+written as "folded stacks", the input format of flame graph tools.
+"""
+
+import signal
+import sys
+import time
+
+if not hasattr(signal, 'setitimer'):
+    raise ImportError("sampleprof requires signal.setitimer()")
+
+__all__ = ["run", "runctx", "Profile"]
+
+# ____________________________________________________________
+# Simple interface
+
+def run(statement, filename=None, sort=-1, interval=None):
+    """Run statement under the sampling profiler, optionally saving the
+    results in filename.
+
+    The arguments have the same meaning as for profile.run(); interval
+    is the sampling period in seconds of CPU time.
+    """
+    prof = Profile(interval)
+    result = None
+    try:
+        try:
+            prof = prof.run(statement)
+        except SystemExit:
+            pass
+    finally:
+        if filename is not None:
+            prof.dump_stats(filename)
+        else:
+            result = prof.print_stats(sort)
+    return result
+
+def runctx(statement, globals, locals, filename=None, interval=None):
+    """Run statement under the sampling profiler, supplying your own
+    globals and locals, optionally saving the results in filename.
+
+    statement and filename have the same semantics as profile.run
+    """
+    prof = Profile(interval)
+    result = None
+    try:
+        try:
+            prof = prof.runctx(statement, globals, locals)
+        except SystemExit:
+            pass
+    finally:
+        if filename is not None:
+            prof.dump_stats(filename)
+        else:
+            result = prof.print_stats()
+    return result
+
+# ____________________________________________________________
+
+class Profile(object):
+    """Profile(interval=0.001)
+
+    Builds a sampling profiler taking a sample of the stack every interval
+    seconds of CPU time consumed by the process.
+
+    Signal handlers always run in the main thread, so only the main thread
+    is sampled, and enable() must be called from it.  The samples
+    attribute is a dictionary mapping the sampled stacks, tuples of code
+    objects from the innermost frame to the outermost, to their number of
+    samples.
+    """
+
+    default_interval = 0.001
+
+    def __init__(self, interval=None):
+        if interval is None:
+            interval = self.default_interval
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self._counts = {}
+        self._stacks = {}
+        self._cpu_time = 0.0
+        self._enabled = False
+        self._old_handler = None
+        self._top_frame = None
+        self._start_time = None
+
+    def _sample(self, signum, frame):
+        # Keep this fast: it runs up to 1/interval times per second.  The
+        # stacks are keyed by the ids of the code objects, since hashing a
+        # code object hashes its bytecode and constants.
+        codes = []
+        append = codes.append
+        top = self._top_frame
+        while frame is not None and frame is not top:
+            append(frame.f_code)
+            frame = frame.f_back
+        key = tuple(map(id, codes))
+        try:
+            self._counts[key] += 1
+        except KeyError:
+            if codes:
+                self._counts[key] = 1
+                # keep the code objects alive, so that the ids stay valid
+                self._stacks[key] = tuple(codes)
+
+    @property
+    def samples(self):
+        samples = {}
+        for key, n in self._counts.iteritems():
+            # distinct code objects can compare equal
+            stack = self._stacks[key]
+            samples[stack] = samples.get(stack, 0) + n
+        return samples
+
+    def enable(self):
+        """Start sampling the stack."""
+        if self._enabled:
+            return
+        # like cProfile, only see the frames below the caller
+        self._top_frame = sys._getframe(1)
+        self._start_time = time.clock()
+        self._old_handler = signal.signal(signal.SIGPROF, self._sample)
+        # restart the system calls interrupted by the sampling
+        signal.siginterrupt(signal.SIGPROF, False)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self._enabled = True
+
+    def disable(self):
+        """Stop sampling the stack."""
+        if not self._enabled:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._old_handler)
+        self._cpu_time += time.clock() - self._start_time
+        self._old_handler = None
+        self._top_frame = None
+        self._enabled = False
+
+    def clear(self):
+        """Forget the samples taken so far."""
+        self._counts = {}
+        self._stacks = {}
+        self._cpu_time = 0.0
+
+    def print_stats(self, sort=-1):
+        import pstats
+        self.create_stats()
+        if not self.stats:
+            # pstats refuses empty profiles: the code ran for less than
+            # the sampling interval
+            print "No samples collected (interval: %g seconds of CPU time)" % (
+                self.interval,)
+            return
+        pstats.Stats(self).strip_dirs().sort_stats(sort).print_stats()
+
+    def dump_stats(self, file):
+        import marshal
+        f = open(file, 'wb')
+        self.create_stats()
+        marshal.dump(self.stats, f)
+        f.close()
+
+    def create_stats(self):
+        self.disable()
+        self.snapshot_stats()
+
+    def snapshot_stats(self):
+        """Build the stats attribute, in the format used by pstats, from
+        the samples.
+
+        A function appearing several times in a stack (recursion) is only
+        counted once in the cumulative time of the stack.  Since calls are
+        not seen, the call counts are numbers of samples.
+        """
+        samples = self.samples
+        # The kernel rounds the interval up to its timer resolution, so
+        # share the CPU time measured while sampling between the samples.
+        nsamples = sum(samples.itervalues())
+        if nsamples and self._cpu_time > 0:
+            interval = self._cpu_time / nsamples
+        else:
+            interval = self.interval
+        counts = {}         # func -> [samples, samples in func itself]
+        edges = {}          # (caller, callee) -> [samples, in callee itself]
+        for stack, n in samples.iteritems():
+            funcs = map(label, stack)
+            seen = set()
+            for i, func in enumerate(funcs):
+                if func not in seen:
+                    seen.add(func)
+                    try:
+                        count = counts[func]
+                    except KeyError:
+                        count = counts[func] = [0, 0]
+                    count[0] += n
+                    if i == 0:
+                        count[1] += n
+                if i + 1 < len(funcs):
+                    edge = (funcs[i + 1], func)
+                    if edge not in seen:
+                        seen.add(edge)
+                        try:
+                            count = edges[edge]
+                        except KeyError:
+                            count = edges[edge] = [0, 0]
+                        count[0] += n
+                        if i == 0:
+                            count[1] += n
+
+        self.stats = {}
+        for func, (total, inline) in counts.iteritems():
+            self.stats[func] = (total, total,
+                                inline * interval, total * interval, {})
+        for (caller, callee), (total, inline) in edges.iteritems():
+            callers = self.stats[callee][4]
+            callers[caller] = (total, total,
+                               inline * interval, total * interval)
+
+    def folded_stacks(self):
+        """Return the samples as a list of "folded stack" lines, the format
+        read by flame graph tools: the function names of the stack from the
+        outermost to the innermost, separated by semicolons, followed by a
+        space and the number of samples."""
+        lines = []
+        for stack, n in self.samples.iteritems():
+            names = [func_name(code) for code in reversed(stack)]
+            lines.append('%s %d' % (';'.join(names), n))
+        lines.sort()
+        return lines
+
+    def dump_folded(self, file):
+        """Write the folded stacks of the samples into file."""
+        self.disable()
+        f = open(file, 'w')
+        for line in self.folded_stacks():
+            f.write(line + '\n')
+        f.close()
+
+    # The following two methods can be called by clients to use
+    # a profiler to profile a statement, given as a string.
+
+    def run(self, cmd):
+        import __main__
+        dict = __main__.__dict__
+        return self.runctx(cmd, dict, dict)
+
+    def runctx(self, cmd, globals, locals):
+        self.enable()
+        try:
+            exec cmd in globals, locals
+        finally:
+            self.disable()
+        return self
+
+    # This method is more useful to profile a single function call.
+    def runcall(self, func, *args, **kw):
+        self.enable()
+        try:
+            return func(*args, **kw)
+        finally:
+            self.disable()
+
+# ____________________________________________________________
+
+def label(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def func_name(code):
+    return '%s (%s:%d)' % (code.co_name, code.co_filename,
+                           code.co_firstlineno)
+
+# ____________________________________________________________
+
+def main():
+    import os
+    from optparse import OptionParser
+    usage = ("sampleprof.py [-o output_file_path] [-f folded_file_path] "
+             "[-s sort] [-i interval] scriptfile [arg] ...")
+    parser = OptionParser(usage=usage)
+    parser.allow_interspersed_args = False
+    parser.add_option('-o', '--outfile', dest="outfile",
+        help="Save stats to <outfile>", default=None)
+    parser.add_option('-f', '--folded', dest="folded",
+        help="Save folded stacks for flame graph tools to <folded>",
+        default=None)
+    parser.add_option('-s', '--sort', dest="sort",
+        help="Sort order when printing to stdout, based on pstats.Stats class", default=-1)
+    parser.add_option('-i', '--interval', dest="interval", type="float",
+        help="Sampling interval in seconds of CPU time (default: %s)"
+             % Profile.default_interval,
+        default=None)
+
+    if not sys.argv[1:]:
+        parser.print_usage()
+        sys.exit(2)
+
+    (options, args) = parser.parse_args()
+    sys.argv[:] = args
+
+    if (len(sys.argv) > 0):
+        sys.path.insert(0, os.path.dirname(sys.argv[0]))
+        prof = Profile(options.interval)
+        try:
+            try:
+                prof.run('execfile(%r)' % (sys.argv[0],))
+            except SystemExit:
+                pass
+        finally:
+            if options.folded is not None:
+                prof.dump_folded(options.folded)
+            if options.outfile is not None:
+                prof.dump_stats(options.outfile)
+            elif options.folded is None:
+                prof.print_stats(options.sort)
+    else:
+        parser.print_usage()
+    return parser
+
+# When invoked as main program, invoke the profiler on a script
+if __name__ == '__main__':
+    main()
@@ -74,6 +74,13 @@ ENABLE_USER_SITE = None
 USER_SITE = None
 USER_BASE = None
 
+# Version of the format of the site cache, see main()
+_SITE_CACHE_VERSION = 1
+# While the site cache is recorded, a pair of lists: the (path, stat key)
+# of the files and directories the processing depends on, and the actions
+# to replay
+_site_cache_record = None
+
 
 def makepath(*paths):
     dir = os.path.abspath(os.path.join(*paths))
@@ -114,14 +121,39 @@ def removeduppaths():
 def addbuilddir():
     """Append ./build/lib.<platform> in case we're running in the build dir
     (especially for Guido :-)"""
-    from sysconfig import get_platform
-    s = "build/lib.%s-%.3s" % (get_platform(), sys.version)
-    if hasattr(sys, 'gettotalrefcount'):
-        s += '-pydebug'
-    s = os.path.join(os.path.dirname(sys.path.pop()), s)
+    builddir = os.path.dirname(sys.path.pop())
+    try:
+        # written by the build, saves importing sysconfig at startup
+        with open(os.path.join(builddir, 'pybuilddir.txt')) as f:
+            s = f.read().strip()
+    except IOError:
+        from sysconfig import get_platform
+        s = "build/lib.%s-%.3s" % (get_platform(), sys.version)
+        if hasattr(sys, 'gettotalrefcount'):
+            s += '-pydebug'
+    s = os.path.join(builddir, s)
     sys.path.append(s)
 
 
+def _stat_key(path):
+    """Return what the site cache compares to know whether path changed"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mode, st.st_mtime, st.st_size)
+
+
+def _record_dependency(path):
+    if _site_cache_record is not None:
+        _site_cache_record[0].append((path, _stat_key(path)))
+
+
+def _record_action(*action):
+    if _site_cache_record is not None:
+        _site_cache_record[1].append(action)
+
+
 def _init_pathinfo():
     """Return a set containing all existing directory entries from sys.path"""
     d = set()
@@ -140,12 +172,14 @@ def addpackage(sitedir, name, known_paths):
        For each line in the file, either combine it with sitedir to a path
        and add that to known_paths, or execute it if it starts with 'import '.
     """
+    global _site_cache_record
     if known_paths is None:
         _init_pathinfo()
         reset = 1
     else:
         reset = 0
     fullname = os.path.join(sitedir, name)
+    _record_dependency(fullname)
     try:
         f = open(fullname, "rU")
     except IOError:
@@ -155,10 +189,22 @@ def addpackage(sitedir, name, known_paths):
             if line.startswith("#"):
                 continue
             if line.startswith(("import ", "import\t")):
-                exec line
+                _record_action('exec', sitedir, name, line)
+                # the effects of the line are not recorded: it is executed
+                # again when the cache is used
+                record, _site_cache_record = _site_cache_record, None
+                try:
+                    exec line
+                finally:
+                    _site_cache_record = record
                 continue
             line = line.rstrip()
             dir, dircase = makepath(sitedir, line)
+            if _site_cache_record is not None:
+                # creating or removing dir changes the mtime of its parent
+                _record_dependency(os.path.dirname(dir))
+                if os.path.exists(dir):
+                    _record_action('path', dir, dircase)
             if not dircase in known_paths and os.path.exists(dir):
                 sys.path.append(dir)
                 known_paths.add(dircase)
@@ -176,6 +222,7 @@ def addsitedir(sitedir, known_paths=None):
     else:
         reset = 0
     sitedir, sitedircase = makepath(sitedir)
+    _record_action('sitedir', sitedir, sitedircase)
     if not sitedircase in known_paths:
         sys.path.append(sitedir)        # Add path component
     try:
@@ -225,6 +272,17 @@ def getuserbase():
     global USER_BASE
     if USER_BASE is not None:
         return USER_BASE
+    if os.name in ('posix', 'nt') and sys.platform != 'darwin':
+        # like sysconfig, without importing it and its variables at startup
+        env_base = os.environ.get("PYTHONUSERBASE", None)
+        if env_base:
+            USER_BASE = env_base
+        elif os.name == 'nt':
+            base = os.environ.get("APPDATA") or "~"
+            USER_BASE = os.path.expanduser(os.path.join(base, "Python"))
+        else:
+            USER_BASE = os.path.expanduser(os.path.join("~", ".local"))
+        return USER_BASE
     from sysconfig import get_config_var
     USER_BASE = get_config_var('userbase')
     return USER_BASE
@@ -241,8 +299,17 @@ def getusersitepackages():
     if USER_SITE is not None:
         return USER_SITE
 
+    if os.name in ('posix', 'nt') and sys.platform != 'darwin':
+        # the purelib path of the posix_user and nt_user sysconfig schemes
+        if os.name == 'nt':
+            subdir = "Python" + sys.version[0] + sys.version[2]
+        else:
+            subdir = os.path.join("lib", "python" + sys.version[:3])
+        USER_SITE = os.path.normpath(os.path.join(user_base, subdir,
+                                                  "site-packages"))
+        return USER_SITE
+
     from sysconfig import get_path
-    import os
 
     if sys.platform == 'darwin':
         from sysconfig import get_config_var
@@ -263,8 +330,10 @@ def addusersitepackages(known_paths):
     # this call will also make sure USER_BASE and USER_SITE are set
     user_site = getusersitepackages()
 
-    if ENABLE_USER_SITE and os.path.isdir(user_site):
-        addsitedir(user_site, known_paths)
+    if ENABLE_USER_SITE:
+        _record_dependency(user_site)
+        if os.path.isdir(user_site):
+            addsitedir(user_site, known_paths)
     return known_paths
 
 def getsitepackages():
@@ -307,11 +376,90 @@ def getsitepackages():
 def addsitepackages(known_paths):
     """Add site-packages (and possibly site-python) to sys.path"""
     for sitedir in getsitepackages():
+        _record_dependency(sitedir)
         if os.path.isdir(sitedir):
             addsitedir(sitedir, known_paths)
 
     return known_paths
 
+def _execpthline(sitedir, name, known_paths, line):
+    """Execute an import line of a .pth file, in the same namespace as
+    addpackage() does"""
+    exec line
+
+def _getsitecachekey():
+    return (_SITE_CACHE_VERSION, sys.version, sys.prefix, sys.exec_prefix,
+            bool(ENABLE_USER_SITE), getusersitepackages(),
+            tuple(getsitepackages()))
+
+def _loadsitecache(filename, known_paths):
+    """Add the site directories and the paths of their .pth files to
+    sys.path from the cache file written by _savesitecache(), and execute
+    the import lines of the .pth files.
+
+    Return False, without changing sys.path, if the cache is missing or
+    if one of the directories or files it depends on changed.
+    """
+    import marshal
+    try:
+        with open(filename, 'rb') as f:
+            key, dependencies, actions = marshal.load(f)
+    except (IOError, EOFError, ValueError, TypeError):
+        return False
+    if key != _getsitecachekey():
+        return False
+    for path, stat_key in dependencies:
+        if _stat_key(path) != stat_key:
+            return False
+    for action in actions:
+        if action[0] == 'exec':
+            _execpthline(action[1], action[2], known_paths, action[3])
+        else:
+            dir, dircase = action[1:]
+            if not dircase in known_paths:
+                sys.path.append(dir)
+                if action[0] == 'path':
+                    known_paths.add(dircase)
+    return True
+
+def _savesitecache(filename, record):
+    """Write the dependencies and the actions recorded while processing
+    the site directories into the cache file filename."""
+    import marshal
+    dependencies = []
+    seen = set()
+    for path, stat_key in record[0]:
+        if path not in seen:
+            seen.add(path)
+            dependencies.append((path, stat_key))
+    actions = record[1]
+    tmpname = '%s.%d' % (filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as f:
+            marshal.dump((_getsitecachekey(), dependencies, actions), f)
+        # A file modified again in the same clock tick would keep the same
+        # mtime: don't trust recently modified files and directories.
+        now = os.stat(tmpname).st_mtime
+        for path, stat_key in dependencies:
+            if stat_key is not None and stat_key[1] > now - 2:
+                os.remove(tmpname)
+                return
+        if os.name == 'nt' and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpname, filename)
+    except (IOError, OSError):
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+
+def _getsitecachefile():
+    """Return the name of the site cache file set by the PYTHONSITECACHE
+    environment variable, or None."""
+    if sys.flags.ignore_environment:
+        return None
+    return os.environ.get("PYTHONSITECACHE") or None
+
 def setBEGINLIBPATH():
     """The OS/2 EMX port has optional extension modules that do double duty
     as DLLs (and must use the .DLL file extension) for other extensions.
@@ -519,7 +667,7 @@ def execusercustomize():
 
 
 def main():
-    global ENABLE_USER_SITE
+    global ENABLE_USER_SITE, _site_cache_record
 
     abs__file__()
     known_paths = removeduppaths()
@@ -528,8 +676,18 @@ def main():
         addbuilddir()
     if ENABLE_USER_SITE is None:
         ENABLE_USER_SITE = check_enableusersite()
-    known_paths = addusersitepackages(known_paths)
-    known_paths = addsitepackages(known_paths)
+    cachefile = _getsitecachefile()
+    if cachefile is None:
+        known_paths = addusersitepackages(known_paths)
+        known_paths = addsitepackages(known_paths)
+    elif not _loadsitecache(cachefile, known_paths):
+        _site_cache_record = record = ([], [])
+        try:
+            known_paths = addusersitepackages(known_paths)
+            known_paths = addsitepackages(known_paths)
+        finally:
+            _site_cache_record = None
+        _savesitecache(cachefile, record)
     if sys.platform == 'os2emx':
         setBEGINLIBPATH()
     setquit()
@@ -197,7 +197,14 @@ def _parse_makefile(filename, vars=None):
     with open(filename) as f:
         lines = f.readlines()
 
-    for line in lines:
+    # join the continuation lines
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        while line.endswith('\\\n') and i + 1 < len(lines):
+            i += 1
+            line = line[:-2] + lines[i]
+        i += 1
         if line.startswith('#') or line.strip() == '':
             continue
         m = _variable_rx.match(line)
@@ -262,8 +269,8 @@ def _get_makefile_filename():
     return os.path.join(get_path('stdlib'), "config", "Makefile")
 
 
-def _init_posix(vars):
-    """Initialize the module as appropriate for POSIX systems."""
+def _parse_posix_vars(vars):
+    """Parse the installed Makefile and pyconfig.h into vars."""
     # load the installed Makefile:
     makefile = _get_makefile_filename()
     try:
@@ -283,6 +290,53 @@ def _init_posix(vars):
         if hasattr(e, "strerror"):
             msg = msg + " (%s)" % e.strerror
         raise IOError(msg)
+    return vars
+
+
+def _get_build_dir():
+    """Return the directory where setup.py builds the extension modules,
+    relative to the build directory of Python."""
+    builddir = 'build/lib.%s-%s' % (get_platform(), _PY_VERSION_SHORT)
+    if hasattr(sys, "gettotalrefcount"):
+        builddir += '-pydebug'
+    return builddir
+
+
+def _generate_posix_vars():
+    """Generate the _sysconfigdata module holding the variables of the
+    Makefile and pyconfig.h, so that they are not parsed at runtime.
+
+    The module is written in the build directory of the extension
+    modules, which site.py adds to sys.path when Python runs from its
+    build directory, and "make install" copies it into the standard
+    library.  The name of the directory is written into pybuilddir.txt.
+    """
+    vars = _parse_posix_vars({})
+    builddir = _get_build_dir()
+    if not os.path.isdir(builddir):
+        os.makedirs(builddir)
+    destfile = os.path.join(builddir, '_sysconfigdata.py')
+    with open(destfile, 'w') as f:
+        f.write('# system configuration generated and used by'
+                ' the sysconfig module\n')
+        f.write('build_time_vars = {\n')
+        for name in sorted(vars):
+            f.write('    %r: %r,\n' % (name, vars[name]))
+        f.write('}\n')
+    with open('pybuilddir.txt', 'w') as f:
+        f.write(builddir)
+
+
+def _init_posix(vars):
+    """Initialize the module as appropriate for POSIX systems."""
+    try:
+        # the variables of the Makefile and pyconfig.h, generated at build
+        # time by _generate_posix_vars()
+        from _sysconfigdata import build_time_vars
+    except ImportError:
+        _parse_posix_vars(vars)
+    else:
+        vars.update(build_time_vars)
 
     # On MacOSX we need to check the setting of the environment variable
     # MACOSX_DEPLOYMENT_TARGET: configure bases some choices on it so
@@ -684,3 +738,29 @@ def get_platform():
 
 def get_python_version():
     return _PY_VERSION_SHORT
+
+
+def _print_dict(title, data):
+    for index, (key, value) in enumerate(sorted(data.items())):
+        if index == 0:
+            print '%s: ' % (title)
+        print '\t%s = "%s"' % (key, value)
+
+
+def _main():
+    """Display all information sysconfig contains, or generate the
+    _sysconfigdata module with --generate-posix-vars."""
+    if '--generate-posix-vars' in sys.argv:
+        _generate_posix_vars()
+        return
+    print 'Platform: "%s"' % get_platform()
+    print 'Python version: "%s"' % get_python_version()
+    print 'Current installation scheme: "%s"' % _get_default_scheme()
+    print
+    _print_dict('Paths', get_paths())
+    print
+    _print_dict('Variables', get_config_vars())
+
+
+if __name__ == '__main__':
+    _main()
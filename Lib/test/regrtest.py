@@ -445,7 +445,7 @@ def main(tests=None, testdir=None, verbose=0, quiet=False,
     if trace:
         import trace
         tracer = trace.Trace(ignoredirs=[sys.prefix, sys.exec_prefix],
-                             trace=False, count=True)
+                             trace=False, count=True, ctracer=True)
 
     test_times = []
     test_support.use_resources = use_resources
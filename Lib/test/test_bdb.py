@@ -0,0 +1,172 @@
+"""Tests for the breakpoints of the bdb module."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from test import test_support
+
+import bdb
+
+
+def untraced():
+    return sys._getframe().f_trace
+
+def with_break(n):
+    x = n + 1
+    return x
+
+def caller():
+    traces = []
+    for i in range(3):
+        traces.append(untraced())
+    x = with_break(1)
+    traces.append(sys._getframe().f_trace)
+    return traces, x
+
+def lineno(func, offset):
+    return func.func_code.co_firstlineno + offset
+
+filename = with_break.func_code.co_filename
+
+
+class Tracer(bdb.Bdb):
+    """Record the stops and run the commands given to the constructor."""
+
+    def __init__(self, commands):
+        bdb.Bdb.__init__(self)
+        self.commands = list(commands)
+        self.stops = []
+
+    def user_line(self, frame):
+        self.stops.append((frame.f_code.co_name, frame.f_lineno))
+        self.next_command(frame)
+
+    def user_return(self, frame, return_value):
+        self.stops.append((frame.f_code.co_name, 'return'))
+        self.next_command(frame)
+
+    def next_command(self, frame):
+        if self.commands:
+            command = self.commands.pop(0)
+        else:
+            command = 'continue'
+        if command == 'continue':
+            self.set_continue()
+        elif command == 'step':
+            self.set_step()
+        elif command == 'return':
+            self.set_return(frame)
+        elif command == 'quit':
+            self.set_quit()
+
+
+class BreakpointTest(unittest.TestCase):
+
+    def tracer(self, commands):
+        tracer = Tracer(commands)
+        # the breakpoints are class state shared by all the debuggers
+        self.addCleanup(tracer.clear_all_breaks)
+        return tracer
+
+    def test_only_code_with_breaks_traced(self):
+        tracer = self.tracer(['continue'])
+        tracer.set_break(filename, lineno(with_break, 1))
+        traces, x = tracer.runcall(caller)
+        self.assertEqual(x, 2)
+        self.assertEqual(traces, [None] * 4)
+        self.assertEqual(tracer.stops,
+                         [('caller', lineno(caller, 1)),
+                          ('with_break', lineno(with_break, 1))])
+        self.assertTrue(tracer._code_breaks(with_break.func_code))
+        self.assertFalse(tracer._code_breaks(untraced.func_code))
+
+    def test_break_lines(self):
+        tracer = self.tracer([])
+        tracer.set_break(filename, lineno(with_break, 2))
+        tracer.set_break(filename, lineno(caller, 4))
+        self.assertEqual(tracer._code_breaks(with_break.func_code),
+                         frozenset([lineno(with_break, 2)]))
+        self.assertEqual(tracer._code_breaks(caller.func_code),
+                         frozenset([lineno(caller, 4)]))
+        self.assertEqual(tracer._code_breaks(untraced.func_code),
+                         frozenset())
+        tracer.clear_break(filename, lineno(caller, 4))
+        self.assertEqual(tracer._code_breaks(caller.func_code),
+                         frozenset())
+        tracer.clear_all_breaks()
+        self.assertEqual(tracer._code_breaks(with_break.func_code),
+                         frozenset())
+
+    def test_break_by_funcname(self):
+        tracer = self.tracer([])
+        tracer.set_break(filename, lineno(with_break, 0),
+                         funcname='with_break')
+        tracer.runcall(caller)
+        self.assertEqual(tracer.stops,
+                         [('caller', lineno(caller, 1)),
+                          ('with_break', lineno(with_break, 1))])
+
+    def test_step_into_untraced_caller(self):
+        # caller() runs untraced after 'continue', the debugger must
+        # still stop in it after returning from the breakpoint
+        tracer = self.tracer(['continue', 'return', 'step'])
+        tracer.set_break(filename, lineno(with_break, 1))
+        tracer.runcall(caller)
+        self.assertEqual(tracer.stops,
+                         [('caller', lineno(caller, 1)),
+                          ('with_break', lineno(with_break, 1)),
+                          ('with_break', 'return'),
+                          ('caller', lineno(caller, 5))])
+
+    def test_break_set_while_stopped(self):
+        # a breakpoint set in a running frame is hit after 'continue'
+        tracer = self.tracer(['continue'])
+        tracer.set_break(filename, lineno(with_break, 1))
+        def user_line(frame, user_line=tracer.user_line):
+            if frame.f_code is with_break.func_code:
+                tracer.set_break(filename, lineno(caller, 6))
+            user_line(frame)
+        tracer.user_line = user_line
+        tracer.runcall(caller)
+        self.assertEqual(tracer.stops,
+                         [('caller', lineno(caller, 1)),
+                          ('with_break', lineno(with_break, 1)),
+                          ('caller', lineno(caller, 6))])
+
+    def test_equal_code_in_different_files(self):
+        # equal code objects from two files must not share their breakpoints
+        source = "def f():\n    x = 1\n    return x\n"
+        dirname = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dirname)
+        funcs = []
+        for name in ('m1.py', 'm2.py'):
+            path = os.path.join(dirname, name)
+            with open(path, 'w') as f:
+                f.write(source)
+            namespace = {}
+            exec compile(source, path, 'exec') in namespace
+            funcs.append(namespace['f'])
+        self.assertEqual(funcs[0].func_code, funcs[1].func_code)
+        tracer = self.tracer(['continue', 'continue'])
+        tracer.set_break(funcs[1].func_code.co_filename, 2)
+        tracer.runcall(lambda: [f() for f in funcs])
+        self.assertEqual(tracer.stops[1:], [('f', 2)])
+        self.assertEqual(tracer._code_breaks(funcs[0].func_code),
+                         frozenset())
+        self.assertEqual(tracer._code_breaks(funcs[1].func_code),
+                         frozenset([2]))
+
+    def test_no_breaks(self):
+        tracer = self.tracer(['continue'])
+        tracer.runcall(caller)
+        self.assertEqual(tracer.stops, [('caller', lineno(caller, 1))])
+        self.assertIsNone(sys.gettrace())
+
+
+def test_main():
+    test_support.run_unittest(BreakpointTest)
+
+if __name__ == "__main__":
+    test_main()
@@ -2,13 +2,15 @@
 import unittest, doctest, operator
 import inspect
 from test import test_support
-from collections import namedtuple, Counter, OrderedDict
+from collections import namedtuple, Counter, OrderedDict, _PyOrderedDict
 from test import mapping_tests
 import pickle, cPickle, copy
 from random import randrange, shuffle
 import keyword
 import re
 import sys
+import collections
+import _collections
 from collections import Hashable, Iterable, Iterator
 from collections import Sized, Container, Callable
 from collections import Set, MutableSet
@@ -177,6 +179,32 @@ class TestNamedTuple(unittest.TestCase):
             self.assertEqual(p, q)
             self.assertEqual(p._fields, q._fields)
 
+    def test_methods(self):
+        Point = namedtuple('Point', 'x y')
+        self.assertEqual(inspect.getargspec(Point.__new__).args,
+                         ['_cls', 'x', 'y'])
+        self.assertEqual(Point.__new__.__name__, '__new__')
+        self.assertEqual(Point.__new__.__doc__,
+                         'Create new instance of Point(x, y)')
+        self.assertEqual(Point._make.__doc__,
+                         'Make a new Point object from a sequence or iterable')
+        self.assertEqual(Point.x.__doc__, 'Alias for field number 0')
+        with self.assertRaises(TypeError) as cm:
+            Point(1)
+        self.assertIn('__new__()', str(cm.exception))
+        with self.assertRaises(TypeError) as cm:
+            Point._make([1, 2, 3])
+        self.assertEqual(str(cm.exception), 'Expected 2 arguments, got 3')
+        with self.assertRaises(ValueError):
+            Point(1, 2)._replace(z=3)
+        # Classes with the same fields do not share their methods' state
+        Other = namedtuple('Other', 'x y')
+        self.assertEqual(repr(Other(1, 2)), 'Other(x=1, y=2)')
+        self.assertEqual(repr(Point(1, 2)), 'Point(x=1, y=2)')
+        Empty = namedtuple('Empty', '')
+        self.assertEqual(Empty(), ())
+        self.assertEqual(repr(Empty._make([])), 'Empty()')
+
     def test_name_conflicts(self):
         # Some names like "self", "cls", "tuple", "itemgetter", and "property"
         # failed when used as field names.  Test to make sure these now work.
@@ -716,6 +744,32 @@ class TestCounter(unittest.TestCase):
                 set_result = setop(set(p.elements()), set(q.elements()))
                 self.assertEqual(counter_result, dict.fromkeys(set_result, 1))
 
+    def test_count_elements(self):
+        from collections import _count_elements
+        d = {'a': 1, 'b': 2.5, 'c': sys.maxint}
+        _count_elements(d, 'abcdd')
+        self.assertEqual(d, {'a': 2, 'b': 3.5, 'c': sys.maxint + 1, 'd': 2})
+        _count_elements(d, [])
+        self.assertEqual(len(d), 4)
+        self.assertRaises(TypeError, _count_elements, d, [[]])
+        self.assertRaises(TypeError, _count_elements, d, 5)
+        self.assertEqual(d, {'a': 2, 'b': 3.5, 'c': sys.maxint + 1, 'd': 2})
+
+        # Overridden get() and __setitem__() are used
+        class D(dict):
+            def get(self, key, default=None):
+                return dict.get(self, key, 10)
+        d = D()
+        _count_elements(d, 'aab')
+        self.assertEqual(d, {'a': 12, 'b': 11})
+        class C(Counter):
+            def __setitem__(self, key, value):
+                Counter.__setitem__(self, key, value * 2)
+        self.assertEqual(C('aab'), {'a': 6, 'b': 2})
+        od = OrderedDict()
+        _count_elements(od, 'bacab')
+        self.assertEqual(list(od.items()), [('b', 2), ('a', 2), ('c', 1)])
+
     def test_subtract(self):
         c = Counter(a=-5, b=0, c=5, d=10, e=15,g=40)
         c.subtract(a=1, b=2, c=-3, d=10, e=20, f=30, h=-50)
@@ -727,9 +781,10 @@ class TestCounter(unittest.TestCase):
         c.subtract('aaaabbcce')
         self.assertEqual(c, Counter(a=-1, b=0, c=-1, d=1, e=-1))
 
-class TestOrderedDict(unittest.TestCase):
+class OrderedDictTests:
 
     def test_init(self):
+        OrderedDict = self.OrderedDict
         with self.assertRaises(TypeError):
             OrderedDict([('a', 1), ('b', 2)], None)                                 # too many args
         pairs = [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 5)]
@@ -739,10 +794,6 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(list(OrderedDict([('a', 1), ('b', 2), ('c', 9), ('d', 4)],
                                           c=3, e=5).items()), pairs)                # mixed input
 
-        # make sure no positional args conflict with possible kwdargs
-        self.assertEqual(inspect.getargspec(OrderedDict.__dict__['__init__']).args,
-                         ['self'])
-
         # Make sure that direct calls to __init__ do not clear previous contents
         d = OrderedDict([('a', 1), ('b', 2), ('c', 3), ('d', 44), ('e', 55)])
         d.__init__([('e', 5), ('f', 6)], g=7, d=4)
@@ -750,6 +801,7 @@ class TestOrderedDict(unittest.TestCase):
             [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 5), ('f', 6), ('g', 7)])
 
     def test_update(self):
+        OrderedDict = self.OrderedDict
         with self.assertRaises(TypeError):
             OrderedDict().update([('a', 1), ('b', 2)], None)                        # too many args
         pairs = [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 5)]
@@ -774,6 +826,7 @@ class TestOrderedDict(unittest.TestCase):
             [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 5), ('f', 6), ('g', 7)])
 
     def test_clear(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od = OrderedDict(pairs)
@@ -782,6 +835,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(len(od), 0)
 
     def test_delitem(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         od = OrderedDict(pairs)
         del od['a']
@@ -791,6 +845,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(list(od.items()), pairs[:2] + pairs[3:])
 
     def test_setitem(self):
+        OrderedDict = self.OrderedDict
         od = OrderedDict([('d', 1), ('b', 2), ('c', 3), ('a', 4), ('e', 5)])
         od['c'] = 10           # existing element
         od['f'] = 20           # new element
@@ -798,6 +853,7 @@ class TestOrderedDict(unittest.TestCase):
                          [('d', 1), ('b', 2), ('c', 10), ('a', 4), ('e', 5), ('f', 20)])
 
     def test_iterators(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od = OrderedDict(pairs)
@@ -812,6 +868,7 @@ class TestOrderedDict(unittest.TestCase):
                          [t[0] for t in reversed(pairs)])
 
     def test_popitem(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od = OrderedDict(pairs)
@@ -821,7 +878,15 @@ class TestOrderedDict(unittest.TestCase):
             od.popitem()
         self.assertEqual(len(od), 0)
 
+        pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
+        od = OrderedDict(pairs)
+        while pairs:
+            self.assertEqual(od.popitem(last=False), pairs.pop(0))
+        with self.assertRaises(KeyError):
+            od.popitem(last=False)
+
     def test_pop(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od = OrderedDict(pairs)
@@ -835,6 +900,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(od.pop(k, 12345), 12345)
 
     def test_equality(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od1 = OrderedDict(pairs)
@@ -850,6 +916,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertNotEqual(od1, OrderedDict(pairs[:-1]))
 
     def test_copying(self):
+        OrderedDict = self.OrderedDict
         # Check that ordered dicts are copyable, deepcopyable, picklable,
         # and have a repr/eval round-trip
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
@@ -875,6 +942,7 @@ class TestOrderedDict(unittest.TestCase):
             self.assertEquals(type(dup), type(od))
 
     def test_yaml_linkage(self):
+        OrderedDict = self.OrderedDict
         # Verify that __reduce__ is setup in a way that supports PyYAML's dump() feature.
         # In yaml, lists are native but tuples are not.
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
@@ -884,6 +952,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertTrue(all(type(pair)==list for pair in od.__reduce__()[1]))
 
     def test_reduce_not_too_fat(self):
+        OrderedDict = self.OrderedDict
         # do not save instance dictionary if not needed
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         od = OrderedDict(pairs)
@@ -892,13 +961,16 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(len(od.__reduce__()), 3)
 
     def test_repr(self):
+        OrderedDict = self.OrderedDict
         od = OrderedDict([('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)])
+        name = OrderedDict.__name__
         self.assertEqual(repr(od),
-            "OrderedDict([('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)])")
+            name + "([('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)])")
         self.assertEqual(eval(repr(od)), od)
-        self.assertEqual(repr(OrderedDict()), "OrderedDict()")
+        self.assertEqual(repr(OrderedDict()), name + "()")
 
     def test_setdefault(self):
+        OrderedDict = self.OrderedDict
         pairs = [('c', 1), ('b', 2), ('a', 3), ('d', 4), ('e', 5), ('f', 6)]
         shuffle(pairs)
         od = OrderedDict(pairs)
@@ -911,6 +983,7 @@ class TestOrderedDict(unittest.TestCase):
         self.assertEqual(list(od.items())[-1], ('x', 10))
 
     def test_reinsert(self):
+        OrderedDict = self.OrderedDict
         # Given insert a, insert b, delete a, re-insert a,
         # verify that a is now later than b.
         od = OrderedDict()
@@ -920,6 +993,160 @@ class TestOrderedDict(unittest.TestCase):
         od['a'] = 1
         self.assertEqual(list(od.items()), [('b', 2), ('a', 1)])
 
+    def test_move_to_end(self):
+        OrderedDict = self.OrderedDict
+        od = OrderedDict.fromkeys('abcde')
+        self.assertEqual(list(od), list('abcde'))
+        od.move_to_end('c')
+        self.assertEqual(list(od), list('abdec'))
+        od.move_to_end('c', 0)
+        self.assertEqual(list(od), list('cabde'))
+        od.move_to_end('c', 0)
+        self.assertEqual(list(od), list('cabde'))
+        od.move_to_end('e')
+        self.assertEqual(list(od), list('cabde'))
+        od.move_to_end('b', last=False)
+        self.assertEqual(list(od), list('bcade'))
+        self.assertEqual(list(reversed(od)), list('edacb'))
+        with self.assertRaises(KeyError):
+            od.move_to_end('x')
+        del od['a']
+        with self.assertRaises(KeyError):
+            od.move_to_end('a')
+
+    def test_override_update(self):
+        OrderedDict = self.OrderedDict
+        # Verify that subclass assignment overrides are used by update()
+        class MyOD(OrderedDict):
+            def __setitem__(self, key, value):
+                OrderedDict.__setitem__(self, key, value * 2)
+        od = MyOD()
+        od.update([('a', 1), ('b', 2)], c=3)
+        od['d'] = 4
+        od.setdefault('e', 5)
+        self.assertEqual(list(od.items()),
+                         [('a', 2), ('b', 4), ('c', 6), ('d', 8), ('e', 10)])
+        self.assertEqual(od.pop('a'), 2)
+        self.assertEqual(od.popitem(), ('e', 10))
+        self.assertEqual(od.popitem(last=False), ('b', 4))
+
+
+class TestPyOrderedDict(OrderedDictTests, unittest.TestCase):
+
+    OrderedDict = collections._PyOrderedDict
+
+    def test_init_signature(self):
+        # make sure no positional args conflict with possible kwdargs
+        OrderedDict = self.OrderedDict
+        self.assertEqual(inspect.getargspec(OrderedDict.__dict__['__init__']).args,
+                         ['self'])
+
+
+@unittest.skipUnless(hasattr(_collections, 'OrderedDict'),
+                     'requires the C OrderedDict')
+class TestCOrderedDict(OrderedDictTests, unittest.TestCase):
+
+    OrderedDict = getattr(_collections, 'OrderedDict', None)
+
+    def test_init_signature(self):
+        # make sure no positional args conflict with possible kwdargs
+        OrderedDict = self.OrderedDict
+        self.assertEqual(list(OrderedDict(self=42).items()), [('self', 42)])
+        od = OrderedDict()
+        od.update(self=1, other=2)
+        self.assertEqual(sorted(od.items()), [('other', 2), ('self', 1)])
+
+    def test_mutation_during_iteration(self):
+        OrderedDict = self.OrderedDict
+        od = OrderedDict.fromkeys('abc')
+        for meth in (od.iterkeys, od.itervalues, od.iteritems,
+                     od.__reversed__):
+            it = meth()
+            next(it)
+            od['d'] = None
+            with self.assertRaises(RuntimeError):
+                next(it)
+            del od['d']
+        # Changing the value of an existing key is allowed
+        it = od.iteritems()
+        next(it)
+        od['a'] = 1
+        self.assertEqual(list(it), [('b', None), ('c', None)])
+        it = iter(od)
+        next(it)
+        od.move_to_end('a')
+        with self.assertRaises(RuntimeError):
+            next(it)
+
+    def test_iterator_length_hint(self):
+        OrderedDict = self.OrderedDict
+        od = OrderedDict.fromkeys('abc')
+        it = iter(od)
+        self.assertEqual(it.__length_hint__(), 3)
+        next(it)
+        self.assertEqual(it.__length_hint__(), 2)
+
+    def test_key_comparison_mutates(self):
+        OrderedDict = self.OrderedDict
+        od = OrderedDict()
+        class Key(object):
+            def __hash__(self):
+                return 1
+            def __eq__(self, other):
+                od.clear()
+                return False
+        od[Key()] = 1
+        od[Key()] = 2
+        od[Key()] = 3
+        self.assertEqual(len(od), len(list(od)))
+
+    @test_support.cpython_only
+    def test_sizeof(self):
+        OrderedDict = self.OrderedDict
+        od = OrderedDict()
+        self.assertGreater(sys.getsizeof(od), sys.getsizeof({}))
+        size = sys.getsizeof(od)
+        od.update((i, i) for i in range(100))
+        self.assertGreater(sys.getsizeof(od), size)
+
+    def test_resize(self):
+        # The nodes are indexed by the slots of their keys in the dict,
+        # which move when the table is resized
+        OrderedDict = self.OrderedDict
+        od = OrderedDict()
+        keys = []
+        for i in range(2000):
+            od[str(i)] = i
+            keys.append(str(i))
+            if i % 3 == 1:
+                del od[keys.pop(len(keys) // 2)]
+            if i % 7 == 2:
+                od.move_to_end(keys[0])
+                keys.append(keys.pop(0))
+            if i % 11 == 5:
+                self.assertEqual(od.popitem(last=False)[0], keys.pop(0))
+        self.assertEqual(list(od), keys)
+        self.assertEqual(list(reversed(od)), keys[::-1])
+        for key in keys[::2]:
+            del od[key]
+        self.assertEqual(list(od), keys[1::2])
+
+    def test_dict_methods(self):
+        # The dict methods bypass the list of keys without breaking it
+        OrderedDict = self.OrderedDict
+        od = OrderedDict.fromkeys('abcde')
+        dict.__setitem__(od, 'x', 1)
+        dict.__delitem__(od, 'b')
+        od.update((str(i), i) for i in range(100))
+        del od['c']
+        od.move_to_end('a')
+        self.assertEqual(list(od)[-1], 'a')
+        self.assertNotIn('c', list(od))
+        dict.clear(od)
+        od['z'] = 1
+        od.clear()
+        self.assertEqual(list(od), [])
+        self.assertEqual(len(od), 0)
 
 
 class GeneralMappingTests(mapping_tests.BasicTestMappingProtocol):
@@ -929,6 +1156,9 @@ class GeneralMappingTests(mapping_tests.BasicTestMappingProtocol):
         d = self._empty_mapping()
         self.assertRaises(KeyError, d.popitem)
 
+class PyGeneralMappingTests(GeneralMappingTests):
+    type2test = collections._PyOrderedDict
+
 class MyOrderedDict(OrderedDict):
     pass
 
@@ -939,13 +1169,20 @@ class SubclassMappingTests(mapping_tests.BasicTestMappingProtocol):
         d = self._empty_mapping()
         self.assertRaises(KeyError, d.popitem)
 
-import collections
+class MyPyOrderedDict(collections._PyOrderedDict):
+    pass
+
+class PySubclassMappingTests(SubclassMappingTests):
+    type2test = MyPyOrderedDict
+
 
 def test_main(verbose=None):
     NamedTupleDocs = doctest.DocTestSuite(module=collections)
     test_classes = [TestNamedTuple, NamedTupleDocs, TestOneTrickPonyABCs,
                     TestCollectionABCs, TestCounter,
-                    TestOrderedDict, GeneralMappingTests, SubclassMappingTests]
+                    TestPyOrderedDict, TestCOrderedDict,
+                    GeneralMappingTests, PyGeneralMappingTests,
+                    SubclassMappingTests, PySubclassMappingTests]
     test_support.run_unittest(*test_classes)
     test_support.run_doctest(collections, verbose)
 
@@ -2,7 +2,7 @@ import unittest
 from test import test_support
 
 import UserDict, random, string
-import gc, weakref
+import gc, weakref, sys
 
 
 class DictTest(unittest.TestCase):
@@ -651,6 +651,120 @@ class DictTest(unittest.TestCase):
         self._tracked(MyDict())
 
 
+class SplitDictTests(unittest.TestCase):
+    # The __dict__ of instances of new-style classes share their keys
+
+    def make(self, cls, n):
+        objs = [cls() for i in range(3)]
+        for o in objs:
+            for i in range(n):
+                setattr(o, 'a%d' % i, i)
+        return objs
+
+    def expected(self, n):
+        return dict(('a%d' % i, i) for i in range(n))
+
+    @test_support.cpython_only
+    def test_sizeof(self):
+        class A(object):
+            pass
+        a, b, c = self.make(A, 8)
+        # the shared keys are not accounted to the instance dicts
+        self.assertLess(sys.getsizeof(b.__dict__),
+                        sys.getsizeof(dict(b.__dict__)))
+        self.assertEqual(sys.getsizeof(b.__dict__),
+                         sys.getsizeof(c.__dict__))
+
+    def test_contents(self):
+        for n in (0, 1, 5, 6, 12, 30):
+            class A(object):
+                pass
+            for o in self.make(A, n):
+                self.assertEqual(o.__dict__, self.expected(n))
+                self.assertEqual(len(o.__dict__), n)
+                self.assertEqual(sorted(o.__dict__), sorted(self.expected(n)))
+                self.assertEqual(sorted(o.__dict__.items()),
+                                 sorted(self.expected(n).items()))
+                self.assertEqual(sorted(o.__dict__.itervalues()), range(n))
+
+    def test_divergence(self):
+        class A(object):
+            pass
+        a, b, c = self.make(A, 4)
+        a.extra = 1
+        del b.a0
+        c.__dict__[1] = 'int key'
+        self.assertEqual(a.__dict__, dict(self.expected(4), extra=1))
+        self.assertFalse(hasattr(b, 'a0'))
+        self.assertFalse(hasattr(b, 'extra'))
+        self.assertEqual(b.a1, 1)
+        self.assertEqual(c.__dict__[1], 'int key')
+        d = A()
+        for i in range(20):
+            setattr(d, 'b%d' % i, i)
+        self.assertEqual(d.__dict__, dict(('b%d' % i, i) for i in range(20)))
+        self.assertEqual(a.__dict__, dict(self.expected(4), extra=1))
+        # b still shares the keys and sees neither a.extra nor the b*
+        self.assertEqual(len(b.__dict__), 3)
+
+    def test_mutating_methods(self):
+        class A(object):
+            pass
+        a, b, c = self.make(A, 5)
+        self.assertEqual(a.__dict__.pop('a1'), 1)
+        self.assertEqual(a.__dict__.pop('a1', None), None)
+        self.assertRaises(KeyError, a.__dict__.pop, 'a1')
+        self.assertEqual(a.__dict__, dict(a0=0, a2=2, a3=3, a4=4))
+        items = []
+        while b.__dict__:
+            items.append(b.__dict__.popitem())
+        self.assertEqual(sorted(items), sorted(self.expected(5).items()))
+        b.x = 1
+        self.assertEqual(b.__dict__, {'x': 1})
+        c.__dict__.clear()
+        self.assertEqual(c.__dict__, {})
+        c.a0 = 'again'
+        self.assertEqual(c.a0, 'again')
+        self.assertEqual(a.__dict__.setdefault('a0', 5), 0)
+        self.assertEqual(a.__dict__.setdefault('z', 5), 5)
+        a.__dict__.update(a0='new', y=3)
+        self.assertEqual(a.__dict__,
+                         dict(a0='new', a2=2, a3=3, a4=4, y=3, z=5))
+
+    def test_copy_and_compare(self):
+        class A(object):
+            pass
+        a, b, c = self.make(A, 7)
+        self.assertEqual(a.__dict__, b.__dict__)
+        self.assertEqual(a.__dict__.copy(), self.expected(7))
+        b.a3 = 'changed'
+        self.assertNotEqual(a.__dict__, b.__dict__)
+        self.assertEqual(dict(b.__dict__)['a3'], 'changed')
+        new = {}
+        new.update(c.__dict__)
+        self.assertEqual(new, self.expected(7))
+
+    def test_class_change(self):
+        class A(object):
+            pass
+        class B(object):
+            pass
+        a, b, c = self.make(A, 3)
+        a.__class__ = B
+        a.extra = 1
+        self.assertEqual(a.__dict__, dict(self.expected(3), extra=1))
+        self.assertEqual(b.__dict__, self.expected(3))
+
+    def test_delete_during_iteration(self):
+        class A(object):
+            pass
+        a, b, c = self.make(A, 5)
+        def mutate():
+            for k in a.__dict__:
+                del a.__dict__[k]
+        self.assertRaises(RuntimeError, mutate)
+
+
 from test import mapping_tests
 
 class GeneralMappingTests(mapping_tests.BasicTestMappingProtocol):
@@ -668,6 +782,7 @@ def test_main():
          DeprecationWarning)):
         test_support.run_unittest(
             DictTest,
+            SplitDictTests,
             GeneralMappingTests,
             SubclassMappingTests,
         )
@@ -53,24 +53,22 @@ def bug1333982(x=[]):
     pass
 
 dis_bug1333982 = """\
- %-4d         0 LOAD_CONST               1 (0)
-              3 POP_JUMP_IF_TRUE        38
-              6 LOAD_GLOBAL              0 (AssertionError)
-              9 BUILD_LIST               0
-             12 LOAD_FAST                0 (x)
-             15 GET_ITER
-        >>   16 FOR_ITER                12 (to 31)
-             19 STORE_FAST               1 (s)
-             22 LOAD_FAST                1 (s)
-             25 LIST_APPEND              2
-             28 JUMP_ABSOLUTE           16
-
- %-4d   >>   31 LOAD_CONST               2 (1)
-             34 BINARY_ADD
-             35 RAISE_VARARGS            2
-
- %-4d   >>   38 LOAD_CONST               0 (None)
-             41 RETURN_VALUE
+ %-4d         0 LOAD_GLOBAL              0 (AssertionError)
+              3 BUILD_LIST               0
+              6 LOAD_FAST                0 (x)
+              9 GET_ITER
+        >>   10 FOR_ITER                12 (to 25)
+             13 STORE_FAST               1 (s)
+             16 LOAD_FAST                1 (s)
+             19 LIST_APPEND              2
+             22 JUMP_ABSOLUTE           10
+
+ %-4d   >>   25 LOAD_CONST               2 (1)
+             28 BINARY_ADD
+             29 RAISE_VARARGS            2
+
+ %-4d        32 LOAD_CONST               0 (None)
+             35 RETURN_VALUE
 """%(bug1333982.func_code.co_firstlineno + 1,
      bug1333982.func_code.co_firstlineno + 2,
      bug1333982.func_code.co_firstlineno + 3)
@@ -3,7 +3,11 @@ import sys
 import unittest
 from test import test_support
 from weakref import proxy
+import weakref
 import pickle
+import copy
+import random
+import __builtin__ as builtins
 
 @staticmethod
 def PythonPartial(func, *args, **keywords):
@@ -428,6 +432,302 @@ class TestTotalOrdering(unittest.TestCase):
             class A:
                 pass
 
+class TestLRU(unittest.TestCase):
+
+    wrapper = staticmethod(functools._py_lru_cache_wrapper)
+
+    def setUp(self):
+        self.saved_wrapper = functools._lru_cache_wrapper
+        functools._lru_cache_wrapper = self.wrapper
+
+    def tearDown(self):
+        functools._lru_cache_wrapper = self.saved_wrapper
+
+    def test_lru(self):
+        def orig(x, y):
+            return 3 * x + y
+        f = functools.lru_cache(maxsize=20)(orig)
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertEqual(maxsize, 20)
+        self.assertEqual(currsize, 0)
+        self.assertEqual(hits, 0)
+        self.assertEqual(misses, 0)
+
+        domain = range(5)
+        for i in range(1000):
+            x, y = random.choice(domain), random.choice(domain)
+            actual = f(x, y)
+            expected = orig(x, y)
+            self.assertEqual(actual, expected)
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertTrue(hits > misses)
+        self.assertEqual(hits + misses, 1000)
+        self.assertEqual(currsize, 20)
+
+        f.cache_clear()   # test clearing
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertEqual(hits, 0)
+        self.assertEqual(misses, 0)
+        self.assertEqual(currsize, 0)
+        f(x, y)
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertEqual(hits, 0)
+        self.assertEqual(misses, 1)
+        self.assertEqual(currsize, 1)
+
+        # Test bypassing the cache
+        self.assertIs(f.__wrapped__, orig)
+        f.__wrapped__(x, y)
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertEqual(hits, 0)
+        self.assertEqual(misses, 1)
+        self.assertEqual(currsize, 1)
+
+        # test size zero (which means "never-cache")
+        calls = []
+        @functools.lru_cache(0)
+        def f():
+            calls.append(1)
+            return 20
+        self.assertEqual(f.cache_info().maxsize, 0)
+        for i in range(5):
+            self.assertEqual(f(), 20)
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(f.cache_info(), (0, 5, 0, 0))
+
+        # test size one
+        calls = []
+        @functools.lru_cache(1)
+        def f():
+            calls.append(1)
+            return 20
+        for i in range(5):
+            self.assertEqual(f(), 20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(f.cache_info(), (4, 1, 1, 1))
+
+        # test size two
+        @functools.lru_cache(2)
+        def f(x):
+            calls.append(x)
+            return x*10
+        calls = []
+        for x in 7, 9, 7, 9, 7, 9, 8, 8, 8, 9, 9, 9, 8, 8, 8, 7:
+            self.assertEqual(f(x), x*10)
+        self.assertEqual(calls, [7, 9, 8, 7])
+        self.assertEqual(f.cache_info(), (12, 4, 2, 2))
+
+    def test_lru_with_maxsize_none(self):
+        @functools.lru_cache(maxsize=None)
+        def fib(n):
+            if n < 2:
+                return n
+            return fib(n-1) + fib(n-2)
+        self.assertEqual([fib(n) for n in range(16)],
+            [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610])
+        self.assertEqual(fib.cache_info(), (28, 16, None, 16))
+        fib.cache_clear()
+        self.assertEqual(fib.cache_info(), (0, 0, None, 0))
+
+    def test_lru_with_maxsize_negative(self):
+        @functools.lru_cache(maxsize=-10)
+        def eq(n):
+            return n
+        for i in (0, 1):
+            self.assertEqual([eq(n) for n in range(150)], list(range(150)))
+        self.assertEqual(eq.cache_info(), (0, 300, -10, 0))
+
+    def test_lru_with_bad_maxsize(self):
+        self.assertRaises(TypeError, functools.lru_cache, 'spam')
+        self.assertRaises(TypeError, functools.lru_cache, 1.5)
+
+    def test_lru_with_exceptions(self):
+        # Verify that user_function exceptions get passed through without
+        # creating a hard-to-read chained exception.
+        for maxsize in (None, 128):
+            @functools.lru_cache(maxsize)
+            def func(i):
+                return 'abc'[i]
+            self.assertEqual(func(0), 'a')
+            with self.assertRaises(IndexError):
+                func(15)
+            # Verify that the previous exception did not result in a cached
+            # entry
+            with self.assertRaises(IndexError):
+                func(15)
+
+    def test_lru_with_types(self):
+        for maxsize in (None, 128):
+            @functools.lru_cache(maxsize=maxsize, typed=True)
+            def square(x):
+                return x * x
+            self.assertEqual(square(3), 9)
+            self.assertEqual(type(square(3)), type(9))
+            self.assertEqual(square(3.0), 9.0)
+            self.assertEqual(type(square(3.0)), type(9.0))
+            self.assertEqual(square(x=3), 9)
+            self.assertEqual(type(square(x=3)), type(9))
+            self.assertEqual(square(x=3.0), 9.0)
+            self.assertEqual(type(square(x=3.0)), type(9.0))
+            self.assertEqual(square.cache_info().hits, 4)
+            self.assertEqual(square.cache_info().misses, 4)
+
+    def test_lru_with_keyword_args(self):
+        @functools.lru_cache()
+        def fib(n):
+            if n < 2:
+                return n
+            return fib(n=n-1) + fib(n=n-2)
+        self.assertEqual(
+            [fib(n=number) for number in range(16)],
+            [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610]
+        )
+        self.assertEqual(fib.cache_info(), (28, 16, 128, 16))
+
+    def test_lru_with_mixed_args(self):
+        @functools.lru_cache(maxsize=10)
+        def f(a, b=1, c=2):
+            return a, b, c
+        self.assertEqual(f(1, c=3), (1, 1, 3))
+        self.assertEqual(f(1, c=3), (1, 1, 3))
+        self.assertEqual(f(1, 1, 3), (1, 1, 3))
+        self.assertEqual(f(c=3, b=1, a=1), (1, 1, 3))
+        self.assertEqual(f(a=1, b=1, c=3), (1, 1, 3))
+        self.assertEqual(f.cache_info(), (2, 3, 10, 3))
+
+    def test_lru_with_unhashable_args(self):
+        for maxsize in (None, 128):
+            @functools.lru_cache(maxsize)
+            def f(x):
+                return len(x)
+            self.assertRaises(TypeError, f, [1, 2])
+            self.assertEqual(f.cache_info().currsize, 0)
+
+    def test_lru_method(self):
+        class X(int):
+            f_cnt = 0
+            @functools.lru_cache(2)
+            def f(self, x):
+                self.f_cnt += 1
+                return x*10+self
+        a = X(5)
+        b = X(5)
+        c = X(7)
+        self.assertEqual(X.f.cache_info(), (0, 0, 2, 0))
+
+        for x in 1, 2, 2, 3, 1, 1, 1, 2, 3, 3:
+            self.assertEqual(a.f(x), x*10 + 5)
+        self.assertEqual((a.f_cnt, b.f_cnt, c.f_cnt), (6, 0, 0))
+        self.assertEqual(X.f.cache_info(), (4, 6, 2, 2))
+
+        for x in 1, 2, 1, 1, 1, 1, 3, 2, 2, 2:
+            self.assertEqual(b.f(x), x*10 + 5)
+        self.assertEqual((a.f_cnt, b.f_cnt, c.f_cnt), (6, 4, 0))
+        self.assertEqual(X.f.cache_info(), (10, 10, 2, 2))
+
+        for x in 2, 1, 1, 1, 1, 2, 1, 3, 2, 1:
+            self.assertEqual(c.f(x), x*10 + 7)
+        self.assertEqual((a.f_cnt, b.f_cnt, c.f_cnt), (6, 4, 5))
+        self.assertEqual(X.f.cache_info(), (15, 15, 2, 2))
+
+    def test_lru_cache_threaded(self):
+        try:
+            import threading
+        except ImportError:
+            self.skipTest('requires threading')
+        def orig(x, y):
+            return 3 * x + y
+        f = functools.lru_cache(maxsize=20)(orig)
+        n, m = 5, 11
+        def full(*args):
+            for _ in range(m):
+                f(*args)
+        start = threading.Event()
+        def worker():
+            start.wait(10)
+            for k in range(n):
+                full(k, 0)
+        threads = [threading.Thread(target=worker) for i in range(n)]
+        for t in threads:
+            t.start()
+        start.set()
+        for t in threads:
+            t.join()
+        hits, misses, maxsize, currsize = f.cache_info()
+        self.assertEqual(hits + misses, n * n * m)
+        self.assertTrue(misses >= n)
+        self.assertEqual(maxsize, 20)
+        self.assertEqual(currsize, n)
+
+    def test_lru_reentrancy_with_len(self):
+        # Test to make sure the LRU cache code isn't thrown-off by
+        # caching the built-in len() function.  Since len() can be
+        # cached, we shouldn't use it inside the lru code itself.
+        old_len = len
+        try:
+            builtins.len = self.lru_len = functools.lru_cache(4)(len)
+            for i in [0, 0, 1, 2, 3, 3, 4, 5, 6, 1, 7, 2, 1]:
+                self.assertEqual(len('abcdefghijklmn'[:i]), i)
+        finally:
+            builtins.len = old_len
+
+    def test_lru_cache_pickle(self):
+        for proto in range(pickle.HIGHEST_PROTOCOL + 1):
+            for f in (cached_func, cached_func_unbounded):
+                self.assertIs(pickle.loads(pickle.dumps(f, proto)), f)
+
+    def test_lru_cache_copy(self):
+        for f in (cached_func, cached_func_unbounded):
+            self.assertIs(copy.copy(f), f)
+            self.assertIs(copy.deepcopy(f), f)
+
+    def test_lru_cache_weakref(self):
+        @functools.lru_cache(10)
+        def f(x):
+            return x
+        r = weakref.ref(f)
+        self.assertIs(r(), f)
+        del f
+        test_support.gc_collect()
+        self.assertIsNone(r())
+
+    def test_lru_cache_collects_cycles(self):
+        @functools.lru_cache(10)
+        def f(x):
+            return x
+        # The cache, the function globals and the wrapper form a cycle
+        class A(object):
+            pass
+        a = A()
+        a.f = f
+        r = weakref.ref(a)
+        f(a)
+        del a, f
+        test_support.gc_collect()
+        self.assertIsNone(r())
+
+@unittest.skipIf(functools._lru_cache_wrapper is
+                 functools._py_lru_cache_wrapper, 'requires _functools')
+class TestCLRU(TestLRU):
+
+    wrapper = staticmethod(functools._lru_cache_wrapper)
+
+    def test_lru_type(self):
+        f = functools.lru_cache()(capture)
+        self.assertIsInstance(f, functools._lru_cache_wrapper)
+        self.assertEqual(f.__name__, 'capture')
+        self.assertEqual(f.__doc__, capture.__doc__)
+        self.assertEqual(f.__module__, capture.__module__)
+
+@functools.lru_cache()
+def cached_func(x, y):
+    return 3 * x + y
+
+@functools.lru_cache(maxsize=None)
+def cached_func_unbounded(x, y):
+    return 3 * x + y
+
+
 def test_main(verbose=None):
     test_classes = (
         TestPartial,
@@ -436,6 +736,8 @@ def test_main(verbose=None):
         TestUpdateWrapper,
         TestWraps,
         TestReduce,
+        TestLRU,
+        TestCLRU,
     )
     test_support.run_unittest(*test_classes)
 
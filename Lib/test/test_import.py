@@ -6,6 +6,7 @@ import random
 import shutil
 import stat
 import sys
+import time
 import unittest
 from test.test_support import (unlink, TESTFN, unload, run_unittest,
                                is_jython, check_warnings, EnvironmentVarGuard)
@@ -386,6 +387,83 @@ class PathsTests(unittest.TestCase):
         test_UNC_path = _test_UNC_path
 
 
+class DirectoryCacheTests(unittest.TestCase):
+    path = TESTFN
+
+    def setUp(self):
+        os.mkdir(self.path)
+        self.syspath = sys.path[:]
+        sys.path.insert(0, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        sys.path[:] = self.syspath
+        for name in ('dircache_a', 'dircache_b', 'dircache_pkg'):
+            unload(name)
+        imp.invalidate_caches()
+
+    def write_module(self, name, *parts):
+        with open(os.path.join(self.path, *parts + (name + '.py',)), 'w') as f:
+            f.write("name = %r\n" % name)
+
+    def set_mtime(self, mtime):
+        os.utime(self.path, (mtime, mtime))
+
+    def test_recently_modified_directory(self):
+        self.write_module('dircache_a')
+        import dircache_a
+        # written in the same second as the previous listing
+        self.write_module('dircache_b')
+        import dircache_b
+        self.assertEqual(dircache_b.name, 'dircache_b')
+
+    def test_modified_directory(self):
+        self.write_module('dircache_a')
+        self.set_mtime(time.time() - 3600)
+        import dircache_a
+        self.write_module('dircache_b')
+        import dircache_b
+        self.assertEqual(dircache_b.name, 'dircache_b')
+
+    def test_invalidate_caches(self):
+        self.write_module('dircache_a')
+        mtime = time.time() - 3600
+        self.set_mtime(mtime)
+        import dircache_a
+        # the directory looks unchanged
+        self.write_module('dircache_b')
+        self.set_mtime(mtime)
+        if os.name == 'posix':
+            with self.assertRaises(ImportError):
+                import dircache_b
+        imp.invalidate_caches()
+        import dircache_b
+        self.assertEqual(dircache_b.name, 'dircache_b')
+
+    def test_package(self):
+        os.mkdir(os.path.join(self.path, 'dircache_pkg'))
+        self.write_module('__init__', 'dircache_pkg')
+        self.write_module('dircache_a', 'dircache_pkg')
+        self.set_mtime(time.time() - 3600)
+        from dircache_pkg import dircache_a
+        self.assertEqual(dircache_a.name, 'dircache_a')
+
+    def test_missing_directory(self):
+        shutil.rmtree(self.path)
+        with self.assertRaises(ImportError):
+            import dircache_a
+        os.mkdir(self.path)
+        self.write_module('dircache_a')
+        import dircache_a
+        self.assertEqual(dircache_a.name, 'dircache_a')
+
+    def test_case_sensitivity(self):
+        self.write_module('dircache_a')
+        self.set_mtime(time.time() - 3600)
+        with self.assertRaises(ImportError):
+            import DIRCACHE_A
+
+
 class RelativeImportTests(unittest.TestCase):
 
     def tearDown(self):
@@ -445,7 +523,8 @@ class RelativeImportTests(unittest.TestCase):
 
 
 def test_main(verbose=None):
-    run_unittest(ImportTests, PycRewritingTests, PathsTests, RelativeImportTests)
+    run_unittest(ImportTests, PycRewritingTests, PathsTests,
+                 DirectoryCacheTests, RelativeImportTests)
 
 if __name__ == '__main__':
     # Test needs to be a package, so we can do relative imports.
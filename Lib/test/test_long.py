@@ -890,6 +890,58 @@ class LongTest(unittest.TestCase):
             self.assertEqual((a+1).bit_length(), i+1)
             self.assertEqual((-a-1).bit_length(), i+1)
 
+    def test_huge_decimal_conversions(self):
+        # Longs with more than about 7000 digits are converted by the
+        # divide and conquer algorithms of _pylong
+        def slow_str(n, w):
+            # the w digits of n >= 0, with leading zeros
+            if w <= 1000:
+                return str(n).zfill(w)
+            hi, lo = divmod(n, 10L ** (w // 2))
+            return slow_str(hi, w - w // 2) + slow_str(lo, w // 2)
+
+        for ndigits in (6990, 7010, 20010, 35000):
+            for n in (10L ** ndigits, 10L ** ndigits - 1,
+                      random.getrandbits(ndigits * 10 // 3) | 1):
+                expected = slow_str(n, ndigits + 1).lstrip('0')
+                self.assertEqual(str(n), expected)
+                self.assertEqual(repr(n), expected + 'L')
+                self.assertEqual(str(-n), '-' + expected)
+                self.assertEqual(long(expected), n)
+                self.assertEqual(long('-' + expected), -n)
+                self.assertEqual(long(' 00' + expected + 'L '), n)
+                self.assertEqual(long(unicode(expected)), n)
+                self.assertEqual(int(expected), n)
+                self.assertEqual(eval(expected), n)
+                self.assertRaises(ValueError, long, expected + 'x')
+                self.assertRaises(ValueError, long, expected + ' 1')
+        self.assertEqual(long('0' * 30000), 0)
+        self.assertEqual(long('0' * 30000 + '12'), 12)
+
+    def test_huge_decimal_conversions_subclass(self):
+        # _pylong must not call the methods of a long subclass
+        class W(long):
+            __lt__ = lambda self, other: True
+            __neg__ = lambda self: self
+            __divmod__ = lambda self, other: (0, 0)
+            __rshift__ = lambda self, other: 0
+            bit_length = lambda self: 10 ** 6
+            __int__ = __long__ = lambda self: 0L
+            __index__ = lambda self: 0
+        for n in (10L ** 9000, -(10L ** 9000) + 1):
+            self.assertEqual(str(W(n)), str(n))
+            self.assertEqual(repr(W(n)), repr(n))
+            self.assertEqual('%d' % W(n), str(n))
+            self.assertEqual(format(W(n), 'd'), str(n))
+
+    def test_pylong_divmod(self):
+        import _pylong
+        for abits, bbits in ((50000, 20000), (80000, 40000), (20000, 1),
+                             (100, 90000), (60000, 60000)):
+            a = random.getrandbits(abits)
+            b = random.getrandbits(bbits) | 1
+            self.assertEqual(_pylong._divmod_pos(a, b), divmod(a, b))
+
 
 def test_main():
     test_support.run_unittest(LongTest)
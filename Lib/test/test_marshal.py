@@ -270,6 +270,80 @@ class BugsTestCase(unittest.TestCase):
         self.assertRaises(ValueError, marshal.loads, invalid_string)
 
 
+class InstancingTestCase(unittest.TestCase):
+    # Version 3 writes the objects reached several times only once
+    keys = ('a' * 300, u'b', 1.5, 2**70, frozenset([1, 2]), ('c', 'd'))
+
+    def helper(self, value, version=marshal.version):
+        s = marshal.dumps(value, version)
+        new = marshal.loads(s)
+        self.assertEqual(new, value)
+        marshal.dump(value, file(test_support.TESTFN, "wb"), version)
+        try:
+            self.assertEqual(marshal.load(file(test_support.TESTFN, "rb")),
+                             new)
+        finally:
+            os.unlink(test_support.TESTFN)
+        return new, s
+
+    def test_shared(self):
+        for obj in self.keys:
+            new, s = self.helper([obj, obj])
+            self.assertIs(new[0], new[1])
+            self.assertEqual(len(s), len(marshal.dumps([obj])) + 5)
+            # the previous versions don't share them
+            new, s = self.helper([obj, obj], 2)
+            self.assertIsNot(new[0], new[1])
+
+    def test_shared_in_containers(self):
+        t = ('x' * 10, [1.0])
+        new, s = self.helper({'t': (t, t), 's': frozenset([t[0]])})
+        self.assertIs(new['t'][0], new['t'][1])
+        self.assertIs(iter(new['s']).next(), new['t'][0][0])
+
+    def test_recursive_containers(self):
+        lst = [1]
+        lst.append(lst)
+        new = marshal.loads(marshal.dumps(lst))
+        self.assertIs(new[1], new)
+        d = {}
+        d['self'] = d
+        new = marshal.loads(marshal.dumps(d))
+        self.assertIs(new['self'], new)
+
+    def test_code(self):
+        with open(__file__.replace('.pyc', '.py')) as f:
+            co = compile(f.read(), __file__, 'exec')
+        for version in range(marshal.version + 1):
+            self.assertEqual(marshal.loads(marshal.dumps(co, version)), co)
+        self.assertLess(len(marshal.dumps(co)), len(marshal.dumps(co, 2)))
+        new = marshal.loads(marshal.dumps(co))
+        codes = [c for c in new.co_consts if hasattr(c, 'co_filename')]
+        self.assertTrue(codes)
+        for c in codes:
+            self.assertIs(c.co_filename, new.co_filename)
+
+    def test_unshared_not_flagged(self):
+        # only the objects written several times get a reference index
+        s = marshal.dumps(['x' * 300, 'x' * 300, float('1.5'), float('1.5')])
+        self.assertNotIn('r', s)
+        obj = 'y' * 300
+        s = marshal.dumps([obj, 1.5, obj])
+        self.assertTrue(s.endswith('r\x00\x00\x00\x00'))
+
+    def test_invalid_references(self):
+        # unknown index
+        self.assertRaises(ValueError, marshal.loads, 'r\x00\x00\x00\x00')
+        self.assertRaises(ValueError, marshal.loads,
+                          '[\x01\x00\x00\x00r\x00\x00\x00\x00')
+        # reference to a tuple being read
+        self.assertRaises(ValueError, marshal.loads,
+                          '\xa8\x01\x00\x00\x00r\x00\x00\x00\x00')
+        # but a list can contain itself
+        new = marshal.loads('\xdb\x01\x00\x00\x00r\x00\x00\x00\x00')
+        self.assertIs(new[0], new)
+
+
 def test_main():
     test_support.run_unittest(IntTestCase,
                               FloatTestCase,
@@ -277,7 +351,8 @@ def test_main():
                               CodeTestCase,
                               ContainerTestCase,
                               ExceptionTestCase,
-                              BugsTestCase)
+                              BugsTestCase,
+                              InstancingTestCase)
 
 if __name__ == "__main__":
     test_main()
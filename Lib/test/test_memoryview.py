@@ -8,6 +8,8 @@ import sys
 import gc
 import weakref
 import array
+import binascii
+import struct
 from test import test_support
 
 
@@ -106,7 +108,7 @@ class AbstractMemoryTests:
         self.assertRaises(IndexError, setitem, -sys.maxsize, b"a")
         # Wrong index/slice types
         self.assertRaises(TypeError, setitem, 0.0, b"a")
-        self.assertRaises(TypeError, setitem, (0,), b"a")
+        self.assertRaises(TypeError, setitem, (0, 0), b"a")
         self.assertRaises(TypeError, setitem, "a", b"a")
         # Trying to resize the memory object
         self.assertRaises(ValueError, setitem, 0, b"")
@@ -334,6 +336,176 @@ class BytesMemorySliceSliceTest(unittest.TestCase,
     #pass
 
 
+class MemoryviewLayoutTest(unittest.TestCase):
+    # Strided slices, casts and multi-dimensional views
+
+    def setUp(self):
+        self.data = bytearray(range(24))
+        self.m = memoryview(self.data)
+
+    def test_strided_slices(self):
+        m = self.m
+        self.assertEqual(m[::2].tolist(), range(0, 24, 2))
+        self.assertEqual(m[::-3].tolist(), range(23, -1, -3))
+        self.assertEqual(m[1::3][::2].tolist(), range(1, 24, 6))
+        self.assertEqual(m[20:2:-5].tobytes(), bytes(self.data[20:2:-5]))
+        self.assertEqual(m[::2].shape, (12,))
+        self.assertEqual(m[::2].strides, (2,))
+        self.assertEqual(m[::-1].strides, (-1,))
+        self.assertEqual(len(m[5:5:3]), 0)
+        self.assertEqual(m[::4][1], b"\x04")
+        self.assertEqual(list(m[::8]), [b"\x00", b"\x08", b"\x10"])
+        self.assertTrue(m[::2] == bytes(self.data[::2]))
+        self.assertEqual(bytearray(m[::-1]), self.data[::-1])
+        self.assertEqual(memoryview(m[::2]).strides, (2,))
+
+    def test_strided_setitem(self):
+        m = self.m
+        m[::2] = b"a" * 12
+        self.assertEqual(self.data[::2], bytearray(b"a" * 12))
+        self.assertEqual(self.data[1::2], bytearray(range(1, 24, 2)))
+        m[::-6] = b"wxyz"
+        self.assertEqual(self.data[23::-6], bytearray(b"wxyz"))
+        # Overlapping copies through strided views
+        m[:] = bytearray(range(24))
+        m[::2] = m[:12]
+        self.assertEqual(self.data[::2], bytearray(range(12)))
+        self.assertRaises(ValueError, m.__setitem__, slice(None, None, 2), b"a")
+
+    def test_non_contiguous_export(self):
+        # Consumers that need contiguous memory cannot get it from a
+        # strided view
+        self.assertRaises(BufferError, binascii.hexlify, self.m[::2])
+        self.assertEqual(binascii.hexlify(self.m[::12].tobytes()), b"000c")
+        self.assertEqual(binascii.hexlify(self.m[3:5]), b"0304")
+
+    def test_cast(self):
+        m = self.m
+        i = m.cast('i')
+        self.assertEqual(i.format, 'i')
+        self.assertEqual(i.itemsize, struct.calcsize('i'))
+        self.assertEqual(i.shape, (24 // i.itemsize,))
+        self.assertEqual(i.tolist(),
+            list(struct.unpack('%di' % (24 // i.itemsize), bytes(self.data))))
+        self.assertEqual(m.cast('@B').format, 'B')
+        self.assertEqual(m.cast('c').tolist(), list(bytes(self.data)))
+        c = m.cast('B', (2, 3, 4))
+        self.assertEqual(c.shape, (2, 3, 4))
+        self.assertEqual(c.strides, (12, 4, 1))
+        self.assertEqual(c.ndim, 3)
+        self.assertEqual(c.cast('B').tolist(), range(24))
+        self.assertEqual(m.cast('B', [24]).tolist(), range(24))
+        self.assertEqual(m[:4].cast('i', []).tolist(),
+                         struct.unpack('i', bytes(self.data[:4]))[0])
+        self.assertEqual(memoryview(b"abcd").cast('B', [2, 2]).readonly, True)
+        # Errors
+        self.assertRaises(TypeError, m[::2].cast, 'B')
+        self.assertRaises(ValueError, m.cast, '<i')
+        self.assertRaises(ValueError, m.cast, 'ii')
+        self.assertRaises(ValueError, m.cast, 'x')
+        self.assertRaises(TypeError, m[:5].cast, 'i')
+        self.assertRaises(TypeError, m.cast, 'B', (5, 5))
+        self.assertRaises(TypeError, m.cast, 'B', 24)
+        self.assertRaises(ValueError, m.cast, 'B', (0, 24))
+        self.assertRaises(ValueError, m.cast, 'B', (-2, -12))
+        self.assertRaises(ValueError, m.cast, 'B', (1,) * 65)
+
+    def test_cast_setitem(self):
+        i = self.m.cast('i')
+        size = i.itemsize
+        # items are returned as bytes, which can be assigned back
+        i[1] = i[0]
+        self.assertEqual(self.data[size:2 * size], self.data[:size])
+        i[0] = struct.pack('i', -5)
+        self.assertEqual(i.tolist()[0], -5)
+        self.assertEqual(struct.unpack('i', i[0])[0], -5)
+        i[1:3] = struct.pack('2i', 7, 8)
+        self.assertEqual(i.tolist()[:3], [-5, 7, 8])
+        i[::-2] = bytearray(struct.pack('3i', 1, 2, 3))
+        self.assertEqual(i.tolist()[1::2], [3, 2, 1])
+        i[2:4] = i[0:2]
+        self.assertEqual(i.tolist()[2:4], [-5, 3])
+        self.assertEqual(struct.unpack('i', bytes(self.data[:size]))[0], -5)
+        # the byte length must match, and views of other items too
+        self.assertRaises(ValueError, i.__setitem__, 0, b"a" * (size + 1))
+        self.assertRaises(ValueError, i.__setitem__, slice(0, 2), b"a" * size)
+        self.assertRaises(TypeError, i.__setitem__, slice(0, 1),
+                          self.m[:size].cast('h'))
+
+    def test_tolist_formats(self):
+        for fmt, values in [('b', [-128, 0, 127]), ('B', [0, 255]),
+                            ('h', [-32768, 32767]), ('H', [0, 65535]),
+                            ('i', [-2**31, 2**31 - 1]), ('I', [0, 2**32 - 1]),
+                            ('l', [-sys.maxint - 1, sys.maxint]),
+                            ('L', [0, 2 * sys.maxint + 1]),
+                            ('q', [-2**63, 2**63 - 1]), ('Q', [0, 2**64 - 1]),
+                            ('f', [1.5, -0.25]), ('d', [1e100, -0.5]),
+                            ('?', [True, False]), ('c', [b"a", b"b"])]:
+            packed = struct.pack('%d%s' % (len(values), fmt), *values)
+            m = memoryview(packed).cast(fmt)
+            self.assertEqual(m.tolist(), values)
+            self.assertEqual(m[::-1].tolist(), values[::-1])
+        m = memoryview(bytearray(6)).cast('B', [2, 3])
+        self.assertEqual(m.tolist(), [[0, 0, 0], [0, 0, 0]])
+
+    def test_multidim_getitem(self):
+        c = self.m.cast('B', (2, 3, 4))
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c[1].shape, (3, 4))
+        self.assertEqual(c[1].tolist(), [[12, 13, 14, 15], [16, 17, 18, 19],
+                                         [20, 21, 22, 23]])
+        self.assertEqual(c[1, 2].tolist(), [20, 21, 22, 23])
+        self.assertEqual(c[1, 2, 3], b"\x17")
+        self.assertEqual(c[-1, -1, -1], b"\x17")
+        self.assertEqual(c[:, 1].tolist(), [[4, 5, 6, 7], [16, 17, 18, 19]])
+        self.assertEqual(c[:, :, ::2].tolist(),
+                         [[[0, 2], [4, 6], [8, 10]],
+                          [[12, 14], [16, 18], [20, 22]]])
+        self.assertEqual(c[-1, ::-1, 0].tolist(), [20, 16, 12])
+        self.assertEqual(c[:, 1, 2].strides, (12,))
+        self.assertEqual(c[()].tolist(), c.tolist())
+        self.assertEqual([x.tolist() for x in c[0]], c[0].tolist())
+        self.assertEqual(c[1, 1:].tobytes(), bytes(self.data[16:]))
+        self.assertTrue(c[:, 0] == b"\x00\x01\x02\x03\x0c\x0d\x0e\x0f")
+        self.assertRaises(IndexError, lambda: c[2])
+        self.assertRaises(IndexError, lambda: c[0, 3])
+        self.assertRaises(IndexError, lambda: c[0, 0, -5])
+        self.assertRaises(TypeError, lambda: c[0, 0, 0, 0])
+        self.assertRaises(TypeError, lambda: c[0, "a"])
+
+    def test_multidim_setitem(self):
+        c = self.m.cast('B', (2, 3, 4))
+        c[0, 0, 0] = b"\xff"
+        self.assertEqual(self.data[0], 255)
+        c[1, :, 1] = b"abc"
+        self.assertEqual(self.data[13::4], bytearray(b"abc"))
+        c[0] = b"z" * 12
+        self.assertEqual(self.data[:12], bytearray(b"z" * 12))
+        c[:, 2, ::-1] = b"12345678"
+        self.assertEqual(self.data[8:12], bytearray(b"4321"))
+        self.assertEqual(self.data[20:24], bytearray(b"8765"))
+        self.assertRaises(ValueError, c.__setitem__, (0, 0), b"abc")
+        self.assertRaises(IndexError, c.__setitem__, (0, 3, 0), b"a")
+        self.assertRaises(TypeError, memoryview(b"abcd").cast('B', [2, 2])
+                          .__setitem__, (0, 0), b"a")
+
+    def test_refs(self):
+        oldrefcount = sys.getrefcount(self.m)
+        c = self.m.cast('B', (4, 6))
+        row = c[1, ::2]
+        del c
+        self.assertEqual(row.tolist(), [6, 8, 10])
+        del row
+        self.assertEqual(sys.getrefcount(self.m), oldrefcount)
+
+    def test_views_keep_memory(self):
+        row = self.m.cast('B', (4, 6))[1, ::2]
+        self.m = None
+        self.assertEqual(row.tolist(), [6, 8, 10])
+        self.assertRaises(BufferError, self.data.append, 0)
+        del row
+        self.data.append(0)
+
 def test_main():
     test_support.run_unittest(__name__)
 
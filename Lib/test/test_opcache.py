@@ -0,0 +1,181 @@
+"""Tests for the LOAD_GLOBAL and LOAD_ATTR inline caches.
+
+The caches are only created once a code object has run often enough, so
+every test warms up the function under test before changing the
+namespaces it reads from.
+"""
+
+import unittest
+import __builtin__
+from test import test_support
+
+WARMUP = 2000
+
+def warm(func, *args):
+    for i in xrange(WARMUP):
+        func(*args)
+    return func(*args)
+
+
+cached_global = 1
+
+def read_global():
+    return cached_global
+
+def read_len():
+    return len
+
+def read_attr(o):
+    return o.x
+
+
+class GlobalCacheTests(unittest.TestCase):
+
+    def tearDown(self):
+        global cached_global
+        cached_global = 1
+        globals().pop('len', None)
+
+    def test_rebind_global(self):
+        global cached_global
+        self.assertEqual(warm(read_global), 1)
+        cached_global = 2
+        self.assertEqual(read_global(), 2)
+
+    def test_delete_global(self):
+        global cached_global
+        warm(read_global)
+        del cached_global
+        self.assertRaises(NameError, read_global)
+        cached_global = 3
+        self.assertEqual(read_global(), 3)
+
+    def test_shadow_builtin(self):
+        self.assertIs(warm(read_len), len)
+        globals()['len'] = 42
+        self.assertEqual(read_len(), 42)
+        del globals()['len']
+        self.assertIs(read_len(), __builtin__.len)
+
+    def test_change_builtin(self):
+        warm(read_len)
+        orig = __builtin__.len
+        __builtin__.len = marker = object()
+        try:
+            self.assertIs(read_len(), marker)
+        finally:
+            __builtin__.len = orig
+        self.assertIs(read_len(), orig)
+
+    def test_different_globals(self):
+        code = compile("for i in xrange(%d): x = value" % WARMUP,
+                       "<opcache>", "exec")
+        ns1 = {'value': 1}
+        ns2 = {'value': 2}
+        exec code in ns1
+        exec code in ns2
+        exec code in ns1
+        self.assertEqual(ns1['x'], 1)
+        self.assertEqual(ns2['x'], 2)
+
+
+class AttributeCacheTests(unittest.TestCase):
+
+    def test_instance_attribute(self):
+        class C(object):
+            pass
+        c = C()
+        c.x = 1
+        self.assertEqual(warm(read_attr, c), 1)
+        c.x = 2
+        self.assertEqual(read_attr(c), 2)
+        d = C()
+        d.x = 3
+        self.assertEqual(read_attr(d), 3)
+        del c.x
+        self.assertRaises(AttributeError, read_attr, c)
+
+    def test_class_data_descriptor(self):
+        class C(object):
+            pass
+        c = C()
+        c.x = 1
+        warm(read_attr, c)
+        C.x = property(lambda self: 'property')
+        self.assertEqual(read_attr(c), 'property')
+        del C.x
+        self.assertEqual(read_attr(c), 1)
+
+    def test_base_class_data_descriptor(self):
+        class B(object):
+            pass
+        class C(B):
+            pass
+        c = C()
+        c.x = 1
+        warm(read_attr, c)
+        B.x = property(lambda self: 'property')
+        self.assertEqual(read_attr(c), 'property')
+
+    def test_class_assignment(self):
+        class C(object):
+            pass
+        class D(object):
+            x = property(lambda self: 'D')
+        c = C()
+        c.x = 1
+        warm(read_attr, c)
+        c.__class__ = D
+        self.assertEqual(read_attr(c), 'D')
+
+    def test_dict_replacement(self):
+        class C(object):
+            pass
+        c = C()
+        c.x = 1
+        warm(read_attr, c)
+        c.__dict__ = {'y': 1, 'x': 2}
+        self.assertEqual(read_attr(c), 2)
+
+    def test_getattribute(self):
+        class C(object):
+            def __getattribute__(self, name):
+                return 'getattribute'
+        c = C()
+        object.__setattr__(c, 'x', 1)
+        self.assertEqual(warm(read_attr, c), 'getattribute')
+
+    def test_classic_instance(self):
+        class C:
+            pass
+        c = C()
+        c.x = 1
+        self.assertEqual(warm(read_attr, c), 1)
+        c.x = 2
+        self.assertEqual(read_attr(c), 2)
+        c.__dict__ = {'x': 3}
+        self.assertEqual(read_attr(c), 3)
+        del c.x
+        self.assertRaises(AttributeError, read_attr, c)
+        C.x = 4
+        self.assertEqual(read_attr(c), 4)
+
+    def test_mixed_types(self):
+        class C(object):
+            pass
+        class D:
+            pass
+        c = C()
+        c.x = 'new'
+        d = D()
+        d.x = 'classic'
+        for i in xrange(WARMUP):
+            self.assertEqual(read_attr(c), 'new')
+            self.assertEqual(read_attr(d), 'classic')
+
+
+def test_main():
+    test_support.run_unittest(GlobalCacheTests, AttributeCacheTests)
+
+if __name__ == "__main__":
+    test_main()
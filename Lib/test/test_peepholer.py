@@ -201,6 +201,96 @@ class TestTranforms(unittest.TestCase):
         self.assertEqual(asm.split().count('JUMP_ABSOLUTE'), 1)
         self.assertEqual(asm.split().count('RETURN_VALUE'), 2)
 
+    def test_folding_of_sets_found_in(self):
+        # set displays of constants used in "in" tests become frozensets
+        for line, elem in (
+            ('a in {1,2,3}', 'frozenset'),
+            ('a not in {"a","b"}', 'frozenset'),
+            ('a in {None, 1.5}', 'frozenset'),
+            ):
+            asm = dis_single(line)
+            self.assertIn(elem, asm)
+            self.assertNotIn('BUILD_SET', asm)
+
+        # the set is still built when it is not used for a test
+        self.assertIn('BUILD_SET', dis_single('a = {1,2,3}'))
+
+        def f(a):
+            return a in {1, 2, 3, 1.0}
+        self.assertTrue(f(3))
+        self.assertTrue(f(1.0))
+        self.assertFalse(f(4))
+        self.assertRaises(TypeError, f, [])
+
+    def test_elim_unreachable_code(self):
+        def f(x):
+            if x:
+                return 1
+                x = 'dead1'
+            else:
+                raise ValueError
+                x = 'dead2'
+            while x:
+                continue
+                x = 'dead3'
+            return x
+        asm = disassemble(f)
+        self.assertNotIn('dead', asm)
+        self.assertEqual(f(1), 1)
+        self.assertRaises(ValueError, f, 0)
+
+    def test_elim_constant_conditions(self):
+        def f():
+            if 2 - 2:
+                return 'folded'
+            if not 2 - 2:
+                return 'kept'
+        asm = disassemble(f)
+        self.assertNotIn('folded', asm)
+        self.assertNotIn('POP_JUMP_IF', asm)
+        self.assertEqual(f(), 'kept')
+
+        def g(x):
+            if not __debug__:
+                return 'not debug'
+            return 'debug' if __debug__ else 'not debug'
+        asm = disassemble(g)
+        self.assertNotIn('__debug__', asm)
+        self.assertNotIn('POP_JUMP_IF', asm)
+        self.assertEqual(g(1), 'not debug' if sys.flags.optimize else 'debug')
+
+    def test_elim_jump_to_next(self):
+        # the jump at the end of an "if" without "else" goes nowhere
+        def f(x):
+            if x:
+                x()
+            return 3
+        asm = disassemble(f)
+        self.assertNotIn('JUMP_FORWARD', asm)
+        self.assertEqual(f(0), 3)
+        self.assertEqual(f(lambda: None), 3)
+
+    def test_setlineno_with_unreachable_code(self):
+        # the block instructions left in unreachable code keep the checks
+        # of frame.f_lineno assignments working
+        def f():
+            try:
+                return 1
+            except ValueError:
+                pass
+            return 2
+        def tracer(frame, event, arg):
+            if event == 'line' and frame.f_code is f.func_code:
+                if frame.f_lineno == f.func_code.co_firstlineno + 3:
+                    frame.f_lineno += 2
+            return tracer
+        sys.settrace(tracer)
+        try:
+            result = f()
+        finally:
+            sys.settrace(None)
+        self.assertEqual(result, 1)
+
 
 def test_main(verbose=None):
     import sys
@@ -0,0 +1,152 @@
+"""Test suite for the sampleprof module."""
+
+import os
+import signal
+import marshal
+import pstats
+import unittest
+from StringIO import StringIO
+from test import test_support
+
+sampleprof = test_support.import_module('sampleprof')
+
+
+def burn(seconds=0.3):
+    # burn CPU time, since the samples are taken on the CPU time clock
+    end = os.times()[0] + seconds
+    while os.times()[0] < end:
+        for i in xrange(1000):
+            pass
+
+def caller():
+    burn()
+
+def burn_until_sampled():
+    # the SIGPROF handler is the _sample() method of the running profiler
+    prof = signal.getsignal(signal.SIGPROF).__self__
+    while not prof.samples:
+        burn(0.01)
+
+
+class SampleProfileTest(unittest.TestCase):
+
+    def profile(self, func):
+        prof = sampleprof.Profile(0.001)
+        prof.runcall(func)
+        self.assertTrue(prof.samples)
+        return prof
+
+    def test_interval(self):
+        self.assertRaises(ValueError, sampleprof.Profile, 0)
+        self.assertRaises(ValueError, sampleprof.Profile, -1.0)
+        self.assertEqual(sampleprof.Profile().interval,
+                         sampleprof.Profile.default_interval)
+
+    def test_handler_restored(self):
+        def handler(signum, frame):
+            pass
+        old = signal.signal(signal.SIGPROF, handler)
+        try:
+            prof = sampleprof.Profile()
+            prof.enable()
+            self.assertEqual(signal.getsignal(signal.SIGPROF), prof._sample)
+            prof.disable()
+            self.assertIs(signal.getsignal(signal.SIGPROF), handler)
+            self.assertEqual(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+        finally:
+            signal.signal(signal.SIGPROF, old)
+
+    def test_samples(self):
+        prof = self.profile(caller)
+        burn_code = burn.func_code
+        caller_code = caller.func_code
+        self.assertTrue(any(stack[0] is burn_code and stack[1] is caller_code
+                            for stack in prof.samples))
+
+    def test_stats(self):
+        prof = self.profile(caller)
+        stats = pstats.Stats(prof, stream=StringIO())
+        burn_label = sampleprof.label(burn.func_code)
+        caller_label = sampleprof.label(caller.func_code)
+        total = sum(prof.samples.itervalues())
+
+        cc, nc, tt, ct, callers = stats.stats[caller_label]
+        self.assertTrue(0 < nc <= total)
+        # the time of the samples adds up to the CPU time burnt
+        self.assertTrue(0.25 <= ct < 1.0, ct)
+        cc, nc, tt, ct, callers = stats.stats[burn_label]
+        self.assertTrue(0 < tt <= ct)
+        self.assertEqual(callers.keys(), [caller_label])
+        self.assertEqual(callers[caller_label][:2], (nc, nc))
+
+        stats.sort_stats('cumulative').print_stats()
+        stats.print_callers()
+
+    def test_recursion(self):
+        def recurse(n):
+            if n:
+                recurse(n - 1)
+            else:
+                burn()
+        prof = self.profile(lambda: recurse(5))
+        prof.create_stats()
+        recurse_label = sampleprof.label(recurse.func_code)
+        total = sum(prof.samples.itervalues())
+        self.assertLessEqual(prof.stats[recurse_label][1], total)
+        callers = prof.stats[recurse_label][4]
+        self.assertLessEqual(callers[recurse_label][0], total)
+
+    def test_dump_stats(self):
+        prof = self.profile(caller)
+        prof.dump_stats(test_support.TESTFN)
+        try:
+            stats = pstats.Stats(test_support.TESTFN, stream=StringIO())
+            with open(test_support.TESTFN, 'rb') as f:
+                self.assertEqual(marshal.load(f), prof.stats)
+        finally:
+            os.unlink(test_support.TESTFN)
+        self.assertIn(sampleprof.label(burn.func_code), stats.stats)
+
+    def test_folded_stacks(self):
+        prof = self.profile(caller)
+        lines = prof.folded_stacks()
+        burn_name = sampleprof.func_name(burn.func_code)
+        caller_name = sampleprof.func_name(caller.func_code)
+        total = 0
+        for line in lines:
+            names, count = line.rsplit(' ', 1)
+            total += int(count)
+        self.assertEqual(total, sum(prof.samples.itervalues()))
+        self.assertTrue(any((caller_name + ';' + burn_name + ' ') in line
+                            for line in lines))
+
+        prof.dump_folded(test_support.TESTFN)
+        try:
+            with open(test_support.TESTFN) as f:
+                self.assertEqual(f.read().splitlines(), lines)
+        finally:
+            os.unlink(test_support.TESTFN)
+
+    def runctx(self, statement):
+        with test_support.captured_stdout() as output:
+            sampleprof.runctx(statement, globals(), {}, interval=0.001)
+        self.assertEqual(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+        return output.getvalue()
+
+    def test_run(self):
+        output = self.runctx("burn_until_sampled()")
+        self.assertIn("burn_until_sampled", output)
+        self.assertNotIn("No samples collected", output)
+
+    def test_run_no_samples(self):
+        output = self.runctx("pass")
+        self.assertIn("No samples collected", output)
+        with test_support.captured_stdout() as output:
+            sampleprof.Profile().print_stats()
+        self.assertIn("No samples collected", output.getvalue())
+
+def test_main():
+    test_support.run_unittest(SampleProfileTest)
+
+if __name__ == "__main__":
+    test_main()
@@ -10,8 +10,11 @@ import __builtin__
 import os
 import sys
 import encodings
+import shutil
 import subprocess
 import sysconfig
+import tempfile
+import time
 from copy import copy
 
 # Need to make sure to not import 'site' if someone specified ``-S`` at the
@@ -160,6 +163,22 @@ class HelperFunctionsTests(unittest.TestCase):
         self.assertEquals(site.USER_SITE, user_site)
         self.assertTrue(user_site.startswith(site.USER_BASE), user_site)
 
+    def test_getuserbase_like_sysconfig(self):
+        # getuserbase() and getusersitepackages() don't import sysconfig
+        # on most platforms, but must agree with it
+        site.USER_BASE = None
+        site.USER_SITE = None
+        sysconfig._CONFIG_VARS = None
+        self.assertEqual(site.getuserbase(),
+                         sysconfig.get_config_var('userbase'))
+        if (sys.platform == "darwin" and
+            sysconfig.get_config_var("PYTHONFRAMEWORK")):
+            scheme = 'osx_framework_user'
+        else:
+            scheme = '%s_user' % os.name
+        self.assertEqual(site.getusersitepackages(),
+                         sysconfig.get_path('purelib', scheme))
+
     def test_getsitepackages(self):
         site.PREFIXES = ['xoxo']
         dirs = site.getsitepackages()
@@ -249,6 +268,102 @@ class PthFile(object):
         if os.path.exists(self.bad_dir_path):
             os.rmdir(self.bad_dir_path)
 
+class SiteCacheTests(unittest.TestCase):
+    """Test the cache of the site directories set by PYTHONSITECACHE."""
+
+    code = ('import sys; '
+            'print ([p for p in sys.path if p.startswith(%r)], '
+            'getattr(sys, "pth_line_executed", False))')
+
+    def setUp(self):
+        self.base = os.path.realpath(tempfile.mkdtemp())
+        self.cachedir = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.cachedir, 'site.cache')
+        self.env = os.environ.copy()
+        self.env['PYTHONUSERBASE'] = self.base
+        self.env['PYTHONSITECACHE'] = self.cachefile
+        self.user_site = os.path.join(self.base, 'lib',
+                                      'python' + sys.version[:3],
+                                      'site-packages')
+        if os.name == 'nt':
+            self.user_site = os.path.join(self.base, 'Python%s%s' %
+                                          (sys.version[0], sys.version[2]),
+                                          'site-packages')
+        os.makedirs(self.user_site)
+        os.mkdir(os.path.join(self.base, 'dir1'))
+        self.pth = os.path.join(self.user_site, 'test.pth')
+        self.write_pth('../../../dir1\n'
+                       'import sys; sys.pth_line_executed = True\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.base)
+        shutil.rmtree(self.cachedir)
+
+    def write_pth(self, text):
+        with open(self.pth, 'w') as f:
+            f.write(text)
+
+    def age(self):
+        # the cache is not saved if a file or directory it depends on was
+        # modified in the last seconds
+        when = time.time() - 3600
+        for dirpath, dirnames, filenames in os.walk(self.base):
+            os.utime(dirpath, (when, when))
+            for name in filenames:
+                os.utime(os.path.join(dirpath, name), (when, when))
+
+    def run_python(self):
+        if os.name == 'nt':
+            expected_prefix = self.base
+        else:
+            expected_prefix = self.base + os.sep
+        p = subprocess.Popen([sys.executable, '-c',
+                              self.code % expected_prefix],
+                             stdout=subprocess.PIPE, env=self.env)
+        out = p.communicate()[0]
+        self.assertEqual(p.returncode, 0)
+        paths, executed = eval(out)
+        return map(os.path.normcase, paths), executed
+
+    def test_cache(self):
+        if not site.ENABLE_USER_SITE:
+            self.skipTest("user site-packages disabled")
+        user_site = os.path.normcase(self.user_site)
+        dir1 = os.path.normcase(os.path.join(self.base, 'dir1'))
+        dir2 = os.path.normcase(os.path.join(self.base, 'dir2'))
+        expected = ([user_site, dir1], True)
+
+        # the cache is not saved when the files were just modified
+        self.assertEqual(self.run_python(), expected)
+        self.assertFalse(os.path.exists(self.cachefile))
+        self.age()
+        self.assertEqual(self.run_python(), expected)
+        self.assertTrue(os.path.exists(self.cachefile))
+        # the cache is used, and the import line executed again
+        when = time.time() - 3600
+        os.utime(self.cachefile, (when, when))
+        mtime = os.stat(self.cachefile).st_mtime
+        self.assertEqual(self.run_python(), expected)
+        self.assertEqual(os.stat(self.cachefile).st_mtime, mtime)
+
+        # a directory of the .pth file is created
+        os.mkdir(os.path.join(self.base, 'dir2'))
+        self.write_pth('../../../dir1\n'
+                       '../../../dir2\n')
+        self.age()
+        expected = ([user_site, dir1, dir2], False)
+        self.assertEqual(self.run_python(), expected)
+        self.assertEqual(self.run_python(), expected)
+        os.rmdir(os.path.join(self.base, 'dir1'))
+        self.assertEqual(self.run_python(), ([user_site, dir2],
+                                                        False))
+
+        # an unreadable cache file is ignored
+        with open(self.cachefile, 'wb') as f:
+            f.write('garbage')
+        self.assertEqual(self.run_python(), ([user_site, dir2],
+                                                        False))
+
 class ImportSideEffectTests(unittest.TestCase):
     """Test side-effects from importing 'site'."""
 
@@ -328,7 +443,7 @@ class ImportSideEffectTests(unittest.TestCase):
                 self.fail("sitecustomize not imported automatically")
 
 def test_main():
-    run_unittest(HelperFunctionsTests, ImportSideEffectTests)
+    run_unittest(HelperFunctionsTests, SiteCacheTests, ImportSideEffectTests)
 
 if __name__ == "__main__":
     test_main()
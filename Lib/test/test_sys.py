@@ -215,6 +215,57 @@ class SysModuleTest(unittest.TestCase):
             sys.setcheckinterval(n)
             self.assertEquals(sys.getcheckinterval(), n)
 
+    @unittest.skipUnless(hasattr(sys, "setswitchinterval"),
+                         "requires thread support")
+    def test_switchinterval(self):
+        self.assertRaises(TypeError, sys.setswitchinterval)
+        self.assertRaises(TypeError, sys.setswitchinterval, "a")
+        self.assertRaises(ValueError, sys.setswitchinterval, -1.0)
+        self.assertRaises(ValueError, sys.setswitchinterval, 0.0)
+        orig = sys.getswitchinterval()
+        # sanity check
+        self.assertTrue(orig < 0.5, orig)
+        try:
+            for n in 0.00001, 0.05, 3.0, orig:
+                sys.setswitchinterval(n)
+                self.assertAlmostEquals(sys.getswitchinterval(), n)
+        finally:
+            sys.setswitchinterval(orig)
+
+    @unittest.skipUnless(hasattr(sys, "getswitchstats"),
+                         "requires thread support")
+    def test_getswitchstats(self):
+        import threading, time
+        stats = sys.getswitchstats()
+        self.assertEqual(len(stats), 3)
+        for n in stats:
+            self.assertTrue(n >= 0, stats)
+        orig = sys.getswitchinterval()
+        sys.setswitchinterval(0.0001)
+        try:
+            # A CPU-bound thread competing with the main thread must
+            # eventually be asked to drop the GIL.
+            done = []
+            def spin():
+                while not done:
+                    pass
+            t = threading.Thread(target=spin)
+            t.start()
+            try:
+                deadline = time.time() + 10.0
+                while (sys.getswitchstats()[1] == stats[1] and
+                       time.time() < deadline):
+                    sum(xrange(1000))
+            finally:
+                done.append(True)
+                t.join()
+        finally:
+            sys.setswitchinterval(orig)
+        switches, requested, forced = sys.getswitchstats()
+        self.assertTrue(switches > stats[0])
+        self.assertTrue(requested > stats[1])
+        self.assertTrue(forced >= stats[2])
+
     def test_recursionlimit(self):
         self.assertRaises(TypeError, sys.getrecursionlimit, 42)
         oldlimit = sys.getrecursionlimit()
@@ -435,6 +486,19 @@ class SysModuleTest(unittest.TestCase):
     def test_clear_type_cache(self):
         sys._clear_type_cache()
 
+    def test_debugmallocstats(self):
+        # Test sys._debugmallocstats()
+        import subprocess, sysconfig
+        p = subprocess.Popen([sys.executable, "-c",
+                              "import sys; sys._debugmallocstats()"],
+                             stderr=subprocess.PIPE)
+        err = p.communicate()[1]
+        self.assertEqual(p.returncode, 0)
+        if sysconfig.get_config_var('WITH_PYMALLOC'):
+            self.assertIn("arenas allocated current", err)
+            self.assertIn("bytes in allocated blocks", err)
+        self.assertRaises(TypeError, sys._debugmallocstats, True)
+
     def test_ioencoding(self):
         import subprocess
         env = dict(os.environ)
@@ -572,7 +636,7 @@ class SizeofTest(unittest.TestCase):
         # complex
         check(complex(0,1), size(h + '2d'))
         # code
-        check(get_cell().func_code, size(h + '4i8Pi3P'))
+        check(get_cell().func_code, size(h + '4i8Pi5P2i'))
         # BaseException
         check(BaseException(), size(h + '3P'))
         # UnicodeEncodeError
@@ -599,9 +663,9 @@ class SizeofTest(unittest.TestCase):
         # method-wrapper (descriptor object)
         check({}.__iter__, size(h + '2P'))
         # dict
-        check({}, size(h + '3P2P' + 8*'P2P'))
+        check({}, size(h + '3P2PQ2P' + 8*'P2P'))
         x = {1:1, 2:2, 3:3, 4:4, 5:5, 6:6, 7:7, 8:8}
-        check(x, size(h + '3P2P' + 8*'P2P') + 16*size('P2P'))
+        check(x, size(h + '3P2PQ2P' + 8*'P2P') + 16*size('P2P'))
         # dictionary-keyiterator
         check({}.iterkeys(), size(h + 'P2PPP'))
         # dictionary-valueiterator
@@ -732,8 +796,8 @@ class SizeofTest(unittest.TestCase):
         check(iter(()), size(h + 'lP'))
         # type
         # (PyTypeObject + PyNumberMethods +  PyMappingMethods +
-        #  PySequenceMethods + PyBufferProcs)
-        s = size(vh + 'P2P15Pl4PP9PP11PI') + size('41P 10P 3P 6P')
+        #  PySequenceMethods + PyBufferProcs + ht_cached_keys)
+        s = size(vh + 'P2P15Pl4PP9PP11PI') + size('41P 10P 3P 6P P')
         class newstyleclass(object):
             pass
         check(newstyleclass, s)
@@ -748,7 +812,13 @@ class SizeofTest(unittest.TestCase):
         # we need to test for both sizes, because we don't know if the string
         # has been cached
         for s in samples:
-            check(s, size(h + 'PPlP') + usize * (len(s) + 1))
+            check(s, size(h + 'PPlPi') + usize * (len(s) + 1))
+        # compact unicode
+        s = ('1'*100).decode('ascii')
+        check(s, size(h + 'PPlPi') + 101)
+        # the Py_UNICODE buffer replaces the compact data
+        s.find(u'2')
+        check(s, size(h + 'PPlPi') + usize * 101)
         # weakref
         import weakref
         check(weakref.ref(int), size(h + '2Pl2P'))
@@ -11,7 +11,8 @@ import shutil
 import subprocess
 from copy import copy, deepcopy
 
-from test.test_support import run_unittest, TESTFN, unlink, get_attribute
+from test.test_support import (run_unittest, TESTFN, unlink, get_attribute,
+                               temp_cwd)
 
 import sysconfig
 from sysconfig import (get_paths, get_platform, get_config_vars,
@@ -230,6 +231,26 @@ class TestSysConfig(unittest.TestCase):
 
         # XXX more platforms to tests here
 
+    def test_parse_makefile_continuation(self):
+        self.makefile = TESTFN
+        with open(self.makefile, 'w') as f:
+            f.write('OBJS=\ta.o \\\n\t\tb.o \\\n\t\tc.o\n'
+                    'CC= gcc\n')
+        vars = sysconfig._parse_makefile(self.makefile)
+        self.assertEqual(vars, {'OBJS': 'a.o \t\tb.o \t\tc.o',
+                                'CC': 'gcc'})
+
+    @unittest.skipUnless(os.name == 'posix', 'test only relevant for POSIX')
+    def test_generate_posix_vars(self):
+        with temp_cwd(TESTFN):
+            sysconfig._generate_posix_vars()
+            with open('pybuilddir.txt') as f:
+                builddir = f.read()
+            ns = {}
+            execfile(os.path.join(builddir, '_sysconfigdata.py'), ns)
+        self.assertEqual(ns['build_time_vars'],
+                         sysconfig._parse_posix_vars({}))
+
     def test_get_config_h_filename(self):
         config_h = sysconfig.get_config_h_filename()
         self.assertTrue(os.path.isfile(config_h), config_h)
@@ -515,8 +515,12 @@ class ThreadingExceptionTests(BaseTestCase):
 class LockTests(lock_tests.LockTests):
     locktype = staticmethod(threading.Lock)
 
-class RLockTests(lock_tests.RLockTests):
-    locktype = staticmethod(threading.RLock)
+class PyRLockTests(lock_tests.RLockTests):
+    locktype = staticmethod(threading._PyRLock)
+
+@unittest.skipIf(threading._CRLock is None, 'RLock not implemented in C')
+class CRLockTests(lock_tests.RLockTests):
+    locktype = staticmethod(threading._CRLock)
 
 class EventTests(lock_tests.EventTests):
     eventtype = staticmethod(threading.Event)
@@ -536,7 +540,8 @@ class BoundedSemaphoreTests(lock_tests.BoundedSemaphoreTests):
 
 
 def test_main():
-    test.test_support.run_unittest(LockTests, RLockTests, EventTests,
+    test.test_support.run_unittest(LockTests, PyRLockTests, CRLockTests,
+                                   EventTests,
                                    ConditionAsRLockTests, ConditionTests,
                                    SemaphoreTests, BoundedSemaphoreTests,
                                    ThreadTests,
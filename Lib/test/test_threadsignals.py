@@ -4,6 +4,7 @@ import unittest
 import signal
 import os
 import sys
+import time
 from test.test_support import run_unittest, import_module
 thread = import_module('thread')
 
@@ -66,6 +67,53 @@ class ThreadSignals(unittest.TestCase):
     def spawnSignallingThread(self):
         thread.start_new_thread(send_signals, ())
 
+    def alarm_interrupt(self, sig, frame):
+        raise KeyboardInterrupt
+
+    # Mac OS X uses condition variables for the locks, which can't be
+    # interrupted by a signal.
+    @unittest.skipIf(sys.platform == 'darwin',
+                     "lock acquisition can't be interrupted on OS X")
+    def test_lock_acquire_interruption(self):
+        # Mimic receiving a SIGINT (KeyboardInterrupt) with SIGALRM while stuck
+        # in a deadlock.
+        oldalrm = signal.signal(signal.SIGALRM, self.alarm_interrupt)
+        try:
+            lock = thread.allocate_lock()
+            lock.acquire()
+            signal.alarm(1)
+            t1 = time.time()
+            self.assertRaises(KeyboardInterrupt, lock.acquire, timeout=5)
+            dt = time.time() - t1
+            # Checking that KeyboardInterrupt was raised is not sufficient.
+            # We want to assert that lock.acquire() was interrupted because
+            # of the signal, not that the signal handler was called
+            # immediately after timeout return of lock.acquire() (which can
+            # fool assertRaises).
+            self.assertLess(dt, 3.0)
+        finally:
+            signal.signal(signal.SIGALRM, oldalrm)
+
+    def test_lock_acquire_retries_on_intr(self):
+        # A signal handler which doesn't raise must not make the timed
+        # acquisition return early.
+        self.sig_recvd = False
+        def my_handler(signal, frame):
+            self.sig_recvd = True
+        old_handler = signal.signal(signal.SIGALRM, my_handler)
+        try:
+            lock = thread.allocate_lock()
+            lock.acquire()
+            signal.alarm(1)
+            t1 = time.time()
+            self.assertFalse(lock.acquire(timeout=2))
+            dt = time.time() - t1
+            self.assertTrue(self.sig_recvd)
+            self.assertGreaterEqual(dt, 1.5)
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, old_handler)
+
 
 def test_main():
     global signal_blackboard
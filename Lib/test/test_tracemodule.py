@@ -0,0 +1,138 @@
+"""Tests for the line counting of the trace module."""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+import unittest
+from test import test_support
+
+import trace
+_trace = test_support.import_module('_trace')
+
+
+def traced_func(n):
+    total = 0
+    for i in range(n):
+        if i % 2:
+            total += i
+        else:
+            total -= 1
+    try:
+        1/0
+    except ZeroDivisionError:
+        total += 1
+    return sum(gen(n)) + total
+
+def gen(n):
+    for i in range(n):
+        yield i
+
+def thread_func():
+    threads = []
+    for i in range(3):
+        t = threading.Thread(target=traced_func, args=(5,))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+
+class CTracerTest(unittest.TestCase):
+
+    def count(self, func, ctracer, **kw):
+        tracer = trace.Trace(count=1, trace=0, ctracer=ctracer, **kw)
+        tracer.runfunc(func)
+        return tracer.results().counts
+
+    def this_file_counts(self, counts):
+        this_file = traced_func.func_code.co_filename
+        return dict((key, n) for key, n in counts.iteritems()
+                    if key[0] == this_file)
+
+    def test_same_counts(self):
+        func = lambda: traced_func(10)
+        python = self.count(func, False)
+        c = self.count(func, True)
+        self.assertEqual(c, python)
+        first = traced_func.func_code.co_firstlineno
+        filename = traced_func.func_code.co_filename
+        self.assertEqual(c[(filename, first + 2)], 11)
+        self.assertEqual(c[(filename, first + 6)], 5)
+        self.assertEqual(c[(filename, first + 10)], 1)
+
+    def test_runner_not_counted(self):
+        counts = self.count(lambda: traced_func(1), True)
+        trace_file = os.path.splitext(trace.__file__)[0] + '.py'
+        self.assertFalse([key for key in counts if key[0] == trace_file])
+
+    def test_ignore(self):
+        this_module = trace.modname(__file__)
+        for kw in ({'ignoremods': [this_module]},
+                   {'ignoredirs': [os.path.dirname(os.path.abspath(__file__))]}):
+            python = self.count(lambda: traced_func(3), False, **kw)
+            c = self.count(lambda: traced_func(3), True, **kw)
+            self.assertEqual(c, python)
+            self.assertEqual(self.this_file_counts(c), {})
+
+    def test_threads(self):
+        tracer = trace.Trace(count=1, trace=0, ctracer=True)
+        tracer.runctx('thread_func()', globals(), {})
+        counts = self.this_file_counts(tracer.results().counts)
+        first = traced_func.func_code.co_firstlineno
+        filename = traced_func.func_code.co_filename
+        self.assertEqual(counts[(filename, first + 1)], 3)
+        self.assertEqual(counts[(filename, first + 2)], 3 * 6)
+        self.assertIsNone(sys.gettrace())
+
+    def test_results_twice(self):
+        tracer = trace.Trace(count=1, trace=0, ctracer=True)
+        tracer.runfunc(traced_func, 2)
+        counts = dict(tracer.results().counts)
+        self.assertEqual(tracer.results().counts, counts)
+        tracer.runfunc(traced_func, 2)
+        counts2 = tracer.results().counts
+        key = (traced_func.func_code.co_filename,
+               traced_func.func_code.co_firstlineno + 1)
+        self.assertEqual(counts2[key], 2 * counts[key])
+
+    def test_filter_error(self):
+        def bad_filter(frame):
+            if frame.f_code is traced_func.func_code:
+                raise KeyError
+            return True
+        tracer = _trace.Tracer(bad_filter)
+        sys.settrace(tracer)
+        try:
+            self.assertRaises(KeyError, traced_func, 1)
+            # the tracer removed itself
+            self.assertIsNone(sys.gettrace())
+        finally:
+            sys.settrace(None)
+        self.assertRaises(TypeError, _trace.Tracer, 1)
+
+    def test_command_line(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            script = os.path.join(tmpdir, 'script.py')
+            with open(script, 'w') as f:
+                f.write('for i in range(7):\n'
+                        '    x = i\n')
+            rc = subprocess.call([sys.executable, '-E', '-m', 'trace',
+                                  '--count', '-C', tmpdir, script])
+            self.assertEqual(rc, 0)
+            with open(os.path.join(tmpdir, 'script.cover')) as f:
+                lines = f.readlines()
+            self.assertEqual(lines[0].split(':')[0].strip(), '8')
+            self.assertEqual(lines[1].split(':')[0].strip(), '7')
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+def test_main():
+    test_support.run_unittest(CTracerTest)
+
+if __name__ == "__main__":
+    test_main()
@@ -6,7 +6,7 @@ Written by Marc-Andre Lemburg (mal@lemburg.com).
 (c) Copyright CNRI, All Rights Reserved. NO WARRANTY.
 
 """#"
-import sys, struct, codecs
+import sys, struct, codecs, re
 from test import test_support, string_tests
 
 # Error handling (bad decoder return)
@@ -914,6 +914,71 @@ class UnicodeTest(
         self.assertEqual((u"abc" u"def" "ghi"), u"abcdefghi")
         self.assertEqual(("abc" "def" u"ghi"), u"abcdefghi")
 
+    def test_compact_storage(self):
+        # Decoded strings may be stored with fewer bytes per character,
+        # they must behave like the strings built in a Py_UNICODE buffer
+        for s in [u'abc' * 10, u'caf\xe9' * 10, u'\u20ac\u4e2d' * 10]:
+            compact = s.encode('utf-8').decode('utf-8')
+            wide = u'%s' % s
+            for x, y in [(compact, wide), (wide, compact),
+                         (compact, compact[:])]:
+                self.assertEqual(x, y)
+                self.assertEqual(hash(x), hash(y))
+                self.assertLess(x[:-1], y)
+                self.assertGreater(x + u'\0', y)
+                self.assertEqual(x[3], y[3])
+                self.assertEqual(x[1:7], y[1:7])
+                self.assertEqual(x[::3], y[::3])
+                self.assertEqual(x[::-1], y[::-1])
+                self.assertEqual(x + y, s + s)
+                self.assertEqual(x + u'\U00010000', s + u'\U00010000')
+            self.assertEqual(compact.encode('utf-8'), s.encode('utf-8'))
+            self.assertEqual(compact.encode('ascii', 'replace'),
+                             s.encode('ascii', 'replace'))
+            self.assertEqual(compact.encode('latin-1', 'ignore'),
+                             s.encode('latin-1', 'ignore'))
+            self.assertEqual(compact.strip(s[0]), s.strip(s[0]))
+            self.assertEqual(compact.rstrip(s[-2:]), s.rstrip(s[-2:]))
+            self.assertEqual(compact.lstrip(), s)
+            # stripping a compact string by itself builds its buffer
+            compact = s.encode('utf-8').decode('utf-8')
+            self.assertEqual(compact.strip(compact), u'')
+            compact = s.encode('utf-8').decode('utf-8')
+            self.assertEqual(compact.rstrip(compact), u'')
+            compact = s.encode('utf-8').decode('utf-8')
+            self.assertEqual(compact.lstrip(compact), u'')
+            compact = (s * 200).encode('utf-8').decode('utf-8')
+            self.assertEqual(compact.strip(compact), u'')
+            compact = s.encode('utf-8').decode('utf-8')
+            self.assertTrue(compact.startswith(s[:5]))
+            self.assertTrue(compact.endswith(s[-5:], 3))
+            self.assertFalse(compact.startswith(u'\U00010000'))
+            # the Py_UNICODE buffer replaces the compact data in the other
+            # operations
+            for op in [lambda x: x.find(x[4:6], 3),
+                       lambda x: x.split(x[1]),
+                       lambda x: x.count(x[2:4]),
+                       lambda x: x.replace(x[0], u'-'),
+                       lambda x: u'<%s>' % x,
+                       lambda x: u'<{0}>'.format(x),
+                       lambda x: re.findall(re.escape(x[1:3]), x),
+                       lambda x: x.upper()]:
+                compact = s.encode('utf-8').decode('utf-8')
+                self.assertEqual(op(compact), op(s))
+                self.assertEqual(compact, s)
+                self.assertEqual(hash(compact), hash(s))
+                self.assertEqual(compact[1:7], s[1:7])
+        ascii = ('x' * 10).decode('ascii')
+        self.assertEqual(hash(ascii), hash('x' * 10))
+        self.assertEqual(ascii.encode('ascii'), 'x' * 10)
+        latin1 = ('x\xe9' * 10).decode('latin-1')
+        self.assertEqual(latin1.encode('latin-1'), 'x\xe9' * 10)
+        self.assertRaises(UnicodeEncodeError, latin1.encode, 'ascii')
+        # compact characters come before the surrogates in UCS2 builds
+        self.assertLess(latin1, u'\U00010000')
+        self.assertLess(latin1, u'\uffff')
+        self.assertGreater(u'\U00010000', latin1)
+
     def test_printing(self):
         class BitBucket:
             def write(self, text):
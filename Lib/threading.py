@@ -29,12 +29,18 @@ from collections import deque
 __all__ = ['activeCount', 'active_count', 'Condition', 'currentThread',
            'current_thread', 'enumerate', 'Event',
            'Lock', 'RLock', 'Semaphore', 'BoundedSemaphore', 'Thread',
-           'Timer', 'setprofile', 'settrace', 'local', 'stack_size']
+           'Timer', 'setprofile', 'settrace', 'local', 'stack_size',
+           'TIMEOUT_MAX']
 
 _start_new_thread = thread.start_new_thread
 _allocate_lock = thread.allocate_lock
 _get_ident = thread.get_ident
 ThreadError = thread.error
+TIMEOUT_MAX = thread.TIMEOUT_MAX
+try:
+    _CRLock = thread.RLock
+except AttributeError:
+    _CRLock = None
 del thread
 
 
@@ -92,8 +98,14 @@ def settrace(func):
 
 Lock = _allocate_lock
 
-def RLock(*args, **kwargs):
-    return _RLock(*args, **kwargs)
+def RLock(verbose=None):
+    # The Python version is used when verbose output is requested, since the
+    # C version doesn't support it.
+    if verbose is None:
+        verbose = _VERBOSE
+    if (__debug__ and verbose) or _CRLock is None:
+        return _PyRLock(verbose)
+    return _CRLock()
 
 class _RLock(_Verbose):
 
@@ -112,14 +124,14 @@ class _RLock(_Verbose):
         return "<%s owner=%r count=%d>" % (
                 self.__class__.__name__, owner, self.__count)
 
-    def acquire(self, blocking=1):
+    def acquire(self, blocking=1, timeout=-1):
         me = _get_ident()
         if self.__owner == me:
             self.__count = self.__count + 1
             if __debug__:
                 self._note("%s.acquire(%s): recursive success", self, blocking)
             return 1
-        rc = self.__block.acquire(blocking)
+        rc = self.__block.acquire(blocking, timeout)
         if rc:
             self.__owner = me
             self.__count = 1
@@ -171,6 +183,8 @@ class _RLock(_Verbose):
     def _is_owned(self):
         return self.__owner == _get_ident()
 
+_PyRLock = _RLock
+
 
 def Condition(*args, **kwargs):
     return _Condition(*args, **kwargs)
@@ -239,22 +253,12 @@ class _Condition(_Verbose):
                 if __debug__:
                     self._note("%s.wait(): got it", self)
             else:
-                # Balancing act:  We can't afford a pure busy loop, so we
-                # have to sleep; but if we sleep the whole timeout time,
-                # we'll be unresponsive.  The scheme here sleeps very
-                # little at first, longer as time goes on, but never longer
-                # than 20 times per second (or the timeout time remaining).
-                endtime = _time() + timeout
-                delay = 0.0005 # 500 us -> initial delay of 1 ms
-                while True:
-                    gotit = waiter.acquire(0)
-                    if gotit:
-                        break
-                    remaining = endtime - _time()
-                    if remaining <= 0:
-                        break
-                    delay = min(delay * 2, remaining, .05)
-                    _sleep(delay)
+                # The lock is acquired with a timeout, so the thread
+                # sleeps until it is notified or the timeout expires.
+                if timeout > 0:
+                    gotit = waiter.acquire(True, min(timeout, TIMEOUT_MAX))
+                else:
+                    gotit = waiter.acquire(False)
                 if not gotit:
                     if __debug__:
                         self._note("%s.wait(%s): timed out", self, timeout)
@@ -306,16 +310,26 @@ class _Semaphore(_Verbose):
         self.__cond = Condition(Lock())
         self.__value = value
 
-    def acquire(self, blocking=1):
+    def acquire(self, blocking=1, timeout=None):
+        if not blocking and timeout is not None:
+            raise ValueError("can't specify timeout for non-blocking acquire")
         rc = False
+        endtime = None
         self.__cond.acquire()
         while self.__value == 0:
             if not blocking:
                 break
+            if timeout is not None:
+                if endtime is None:
+                    endtime = _time() + timeout
+                else:
+                    timeout = endtime - _time()
+                    if timeout <= 0:
+                        break
             if __debug__:
                 self._note("%s.acquire(%s): blocked waiting, value=%s",
                            self, blocking, self.__value)
-            self.__cond.wait()
+            self.__cond.wait(timeout)
         else:
             self.__value = self.__value - 1
             if __debug__:
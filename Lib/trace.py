@@ -65,6 +65,11 @@ try:
 except ImportError:
     import pickle
 
+try:
+    import _trace
+except ImportError:
+    _trace = None
+
 def usage(outfile):
     outfile.write("""Usage: %s [OPTIONS] <file> [ARGS]
 
@@ -439,7 +444,7 @@ def find_executable_linenos(filename):
 class Trace:
     def __init__(self, count=1, trace=1, countfuncs=0, countcallers=0,
                  ignoremods=(), ignoredirs=(), infile=None, outfile=None,
-                 timing=False):
+                 timing=False, ctracer=False):
         """
         @param count true iff it should count number of times each
                      line is executed
@@ -456,6 +461,9 @@ class Trace:
                      added into the results
         @param outfile file in which to write the results
         @param timing true iff timing information be displayed
+        @param ctracer true iff the lines should be counted by a C trace
+                     function rather than by localtrace_count, when
+                     only counting and the _trace module is available
         """
         self.infile = infile
         self.outfile = outfile
@@ -469,6 +477,7 @@ class Trace:
         self._callers = {}
         self._caller_cache = {}
         self.start_time = None
+        self._ctracer = None
         if timing:
             self.start_time = time.time()
         if countcallers:
@@ -484,6 +493,12 @@ class Trace:
         elif count:
             self.globaltrace = self.globaltrace_lt
             self.localtrace = self.localtrace_count
+            if ctracer and _trace is not None:
+                # counts the lines of the frames for which globaltrace_lt
+                # would return localtrace_count
+                self._ctracer = _trace.Tracer(
+                    lambda frame: self._is_traced(frame) is not None)
+                self.globaltrace = self._ctracer
         else:
             # Ahem -- do nothing?  Okay.
             self.donothing = 1
@@ -590,6 +605,19 @@ class Trace:
             this_func = self.file_module_function_of(frame)
             self._calledfuncs[this_func] = 1
 
+    def _is_traced(self, frame):
+        """Return the module name of the code block being entered, or None
+        if it is to be ignored."""
+        filename = frame.f_globals.get('__file__', None)
+        if filename:
+            # XXX modname() doesn't work right for packages, so
+            # the ignore support won't work right for packages
+            modulename = modname(filename)
+            if modulename is not None:
+                if not self.ignore.names(filename, modulename):
+                    return modulename
+        return None
+
     def globaltrace_lt(self, frame, why, arg):
         """Handler for call events.
 
@@ -597,21 +625,12 @@ class Trace:
         else returns self.localtrace.
         """
         if why == 'call':
-            code = frame.f_code
-            filename = frame.f_globals.get('__file__', None)
-            if filename:
-                # XXX modname() doesn't work right for packages, so
-                # the ignore support won't work right for packages
-                modulename = modname(filename)
-                if modulename is not None:
-                    ignore_it = self.ignore.names(filename, modulename)
-                    if not ignore_it:
-                        if self.trace:
-                            print (" --- modulename: %s, funcname: %s"
-                                   % (modulename, code.co_name))
-                        return self.localtrace
-            else:
-                return None
+            modulename = self._is_traced(frame)
+            if modulename is not None:
+                if self.trace:
+                    print (" --- modulename: %s, funcname: %s"
+                           % (modulename, frame.f_code.co_name))
+                return self.localtrace
 
     def localtrace_trace_and_count(self, frame, why, arg):
         if why == "line":
@@ -650,6 +669,8 @@ class Trace:
         return self.localtrace
 
     def results(self):
+        if self._ctracer is not None:
+            self._ctracer.collect(self.counts)
         return CoverageResults(self.counts, infile=self.infile,
                                outfile=self.outfile,
                                calledfuncs=self._calledfuncs,
@@ -796,7 +817,7 @@ def main(argv=None):
         t = Trace(count, trace, countfuncs=listfuncs,
                   countcallers=countcallers, ignoremods=ignore_modules,
                   ignoredirs=ignore_dirs, infile=counts_file,
-                  outfile=counts_file, timing=timing)
+                  outfile=counts_file, timing=timing, ctracer=True)
         try:
             t.run('execfile(%r)' % (progname,))
         except IOError, err:
@@ -645,6 +645,8 @@ unicode_internal_encode(PyObject *self,
 
     if (PyUnicode_Check(obj)) {
         data = PyUnicode_AS_DATA(obj);
+        if (data == NULL)
+            return NULL;
         size = PyUnicode_GET_DATA_SIZE(obj);
         return codec_tuple(PyString_FromStringAndSize(data, size),
                            PyUnicode_GET_SIZE(obj));
@@ -669,8 +671,10 @@ utf_7_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF7(PyUnicode_AS_UNICODE(str),
                                          PyUnicode_GET_SIZE(str),
                                          0,
@@ -695,9 +699,8 @@ utf_8_encode(PyObject *self,
     str = PyUnicode_FromObject(str);
     if (str == NULL)
         return NULL;
-    v = codec_tuple(PyUnicode_EncodeUTF8(PyUnicode_AS_UNICODE(str),
-                                         PyUnicode_GET_SIZE(str),
-                                         errors),
+    /* The UTF-8 encoder never calls the error handler */
+    v = codec_tuple(PyUnicode_AsUTF8String(str),
                     PyUnicode_GET_SIZE(str));
     Py_DECREF(str);
     return v;
@@ -723,8 +726,10 @@ utf_16_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF16(PyUnicode_AS_UNICODE(str),
                                           PyUnicode_GET_SIZE(str),
                                           errors,
@@ -746,8 +751,10 @@ utf_16_le_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF16(PyUnicode_AS_UNICODE(str),
                                              PyUnicode_GET_SIZE(str),
                                              errors,
@@ -769,8 +776,10 @@ utf_16_be_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF16(PyUnicode_AS_UNICODE(str),
                                           PyUnicode_GET_SIZE(str),
                                           errors,
@@ -800,8 +809,10 @@ utf_32_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF32(PyUnicode_AS_UNICODE(str),
                                           PyUnicode_GET_SIZE(str),
                                           errors,
@@ -823,8 +834,10 @@ utf_32_le_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF32(PyUnicode_AS_UNICODE(str),
                                              PyUnicode_GET_SIZE(str),
                                              errors,
@@ -846,8 +859,10 @@ utf_32_be_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUTF32(PyUnicode_AS_UNICODE(str),
                                           PyUnicode_GET_SIZE(str),
                                           errors,
@@ -869,8 +884,10 @@ unicode_escape_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeUnicodeEscape(PyUnicode_AS_UNICODE(str),
                                                   PyUnicode_GET_SIZE(str)),
                     PyUnicode_GET_SIZE(str));
@@ -890,8 +907,10 @@ raw_unicode_escape_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeRawUnicodeEscape(
                                PyUnicode_AS_UNICODE(str),
                                PyUnicode_GET_SIZE(str)),
@@ -914,11 +933,18 @@ latin_1_encode(PyObject *self,
     str = PyUnicode_FromObject(str);
     if (str == NULL)
         return NULL;
-    v = codec_tuple(PyUnicode_EncodeLatin1(
-                               PyUnicode_AS_UNICODE(str),
-                               PyUnicode_GET_SIZE(str),
-                               errors),
-                    PyUnicode_GET_SIZE(str));
+    /* Strict encoding does not need the Py_UNICODE buffer */
+    if (errors == NULL || strcmp(errors, "strict") == 0)
+        v = codec_tuple(PyUnicode_AsLatin1String(str),
+                        PyUnicode_GET_SIZE(str));
+    else if (PyUnicode_AS_UNICODE(str) == NULL)
+        v = NULL;
+    else
+        v = codec_tuple(PyUnicode_EncodeLatin1(
+                                   PyUnicode_AS_UNICODE(str),
+                                   PyUnicode_GET_SIZE(str),
+                                   errors),
+                        PyUnicode_GET_SIZE(str));
     Py_DECREF(str);
     return v;
 }
@@ -937,11 +963,18 @@ ascii_encode(PyObject *self,
     str = PyUnicode_FromObject(str);
     if (str == NULL)
         return NULL;
-    v = codec_tuple(PyUnicode_EncodeASCII(
-                               PyUnicode_AS_UNICODE(str),
-                               PyUnicode_GET_SIZE(str),
-                               errors),
-                    PyUnicode_GET_SIZE(str));
+    /* Strict encoding does not need the Py_UNICODE buffer */
+    if (errors == NULL || strcmp(errors, "strict") == 0)
+        v = codec_tuple(PyUnicode_AsASCIIString(str),
+                        PyUnicode_GET_SIZE(str));
+    else if (PyUnicode_AS_UNICODE(str) == NULL)
+        v = NULL;
+    else
+        v = codec_tuple(PyUnicode_EncodeASCII(
+                                   PyUnicode_AS_UNICODE(str),
+                                   PyUnicode_GET_SIZE(str),
+                                   errors),
+                        PyUnicode_GET_SIZE(str));
     Py_DECREF(str);
     return v;
 }
@@ -961,8 +994,10 @@ charmap_encode(PyObject *self,
         mapping = NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeCharmap(
                                PyUnicode_AS_UNICODE(str),
                                PyUnicode_GET_SIZE(str),
@@ -996,8 +1031,10 @@ mbcs_encode(PyObject *self,
         return NULL;
 
     str = PyUnicode_FromObject(str);
-    if (str == NULL)
+    if (str == NULL || PyUnicode_AS_UNICODE(str) == NULL) {
+        Py_XDECREF(str);
         return NULL;
+    }
     v = codec_tuple(PyUnicode_EncodeMBCS(
                                PyUnicode_AS_UNICODE(str),
                                PyUnicode_GET_SIZE(str),
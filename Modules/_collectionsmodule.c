@@ -1593,20 +1593,1414 @@ static PyTypeObject defdict_type = {
     PyObject_GC_Del,                    /* tp_free */
 };
 
+/* OrderedDict type *********************************************************/
+
+/* An OrderedDict is a dict which also links its keys in a doubly linked list
+   of nodes, in insertion order.  So that the node of a key is found, unlinked
+   or moved in O(1) without a second dict, od_fast_nodes is indexed like the
+   table of the dict: od_fast_nodes[i] is the node of the key in slot i of
+   ma_table, or NULL.
+
+   Resizing the dict moves the keys to other slots, so od_fast_nodes is
+   rebuilt from the list whenever it no longer matches the table: when
+   ma_table or its size changed, or ma_fill went down (a small table is
+   resized in place, which leaves the same ma_table).  An entry is only
+   trusted if the node holds the very key object of its slot.
+
+   The list owns the nodes and a reference to their keys.  Comparing keys
+   can run Python code, which may change the OrderedDict: a node is not used
+   after running Python code unless od_state shows that the list did not
+   change, and odict_lookup() checks the slots after its dict lookup.
+
+   Every change to the list increments od_state, which the iterators check
+   before following their node.  Replacing the value of an existing key
+   leaves the list alone.
+*/
+
+typedef struct odictnode {
+    PyObject *key;
+    long hash;
+    struct odictnode *prev;
+    struct odictnode *next;
+} odictnode;
+
+typedef struct {
+    PyDictObject od_dict;       /* the underlying dict */
+    odictnode *od_first;        /* NULL if the list is empty */
+    odictnode *od_last;
+    odictnode **od_fast_nodes;  /* nodes by slot of ma_table; lazily built */
+    Py_ssize_t od_fast_nodes_size;
+    PyDictEntry *od_resize_sentinel;    /* ma_table when it was built */
+    Py_ssize_t od_fill_sentinel;        /* ma_fill when last checked */
+    long od_state;              /* incremented when the list changes */
+    PyObject *od_inst_dict;
+    PyObject *od_weakreflist;
+} odictobject;
+
+static PyTypeObject odict_type;
+static PyTypeObject odictiter_type;
+
+#define ODict_Check(op) PyObject_TypeCheck(op, &odict_type)
+#define ODict_CheckExact(op) (Py_TYPE(op) == &odict_type)
+
+static long
+odict_hash(PyObject *key)
+{
+    long hash;
+
+    if (!PyString_CheckExact(key) ||
+        (hash = ((PyStringObject *)key)->ob_shash) == -1)
+        hash = PyObject_Hash(key);
+    return hash;
+}
+
+static void
+odict_set_key_error(PyObject *key)
+{
+    PyObject *tup;
+
+    tup = PyTuple_Pack(1, key);
+    if (tup == NULL)
+        return;
+    PyErr_SetObject(PyExc_KeyError, tup);
+    Py_DECREF(tup);
+}
+
+static void
+odict_append_node(odictobject *od, odictnode *node)
+{
+    node->prev = od->od_last;
+    node->next = NULL;
+    if (od->od_last == NULL)
+        od->od_first = node;
+    else
+        od->od_last->next = node;
+    od->od_last = node;
+    od->od_state++;
+}
+
+static void
+odict_prepend_node(odictobject *od, odictnode *node)
+{
+    node->prev = NULL;
+    node->next = od->od_first;
+    if (od->od_first == NULL)
+        od->od_last = node;
+    else
+        od->od_first->prev = node;
+    od->od_first = node;
+    od->od_state++;
+}
+
+static void
+odict_unlink_node(odictobject *od, odictnode *node)
+{
+    if (node->prev == NULL)
+        od->od_first = node->next;
+    else
+        node->prev->next = node->next;
+    if (node->next == NULL)
+        od->od_last = node->prev;
+    else
+        node->next->prev = node->prev;
+    node->prev = node->next = NULL;
+    od->od_state++;
+}
+
+/* Rebuild od_fast_nodes for the current table of the dict.  This runs no
+   Python code. */
+static int
+odict_resize_fast_nodes(odictobject *od)
+{
+    PyDictObject *mp = (PyDictObject *)od;
+    Py_ssize_t size = mp->ma_mask + 1, i;
+    odictnode **fast_nodes = od->od_fast_nodes;
+    odictnode *node;
+
+    if (size != od->od_fast_nodes_size) {
+        fast_nodes = PyMem_NEW(odictnode *, size);
+        if (fast_nodes == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        PyMem_FREE(od->od_fast_nodes);
+        od->od_fast_nodes = fast_nodes;
+        od->od_fast_nodes_size = size;
+    }
+    memset(fast_nodes, 0, size * sizeof(odictnode *));
+    for (node = od->od_first; node != NULL; node = node->next) {
+        /* A key deleted or replaced with dict methods has no slot */
+        i = _PyDict_KeyIndex((PyObject *)od, node->key, node->hash);
+        if (i >= 0 && fast_nodes[i] == NULL)
+            fast_nodes[i] = node;
+    }
+    od->od_resize_sentinel = mp->ma_table;
+    od->od_fill_sentinel = mp->ma_fill;
+    return 0;
+}
+
+/* Look key up in the dict.  Return the index of its slot and store its node,
+   or NULL if it has none, in *pnode; return -1 if key is missing and -2 with
+   an exception set on error. */
+static Py_ssize_t
+odict_lookup(odictobject *od, PyObject *key, long hash, odictnode **pnode)
+{
+    PyDictObject *mp = (PyDictObject *)od;
+    PyDictEntry *ep;
+    odictnode *node;
+    Py_ssize_t i;
+
+    *pnode = NULL;
+    ep = (mp->ma_lookup)(mp, key, hash);
+    if (ep == NULL)
+        return -2;
+    if (_PyDict_ENTRY_VALUE(mp, ep) == NULL)
+        return -1;
+    i = ep - mp->ma_table;
+    /* No Python code runs from here on, so ep stays valid */
+    if (od->od_fast_nodes == NULL ||
+        od->od_resize_sentinel != mp->ma_table ||
+        od->od_fast_nodes_size != mp->ma_mask + 1 ||
+        od->od_fill_sentinel > mp->ma_fill) {
+        if (odict_resize_fast_nodes(od) < 0)
+            return -2;
+    }
+    od->od_fill_sentinel = mp->ma_fill;
+    node = od->od_fast_nodes[i];
+    if (node != NULL && node->key != ep->me_key) {
+        /* The table changed in a way the sentinels missed */
+        if (odict_resize_fast_nodes(od) < 0)
+            return -2;
+        node = od->od_fast_nodes[i];
+    }
+    *pnode = node;
+    return i;
+}
+
+/* Append a node for key, which has just been stored in the dict, unless it
+   already has one */
+static int
+odict_add_node(odictobject *od, PyObject *key, long hash)
+{
+    odictnode *node;
+    Py_ssize_t i;
+
+    i = odict_lookup(od, key, hash, &node);
+    if (i == -2)
+        return -1;
+    /* key may have been removed again by the comparisons */
+    if (i == -1 || node != NULL)
+        return 0;
+    node = (odictnode *)PyObject_MALLOC(sizeof(odictnode));
+    if (node == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    /* The node holds the key object of the dict, see odict_lookup() */
+    node->key = od->od_dict.ma_table[i].me_key;
+    Py_INCREF(node->key);
+    node->hash = hash;
+    od->od_fast_nodes[i] = node;
+    odict_append_node(od, node);
+    return 0;
+}
+
+/* Unlink and free node, whose key is still in slot i of the dict */
+static void
+odict_remove_node(odictobject *od, odictnode *node, Py_ssize_t i)
+{
+    assert(od->od_fast_nodes[i] == node);
+    od->od_fast_nodes[i] = NULL;
+    odict_unlink_node(od, node);
+    /* The dict holds another reference to the key */
+    Py_DECREF(node->key);
+    PyObject_FREE(node);
+}
+
+/* Empty the list, leaving the dict alone */
+static void
+odict_clear_nodes(odictobject *od)
+{
+    odictnode *node = od->od_first;
+
+    od->od_first = od->od_last = NULL;
+    od->od_state++;
+    PyMem_FREE(od->od_fast_nodes);
+    od->od_fast_nodes = NULL;
+    od->od_fast_nodes_size = 0;
+    /* Releasing the keys can run Python code: the list is detached first */
+    while (node != NULL) {
+        odictnode *next = node->next;
+        Py_DECREF(node->key);
+        PyObject_FREE(node);
+        node = next;
+    }
+}
+
+static int
+odict_setitem_hash(odictobject *od, PyObject *key, PyObject *value, long hash)
+{
+    if (_PyDict_SetItem_KnownHash((PyObject *)od, key, value, hash) < 0)
+        return -1;
+    if (odict_add_node(od, key, hash) < 0) {
+        /* Keep the dict and the list in step */
+        PyObject *type, *val, *tb;
+
+        PyErr_Fetch(&type, &val, &tb);
+        if (_PyDict_DelItem_KnownHash((PyObject *)od, key, hash) < 0)
+            PyErr_Clear();
+        PyErr_Restore(type, val, tb);
+        return -1;
+    }
+    return 0;
+}
+
+static int
+odict_delitem_hash(odictobject *od, PyObject *key, long hash)
+{
+    odictnode *node;
+    Py_ssize_t i;
+
+    i = odict_lookup(od, key, hash, &node);
+    if (i == -2)
+        return -1;
+    if (node != NULL)
+        odict_remove_node(od, node, i);
+    /* This raises KeyError if key is missing */
+    return _PyDict_DelItem_KnownHash((PyObject *)od, key, hash);
+}
+
+static int
+odict_ass_sub(odictobject *od, PyObject *key, PyObject *value)
+{
+    long hash = odict_hash(key);
+
+    if (hash == -1)
+        return -1;
+    if (value == NULL)
+        return odict_delitem_hash(od, key, hash);
+    return odict_setitem_hash(od, key, value, hash);
+}
+
+/* Remove key and return its value; failobj (if not NULL) is returned
+   instead of raising KeyError when key is missing. */
+static PyObject *
+odict_popkey(odictobject *od, PyObject *key, PyObject *failobj)
+{
+    PyObject *value;
+    long hash;
+
+    if (!ODict_CheckExact(od)) {
+        /* Go through the methods a subclass may override */
+        value = PyObject_GetItem((PyObject *)od, key);
+        if (value == NULL) {
+            if (failobj == NULL || !PyErr_ExceptionMatches(PyExc_KeyError))
+                return NULL;
+            PyErr_Clear();
+            Py_INCREF(failobj);
+            return failobj;
+        }
+        if (PyObject_DelItem((PyObject *)od, key) < 0) {
+            Py_DECREF(value);
+            return NULL;
+        }
+        return value;
+    }
+
+    hash = odict_hash(key);
+    if (hash == -1)
+        return NULL;
+    value = _PyDict_GetItem_KnownHash((PyObject *)od, key, hash);
+    if (value == NULL) {
+        if (PyErr_Occurred())
+            return NULL;
+        if (failobj == NULL) {
+            odict_set_key_error(key);
+            return NULL;
+        }
+        Py_INCREF(failobj);
+        return failobj;
+    }
+    Py_INCREF(value);
+    if (odict_delitem_hash(od, key, hash) < 0) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    return value;
+}
+
+/* Iterators over the keys, values or items, in either direction */
+
+#define ODICT_ITER_KEYS     1
+#define ODICT_ITER_VALUES   2
+#define ODICT_ITER_ITEMS    (ODICT_ITER_KEYS | ODICT_ITER_VALUES)
+#define ODICT_ITER_REVERSED 4
+
+typedef struct {
+    PyObject_HEAD
+    odictobject *di_od;         /* NULL once the iterator is exhausted */
+    odictnode *di_node;         /* the next node, NULL at the end; only
+                                   valid while di_state is current */
+    long di_state;
+    int di_kind;
+    Py_ssize_t di_len;
+    PyObject *di_result;        /* reusable result tuple for items */
+} odictiterobject;
+
+static PyObject *
+odictiter_new(odictobject *od, int kind)
+{
+    odictiterobject *di;
+
+    di = PyObject_GC_New(odictiterobject, &odictiter_type);
+    if (di == NULL)
+        return NULL;
+    di->di_od = NULL;
+    di->di_node = NULL;
+    if ((kind & ODICT_ITER_ITEMS) == ODICT_ITER_ITEMS) {
+        di->di_result = PyTuple_Pack(2, Py_None, Py_None);
+        if (di->di_result == NULL) {
+            Py_DECREF(di);
+            return NULL;
+        }
+    }
+    else
+        di->di_result = NULL;
+    Py_INCREF(od);
+    di->di_od = od;
+    di->di_node = (kind & ODICT_ITER_REVERSED) ? od->od_last : od->od_first;
+    di->di_state = od->od_state;
+    di->di_kind = kind;
+    di->di_len = PyDict_Size((PyObject *)od);
+    PyObject_GC_Track(di);
+    return (PyObject *)di;
+}
+
+static void
+odictiter_dealloc(odictiterobject *di)
+{
+    PyObject_GC_UnTrack(di);
+    Py_XDECREF(di->di_od);
+    Py_XDECREF(di->di_result);
+    PyObject_GC_Del(di);
+}
+
+static int
+odictiter_traverse(odictiterobject *di, visitproc visit, void *arg)
+{
+    Py_VISIT(di->di_od);
+    Py_VISIT(di->di_result);
+    return 0;
+}
+
+static PyObject *
+odictiter_iternext(odictiterobject *di)
+{
+    odictobject *od = di->di_od;
+    odictnode *node = di->di_node;
+    PyObject *key, *value, *result;
+    long hash;
+
+    if (od == NULL)
+        return NULL;
+    if (od->od_state != di->di_state) {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "OrderedDict mutated during iteration");
+        goto fail;
+    }
+    if (node == NULL)
+        goto fail;
+
+    key = node->key;
+    hash = node->hash;
+    Py_INCREF(key);
+    di->di_node = (di->di_kind & ODICT_ITER_REVERSED) ? node->prev :
+                                                         node->next;
+    di->di_len--;
+
+    if (!(di->di_kind & ODICT_ITER_VALUES))
+        return key;
+
+    value = _PyDict_GetItem_KnownHash((PyObject *)od, key, hash);
+    if (value == NULL) {
+        if (!PyErr_Occurred())
+            odict_set_key_error(key);
+        Py_DECREF(key);
+        goto fail;
+    }
+    Py_INCREF(value);
+    if (!(di->di_kind & ODICT_ITER_KEYS)) {
+        Py_DECREF(key);
+        return value;
+    }
+
+    result = di->di_result;
+    if (Py_REFCNT(result) == 1) {
+        /* The previous result was released: reuse the tuple */
+        Py_INCREF(result);
+        Py_DECREF(PyTuple_GET_ITEM(result, 0));
+        Py_DECREF(PyTuple_GET_ITEM(result, 1));
+    }
+    else {
+        result = PyTuple_New(2);
+        if (result == NULL) {
+            Py_DECREF(key);
+            Py_DECREF(value);
+            goto fail;
+        }
+    }
+    PyTuple_SET_ITEM(result, 0, key);
+    PyTuple_SET_ITEM(result, 1, value);
+    return result;
+
+fail:
+    Py_CLEAR(di->di_od);
+    di->di_node = NULL;
+    return NULL;
+}
+
+static PyObject *
+odictiter_len(odictiterobject *di)
+{
+    Py_ssize_t len = 0;
+
+    if (di->di_od != NULL && di->di_state == di->di_od->od_state)
+        len = di->di_len;
+    return PyInt_FromSize_t(len);
+}
+
+static PyMethodDef odictiter_methods[] = {
+    {"__length_hint__", (PyCFunction)odictiter_len, METH_NOARGS,
+     length_hint_doc},
+    {NULL,              NULL}           /* sentinel */
+};
+
+static PyTypeObject odictiter_type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "odict_iterator",                           /* tp_name */
+    sizeof(odictiterobject),                    /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    /* methods */
+    (destructor)odictiter_dealloc,              /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_compare */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    PyObject_GenericGetAttr,                    /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,    /* tp_flags */
+    0,                                          /* tp_doc */
+    (traverseproc)odictiter_traverse,           /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    PyObject_SelfIter,                          /* tp_iter */
+    (iternextfunc)odictiter_iternext,           /* tp_iternext */
+    odictiter_methods,                          /* tp_methods */
+    0,
+};
+
+/* OrderedDict methods */
+
+static PyObject *
+odict_iter(odictobject *od)
+{
+    return odictiter_new(od, ODICT_ITER_KEYS);
+}
+
+PyDoc_STRVAR(odict_reversed_doc,
+"od.__reversed__() <==> reversed(od)");
+
+static PyObject *
+odict_reversed(odictobject *od)
+{
+    return odictiter_new(od, ODICT_ITER_KEYS | ODICT_ITER_REVERSED);
+}
+
+PyDoc_STRVAR(odict_iterkeys_doc,
+"od.iterkeys() -> an iterator over the keys in od");
+
+static PyObject *
+odict_iterkeys(odictobject *od)
+{
+    return odictiter_new(od, ODICT_ITER_KEYS);
+}
+
+PyDoc_STRVAR(odict_itervalues_doc,
+"od.itervalues() -> an iterator over the values in od");
+
+static PyObject *
+odict_itervalues(odictobject *od)
+{
+    return odictiter_new(od, ODICT_ITER_VALUES);
+}
+
+PyDoc_STRVAR(odict_iteritems_doc,
+"od.iteritems() -> an iterator over the (key, value) pairs in od");
+
+static PyObject *
+odict_iteritems(odictobject *od)
+{
+    return odictiter_new(od, ODICT_ITER_ITEMS);
+}
+
+static PyObject *
+odict_list(odictobject *od, int kind)
+{
+    PyObject *it, *result;
+
+    it = odictiter_new(od, kind);
+    if (it == NULL)
+        return NULL;
+    result = PySequence_List(it);
+    Py_DECREF(it);
+    return result;
+}
+
+PyDoc_STRVAR(odict_keys_doc, "od.keys() -> list of od's keys");
+
+static PyObject *
+odict_keys(odictobject *od)
+{
+    return odict_list(od, ODICT_ITER_KEYS);
+}
+
+PyDoc_STRVAR(odict_values_doc, "od.values() -> list of od's values");
+
+static PyObject *
+odict_values(odictobject *od)
+{
+    return odict_list(od, ODICT_ITER_VALUES);
+}
+
+PyDoc_STRVAR(odict_items_doc,
+"od.items() -> list of od's (key, value) pairs, as 2-tuples");
+
+static PyObject *
+odict_items(odictobject *od)
+{
+    return odict_list(od, ODICT_ITER_ITEMS);
+}
+
+/* Implement od.update(other, **kwds) like MutableMapping.update() */
+static int
+odict_update_arg(PyObject *self, PyObject *other)
+{
+    PyObject *keys, *it, *item;
+    int status = 0;
+
+    if (PyDict_CheckExact(other)) {
+        PyObject *key, *value;
+        Py_ssize_t pos = 0;
+
+        while (PyDict_Next(other, &pos, &key, &value)) {
+            Py_INCREF(key);
+            Py_INCREF(value);
+            status = PyObject_SetItem(self, key, value);
+            Py_DECREF(key);
+            Py_DECREF(value);
+            if (status < 0)
+                return -1;
+        }
+        return 0;
+    }
+
+    if (PyObject_HasAttrString(other, "keys")) {
+        keys = PyObject_CallMethod(other, "keys", NULL);
+        if (keys == NULL)
+            return -1;
+        it = PyObject_GetIter(keys);
+        Py_DECREF(keys);
+        if (it == NULL)
+            return -1;
+        while (status == 0 && (item = PyIter_Next(it)) != NULL) {
+            PyObject *value = PyObject_GetItem(other, item);
+            if (value == NULL)
+                status = -1;
+            else {
+                status = PyObject_SetItem(self, item, value);
+                Py_DECREF(value);
+            }
+            Py_DECREF(item);
+        }
+        Py_DECREF(it);
+        if (status < 0 || PyErr_Occurred())
+            return -1;
+        return 0;
+    }
+
+    it = PyObject_GetIter(other);
+    if (it == NULL)
+        return -1;
+    while (status == 0 && (item = PyIter_Next(it)) != NULL) {
+        PyObject *fast = PySequence_Fast(item, "");
+        if (fast == NULL) {
+            if (PyErr_ExceptionMatches(PyExc_TypeError))
+                PyErr_Format(PyExc_TypeError,
+                             "cannot convert OrderedDict update "
+                             "sequence element to a sequence");
+            status = -1;
+        }
+        else if (PySequence_Fast_GET_SIZE(fast) != 2) {
+            PyErr_Format(PyExc_ValueError,
+                         "OrderedDict update sequence element has "
+                         "length %zd; 2 is required",
+                         PySequence_Fast_GET_SIZE(fast));
+            status = -1;
+        }
+        else
+            status = PyObject_SetItem(self,
+                                      PySequence_Fast_GET_ITEM(fast, 0),
+                                      PySequence_Fast_GET_ITEM(fast, 1));
+        Py_XDECREF(fast);
+        Py_DECREF(item);
+    }
+    Py_DECREF(it);
+    if (status < 0 || PyErr_Occurred())
+        return -1;
+    return 0;
+}
+
+static int
+odict_update_common(PyObject *self, PyObject *args, PyObject *kwds,
+                    const char *methname)
+{
+    Py_ssize_t nargs = PyTuple_GET_SIZE(args);
+
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s expected at most 1 arguments, got %zd",
+                     methname, nargs);
+        return -1;
+    }
+    if (nargs == 1 && odict_update_arg(self, PyTuple_GET_ITEM(args, 0)) < 0)
+        return -1;
+    if (kwds != NULL && PyDict_Size(kwds) > 0)
+        return odict_update_arg(self, kwds);
+    return 0;
+}
+
+PyDoc_STRVAR(odict_update_doc,
+"od.update([E, ]**F) -> None.  Update od from mapping/iterable E and F.\n\
+If E has a .keys() method, does:     for k in E.keys(): od[k] = E[k]\n\
+otherwise does:     for (k, v) in E: od[k] = v\n\
+In either case, this is followed by: for k, v in F.items(): od[k] = v");
+
+static PyObject *
+odict_update(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    if (odict_update_common(self, args, kwds, "update") < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static int
+odict_init(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    return odict_update_common(self, args, kwds, "OrderedDict");
+}
+
+PyDoc_STRVAR(odict_setdefault_doc,
+"od.setdefault(k[,d]) -> od.get(k,d), also set od[k]=d if k not in od");
+
+static PyObject *
+odict_setdefault(odictobject *od, PyObject *args)
+{
+    PyObject *key, *value, *failobj = Py_None;
+    long hash;
+
+    if (!PyArg_UnpackTuple(args, "setdefault", 1, 2, &key, &failobj))
+        return NULL;
+
+    if (!ODict_CheckExact(od)) {
+        value = PyObject_GetItem((PyObject *)od, key);
+        if (value != NULL || !PyErr_ExceptionMatches(PyExc_KeyError))
+            return value;
+        PyErr_Clear();
+        if (PyObject_SetItem((PyObject *)od, key, failobj) < 0)
+            return NULL;
+        Py_INCREF(failobj);
+        return failobj;
+    }
+
+    hash = odict_hash(key);
+    if (hash == -1)
+        return NULL;
+    value = _PyDict_GetItem_KnownHash((PyObject *)od, key, hash);
+    if (value == NULL) {
+        if (PyErr_Occurred())
+            return NULL;
+        if (odict_setitem_hash(od, key, failobj, hash) < 0)
+            return NULL;
+        value = failobj;
+    }
+    Py_INCREF(value);
+    return value;
+}
+
+PyDoc_STRVAR(odict_pop_doc,
+"od.pop(k[,d]) -> v, remove specified key and return the corresponding\n\
+value.  If key is not found, d is returned if given, otherwise KeyError\n\
+is raised.");
+
+static PyObject *
+odict_pop(odictobject *od, PyObject *args)
+{
+    PyObject *key, *failobj = NULL;
+
+    if (!PyArg_UnpackTuple(args, "pop", 1, 2, &key, &failobj))
+        return NULL;
+    return odict_popkey(od, key, failobj);
+}
+
+PyDoc_STRVAR(odict_popitem_doc,
+"od.popitem(last=True) -> (k, v), return and remove a (key, value) pair.\n\
+Pairs are returned in LIFO order if last is true or FIFO order if false.");
+
+static PyObject *
+odict_popitem(odictobject *od, PyObject *args, PyObject *kwds)
+{
+    PyObject *key, *value, *result;
+    PyObject *last = Py_True;
+    odictnode *node;
+    int is_last;
+    static char *kwlist[] = {"last", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O:popitem", kwlist,
+                                     &last))
+        return NULL;
+    is_last = PyObject_IsTrue(last);
+    if (is_last < 0)
+        return NULL;
+
+    node = is_last ? od->od_last : od->od_first;
+    if (node == NULL) {
+        PyErr_SetString(PyExc_KeyError, "dictionary is empty");
+        return NULL;
+    }
+    key = node->key;
+    Py_INCREF(key);
+    if (ODict_CheckExact(od))
+        value = odict_popkey(od, key, NULL);
+    else
+        value = PyObject_CallMethod((PyObject *)od, "pop", "O", key);
+    if (value == NULL) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    result = PyTuple_Pack(2, key, value);
+    Py_DECREF(key);
+    Py_DECREF(value);
+    return result;
+}
+
+PyDoc_STRVAR(odict_move_to_end_doc,
+"od.move_to_end(key, last=True) -> None.  Move an existing element to the\n\
+end (or beginning if last is false).  Raise KeyError if the element does\n\
+not exist.  With last=True, this acts like a fast version of\n\
+od[key] = od.pop(key).");
+
+static PyObject *
+odict_move_to_end(odictobject *od, PyObject *args, PyObject *kwds)
+{
+    PyObject *key, *last = Py_True;
+    odictnode *node;
+    long hash;
+    int is_last;
+    static char *kwlist[] = {"key", "last", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:move_to_end", kwlist,
+                                     &key, &last))
+        return NULL;
+    is_last = PyObject_IsTrue(last);
+    if (is_last < 0)
+        return NULL;
+    hash = odict_hash(key);
+    if (hash == -1)
+        return NULL;
+    if (odict_lookup(od, key, hash, &node) == -2)
+        return NULL;
+    if (node == NULL) {
+        odict_set_key_error(key);
+        return NULL;
+    }
+    if (is_last) {
+        if (node != od->od_last) {
+            odict_unlink_node(od, node);
+            odict_append_node(od, node);
+        }
+    }
+    else {
+        if (node != od->od_first) {
+            odict_unlink_node(od, node);
+            odict_prepend_node(od, node);
+        }
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(odict_clear_doc,
+"od.clear() -> None.  Remove all items from od.");
+
+static PyObject *
+odict_clear(odictobject *od)
+{
+    odict_clear_nodes(od);
+    PyDict_Clear((PyObject *)od);
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(odict_copy_doc, "od.copy() -> a shallow copy of od");
+
+static PyObject *
+odict_copy(odictobject *od)
+{
+    /* Like defaultdict.copy(), this calls the object's class */
+    return PyObject_CallFunctionObjArgs((PyObject *)Py_TYPE(od), od, NULL);
+}
+
+PyDoc_STRVAR(odict_fromkeys_doc,
+"OD.fromkeys(S[, v]) -> New ordered dictionary with keys from S\n\
+and values equal to v (which defaults to None).");
+
+static PyObject *
+odict_fromkeys(PyObject *cls, PyObject *args)
+{
+    PyObject *seq, *value = Py_None, *od, *it, *key;
+
+    if (!PyArg_UnpackTuple(args, "fromkeys", 1, 2, &seq, &value))
+        return NULL;
+    od = PyObject_CallObject(cls, NULL);
+    if (od == NULL)
+        return NULL;
+    it = PyObject_GetIter(seq);
+    if (it == NULL) {
+        Py_DECREF(od);
+        return NULL;
+    }
+    while ((key = PyIter_Next(it)) != NULL) {
+        int status = PyObject_SetItem(od, key, value);
+        Py_DECREF(key);
+        if (status < 0)
+            break;
+    }
+    Py_DECREF(it);
+    if (PyErr_Occurred()) {
+        Py_DECREF(od);
+        return NULL;
+    }
+    return od;
+}
+
+static PyObject *
+odict_reduce(odictobject *od)
+{
+    /* __reduce__ returns (type(od), (items,)), where items is a list of
+       [key, value] lists (PyYAML dumps lists natively, not tuples), and
+       adds the instance dict if it is not empty. */
+    PyObject *items, *it, *key, *result;
+
+    items = PyList_New(0);
+    if (items == NULL)
+        return NULL;
+    it = odictiter_new(od, ODICT_ITER_KEYS);
+    if (it == NULL) {
+        Py_DECREF(items);
+        return NULL;
+    }
+    while ((key = PyIter_Next(it)) != NULL) {
+        PyObject *value, *pair;
+        int status = -1;
+
+        value = PyObject_GetItem((PyObject *)od, key);
+        if (value != NULL) {
+            pair = PyList_New(2);
+            if (pair != NULL) {
+                Py_INCREF(key);
+                PyList_SET_ITEM(pair, 0, key);
+                Py_INCREF(value);
+                PyList_SET_ITEM(pair, 1, value);
+                status = PyList_Append(items, pair);
+                Py_DECREF(pair);
+            }
+            Py_DECREF(value);
+        }
+        Py_DECREF(key);
+        if (status < 0)
+            break;
+    }
+    Py_DECREF(it);
+    if (PyErr_Occurred()) {
+        Py_DECREF(items);
+        return NULL;
+    }
+    if (od->od_inst_dict != NULL && PyDict_Size(od->od_inst_dict) > 0) {
+        PyObject *inst_dict = PyDict_Copy(od->od_inst_dict);
+        if (inst_dict == NULL) {
+            Py_DECREF(items);
+            return NULL;
+        }
+        result = Py_BuildValue("O(N)N", Py_TYPE(od), items, inst_dict);
+    }
+    else
+        result = Py_BuildValue("O(N)", Py_TYPE(od), items);
+    return result;
+}
+
+PyDoc_STRVAR(odict_sizeof_doc,
+"od.__sizeof__() -> size of od in memory, in bytes");
+
+static PyObject *
+odict_sizeof(odictobject *od)
+{
+    PyObject *size;
+    Py_ssize_t res;
+
+    size = PyObject_CallMethod((PyObject *)&PyDict_Type, "__sizeof__", "O",
+                               od);
+    if (size == NULL)
+        return NULL;
+    res = PyInt_AsSsize_t(size);
+    Py_DECREF(size);
+    if (res == -1 && PyErr_Occurred())
+        return NULL;
+    res += sizeof(odictobject) - sizeof(PyDictObject);
+    res += od->od_fast_nodes_size * sizeof(odictnode *);
+    res += PyDict_Size((PyObject *)od) * sizeof(odictnode);
+    return PyInt_FromSsize_t(res);
+}
+
+static PyObject *
+odict_repr(odictobject *od)
+{
+    PyObject *name, *items, *result = NULL;
+    int status;
+
+    name = PyObject_GetAttrString((PyObject *)Py_TYPE(od), "__name__");
+    if (name == NULL)
+        return NULL;
+    if (!PyString_Check(name)) {
+        PyErr_SetString(PyExc_TypeError, "__name__ must be a string");
+        goto done;
+    }
+    if (PyDict_Size((PyObject *)od) == 0) {
+        result = PyString_FromFormat("%s()", PyString_AS_STRING(name));
+        goto done;
+    }
+    status = Py_ReprEnter((PyObject *)od);
+    if (status != 0) {
+        if (status > 0)
+            result = PyString_FromString("...");
+        goto done;
+    }
+    items = PyObject_CallMethod((PyObject *)od, "items", NULL);
+    if (items != NULL) {
+        PyObject *items_repr = PyObject_Repr(items);
+        Py_DECREF(items);
+        if (items_repr != NULL) {
+            result = PyString_FromFormat("%s(%s)", PyString_AS_STRING(name),
+                                         PyString_AS_STRING(items_repr));
+            Py_DECREF(items_repr);
+        }
+    }
+    Py_ReprLeave((PyObject *)od);
+done:
+    Py_DECREF(name);
+    return result;
+}
+
+static int
+odict_print(odictobject *od, FILE *fp, int flags)
+{
+    PyObject *repr;
+
+    repr = PyObject_Repr((PyObject *)od);
+    if (repr == NULL)
+        return -1;
+    Py_BEGIN_ALLOW_THREADS
+    fputs(PyString_AS_STRING(repr), fp);
+    Py_END_ALLOW_THREADS
+    Py_DECREF(repr);
+    return 0;
+}
+
+/* Return 1 if the keys of a and b are equal and in the same order, 0 if
+   not and -1 on error. */
+static int
+odict_keys_equal(odictobject *a, odictobject *b)
+{
+    odictnode *node_a = a->od_first, *node_b = b->od_first;
+    long state_a = a->od_state, state_b = b->od_state;
+
+    while (node_a != NULL && node_b != NULL) {
+        PyObject *key_a = node_a->key, *key_b = node_b->key;
+        int cmp;
+
+        if (key_a != key_b) {
+            Py_INCREF(key_a);
+            Py_INCREF(key_b);
+            cmp = PyObject_RichCompareBool(key_a, key_b, Py_EQ);
+            Py_DECREF(key_a);
+            Py_DECREF(key_b);
+            if (cmp <= 0)
+                return cmp;
+            if (a->od_state != state_a || b->od_state != state_b) {
+                PyErr_SetString(PyExc_RuntimeError,
+                                "OrderedDict mutated during iteration");
+                return -1;
+            }
+        }
+        node_a = node_a->next;
+        node_b = node_b->next;
+    }
+    return node_a == NULL && node_b == NULL;
+}
+
+static PyObject *
+odict_richcompare(PyObject *v, PyObject *w, int op)
+{
+    if ((op == Py_EQ || op == Py_NE) && ODict_Check(v) && ODict_Check(w)) {
+        /* Comparison to another OrderedDict is order-sensitive */
+        PyObject *res;
+        int cmp;
+
+        res = PyDict_Type.tp_richcompare(v, w, Py_EQ);
+        if (res != Py_True)
+            cmp = res == NULL ? -1 : 0;
+        else
+            cmp = odict_keys_equal((odictobject *)v, (odictobject *)w);
+        Py_XDECREF(res);
+        if (cmp < 0)
+            return NULL;
+        res = (cmp == (op == Py_EQ)) ? Py_True : Py_False;
+        Py_INCREF(res);
+        return res;
+    }
+    return PyDict_Type.tp_richcompare(v, w, op);
+}
+
+static PyObject *
+odict_get_dict(odictobject *od)
+{
+    if (od->od_inst_dict == NULL) {
+        od->od_inst_dict = PyDict_New();
+        if (od->od_inst_dict == NULL)
+            return NULL;
+    }
+    Py_INCREF(od->od_inst_dict);
+    return od->od_inst_dict;
+}
+
+static int
+odict_set_dict(odictobject *od, PyObject *value)
+{
+    PyObject *tmp;
+
+    if (value == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "an OrderedDict's dictionary may not be deleted");
+        return -1;
+    }
+    if (!PyDict_Check(value)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "setting OrderedDict's dictionary to a non-dict");
+        return -1;
+    }
+    tmp = od->od_inst_dict;
+    Py_INCREF(value);
+    od->od_inst_dict = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+
+static PyGetSetDef odict_getsetlist[] = {
+    {"__dict__", (getter)odict_get_dict, (setter)odict_set_dict},
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef odict_methods[] = {
+    {"__reversed__", (PyCFunction)odict_reversed, METH_NOARGS,
+     odict_reversed_doc},
+    {"keys", (PyCFunction)odict_keys, METH_NOARGS,
+     odict_keys_doc},
+    {"values", (PyCFunction)odict_values, METH_NOARGS,
+     odict_values_doc},
+    {"items", (PyCFunction)odict_items, METH_NOARGS,
+     odict_items_doc},
+    {"iterkeys", (PyCFunction)odict_iterkeys, METH_NOARGS,
+     odict_iterkeys_doc},
+    {"itervalues", (PyCFunction)odict_itervalues, METH_NOARGS,
+     odict_itervalues_doc},
+    {"iteritems", (PyCFunction)odict_iteritems, METH_NOARGS,
+     odict_iteritems_doc},
+    {"update", (PyCFunction)odict_update, METH_VARARGS | METH_KEYWORDS,
+     odict_update_doc},
+    {"setdefault", (PyCFunction)odict_setdefault, METH_VARARGS,
+     odict_setdefault_doc},
+    {"pop", (PyCFunction)odict_pop, METH_VARARGS,
+     odict_pop_doc},
+    {"popitem", (PyCFunction)odict_popitem, METH_VARARGS | METH_KEYWORDS,
+     odict_popitem_doc},
+    {"move_to_end", (PyCFunction)odict_move_to_end,
+     METH_VARARGS | METH_KEYWORDS, odict_move_to_end_doc},
+    {"clear", (PyCFunction)odict_clear, METH_NOARGS,
+     odict_clear_doc},
+    {"copy", (PyCFunction)odict_copy, METH_NOARGS,
+     odict_copy_doc},
+    {"fromkeys", (PyCFunction)odict_fromkeys, METH_VARARGS | METH_CLASS,
+     odict_fromkeys_doc},
+    {"__reduce__", (PyCFunction)odict_reduce, METH_NOARGS,
+     reduce_doc},
+    {"__sizeof__", (PyCFunction)odict_sizeof, METH_NOARGS,
+     odict_sizeof_doc},
+    {NULL}
+};
+
+static PyMappingMethods odict_as_mapping = {
+    0,                                  /* mp_length */
+    0,                                  /* mp_subscript */
+    (objobjargproc)odict_ass_sub,       /* mp_ass_subscript */
+};
+
+static void
+odict_dealloc(odictobject *od)
+{
+    PyObject_GC_UnTrack(od);
+    if (od->od_weakreflist != NULL)
+        PyObject_ClearWeakRefs((PyObject *)od);
+    odict_clear_nodes(od);
+    Py_CLEAR(od->od_inst_dict);
+    PyDict_Type.tp_dealloc((PyObject *)od);
+}
+
+static int
+odict_traverse(odictobject *od, visitproc visit, void *arg)
+{
+    odictnode *node;
+
+    /* The nodes are not tracked: visit the keys they hold */
+    for (node = od->od_first; node != NULL; node = node->next)
+        Py_VISIT(node->key);
+    Py_VISIT(od->od_inst_dict);
+    return PyDict_Type.tp_traverse((PyObject *)od, visit, arg);
+}
+
+static int
+odict_tp_clear(odictobject *od)
+{
+    odict_clear_nodes(od);
+    Py_CLEAR(od->od_inst_dict);
+    return PyDict_Type.tp_clear((PyObject *)od);
+}
+
+PyDoc_STRVAR(odict_doc,
+"OrderedDict([items]) --> dict that remembers insertion order\n\
+\n\
+Iterating over an OrderedDict yields its keys in the order they were\n\
+first inserted; setting the value of an existing key does not move it.\n\
+Comparison to another OrderedDict is order-sensitive, comparison to\n\
+a regular mapping is not.\n\
+");
+
+static PyTypeObject odict_type = {
+    PyVarObject_HEAD_INIT(DEFERRED_ADDRESS(&PyType_Type), 0)
+    "collections.OrderedDict",          /* tp_name */
+    sizeof(odictobject),                /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)odict_dealloc,          /* tp_dealloc */
+    (printfunc)odict_print,             /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    (reprfunc)odict_repr,               /* tp_repr */
+    0,                                  /* tp_as_number */
+    0,                                  /* tp_as_sequence */
+    &odict_as_mapping,                  /* tp_as_mapping */
+    PyObject_HashNotImplemented,        /* tp_hash */
+    0,                                  /* tp_call */
+    0,                                  /* tp_str */
+    PyObject_GenericGetAttr,            /* tp_getattro */
+    0,                                  /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC |
+        Py_TPFLAGS_HAVE_WEAKREFS,       /* tp_flags */
+    odict_doc,                          /* tp_doc */
+    (traverseproc)odict_traverse,       /* tp_traverse */
+    (inquiry)odict_tp_clear,            /* tp_clear */
+    odict_richcompare,                  /* tp_richcompare */
+    offsetof(odictobject, od_weakreflist),      /* tp_weaklistoffset*/
+    (getiterfunc)odict_iter,            /* tp_iter */
+    0,                                  /* tp_iternext */
+    odict_methods,                      /* tp_methods */
+    0,                                  /* tp_members */
+    odict_getsetlist,                   /* tp_getset */
+    DEFERRED_ADDRESS(&PyDict_Type),     /* tp_base */
+    0,                                  /* tp_dict */
+    0,                                  /* tp_descr_get */
+    0,                                  /* tp_descr_set */
+    offsetof(odictobject, od_inst_dict),        /* tp_dictoffset */
+    odict_init,                         /* tp_init */
+    PyType_GenericAlloc,                /* tp_alloc */
+    0,                                  /* tp_new */
+    PyObject_GC_Del,                    /* tp_free */
+};
+
+/* helper function for Counter  *********************************************/
+
+PyDoc_STRVAR(_count_elements_doc,
+"_count_elements(mapping, iterable) -> None\n\
+\n\
+Count elements in the iterable, updating the mapping");
+
+static PyObject *
+_count_elements(PyObject *self, PyObject *args)
+{
+    PyObject *it, *iterable, *mapping, *oldval;
+    PyObject *newval = NULL;
+    PyObject *key = NULL;
+    PyObject *zero = NULL;
+    PyObject *one = NULL;
+    PyObject *mapping_get = NULL;
+    PyObject *dict_get, *dict_setitem;
+    long hash;
+    static PyObject *get_str = NULL, *setitem_str = NULL;
+
+    if (!PyArg_UnpackTuple(args, "_count_elements", 2, 2, &mapping,
+                           &iterable))
+        return NULL;
+
+    if (get_str == NULL) {
+        get_str = PyString_InternFromString("get");
+        if (get_str == NULL)
+            return NULL;
+    }
+    if (setitem_str == NULL) {
+        setitem_str = PyString_InternFromString("__setitem__");
+        if (setitem_str == NULL)
+            return NULL;
+    }
+
+    it = PyObject_GetIter(iterable);
+    if (it == NULL)
+        return NULL;
+
+    one = PyInt_FromLong(1);
+    if (one == NULL)
+        goto done;
+
+    /* Use the dict directly when its get() and __setitem__() are not
+       overridden, as they are not by Counter. */
+    dict_get = _PyType_Lookup(&PyDict_Type, get_str);
+    dict_setitem = _PyType_Lookup(&PyDict_Type, setitem_str);
+    if (PyDict_Check(mapping) &&
+        _PyType_Lookup(Py_TYPE(mapping), get_str) == dict_get &&
+        _PyType_Lookup(Py_TYPE(mapping), setitem_str) == dict_setitem) {
+        while (1) {
+            key = PyIter_Next(it);
+            if (key == NULL)
+                break;
+            if (!PyString_CheckExact(key) ||
+                (hash = ((PyStringObject *)key)->ob_shash) == -1) {
+                hash = PyObject_Hash(key);
+                if (hash == -1)
+                    break;
+            }
+            oldval = _PyDict_GetItem_KnownHash(mapping, key, hash);
+            if (oldval == NULL) {
+                if (PyErr_Occurred())
+                    break;
+                if (_PyDict_SetItem_KnownHash(mapping, key, one, hash) < 0)
+                    break;
+            }
+            else {
+                if (PyInt_CheckExact(oldval) &&
+                    PyInt_AS_LONG(oldval) < LONG_MAX)
+                    newval = PyInt_FromLong(PyInt_AS_LONG(oldval) + 1);
+                else {
+                    /* __add__ may run code which releases oldval */
+                    Py_INCREF(oldval);
+                    newval = PyNumber_Add(oldval, one);
+                    Py_DECREF(oldval);
+                }
+                if (newval == NULL)
+                    break;
+                if (_PyDict_SetItem_KnownHash(mapping, key, newval, hash) < 0)
+                    break;
+                Py_CLEAR(newval);
+            }
+            Py_DECREF(key);
+        }
+    }
+    else {
+        mapping_get = PyObject_GetAttr(mapping, get_str);
+        if (mapping_get == NULL)
+            goto done;
+
+        zero = PyInt_FromLong(0);
+        if (zero == NULL)
+            goto done;
+
+        while (1) {
+            key = PyIter_Next(it);
+            if (key == NULL)
+                break;
+            oldval = PyObject_CallFunctionObjArgs(mapping_get, key, zero,
+                                                  NULL);
+            if (oldval == NULL)
+                break;
+            newval = PyNumber_Add(oldval, one);
+            Py_DECREF(oldval);
+            if (newval == NULL)
+                break;
+            if (PyObject_SetItem(mapping, key, newval) < 0)
+                break;
+            Py_CLEAR(newval);
+            Py_DECREF(key);
+        }
+    }
+
+done:
+    Py_DECREF(it);
+    Py_XDECREF(key);
+    Py_XDECREF(newval);
+    Py_XDECREF(mapping_get);
+    Py_XDECREF(zero);
+    Py_XDECREF(one);
+    if (PyErr_Occurred())
+        return NULL;
+    Py_RETURN_NONE;
+}
+
 /* module level code ********************************************************/
 
 PyDoc_STRVAR(module_doc,
 "High performance data structures.\n\
 - deque:        ordered collection accessible from endpoints only\n\
 - defaultdict:  dict subclass with a default value factory\n\
+- OrderedDict:  dict subclass that remembers the order entries were added\n\
 ");
 
+static struct PyMethodDef module_functions[] = {
+    {"_count_elements", _count_elements,    METH_VARARGS,
+     _count_elements_doc},
+    {NULL,       NULL}          /* sentinel */
+};
+
 PyMODINIT_FUNC
 init_collections(void)
 {
     PyObject *m;
 
-    m = Py_InitModule3("_collections", NULL, module_doc);
+    m = Py_InitModule3("_collections", module_functions, module_doc);
     if (m == NULL)
         return;
 
@@ -1621,6 +3015,17 @@ init_collections(void)
     Py_INCREF(&defdict_type);
     PyModule_AddObject(m, "defaultdict", (PyObject *)&defdict_type);
 
+    odict_type.tp_base = &PyDict_Type;
+    /* Order comparisons are those of dicts */
+    odict_type.tp_compare = PyDict_Type.tp_compare;
+    if (PyType_Ready(&odict_type) < 0)
+        return;
+    Py_INCREF(&odict_type);
+    PyModule_AddObject(m, "OrderedDict", (PyObject *)&odict_type);
+
+    if (PyType_Ready(&odictiter_type) < 0)
+        return;
+
     if (PyType_Ready(&dequeiter_type) < 0)
         return;
 
@@ -5684,8 +5684,10 @@ Py_ssize_t My_PyUnicode_AsWideChar(PyUnicodeObject *unicode,
     }
     if (size > PyUnicode_GET_SIZE(unicode))
     size = PyUnicode_GET_SIZE(unicode);
+    if (PyUnicode_AS_UNICODE(unicode) == NULL)
+    return -1;
 #ifdef HAVE_USABLE_WCHAR_T
-    memcpy(w, unicode->str, size * sizeof(wchar_t));
+    memcpy(w, PyUnicode_AS_UNICODE(unicode), size * sizeof(wchar_t));
 #else
     {
     register Py_UNICODE *u;
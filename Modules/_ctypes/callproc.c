@@ -671,6 +671,8 @@ static int ConvParam(PyObject *obj, Py_ssize_t index, struct argument *pa)
 #ifdef HAVE_USABLE_WCHAR_T
         pa->ffi_type = &ffi_type_pointer;
         pa->value.p = PyUnicode_AS_UNICODE(obj);
+        if (pa->value.p == NULL)
+            return -1;
         Py_INCREF(obj);
         pa->keep = obj;
         return 0;
@@ -1444,6 +1444,10 @@ Z_set(void *ptr, PyObject *value, Py_ssize_t size)
        type.  So we can copy directly.  Hm, are unicode objects always NUL
        terminated in Python, internally?
      */
+    if (PyUnicode_AS_UNICODE(value) == NULL) {
+        Py_DECREF(value);
+        return NULL;
+    }
     *(wchar_t **)ptr = PyUnicode_AS_UNICODE(value);
     return value;
 #else
@@ -1534,6 +1538,10 @@ BSTR_set(void *ptr, PyObject *value, Py_ssize_t size)
             PyErr_SetString(PyExc_ValueError, "String too long for BSTR");
             return NULL;
         }
+        if (PyUnicode_AS_UNICODE(value) == NULL) {
+            Py_DECREF(value);
+            return NULL;
+        }
         bstr = SysAllocStringLen(PyUnicode_AS_UNICODE(value),
                                  (unsigned)size);
         Py_DECREF(value);
@@ -725,6 +725,11 @@ checkpath(PyObject* tag)
 #if defined(Py_USING_UNICODE)
     if (PyUnicode_Check(tag)) {
         Py_UNICODE *p = PyUnicode_AS_UNICODE(tag);
+        if (p == NULL) {
+            /* let the Python implementation deal with it */
+            PyErr_Clear();
+            return 1;
+        }
         for (i = 0; i < PyUnicode_GET_SIZE(tag); i++) {
             if (p[i] == '{')
                 check = 0;
@@ -2431,6 +2436,10 @@ expat_unknown_encoding_handler(XMLParserObject *self, const XML_Char *name,
     }
 
     p = PyUnicode_AS_UNICODE(u);
+    if (p == NULL) {
+        Py_DECREF(u);
+        return XML_STATUS_ERROR;
+    }
 
     for (i = 0; i < 256; i++) {
         if (p[i] != Py_UNICODE_REPLACEMENT_CHARACTER)
@@ -366,6 +366,686 @@ static PyTypeObject partial_type = {
 };
 
 
+/* lru_cache object **********************************************************/
+
+/* this object is used to delimit args and keywords in the cache keys */
+static PyObject *kwd_mark = NULL;
+
+struct lru_list_elem;
+struct lru_cache_object;
+
+typedef struct lru_list_elem {
+    PyObject_HEAD
+    struct lru_list_elem *prev, *next;  /* borrowed links */
+    long hash;
+    PyObject *key, *result;
+} lru_list_elem;
+
+/* The links are not tracked by the garbage collector: the cache object
+   visits their keys and results itself. */
+static void
+lru_list_elem_dealloc(lru_list_elem *link)
+{
+    Py_XDECREF(link->key);
+    Py_XDECREF(link->result);
+    PyObject_Del(link);
+}
+
+static PyTypeObject lru_list_elem_type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "functools._lru_list_elem",         /* tp_name */
+    sizeof(lru_list_elem),              /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)lru_list_elem_dealloc,  /* tp_dealloc */
+    0,                                  /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    0,                                  /* tp_repr */
+    0,                                  /* tp_as_number */
+    0,                                  /* tp_as_sequence */
+    0,                                  /* tp_as_mapping */
+    0,                                  /* tp_hash */
+    0,                                  /* tp_call */
+    0,                                  /* tp_str */
+    0,                                  /* tp_getattro */
+    0,                                  /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                 /* tp_flags */
+};
+
+
+typedef PyObject *(*lru_cache_ternaryfunc)(struct lru_cache_object *,
+                                           PyObject *, PyObject *);
+
+typedef struct lru_cache_object {
+    lru_list_elem root;  /* includes PyObject_HEAD */
+    Py_ssize_t maxsize;
+    PyObject *maxsize_O;
+    PyObject *func;
+    lru_cache_ternaryfunc wrapper;
+    PyObject *cache;
+    PyObject *cache_info_type;
+    Py_ssize_t misses, hits;
+    int typed;
+    int full;
+    PyObject *dict;
+    PyObject *weakreflist;
+} lru_cache_object;
+
+static PyTypeObject lru_cache_type;
+
+/* Build the cache key of a call.  The key only has to be hashable and
+   equal to the keys of equivalent calls, so when there are no keyword
+   arguments and types are not distinguished the arguments tuple itself
+   is used. */
+static PyObject *
+lru_cache_make_key(PyObject *args, PyObject *kwds, int typed)
+{
+    PyObject *key, *sorted_items;
+    Py_ssize_t key_size, pos, key_pos;
+
+    if (!typed && (kwds == NULL || PyDict_Size(kwds) == 0)) {
+        Py_INCREF(args);
+        return args;
+    }
+
+    if (kwds != NULL && PyDict_Size(kwds) > 0) {
+        sorted_items = PyDict_Items(kwds);
+        if (sorted_items == NULL)
+            return NULL;
+        if (PyList_Sort(sorted_items) < 0) {
+            Py_DECREF(sorted_items);
+            return NULL;
+        }
+    }
+    else
+        sorted_items = NULL;
+
+    key_size = PyTuple_GET_SIZE(args);
+    if (sorted_items != NULL)
+        key_size += PyList_GET_SIZE(sorted_items);
+    if (typed)
+        key_size *= 2;
+    if (sorted_items != NULL)
+        key_size++;
+
+    key = PyTuple_New(key_size);
+    if (key == NULL)
+        goto done;
+
+    key_pos = 0;
+    for (pos = 0; pos < PyTuple_GET_SIZE(args); ++pos) {
+        PyObject *item = PyTuple_GET_ITEM(args, pos);
+        Py_INCREF(item);
+        PyTuple_SET_ITEM(key, key_pos++, item);
+    }
+    if (sorted_items != NULL) {
+        Py_INCREF(kwd_mark);
+        PyTuple_SET_ITEM(key, key_pos++, kwd_mark);
+        for (pos = 0; pos < PyList_GET_SIZE(sorted_items); ++pos) {
+            PyObject *item = PyList_GET_ITEM(sorted_items, pos);
+            Py_INCREF(item);
+            PyTuple_SET_ITEM(key, key_pos++, item);
+        }
+    }
+    if (typed) {
+        for (pos = 0; pos < PyTuple_GET_SIZE(args); ++pos) {
+            PyObject *item = (PyObject *)Py_TYPE(PyTuple_GET_ITEM(args, pos));
+            Py_INCREF(item);
+            PyTuple_SET_ITEM(key, key_pos++, item);
+        }
+        if (sorted_items != NULL) {
+            for (pos = 0; pos < PyList_GET_SIZE(sorted_items); ++pos) {
+                PyObject *kv = PyList_GET_ITEM(sorted_items, pos);
+                PyObject *item = (PyObject *)Py_TYPE(PyTuple_GET_ITEM(kv, 1));
+                Py_INCREF(item);
+                PyTuple_SET_ITEM(key, key_pos++, item);
+            }
+        }
+    }
+    assert(key_pos == key_size);
+
+done:
+    Py_XDECREF(sorted_items);
+    return key;
+}
+
+static PyObject *
+uncached_lru_cache_wrapper(lru_cache_object *self,
+                           PyObject *args, PyObject *kwds)
+{
+    PyObject *result;
+
+    result = PyObject_Call(self->func, args, kwds);
+    if (result == NULL)
+        return NULL;
+    self->misses++;
+    return result;
+}
+
+static PyObject *
+infinite_lru_cache_wrapper(lru_cache_object *self,
+                           PyObject *args, PyObject *kwds)
+{
+    PyObject *key, *result;
+    long hash;
+
+    key = lru_cache_make_key(args, kwds, self->typed);
+    if (key == NULL)
+        return NULL;
+    hash = PyObject_Hash(key);
+    if (hash == -1) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    result = _PyDict_GetItem_KnownHash(self->cache, key, hash);
+    if (result != NULL) {
+        Py_INCREF(result);
+        self->hits++;
+        Py_DECREF(key);
+        return result;
+    }
+    if (PyErr_Occurred()) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    result = PyObject_Call(self->func, args, kwds);
+    if (result == NULL) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    if (_PyDict_SetItem_KnownHash(self->cache, key, result, hash) < 0) {
+        Py_DECREF(result);
+        Py_DECREF(key);
+        return NULL;
+    }
+    Py_DECREF(key);
+    self->misses++;
+    return result;
+}
+
+/* A link is detached (pointing to itself) while it is not in the list */
+static void
+lru_cache_extricate_link(lru_list_elem *link)
+{
+    link->prev->next = link->next;
+    link->next->prev = link->prev;
+    link->prev = link->next = link;
+}
+
+static void
+lru_cache_append_link(lru_cache_object *self, lru_list_elem *link)
+{
+    lru_list_elem *root = &self->root;
+    lru_list_elem *last = root->prev;
+
+    last->next = root->prev = link;
+    link->prev = last;
+    link->next = root;
+}
+
+static void
+lru_cache_prepend_link(lru_cache_object *self, lru_list_elem *link)
+{
+    lru_list_elem *root = &self->root;
+    lru_list_elem *first = root->next;
+
+    first->prev = root->next = link;
+    link->prev = root;
+    link->next = first;
+}
+
+/* The links of a bounded cache form a circular doubly linked list ordered
+   from the least to the most recently used, with self->root as the
+   sentinel.  The list owns one reference to each link and the cache dict
+   maps the keys to the links.
+
+   Any dict operation may run Python code (__eq__, __del__) which can call
+   the wrapper again.  A link is therefore detached from the list before its
+   key is removed from the dict, so that a nested call can neither move nor
+   reuse it, and it is only appended once it is in the dict again.  A nested
+   call may also store a key which is then stored again by the outer call;
+   the link it replaces in the dict stays in the list until it is evicted,
+   and is dropped then. */
+static PyObject *
+bounded_lru_cache_wrapper(lru_cache_object *self,
+                          PyObject *args, PyObject *kwds)
+{
+    lru_list_elem *link;
+    PyObject *key, *result;
+    long hash;
+
+    key = lru_cache_make_key(args, kwds, self->typed);
+    if (key == NULL)
+        return NULL;
+    hash = PyObject_Hash(key);
+    if (hash == -1) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    link = (lru_list_elem *)_PyDict_GetItem_KnownHash(self->cache, key, hash);
+    if (link != NULL) {
+        /* Move the link to the most recently used end of the list */
+        if (link->next != link) {
+            lru_cache_extricate_link(link);
+            lru_cache_append_link(self, link);
+        }
+        self->hits++;
+        result = link->result;
+        Py_INCREF(result);
+        Py_DECREF(key);
+        return result;
+    }
+    if (PyErr_Occurred()) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    result = PyObject_Call(self->func, args, kwds);
+    if (result == NULL) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    self->misses++;
+    /* The call may have stored the same key already */
+    if (_PyDict_GetItem_KnownHash(self->cache, key, hash) != NULL) {
+        Py_DECREF(key);
+        return result;
+    }
+    if (PyErr_Occurred()) {
+        Py_DECREF(result);
+        Py_DECREF(key);
+        return NULL;
+    }
+
+    while (self->full && self->root.next != &self->root) {
+        /* Reuse the least recently used link for the new key and result */
+        PyObject *oldkey, *oldresult;
+
+        link = self->root.next;
+        lru_cache_extricate_link(link);
+        if (_PyDict_DelItem_KnownHash(self->cache, link->key,
+                                      link->hash) < 0) {
+            if (!PyErr_ExceptionMatches(PyExc_KeyError)) {
+                lru_cache_prepend_link(self, link);
+                Py_DECREF(result);
+                Py_DECREF(key);
+                return NULL;
+            }
+            /* The link was replaced in the dict by a nested call */
+            PyErr_Clear();
+            Py_DECREF(link);
+            continue;
+        }
+        /* The old key and result are released once the link is back in
+           the list, so that their clean-up code sees a consistent cache. */
+        oldkey = link->key;
+        oldresult = link->result;
+        link->hash = hash;
+        link->key = key;
+        link->result = result;
+        Py_INCREF(result); /* for return */
+        if (_PyDict_SetItem_KnownHash(self->cache, key, (PyObject *)link,
+                                      hash) < 0) {
+            Py_DECREF(link);
+            Py_DECREF(result);
+            result = NULL;
+        }
+        else
+            lru_cache_append_link(self, link);
+        Py_DECREF(oldkey);
+        Py_DECREF(oldresult);
+        return result;
+    }
+
+    /* Put the result in a new link at the most recently used end */
+    link = PyObject_New(lru_list_elem, &lru_list_elem_type);
+    if (link == NULL) {
+        Py_DECREF(result);
+        Py_DECREF(key);
+        return NULL;
+    }
+    link->prev = link->next = link;
+    link->hash = hash;
+    link->key = key;
+    link->result = result;
+    Py_INCREF(result); /* for return */
+    if (_PyDict_SetItem_KnownHash(self->cache, key, (PyObject *)link,
+                                  hash) < 0) {
+        Py_DECREF(link);
+        Py_DECREF(result);
+        return NULL;
+    }
+    lru_cache_append_link(self, link);
+    self->full = (PyDict_Size(self->cache) >= self->maxsize);
+    return result;
+}
+
+static PyObject *
+lru_cache_new(PyTypeObject *type, PyObject *args, PyObject *kw)
+{
+    PyObject *func, *maxsize_O, *cache_info_type, *cachedict;
+    int typed;
+    lru_cache_object *obj;
+    Py_ssize_t maxsize;
+    lru_cache_ternaryfunc wrapper;
+    static char *keywords[] = {"user_function", "maxsize", "typed",
+                               "cache_info_type", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kw, "OOiO:lru_cache", keywords,
+                                     &func, &maxsize_O, &typed,
+                                     &cache_info_type)) {
+        return NULL;
+    }
+
+    if (!PyCallable_Check(func)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "the first argument must be callable");
+        return NULL;
+    }
+
+    /* select the caching function */
+    if (maxsize_O == Py_None) {
+        wrapper = (lru_cache_ternaryfunc)infinite_lru_cache_wrapper;
+        maxsize = -1;
+    }
+    else if (PyIndex_Check(maxsize_O)) {
+        maxsize = PyNumber_AsSsize_t(maxsize_O, PyExc_OverflowError);
+        if (maxsize == -1 && PyErr_Occurred())
+            return NULL;
+        if (maxsize <= 0)
+            wrapper = (lru_cache_ternaryfunc)uncached_lru_cache_wrapper;
+        else
+            wrapper = (lru_cache_ternaryfunc)bounded_lru_cache_wrapper;
+    }
+    else {
+        PyErr_SetString(PyExc_TypeError,
+                        "maxsize should be integer or None");
+        return NULL;
+    }
+
+    cachedict = PyDict_New();
+    if (cachedict == NULL)
+        return NULL;
+
+    obj = (lru_cache_object *)type->tp_alloc(type, 0);
+    if (obj == NULL) {
+        Py_DECREF(cachedict);
+        return NULL;
+    }
+
+    obj->cache = cachedict;
+    obj->root.prev = &obj->root;
+    obj->root.next = &obj->root;
+    obj->maxsize = maxsize;
+    Py_INCREF(maxsize_O);
+    obj->maxsize_O = maxsize_O;
+    Py_INCREF(func);
+    obj->func = func;
+    obj->wrapper = wrapper;
+    obj->misses = obj->hits = 0;
+    obj->typed = typed;
+    obj->full = 0;
+    Py_INCREF(cache_info_type);
+    obj->cache_info_type = cache_info_type;
+    obj->dict = NULL;
+    obj->weakreflist = NULL;
+    return (PyObject *)obj;
+}
+
+/* Detach the links from the root and return the first one; the caller
+   releases them with lru_cache_clear_list(). */
+static lru_list_elem *
+lru_cache_unlink_list(lru_cache_object *self)
+{
+    lru_list_elem *root = &self->root;
+    lru_list_elem *link = root->next;
+
+    if (link == root)
+        return NULL;
+    root->prev->next = NULL;
+    root->next = root->prev = root;
+    return link;
+}
+
+static void
+lru_cache_clear_list(lru_list_elem *link)
+{
+    while (link != NULL) {
+        lru_list_elem *next = link->next;
+        Py_DECREF(link);
+        link = next;
+    }
+}
+
+static void
+lru_cache_dealloc(lru_cache_object *obj)
+{
+    lru_list_elem *list = lru_cache_unlink_list(obj);
+
+    PyObject_GC_UnTrack(obj);
+    if (obj->weakreflist != NULL)
+        PyObject_ClearWeakRefs((PyObject *)obj);
+    Py_XDECREF(obj->maxsize_O);
+    Py_XDECREF(obj->func);
+    Py_XDECREF(obj->cache);
+    Py_XDECREF(obj->dict);
+    Py_XDECREF(obj->cache_info_type);
+    lru_cache_clear_list(list);
+    Py_TYPE(obj)->tp_free(obj);
+}
+
+static PyObject *
+lru_cache_call(lru_cache_object *self, PyObject *args, PyObject *kwds)
+{
+    if (self->cache == NULL) {
+        PyErr_SetString(PyExc_ReferenceError,
+                        "the lru_cache wrapper has been cleared");
+        return NULL;
+    }
+    return self->wrapper(self, args, kwds);
+}
+
+static PyObject *
+lru_cache_descr_get(PyObject *self, PyObject *obj, PyObject *type)
+{
+    if (obj == Py_None || obj == NULL) {
+        Py_INCREF(self);
+        return self;
+    }
+    return PyMethod_New(self, obj, type);
+}
+
+static PyObject *
+lru_cache_cache_info(lru_cache_object *self, PyObject *unused)
+{
+    return PyObject_CallFunction(self->cache_info_type, "nnOn",
+                                 self->hits, self->misses, self->maxsize_O,
+                                 self->cache != NULL ?
+                                     PyDict_Size(self->cache) : 0);
+}
+
+static PyObject *
+lru_cache_cache_clear(lru_cache_object *self, PyObject *unused)
+{
+    lru_list_elem *list = lru_cache_unlink_list(self);
+
+    self->hits = self->misses = 0;
+    self->full = 0;
+    if (self->cache != NULL)
+        PyDict_Clear(self->cache);
+    lru_cache_clear_list(list);
+    Py_RETURN_NONE;
+}
+
+/* The wrapper of a module level function is pickled by reference, like
+   the function itself. */
+static PyObject *
+lru_cache_reduce(PyObject *self, PyObject *unused)
+{
+    return PyObject_GetAttrString(self, "__name__");
+}
+
+static PyObject *
+lru_cache_copy(PyObject *self, PyObject *unused)
+{
+    Py_INCREF(self);
+    return self;
+}
+
+static PyObject *
+lru_cache_deepcopy(PyObject *self, PyObject *unused)
+{
+    Py_INCREF(self);
+    return self;
+}
+
+static int
+lru_cache_tp_traverse(lru_cache_object *self, visitproc visit, void *arg)
+{
+    lru_list_elem *link = self->root.next;
+
+    while (link != &self->root) {
+        lru_list_elem *next = link->next;
+        Py_VISIT(link->key);
+        Py_VISIT(link->result);
+        link = next;
+    }
+    Py_VISIT(self->maxsize_O);
+    Py_VISIT(self->func);
+    Py_VISIT(self->cache);
+    Py_VISIT(self->cache_info_type);
+    Py_VISIT(self->dict);
+    return 0;
+}
+
+static int
+lru_cache_tp_clear(lru_cache_object *self)
+{
+    lru_list_elem *list = lru_cache_unlink_list(self);
+
+    Py_CLEAR(self->maxsize_O);
+    Py_CLEAR(self->func);
+    Py_CLEAR(self->cache);
+    Py_CLEAR(self->cache_info_type);
+    Py_CLEAR(self->dict);
+    lru_cache_clear_list(list);
+    return 0;
+}
+
+static PyObject *
+lru_cache_get_dict(lru_cache_object *self)
+{
+    if (self->dict == NULL) {
+        self->dict = PyDict_New();
+        if (self->dict == NULL)
+            return NULL;
+    }
+    Py_INCREF(self->dict);
+    return self->dict;
+}
+
+static int
+lru_cache_set_dict(lru_cache_object *self, PyObject *value)
+{
+    PyObject *tmp;
+
+    if (value == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "an lru_cache object's dictionary may not be deleted");
+        return -1;
+    }
+    if (!PyDict_Check(value)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "setting lru_cache object's dictionary to a non-dict");
+        return -1;
+    }
+    tmp = self->dict;
+    Py_INCREF(value);
+    self->dict = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+
+PyDoc_STRVAR(lru_cache_doc,
+"_lru_cache_wrapper(user_function, maxsize, typed, cache_info_type)\n\
+\n\
+Create a cached callable that wraps another function.\n\
+\n\
+user_function:      the function being cached\n\
+\n\
+maxsize:  0         for no caching\n\
+          None      for unlimited cache size\n\
+          n         for a bounded cache\n\
+\n\
+typed:    False     cache f(3) and f(3.0) as identical calls\n\
+          True      cache f(3) and f(3.0) as distinct calls\n\
+\n\
+cache_info_type:    namedtuple class with the fields:\n\
+                        hits misses currsize maxsize\n");
+
+static PyMethodDef lru_cache_methods[] = {
+    {"cache_info", (PyCFunction)lru_cache_cache_info, METH_NOARGS,
+     "Report cache statistics"},
+    {"cache_clear", (PyCFunction)lru_cache_cache_clear, METH_NOARGS,
+     "Clear the cache and cache statistics"},
+    {"__reduce__", (PyCFunction)lru_cache_reduce, METH_NOARGS},
+    {"__copy__", (PyCFunction)lru_cache_copy, METH_VARARGS},
+    {"__deepcopy__", (PyCFunction)lru_cache_deepcopy, METH_VARARGS},
+    {NULL,              NULL}           /* sentinel */
+};
+
+static PyGetSetDef lru_cache_getsetlist[] = {
+    {"__dict__", (getter)lru_cache_get_dict, (setter)lru_cache_set_dict},
+    {NULL} /* Sentinel */
+};
+
+static PyTypeObject lru_cache_type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "functools._lru_cache_wrapper",     /* tp_name */
+    sizeof(lru_cache_object),           /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)lru_cache_dealloc,      /* tp_dealloc */
+    0,                                  /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    0,                                  /* tp_repr */
+    0,                                  /* tp_as_number */
+    0,                                  /* tp_as_sequence */
+    0,                                  /* tp_as_mapping */
+    0,                                  /* tp_hash */
+    (ternaryfunc)lru_cache_call,        /* tp_call */
+    0,                                  /* tp_str */
+    PyObject_GenericGetAttr,            /* tp_getattro */
+    PyObject_GenericSetAttr,            /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC |
+        Py_TPFLAGS_HAVE_WEAKREFS,       /* tp_flags */
+    lru_cache_doc,                      /* tp_doc */
+    (traverseproc)lru_cache_tp_traverse,/* tp_traverse */
+    (inquiry)lru_cache_tp_clear,        /* tp_clear */
+    0,                                  /* tp_richcompare */
+    offsetof(lru_cache_object, weakreflist),    /* tp_weaklistoffset */
+    0,                                  /* tp_iter */
+    0,                                  /* tp_iternext */
+    lru_cache_methods,                  /* tp_methods */
+    0,                                  /* tp_members */
+    lru_cache_getsetlist,               /* tp_getset */
+    0,                                  /* tp_base */
+    0,                                  /* tp_dict */
+    lru_cache_descr_get,                /* tp_descr_get */
+    0,                                  /* tp_descr_set */
+    offsetof(lru_cache_object, dict),   /* tp_dictoffset */
+    0,                                  /* tp_init */
+    0,                                  /* tp_alloc */
+    lru_cache_new,                      /* tp_new */
+    PyObject_GC_Del,                    /* tp_free */
+};
+
+
 /* module level code ********************************************************/
 
 PyDoc_STRVAR(module_doc,
@@ -384,6 +1064,7 @@ init_functools(void)
     char *name;
     PyTypeObject *typelist[] = {
         &partial_type,
+        &lru_cache_type,
         NULL
     };
 
@@ -391,6 +1072,13 @@ init_functools(void)
     if (m == NULL)
         return;
 
+    kwd_mark = PyObject_CallObject((PyObject *)&PyBaseObject_Type, NULL);
+    if (kwd_mark == NULL)
+        return;
+
+    if (PyType_Ready(&lru_list_elem_type) < 0)
+        return;
+
     for (i=0 ; typelist[i] != NULL ; i++) {
         if (PyType_Ready(typelist[i]) < 0)
             return;
@@ -230,8 +230,11 @@ fileio_init(PyObject *oself, PyObject *args, PyObject *kwds)
     }
 
 #ifdef MS_WINDOWS
-    if (PyUnicode_Check(nameobj))
+    if (PyUnicode_Check(nameobj)) {
         widename = PyUnicode_AS_UNICODE(nameobj);
+        if (widename == NULL)
+            return -1;
+    }
     if (widename == NULL)
 #endif
     if (fd < 0)
@@ -133,6 +133,10 @@ write_str(stringio *self, PyObject *obj)
 
     assert(PyUnicode_Check(decoded));
     str = PyUnicode_AS_UNICODE(decoded);
+    if (str == NULL) {
+        Py_DECREF(decoded);
+        return -1;
+    }
     len = PyUnicode_GET_SIZE(decoded);
 
     assert(len >= 0);
@@ -731,6 +735,8 @@ stringio_setstate(stringio *self, PyObject *state)
     {
         Py_UNICODE *buf = PyUnicode_AS_UNICODE(PyTuple_GET_ITEM(state, 0));
         Py_ssize_t bufsize = PyUnicode_GET_SIZE(PyTuple_GET_ITEM(state, 0));
+        if (buf == NULL)
+            return NULL;
         if (resize_buffer(self, bufsize) < 0)
             return NULL;
         memcpy(self->buf, buf, bufsize * sizeof(Py_UNICODE));
@@ -273,6 +273,8 @@ _PyIncrementalNewlineDecoder_decode(PyObject *_self,
                         "decoder should return a string result");
         goto error;
     }
+    if (PyUnicode_AS_UNICODE(output) == NULL)
+        goto error;
 
     output_len = PyUnicode_GET_SIZE(output);
     if (self->pendingcr && (final || output_len > 0)) {
@@ -1235,6 +1237,9 @@ textiowrapper_write(textio *self, PyObject *args)
         return NULL;
     }
 
+    if (PyUnicode_AS_UNICODE(text) == NULL)
+        return NULL;
+
     Py_INCREF(text);
 
     textlen = PyUnicode_GetSize(text);
@@ -1251,6 +1256,10 @@ textiowrapper_write(textio *self, PyObject *args)
         if (newtext == NULL)
             return NULL;
         text = newtext;
+        if (PyUnicode_AS_UNICODE(text) == NULL) {
+            Py_DECREF(text);
+            return NULL;
+        }
     }
 
     if (self->line_buffering &&
@@ -1337,9 +1346,10 @@ textiowrapper_get_decoded_chars(textio *self, Py_ssize_t n)
         n = avail;
 
     if (self->decoded_chars_used > 0 || n < avail) {
-        chars = PyUnicode_FromUnicode(
-            PyUnicode_AS_UNICODE(self->decoded_chars)
-            + self->decoded_chars_used, n);
+        Py_UNICODE *s = PyUnicode_AS_UNICODE(self->decoded_chars);
+        if (s == NULL)
+            return NULL;
+        chars = PyUnicode_FromUnicode(s + self->decoded_chars_used, n);
         if (chars == NULL)
             return NULL;
     }
@@ -1698,6 +1708,8 @@ _textiowrapper_readline(textio *self, Py_ssize_t limit)
         }
 
         ptr = PyUnicode_AS_UNICODE(line);
+        if (ptr == NULL)
+            goto error;
         line_len = PyUnicode_GET_SIZE(line);
 
         endpos = _PyIO_find_line_ending(
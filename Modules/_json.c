@@ -209,6 +209,8 @@ ascii_escape_unicode(PyObject *pystr)
 
     input_chars = PyUnicode_GET_SIZE(pystr);
     input_unicode = PyUnicode_AS_UNICODE(pystr);
+    if (input_unicode == NULL)
+        return NULL;
 
     /* One char input can be up to 6 chars output, estimate 4 of these */
     output_size = 2 + (MIN_EXPANSION * 4) + input_chars;
@@ -647,7 +649,7 @@ scanstring_unicode(PyObject *pystr, Py_ssize_t end, int strict, Py_ssize_t *next
     Py_ssize_t next;
     const Py_UNICODE *buf = PyUnicode_AS_UNICODE(pystr);
     PyObject *chunks = PyList_New(0);
-    if (chunks == NULL) {
+    if (chunks == NULL || buf == NULL) {
         goto bail;
     }
     if (end < 0 || len <= end) {
@@ -851,6 +853,150 @@ py_scanstring(PyObject* self UNUSED, PyObject *args)
     return _build_rval_index_tuple(rval, next_end);
 }
 
+static Py_ssize_t
+scan_end_str(const char *buf, Py_ssize_t len, Py_ssize_t idx)
+{
+    /* Return the index after the JSON value starting at buf[idx], or -1 if
+       buf ends before the value does.  Only the extent of the value is
+       found, the scanner validates it.  A scalar ends at the first
+       delimiter after it, so a number is only complete once the character
+       after it has been seen. */
+    Py_ssize_t depth = 0;
+    char c;
+    while (idx < len) {
+        c = buf[idx];
+        if (c == '"') {
+            for (idx++; idx < len; idx++) {
+                c = buf[idx];
+                if (c == '"')
+                    break;
+                if (c == '\\')
+                    idx++;
+            }
+            if (idx >= len)
+                return -1;
+            idx++;
+            if (depth == 0)
+                return idx;
+        }
+        else if (c == '[' || c == '{') {
+            depth++;
+            idx++;
+        }
+        else if (c == ']' || c == '}') {
+            if (depth == 0)
+                return idx;
+            idx++;
+            if (--depth == 0)
+                return idx;
+        }
+        else if (depth == 0) {
+            while (!IS_WHITESPACE(c) && c != ',' && c != ':' && c != '"' &&
+                   c != '[' && c != ']' && c != '{' && c != '}') {
+                if (++idx >= len)
+                    return -1;
+                c = buf[idx];
+            }
+            return idx;
+        }
+        else {
+            idx++;
+        }
+    }
+    return -1;
+}
+
+static Py_ssize_t
+scan_end_unicode(const Py_UNICODE *buf, Py_ssize_t len, Py_ssize_t idx)
+{
+    /* Unicode version of scan_end_str */
+    Py_ssize_t depth = 0;
+    Py_UNICODE c;
+    while (idx < len) {
+        c = buf[idx];
+        if (c == '"') {
+            for (idx++; idx < len; idx++) {
+                c = buf[idx];
+                if (c == '"')
+                    break;
+                if (c == '\\')
+                    idx++;
+            }
+            if (idx >= len)
+                return -1;
+            idx++;
+            if (depth == 0)
+                return idx;
+        }
+        else if (c == '[' || c == '{') {
+            depth++;
+            idx++;
+        }
+        else if (c == ']' || c == '}') {
+            if (depth == 0)
+                return idx;
+            idx++;
+            if (--depth == 0)
+                return idx;
+        }
+        else if (depth == 0) {
+            while (!IS_WHITESPACE(c) && c != ',' && c != ':' && c != '"' &&
+                   c != '[' && c != ']' && c != '{' && c != '}') {
+                if (++idx >= len)
+                    return -1;
+                c = buf[idx];
+            }
+            return idx;
+        }
+        else {
+            idx++;
+        }
+    }
+    return -1;
+}
+
+PyDoc_STRVAR(pydoc_scan_end,
+    "scan_end(s, idx) -> end\n"
+    "\n"
+    "Find the end of the JSON value starting at s[idx], skipping over\n"
+    "strings and matching brackets without decoding anything.\n"
+    "\n"
+    "Returns the index of the character in s after the value, or -1 if\n"
+    "s ends before the value is known to be complete.  The value is not\n"
+    "validated; a scanner must still decode it."
+);
+
+static PyObject *
+py_scan_end(PyObject* self UNUSED, PyObject *args)
+{
+    PyObject *pystr;
+    Py_ssize_t idx, end;
+    if (!PyArg_ParseTuple(args, "OO&:scan_end", &pystr, _convertPyInt_AsSsize_t, &idx)) {
+        return NULL;
+    }
+    if (idx < 0) {
+        PyErr_SetString(PyExc_ValueError, "idx cannot be negative");
+        return NULL;
+    }
+    if (PyString_Check(pystr)) {
+        end = scan_end_str(PyString_AS_STRING(pystr),
+                           PyString_GET_SIZE(pystr), idx);
+    }
+    else if (PyUnicode_Check(pystr)) {
+        if (PyUnicode_AS_UNICODE(pystr) == NULL)
+            return NULL;
+        end = scan_end_unicode(PyUnicode_AS_UNICODE(pystr),
+                               PyUnicode_GET_SIZE(pystr), idx);
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "first argument must be a string, not %.80s",
+                     Py_TYPE(pystr)->tp_name);
+        return NULL;
+    }
+    return _convertPyInt_FromSsize_t(&end);
+}
+
 PyDoc_STRVAR(pydoc_encode_basestring_ascii,
     "encode_basestring_ascii(basestring) -> str\n"
     "\n"
@@ -1605,6 +1751,8 @@ scan_once_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
     */
     Py_UNICODE *str = PyUnicode_AS_UNICODE(pystr);
     Py_ssize_t length = PyUnicode_GET_SIZE(pystr);
+    if (str == NULL)
+        return NULL;
     if (idx >= length) {
         PyErr_SetNone(PyExc_StopIteration);
         return NULL;
@@ -2384,6 +2532,10 @@ static PyMethodDef speedups_methods[] = {
         (PyCFunction)py_scanstring,
         METH_VARARGS,
         pydoc_scanstring},
+    {"scan_end",
+        (PyCFunction)py_scan_end,
+        METH_VARARGS,
+        pydoc_scan_end},
     {NULL, NULL, 0, NULL}
 };
 
@@ -1686,6 +1686,8 @@ getstring(PyObject* string, Py_ssize_t* p_length, int* p_charsize)
     if (PyUnicode_Check(string)) {
         /* unicode strings doesn't always support the buffer interface */
         ptr = (void*) PyUnicode_AS_DATA(string);
+        if (ptr == NULL)
+            return NULL;
         /* bytes = PyUnicode_GET_DATA_SIZE(string); */
         size = PyUnicode_GET_SIZE(string);
         charsize = sizeof(Py_UNICODE);
@@ -977,6 +977,8 @@ AsObj(PyObject *value)
         Tcl_UniChar *outbuf = NULL;
         Py_ssize_t i;
         size_t allocsize = ((size_t)size) * sizeof(Tcl_UniChar);
+        if (inbuf == NULL)
+            return NULL;
         if (allocsize >= size)
             outbuf = (Tcl_UniChar*)ckalloc(allocsize);
         /* Else overflow occurred, and we take the next exit */
@@ -998,6 +1000,8 @@ AsObj(PyObject *value)
         ckfree(FREECAST outbuf);
         return result;
 #else
+        if (inbuf == NULL)
+            return NULL;
         return Tcl_NewUnicodeObj(inbuf, size);
 #endif
 
@@ -0,0 +1,432 @@
+/* C line counter for the trace module.
+
+   Counting the executed lines with a Python trace function costs a Python
+   call per line.  A Tracer is installed as a C trace function instead: the
+   first time a code object is entered, it asks a Python callback whether
+   the lines of the code are to be counted, and then increments one counter
+   per line in an array attached to the code object. */
+
+#include "Python.h"
+#include "code.h"
+#include "frameobject.h"
+
+typedef struct {
+    PyCodeObject *code;
+    int counted;        /* true if the lines of code are counted */
+    int firstline;      /* line number of counts[0] */
+    int nlines;
+    long *counts;
+} codeinfo;
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *filter;
+    /* open addressing hash table of the code objects entered so far,
+       keyed by address; size is a power of 2 */
+    codeinfo **table;
+    Py_ssize_t size;
+    Py_ssize_t used;
+    /* last code object looked up, most lines follow a line of the same
+       code object */
+    codeinfo *last;
+} TracerObject;
+
+static PyTypeObject Tracer_Type;
+
+#define MIN_TABLE_SIZE 64
+
+static Py_ssize_t
+code_slot(TracerObject *self, PyCodeObject *code)
+{
+    size_t mask = (size_t)self->size - 1;
+    size_t i = ((size_t)code >> 4) & mask;
+
+    while (self->table[i] != NULL && self->table[i]->code != code)
+        i = (i + 1) & mask;
+    return (Py_ssize_t)i;
+}
+
+static codeinfo *
+lookup_code(TracerObject *self, PyCodeObject *code)
+{
+    if (self->table == NULL)
+        return NULL;
+    return self->table[code_slot(self, code)];
+}
+
+static int
+resize_table(TracerObject *self, Py_ssize_t size)
+{
+    codeinfo **oldtable = self->table;
+    Py_ssize_t oldsize = self->size, i;
+
+    self->table = PyMem_New(codeinfo *, size);
+    if (self->table == NULL) {
+        self->table = oldtable;
+        PyErr_NoMemory();
+        return -1;
+    }
+    memset(self->table, 0, size * sizeof(codeinfo *));
+    self->size = size;
+    for (i = 0; i < oldsize; i++) {
+        if (oldtable[i] != NULL)
+            self->table[code_slot(self, oldtable[i]->code)] = oldtable[i];
+    }
+    PyMem_Free(oldtable);
+    return 0;
+}
+
+/* Return the number of lines spanned by code, according to its lnotab */
+static int
+code_nlines(PyCodeObject *code)
+{
+    unsigned char *p = (unsigned char *)PyString_AS_STRING(code->co_lnotab);
+    Py_ssize_t n = PyString_GET_SIZE(code->co_lnotab) / 2;
+    int line = 0, maxline = 0;
+
+    while (--n >= 0) {
+        p++;
+        line += *p++;
+        if (line > maxline)
+            maxline = line;
+    }
+    return maxline + 1;
+}
+
+/* Register the code of frame, entered for the first time, asking the
+   filter whether its lines are counted */
+static codeinfo *
+add_code(TracerObject *self, PyFrameObject *frame)
+{
+    PyCodeObject *code = frame->f_code;
+    codeinfo *info;
+    PyObject *res;
+    int counted;
+
+    if (self->filter == NULL) {
+        /* cleared by the garbage collector */
+        counted = 0;
+    }
+    else {
+        res = PyObject_CallFunctionObjArgs(self->filter, (PyObject *)frame,
+                                           NULL);
+        if (res == NULL)
+            return NULL;
+        counted = PyObject_IsTrue(res);
+        Py_DECREF(res);
+        if (counted < 0)
+            return NULL;
+    }
+
+    if ((self->used + 1) * 2 > self->size) {
+        if (resize_table(self, self->size ? self->size * 2
+                                          : MIN_TABLE_SIZE) < 0)
+            return NULL;
+    }
+    info = PyMem_New(codeinfo, 1);
+    if (info == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    info->counted = counted;
+    info->firstline = code->co_firstlineno;
+    info->nlines = 0;
+    info->counts = NULL;
+    if (counted) {
+        info->nlines = code_nlines(code);
+        info->counts = PyMem_New(long, info->nlines);
+        if (info->counts == NULL) {
+            PyMem_Free(info);
+            PyErr_NoMemory();
+            return NULL;
+        }
+        memset(info->counts, 0, info->nlines * sizeof(long));
+    }
+    Py_INCREF(code);
+    info->code = code;
+    self->table[code_slot(self, code)] = info;
+    self->used++;
+    return info;
+}
+
+/* Grow the counters of info to cover line, which should not happen unless
+   the line numbers of the frame were changed */
+static int
+grow_counts(codeinfo *info, int line)
+{
+    int first = line < info->firstline ? line : info->firstline;
+    int last = info->firstline + info->nlines - 1;
+    int nlines;
+    long *counts;
+
+    if (line > last)
+        last = line;
+    nlines = last - first + 1;
+    counts = PyMem_New(long, nlines);
+    if (counts == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    memset(counts, 0, nlines * sizeof(long));
+    if (info->nlines)
+        memcpy(counts + (info->firstline - first), info->counts,
+               info->nlines * sizeof(long));
+    PyMem_Free(info->counts);
+    info->counts = counts;
+    info->firstline = first;
+    info->nlines = nlines;
+    return 0;
+}
+
+static int
+tracer_trace(PyObject *obj, PyFrameObject *frame, int what, PyObject *arg)
+{
+    TracerObject *self = (TracerObject *)obj;
+    codeinfo *info;
+    int line;
+
+    if (what == PyTrace_LINE) {
+        info = self->last;
+        if (info == NULL || info->code != frame->f_code) {
+            info = lookup_code(self, frame->f_code);
+            /* ignore the frames which were running before the tracer was
+               installed, like a Python trace function would */
+            if (info == NULL)
+                return 0;
+            self->last = info;
+        }
+        if (!info->counted)
+            return 0;
+        line = frame->f_lineno - info->firstline;
+        if (line < 0 || line >= info->nlines) {
+            if (grow_counts(info, frame->f_lineno) < 0)
+                goto error;
+            line = frame->f_lineno - info->firstline;
+        }
+        info->counts[line]++;
+    }
+    else if (what == PyTrace_CALL) {
+        if (lookup_code(self, frame->f_code) == NULL) {
+            if (add_code(self, frame) == NULL)
+                goto error;
+        }
+    }
+    return 0;
+
+error:
+    PyEval_SetTrace(NULL, NULL);
+    return -1;
+}
+
+static PyObject *
+tracer_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"filter", 0};
+    TracerObject *self;
+    PyObject *filter;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O:Tracer", kwlist, &filter))
+        return NULL;
+    if (!PyCallable_Check(filter)) {
+        PyErr_SetString(PyExc_TypeError, "filter must be callable");
+        return NULL;
+    }
+    self = PyObject_GC_New(TracerObject, type);
+    if (self == NULL)
+        return NULL;
+    Py_INCREF(filter);
+    self->filter = filter;
+    self->table = NULL;
+    self->size = 0;
+    self->used = 0;
+    self->last = NULL;
+    PyObject_GC_Track(self);
+    return (PyObject *)self;
+}
+
+static int
+tracer_traverse(TracerObject *self, visitproc visit, void *arg)
+{
+    Py_ssize_t i;
+
+    Py_VISIT(self->filter);
+    for (i = 0; i < self->size; i++) {
+        if (self->table[i] != NULL)
+            Py_VISIT(self->table[i]->code);
+    }
+    return 0;
+}
+
+static int
+tracer_clear(TracerObject *self)
+{
+    Py_CLEAR(self->filter);
+    return 0;
+}
+
+static void
+tracer_dealloc(TracerObject *self)
+{
+    Py_ssize_t i;
+
+    PyObject_GC_UnTrack(self);
+    Py_XDECREF(self->filter);
+    for (i = 0; i < self->size; i++) {
+        codeinfo *info = self->table[i];
+        if (info != NULL) {
+            Py_DECREF(info->code);
+            PyMem_Free(info->counts);
+            PyMem_Free(info);
+        }
+    }
+    PyMem_Free(self->table);
+    PyObject_GC_Del(self);
+}
+
+static PyObject *
+tracer_call(TracerObject *self, PyObject *args, PyObject *kwds)
+{
+    PyFrameObject *frame;
+    char *event;
+    PyObject *arg;
+
+    if (!PyArg_ParseTuple(args, "O!sO:Tracer", &PyFrame_Type, &frame,
+                          &event, &arg))
+        return NULL;
+    if (self->filter == NULL) {
+        PyErr_SetString(PyExc_ValueError, "the tracer was cleared");
+        return NULL;
+    }
+    /* Replace the Python trace function of the thread which called us */
+    PyEval_SetTrace(tracer_trace, (PyObject *)self);
+    if (strcmp(event, "call") == 0) {
+        if (tracer_trace((PyObject *)self, frame, PyTrace_CALL, arg) < 0)
+            return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(tracer_collect_doc,
+"collect(counts)\n\
+\n\
+Add the number of times each line was executed to the dictionary counts,\n\
+whose keys are (filename, lineno) tuples, and reset the counters.");
+
+static PyObject *
+tracer_collect(TracerObject *self, PyObject *counts)
+{
+    Py_ssize_t i;
+    int j;
+
+    if (!PyDict_Check(counts)) {
+        PyErr_SetString(PyExc_TypeError, "counts must be a dict");
+        return NULL;
+    }
+    for (i = 0; i < self->size; i++) {
+        codeinfo *info = self->table[i];
+        if (info == NULL || !info->counted)
+            continue;
+        for (j = 0; j < info->nlines; j++) {
+            PyObject *key, *value;
+            long count;
+
+            if (info->counts[j] == 0)
+                continue;
+            key = Py_BuildValue("(Oi)", info->code->co_filename,
+                                info->firstline + j);
+            if (key == NULL)
+                return NULL;
+            count = info->counts[j];
+            value = PyDict_GetItem(counts, key);
+            if (value != NULL) {
+                count += PyInt_AsLong(value);
+                if (count == -1 && PyErr_Occurred()) {
+                    Py_DECREF(key);
+                    return NULL;
+                }
+            }
+            value = PyInt_FromLong(count);
+            if (value == NULL || PyDict_SetItem(counts, key, value) < 0) {
+                Py_XDECREF(value);
+                Py_DECREF(key);
+                return NULL;
+            }
+            Py_DECREF(value);
+            Py_DECREF(key);
+            info->counts[j] = 0;
+        }
+    }
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef tracer_methods[] = {
+    {"collect", (PyCFunction)tracer_collect, METH_O, tracer_collect_doc},
+    {NULL, NULL}
+};
+
+PyDoc_STRVAR(tracer_doc,
+"Tracer(filter)\n\
+\n\
+Count the executed lines.  Install the tracer with sys.settrace() or\n\
+threading.settrace(): on the first call event in a thread, it replaces\n\
+itself with a C trace function.  filter(frame) is called the first time\n\
+a code object is entered and returns true if its lines are counted.\n\
+Frames running before the tracer was installed are not counted.");
+
+static PyTypeObject Tracer_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_trace.Tracer",                            /* tp_name */
+    sizeof(TracerObject),                       /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor)tracer_dealloc,                 /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_compare */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    (ternaryfunc)tracer_call,                   /* tp_call */
+    0,                                          /* tp_str */
+    PyObject_GenericGetAttr,                    /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,    /* tp_flags */
+    tracer_doc,                                 /* tp_doc */
+    (traverseproc)tracer_traverse,              /* tp_traverse */
+    (inquiry)tracer_clear,                      /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    tracer_methods,                             /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    0,                                          /* tp_alloc */
+    tracer_new,                                 /* tp_new */
+};
+
+PyDoc_STRVAR(module_doc,
+"Fast line counting for the trace module.");
+
+PyMODINIT_FUNC
+init_trace(void)
+{
+    PyObject *m;
+
+    if (PyType_Ready(&Tracer_Type) < 0)
+        return;
+    m = Py_InitModule3("_trace", NULL, module_doc);
+    if (m == NULL)
+        return;
+    Py_INCREF(&Tracer_Type);
+    PyModule_AddObject(m, "Tracer", (PyObject *)&Tracer_Type);
+}
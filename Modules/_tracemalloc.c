@@ -0,0 +1,926 @@
+/* Memory allocation tracer.
+
+   While tracing, the allocators of the PYMEM_DOMAIN_MEM and
+   PYMEM_DOMAIN_OBJ domains are wrapped by hooks which record, for each
+   live memory block, its size and the traceback of the Python code that
+   allocated it.  The tracebacks are interned, so a traceback shared by
+   many blocks is only stored once.  Lib/tracemalloc.py builds snapshots on
+   top of _get_traces().
+
+   Tracing is only possible while the allocating thread holds the GIL:
+   blocks allocated by a thread which released it are not traced.  They can
+   still be released by any thread, which is why the table of traces is
+   protected by its own lock.  The tracebacks table is only used with the
+   GIL held.
+
+   The tables themselves are allocated with the platform malloc(), so the
+   tracer never calls itself. */
+
+#include "Python.h"
+#include "frameobject.h"
+#ifdef WITH_THREAD
+#include "pythread.h"
+#endif
+
+/* Upper bound for the number of frames stored per traceback */
+#define MAX_NFRAME 65535
+
+typedef struct {
+    PyObject *filename;
+    int lineno;
+} frame_t;
+
+typedef struct {
+    long hash;
+    int nframe;
+    frame_t frames[1];
+} traceback_t;
+
+#define TRACEBACK_SIZE(NFRAME) \
+        (sizeof(traceback_t) + sizeof(frame_t) * ((NFRAME) - 1))
+
+
+/* A small chained hash table.  In the table of traces, the key is the
+   address of the memory block, and the entry records the size of the block
+   and its traceback.  In the table of tracebacks, the key is the interned
+   traceback and the other fields are unused. */
+
+typedef struct entry {
+    struct entry *next;
+    long hash;
+    const void *key;
+    traceback_t *traceback;
+    size_t size;
+} entry_t;
+
+typedef long (*hashtable_hash_func)(const void *key);
+typedef int (*hashtable_compare_func)(const void *key, const entry_t *entry);
+
+typedef struct {
+    size_t num_buckets;
+    size_t entries;
+    entry_t **buckets;
+    hashtable_hash_func hash_func;
+    hashtable_compare_func compare_func;
+    /* released entries kept for reuse, linked by their next field:
+       blocks are allocated and released all the time, calling malloc()
+       and free() for each trace would double the cost of tracing */
+    entry_t *free_entries;
+    size_t nfree_entries;
+} hashtable_t;
+
+#define HASHTABLE_MIN_SIZE 16
+#define HASHTABLE_MAX_FREE_ENTRIES 4096
+
+static hashtable_t *
+hashtable_new(hashtable_hash_func hash_func,
+              hashtable_compare_func compare_func)
+{
+    hashtable_t *ht;
+
+    ht = (hashtable_t *)malloc(sizeof(hashtable_t));
+    if (ht == NULL)
+        return NULL;
+    ht->num_buckets = HASHTABLE_MIN_SIZE;
+    ht->entries = 0;
+    ht->buckets = (entry_t **)calloc(ht->num_buckets, sizeof(entry_t *));
+    if (ht->buckets == NULL) {
+        free(ht);
+        return NULL;
+    }
+    ht->hash_func = hash_func;
+    ht->compare_func = compare_func;
+    ht->free_entries = NULL;
+    ht->nfree_entries = 0;
+    return ht;
+}
+
+static entry_t *
+hashtable_alloc_entry(hashtable_t *ht)
+{
+    entry_t *entry = ht->free_entries;
+
+    if (entry == NULL)
+        return (entry_t *)malloc(sizeof(entry_t));
+    ht->free_entries = entry->next;
+    ht->nfree_entries--;
+    return entry;
+}
+
+static void
+hashtable_free_entry(hashtable_t *ht, entry_t *entry)
+{
+    if (ht->nfree_entries >= HASHTABLE_MAX_FREE_ENTRIES) {
+        free(entry);
+        return;
+    }
+    entry->next = ht->free_entries;
+    ht->free_entries = entry;
+    ht->nfree_entries++;
+}
+
+static entry_t *
+hashtable_get_entry(hashtable_t *ht, const void *key)
+{
+    long hash = ht->hash_func(key);
+    entry_t *entry;
+
+    entry = ht->buckets[(size_t)hash & (ht->num_buckets - 1)];
+    for (; entry != NULL; entry = entry->next) {
+        if (entry->hash == hash && ht->compare_func(key, entry))
+            return entry;
+    }
+    return NULL;
+}
+
+/* Double the number of buckets.  On failure, keep the current buckets:
+   the table only gets slower. */
+static void
+hashtable_grow(hashtable_t *ht)
+{
+    size_t new_size = ht->num_buckets * 2, i;
+    entry_t **buckets, *entry, *next;
+
+    buckets = (entry_t **)calloc(new_size, sizeof(entry_t *));
+    if (buckets == NULL)
+        return;
+    for (i = 0; i < ht->num_buckets; i++) {
+        for (entry = ht->buckets[i]; entry != NULL; entry = next) {
+            size_t index = (size_t)entry->hash & (new_size - 1);
+            next = entry->next;
+            entry->next = buckets[index];
+            buckets[index] = entry;
+        }
+    }
+    free(ht->buckets);
+    ht->buckets = buckets;
+    ht->num_buckets = new_size;
+}
+
+/* Add an entry for key, which must not be in the table yet.  Return -1 on
+   memory allocation failure. */
+static int
+hashtable_add(hashtable_t *ht, const void *key,
+              traceback_t *traceback, size_t size)
+{
+    entry_t *entry;
+    size_t index;
+
+    entry = hashtable_alloc_entry(ht);
+    if (entry == NULL)
+        return -1;
+    entry->hash = ht->hash_func(key);
+    entry->key = key;
+    entry->traceback = traceback;
+    entry->size = size;
+
+    index = (size_t)entry->hash & (ht->num_buckets - 1);
+    entry->next = ht->buckets[index];
+    ht->buckets[index] = entry;
+    ht->entries++;
+
+    if (ht->entries > ht->num_buckets)
+        hashtable_grow(ht);
+    return 0;
+}
+
+/* Remove the entry of key and copy its size into *size.  Return 0 if the
+   key was not in the table. */
+static int
+hashtable_pop(hashtable_t *ht, const void *key, size_t *size)
+{
+    long hash = ht->hash_func(key);
+    entry_t **link, *entry;
+
+    link = &ht->buckets[(size_t)hash & (ht->num_buckets - 1)];
+    for (entry = *link; entry != NULL; link = &entry->next, entry = *link) {
+        if (entry->hash == hash && ht->compare_func(key, entry)) {
+            *link = entry->next;
+            ht->entries--;
+            *size = entry->size;
+            hashtable_free_entry(ht, entry);
+            return 1;
+        }
+    }
+    return 0;
+}
+
+/* Remove all entries, calling func (if not NULL) on each of them first */
+static void
+hashtable_clear(hashtable_t *ht, void (*func)(entry_t *entry))
+{
+    size_t i;
+    entry_t *entry, *next;
+
+    for (i = 0; i < ht->num_buckets; i++) {
+        for (entry = ht->buckets[i]; entry != NULL; entry = next) {
+            next = entry->next;
+            if (func != NULL)
+                func(entry);
+            free(entry);
+        }
+        ht->buckets[i] = NULL;
+    }
+    ht->entries = 0;
+}
+
+static void
+hashtable_destroy(hashtable_t *ht)
+{
+    entry_t *entry, *next;
+
+    hashtable_clear(ht, NULL);
+    for (entry = ht->free_entries; entry != NULL; entry = next) {
+        next = entry->next;
+        free(entry);
+    }
+    free(ht->buckets);
+    free(ht);
+}
+
+
+/* Tracer state */
+
+static struct {
+    /* is tracing enabled? */
+    int tracing;
+    /* maximum number of frames stored per traceback */
+    int max_nframe;
+} tracemalloc_config = {0, 1};
+
+/* the allocators wrapped by the hooks */
+static PyMemAllocator allocator_mem;
+static PyMemAllocator allocator_obj;
+
+/* address of a block => size and traceback */
+static hashtable_t *tracemalloc_traces = NULL;
+
+/* set of the interned tracebacks */
+static hashtable_t *tracemalloc_tracebacks = NULL;
+
+/* buffer used to read the traceback of the current allocation */
+static traceback_t *tracemalloc_traceback = NULL;
+
+/* frame used when no Python frame is available */
+static PyObject *unknown_filename = NULL;
+
+/* total size of the traced blocks, and its maximum since the last
+   clear_traces() */
+static size_t tracemalloc_traced_memory = 0;
+static size_t tracemalloc_peak_traced_memory = 0;
+
+/* memory used by the interned tracebacks */
+static size_t tracemalloc_tracebacks_memory = 0;
+
+#ifdef WITH_THREAD
+static PyThread_type_lock tables_lock = NULL;
+#define TABLES_LOCK() PyThread_acquire_lock(tables_lock, 1)
+#define TABLES_UNLOCK() PyThread_release_lock(tables_lock)
+#else
+#define TABLES_LOCK()
+#define TABLES_UNLOCK()
+#endif
+
+
+static long
+hashtable_hash_ptr(const void *key)
+{
+    /* the low bits of a block address are always 0 */
+    return (long)((Py_uintptr_t)key >> 3);
+}
+
+static int
+hashtable_compare_ptr(const void *key, const entry_t *entry)
+{
+    return key == entry->key;
+}
+
+static long
+traceback_hash(traceback_t *traceback)
+{
+    /* same algorithm as tuplehash() */
+    long x = 0x345678L, y;
+    long mult = 1000003L;
+    int i;
+
+    for (i = 0; i < traceback->nframe; i++) {
+        frame_t *frame = &traceback->frames[i];
+        y = PyObject_Hash(frame->filename) ^ frame->lineno;
+        x = (x ^ y) * mult;
+        mult += (long)(82520L + 2 * (traceback->nframe - i));
+    }
+    x += 97531L;
+    if (x == -1)
+        x = -2;
+    return x;
+}
+
+static long
+hashtable_hash_traceback(const void *key)
+{
+    return ((const traceback_t *)key)->hash;
+}
+
+static int
+hashtable_compare_traceback(const void *key, const entry_t *entry)
+{
+    const traceback_t *a = (const traceback_t *)key;
+    const traceback_t *b = (const traceback_t *)entry->key;
+    int i;
+
+    if (a->nframe != b->nframe)
+        return 0;
+    for (i = 0; i < a->nframe; i++) {
+        const frame_t *fa = &a->frames[i], *fb = &b->frames[i];
+        if (fa->lineno != fb->lineno)
+            return 0;
+        if (fa->filename != fb->filename
+            && !_PyString_Eq(fa->filename, fb->filename))
+            return 0;
+    }
+    return 1;
+}
+
+/* Does the current thread hold the GIL? */
+static int
+tracemalloc_holds_gil(void)
+{
+    PyThreadState *tstate = _PyThreadState_Current;
+
+    if (tstate == NULL)
+        return 0;
+#ifdef WITH_THREAD
+    return tstate->thread_id == PyThread_get_thread_ident();
+#else
+    return 1;
+#endif
+}
+
+/* Return the interned traceback of the current thread, or NULL on memory
+   allocation failure.  The GIL must be held. */
+static traceback_t *
+traceback_get(void)
+{
+    traceback_t *traceback = tracemalloc_traceback, *copy;
+    PyFrameObject *pyframe;
+    entry_t *entry;
+    size_t size;
+    int i;
+
+    traceback->nframe = 0;
+    for (pyframe = _PyThreadState_Current->frame; pyframe != NULL;
+         pyframe = pyframe->f_back) {
+        frame_t *frame = &traceback->frames[traceback->nframe];
+        frame->filename = pyframe->f_code->co_filename;
+        frame->lineno = PyFrame_GetLineNumber(pyframe);
+        if (++traceback->nframe == tracemalloc_config.max_nframe)
+            break;
+    }
+    if (traceback->nframe == 0) {
+        traceback->frames[0].filename = unknown_filename;
+        traceback->frames[0].lineno = 0;
+        traceback->nframe = 1;
+    }
+    traceback->hash = traceback_hash(traceback);
+
+    entry = hashtable_get_entry(tracemalloc_tracebacks, traceback);
+    if (entry != NULL)
+        return (traceback_t *)entry->key;
+
+    size = TRACEBACK_SIZE(traceback->nframe);
+    copy = (traceback_t *)malloc(size);
+    if (copy == NULL)
+        return NULL;
+    memcpy(copy, traceback, size);
+    if (hashtable_add(tracemalloc_tracebacks, copy, NULL, 0) < 0) {
+        free(copy);
+        return NULL;
+    }
+    for (i = 0; i < copy->nframe; i++)
+        Py_INCREF(copy->frames[i].filename);
+    tracemalloc_tracebacks_memory += size;
+    return copy;
+}
+
+static void
+tracemalloc_remove_trace(void *ptr)
+{
+    size_t size;
+
+    TABLES_LOCK();
+    if (hashtable_pop(tracemalloc_traces, ptr, &size))
+        tracemalloc_traced_memory -= size;
+    TABLES_UNLOCK();
+}
+
+/* Record the trace of a block allocated with the GIL held.  Return -1 on
+   memory allocation failure. */
+static int
+tracemalloc_add_trace(void *ptr, size_t size)
+{
+    traceback_t *traceback;
+    entry_t *entry;
+    int res = 0;
+
+    traceback = traceback_get();
+    if (traceback == NULL)
+        return -1;
+
+    TABLES_LOCK();
+    entry = hashtable_get_entry(tracemalloc_traces, ptr);
+    if (entry != NULL) {
+        /* the block was released by a function that bypassed the hooks */
+        tracemalloc_traced_memory -= entry->size;
+        entry->size = size;
+        entry->traceback = traceback;
+    }
+    else
+        res = hashtable_add(tracemalloc_traces, ptr, traceback, size);
+    if (res == 0) {
+        tracemalloc_traced_memory += size;
+        if (tracemalloc_traced_memory > tracemalloc_peak_traced_memory)
+            tracemalloc_peak_traced_memory = tracemalloc_traced_memory;
+    }
+    TABLES_UNLOCK();
+    return res;
+}
+
+static void *
+tracemalloc_malloc(void *ctx, size_t size)
+{
+    PyMemAllocator *alloc = (PyMemAllocator *)ctx;
+    void *ptr;
+
+    ptr = alloc->malloc(alloc->ctx, size);
+    if (ptr == NULL || !tracemalloc_holds_gil())
+        return ptr;
+    if (tracemalloc_add_trace(ptr, size) < 0) {
+        alloc->free(alloc->ctx, ptr);
+        return NULL;
+    }
+    return ptr;
+}
+
+static void *
+tracemalloc_realloc(void *ctx, void *ptr, size_t new_size)
+{
+    PyMemAllocator *alloc = (PyMemAllocator *)ctx;
+    void *ptr2;
+
+    if (!tracemalloc_holds_gil()) {
+        /* the new block cannot be traced: forget the old one before
+           another thread can get its address back from the allocator */
+        if (ptr != NULL)
+            tracemalloc_remove_trace(ptr);
+        return alloc->realloc(alloc->ctx, ptr, new_size);
+    }
+
+    ptr2 = alloc->realloc(alloc->ctx, ptr, new_size);
+    if (ptr2 == NULL)
+        return NULL;
+    if (ptr != NULL)
+        tracemalloc_remove_trace(ptr);
+    if (tracemalloc_add_trace(ptr2, new_size) < 0) {
+        if (ptr == NULL) {
+            alloc->free(alloc->ctx, ptr2);
+            return NULL;
+        }
+        /* The block was resized but its trace is lost: it cannot be
+           restored to its previous size, so leave it untraced. */
+    }
+    return ptr2;
+}
+
+static void
+tracemalloc_free(void *ctx, void *ptr)
+{
+    PyMemAllocator *alloc = (PyMemAllocator *)ctx;
+
+    if (ptr == NULL)
+        return;
+    /* remove the trace first: once released, the address can be reused
+       by another thread */
+    tracemalloc_remove_trace(ptr);
+    alloc->free(alloc->ctx, ptr);
+}
+
+static void
+traceback_release(entry_t *entry)
+{
+    traceback_t *traceback = (traceback_t *)entry->key;
+    int i;
+
+    for (i = 0; i < traceback->nframe; i++)
+        Py_DECREF(traceback->frames[i].filename);
+    free(traceback);
+}
+
+/* Forget all traces and tracebacks.  The GIL must be held. */
+static void
+tracemalloc_clear_traces(void)
+{
+    TABLES_LOCK();
+    hashtable_clear(tracemalloc_traces, NULL);
+    tracemalloc_traced_memory = 0;
+    tracemalloc_peak_traced_memory = 0;
+    TABLES_UNLOCK();
+
+    hashtable_clear(tracemalloc_tracebacks, traceback_release);
+    tracemalloc_tracebacks_memory = 0;
+}
+
+static int
+tracemalloc_init(void)
+{
+    if (tracemalloc_traces != NULL)
+        return 0;
+
+#ifdef WITH_THREAD
+    tables_lock = PyThread_allocate_lock();
+    if (tables_lock == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot allocate lock");
+        return -1;
+    }
+#endif
+    unknown_filename = PyString_InternFromString("<unknown>");
+    if (unknown_filename == NULL)
+        return -1;
+    tracemalloc_traces = hashtable_new(hashtable_hash_ptr,
+                                       hashtable_compare_ptr);
+    tracemalloc_tracebacks = hashtable_new(hashtable_hash_traceback,
+                                           hashtable_compare_traceback);
+    if (tracemalloc_traces == NULL || tracemalloc_tracebacks == NULL) {
+        if (tracemalloc_traces != NULL)
+            hashtable_destroy(tracemalloc_traces);
+        if (tracemalloc_tracebacks != NULL)
+            hashtable_destroy(tracemalloc_tracebacks);
+        tracemalloc_traces = tracemalloc_tracebacks = NULL;
+        PyErr_NoMemory();
+        return -1;
+    }
+    return 0;
+}
+
+static int
+tracemalloc_set_nframe(int nframe)
+{
+    traceback_t *traceback;
+
+    if (nframe < 1 || nframe > MAX_NFRAME) {
+        PyErr_Format(PyExc_ValueError,
+                     "the number of frames must be in range [1; %d]",
+                     MAX_NFRAME);
+        return -1;
+    }
+    traceback = (traceback_t *)realloc(tracemalloc_traceback,
+                                       TRACEBACK_SIZE(nframe));
+    if (traceback == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    tracemalloc_traceback = traceback;
+    tracemalloc_config.max_nframe = nframe;
+    return 0;
+}
+
+/* Start tracing, storing at most nframe frames per traceback.  If tracing
+   is already started, only change the number of frames.  Return -1 with
+   an exception set on error. */
+int
+_PyTraceMalloc_Start(int nframe)
+{
+    PyMemAllocator alloc;
+
+    if (tracemalloc_init() < 0)
+        return -1;
+    if (tracemalloc_set_nframe(nframe) < 0)
+        return -1;
+    if (tracemalloc_config.tracing)
+        return 0;
+
+    alloc.malloc = tracemalloc_malloc;
+    alloc.realloc = tracemalloc_realloc;
+    alloc.free = tracemalloc_free;
+
+    PyMem_GetAllocator(PYMEM_DOMAIN_MEM, &allocator_mem);
+    alloc.ctx = &allocator_mem;
+    PyMem_SetAllocator(PYMEM_DOMAIN_MEM, &alloc);
+
+    PyMem_GetAllocator(PYMEM_DOMAIN_OBJ, &allocator_obj);
+    alloc.ctx = &allocator_obj;
+    PyMem_SetAllocator(PYMEM_DOMAIN_OBJ, &alloc);
+
+    tracemalloc_config.tracing = 1;
+    return 0;
+}
+
+/* Stop tracing and forget all traces.  Called by Py_Finalize(). */
+void
+_PyTraceMalloc_Stop(void)
+{
+    if (!tracemalloc_config.tracing)
+        return;
+    tracemalloc_config.tracing = 0;
+
+    PyMem_SetAllocator(PYMEM_DOMAIN_MEM, &allocator_mem);
+    PyMem_SetAllocator(PYMEM_DOMAIN_OBJ, &allocator_obj);
+
+    tracemalloc_clear_traces();
+}
+
+
+/* Python functions */
+
+/* Convert the traceback to a tuple of (filename, lineno) tuples, most
+   recent call first.  The tuples are cached in the dict "cache" keyed
+   by the address of the interned traceback. */
+static PyObject *
+traceback_to_pyobject(traceback_t *traceback, PyObject *cache)
+{
+    PyObject *key = NULL, *frames;
+    int i;
+
+    if (cache != NULL) {
+        key = PyLong_FromVoidPtr(traceback);
+        if (key == NULL)
+            return NULL;
+        frames = PyDict_GetItem(cache, key);
+        if (frames != NULL) {
+            Py_DECREF(key);
+            Py_INCREF(frames);
+            return frames;
+        }
+    }
+
+    frames = PyTuple_New(traceback->nframe);
+    if (frames == NULL)
+        goto error;
+    for (i = 0; i < traceback->nframe; i++) {
+        frame_t *frame = &traceback->frames[i];
+        PyObject *item = Py_BuildValue("Oi", frame->filename, frame->lineno);
+        if (item == NULL)
+            goto error;
+        PyTuple_SET_ITEM(frames, i, item);
+    }
+
+    if (cache != NULL) {
+        if (PyDict_SetItem(cache, key, frames) < 0)
+            goto error;
+        Py_DECREF(key);
+    }
+    return frames;
+
+error:
+    Py_XDECREF(key);
+    Py_XDECREF(frames);
+    return NULL;
+}
+
+PyDoc_STRVAR(start_doc,
+"start(nframe=1)\n\
+\n\
+Start tracing Python memory allocations, storing at most nframe frames\n\
+per traceback.");
+
+static PyObject *
+tracemalloc_start(PyObject *self, PyObject *args)
+{
+    int nframe = 1;
+
+    if (!PyArg_ParseTuple(args, "|i:start", &nframe))
+        return NULL;
+    if (_PyTraceMalloc_Start(nframe) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(stop_doc,
+"stop()\n\
+\n\
+Stop tracing Python memory allocations and clear the traces.");
+
+static PyObject *
+tracemalloc_stop(PyObject *self)
+{
+    _PyTraceMalloc_Stop();
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(is_tracing_doc,
+"is_tracing() -> bool\n\
+\n\
+True if the tracemalloc module is tracing Python memory allocations.");
+
+static PyObject *
+tracemalloc_is_tracing(PyObject *self)
+{
+    return PyBool_FromLong(tracemalloc_config.tracing);
+}
+
+PyDoc_STRVAR(clear_traces_doc,
+"clear_traces()\n\
+\n\
+Clear the traces of the memory blocks allocated by Python.");
+
+static PyObject *
+tracemalloc_clear(PyObject *self)
+{
+    if (tracemalloc_config.tracing)
+        tracemalloc_clear_traces();
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(get_traceback_limit_doc,
+"get_traceback_limit() -> int\n\
+\n\
+Return the maximum number of frames stored in the traceback of a trace.");
+
+static PyObject *
+tracemalloc_get_traceback_limit(PyObject *self)
+{
+    return PyInt_FromLong(tracemalloc_config.max_nframe);
+}
+
+PyDoc_STRVAR(get_traced_memory_doc,
+"get_traced_memory() -> (int, int)\n\
+\n\
+Return the current size and the peak size of the memory blocks traced\n\
+by the tracemalloc module, in bytes.");
+
+static PyObject *
+tracemalloc_get_traced_memory(PyObject *self)
+{
+    size_t size, peak;
+
+    if (!tracemalloc_config.tracing)
+        return Py_BuildValue("ii", 0, 0);
+
+    TABLES_LOCK();
+    size = tracemalloc_traced_memory;
+    peak = tracemalloc_peak_traced_memory;
+    TABLES_UNLOCK();
+    return Py_BuildValue("nn", (Py_ssize_t)size, (Py_ssize_t)peak);
+}
+
+PyDoc_STRVAR(get_tracemalloc_memory_doc,
+"get_tracemalloc_memory() -> int\n\
+\n\
+Return the memory usage of the tracemalloc module itself, used to store\n\
+the traces and the tracebacks, in bytes.");
+
+static PyObject *
+tracemalloc_get_tracemalloc_memory(PyObject *self)
+{
+    size_t size = 0;
+
+    if (tracemalloc_traces != NULL) {
+        TABLES_LOCK();
+        size += tracemalloc_traces->num_buckets * sizeof(entry_t *);
+        size += tracemalloc_traces->entries * sizeof(entry_t);
+        TABLES_UNLOCK();
+        size += tracemalloc_tracebacks->num_buckets * sizeof(entry_t *);
+        size += tracemalloc_tracebacks->entries * sizeof(entry_t);
+        size += tracemalloc_tracebacks_memory;
+    }
+    return PyInt_FromSize_t(size);
+}
+
+PyDoc_STRVAR(get_traces_doc,
+"_get_traces() -> list\n\
+\n\
+Get the traces of the memory blocks allocated by Python: a list of\n\
+(size, traceback) tuples, where traceback is a tuple of\n\
+(filename, lineno) tuples, most recent call first.\n\
+\n\
+Return an empty list if the tracemalloc module is disabled.");
+
+static PyObject *
+tracemalloc_get_traces(PyObject *self)
+{
+    entry_t *copy = NULL, *entry;
+    size_t ntraces = 0, i, j;
+    PyObject *list, *cache = NULL;
+
+    list = PyList_New(0);
+    if (list == NULL || !tracemalloc_config.tracing)
+        return list;
+
+    /* Copy the traces, so that the table is not locked while building the
+       list: the objects allocated meanwhile are traced as well. */
+    TABLES_LOCK();
+    if (tracemalloc_traces->entries != 0) {
+        copy = (entry_t *)malloc(tracemalloc_traces->entries
+                                 * sizeof(entry_t));
+        if (copy != NULL) {
+            for (i = 0; i < tracemalloc_traces->num_buckets; i++) {
+                entry = tracemalloc_traces->buckets[i];
+                for (; entry != NULL; entry = entry->next)
+                    copy[ntraces++] = *entry;
+            }
+        }
+        else
+            ntraces = tracemalloc_traces->entries;
+    }
+    TABLES_UNLOCK();
+    if (ntraces == 0)
+        return list;
+    if (copy == NULL)
+        goto nomemory;
+
+    cache = PyDict_New();
+    if (cache == NULL)
+        goto error;
+    for (j = 0; j < ntraces; j++) {
+        PyObject *frames, *trace;
+        int res;
+
+        frames = traceback_to_pyobject(copy[j].traceback, cache);
+        if (frames == NULL)
+            goto error;
+        trace = Py_BuildValue("(nN)", (Py_ssize_t)copy[j].size, frames);
+        if (trace == NULL)
+            goto error;
+        res = PyList_Append(list, trace);
+        Py_DECREF(trace);
+        if (res < 0)
+            goto error;
+    }
+    free(copy);
+    Py_DECREF(cache);
+    return list;
+
+nomemory:
+    PyErr_NoMemory();
+error:
+    free(copy);
+    Py_XDECREF(cache);
+    Py_DECREF(list);
+    return NULL;
+}
+
+PyDoc_STRVAR(get_object_traceback_doc,
+"_get_object_traceback(obj) -> tuple or None\n\
+\n\
+Get the traceback where the Python object obj was allocated, as a tuple\n\
+of (filename, lineno) tuples, most recent call first.\n\
+\n\
+Return None if the tracemalloc module is disabled or did not trace the\n\
+allocation of the object.");
+
+static PyObject *
+tracemalloc_get_object_traceback(PyObject *self, PyObject *obj)
+{
+    void *ptr;
+    entry_t *entry;
+    traceback_t *traceback = NULL;
+
+    if (!tracemalloc_config.tracing)
+        Py_RETURN_NONE;
+
+    if (PyType_IS_GC(Py_TYPE(obj)))
+        ptr = (void *)((char *)obj - sizeof(PyGC_Head));
+    else
+        ptr = (void *)obj;
+
+    TABLES_LOCK();
+    entry = hashtable_get_entry(tracemalloc_traces, ptr);
+    if (entry != NULL)
+        traceback = entry->traceback;
+    TABLES_UNLOCK();
+
+    if (traceback == NULL)
+        Py_RETURN_NONE;
+    return traceback_to_pyobject(traceback, NULL);
+}
+
+static PyMethodDef tracemalloc_methods[] = {
+    {"start", tracemalloc_start, METH_VARARGS, start_doc},
+    {"stop", (PyCFunction)tracemalloc_stop, METH_NOARGS, stop_doc},
+    {"is_tracing", (PyCFunction)tracemalloc_is_tracing,
+     METH_NOARGS, is_tracing_doc},
+    {"clear_traces", (PyCFunction)tracemalloc_clear,
+     METH_NOARGS, clear_traces_doc},
+    {"get_traceback_limit", (PyCFunction)tracemalloc_get_traceback_limit,
+     METH_NOARGS, get_traceback_limit_doc},
+    {"get_traced_memory", (PyCFunction)tracemalloc_get_traced_memory,
+     METH_NOARGS, get_traced_memory_doc},
+    {"get_tracemalloc_memory",
+     (PyCFunction)tracemalloc_get_tracemalloc_memory,
+     METH_NOARGS, get_tracemalloc_memory_doc},
+    {"_get_traces", (PyCFunction)tracemalloc_get_traces,
+     METH_NOARGS, get_traces_doc},
+    {"_get_object_traceback", tracemalloc_get_object_traceback,
+     METH_O, get_object_traceback_doc},
+    {NULL, NULL}                /* sentinel */
+};
+
+PyDoc_STRVAR(module_doc,
+"Debug module to trace memory blocks allocated by Python.\n\
+\n\
+See the tracemalloc module for the high-level interface.");
+
+PyMODINIT_FUNC
+init_tracemalloc(void)
+{
+    Py_InitModule3("_tracemalloc", tracemalloc_methods, module_doc);
+}
@@ -1979,6 +1979,10 @@ array_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 #ifdef Py_USING_UNICODE
             } else if (initial != NULL && PyUnicode_Check(initial))  {
                 Py_ssize_t n = PyUnicode_GET_DATA_SIZE(initial);
+                if (PyUnicode_AS_DATA(initial) == NULL) {
+                    Py_DECREF(a);
+                    return NULL;
+                }
                 if (n > 0) {
                     arrayobject *self = (arrayobject *)a;
                     char *item = self->ob_item;
@@ -1378,6 +1378,8 @@ save_unicode(Picklerobject *self, PyObject *args, int doput)
         char *repr_str;
         static char string = UNICODE;
 
+        if (PyUnicode_AS_UNICODE(args) == NULL)
+            return -1;
         repr = modified_EncodeRawUnicodeEscape(
             PyUnicode_AS_UNICODE(args), PyUnicode_GET_SIZE(args));
         if (!repr)
@@ -319,6 +319,8 @@ multibytecodec_encerror(MultibyteCodec *codec,
     {
         const Py_UNICODE *uraw = PyUnicode_AS_UNICODE(tobj);
 
+        if (uraw == NULL)
+            goto errorexit;
         retstr = multibytecodec_encode(codec, state, &uraw,
                         PyUnicode_GET_SIZE(tobj), ERROR_STRICT,
                         MBENC_FLUSH);
@@ -437,6 +439,8 @@ multibytecodec_decerror(MultibyteCodec *codec,
 
     retunisize = PyUnicode_GET_SIZE(retuni);
     if (retunisize > 0) {
+        if (PyUnicode_AS_DATA(retuni) == NULL)
+            goto errorexit;
         REQUIRE_DECODEBUFFER(buf, retunisize);
         memcpy((char *)buf->outbuf, PyUnicode_AS_DATA(retuni),
                         retunisize * Py_UNICODE_SIZE);
@@ -566,6 +570,10 @@ MultibyteCodec_Encode(MultibyteCodecObject *self,
     }
 
     data = PyUnicode_AS_UNICODE(arg);
+    if (data == NULL) {
+        Py_XDECREF(ucvt);
+        return NULL;
+    }
     datalen = PyUnicode_GET_SIZE(arg);
 
     errorcb = internal_error_callback(errors);
@@ -749,6 +757,11 @@ encoder_encode_stateful(MultibyteStatefulEncoderContext *ctx,
         }
     }
 
+    if (PyUnicode_AS_UNICODE(unistr) == NULL) {
+        Py_XDECREF(ucvt);
+        return NULL;
+    }
+
     datalen = PyUnicode_GET_SIZE(unistr);
     origpending = ctx->pendingsize;
 
@@ -57,6 +57,9 @@ static int collecting = 0;
 /* list of uncollectable objects */
 static PyObject *garbage = NULL;
 
+/* list of callables invoked before and after each collection */
+static PyObject *callbacks = NULL;
+
 /* Python string to use if unhandled exception occurs */
 static PyObject *gc_str = NULL;
 
@@ -816,9 +819,10 @@ get_time(void)
 }
 
 /* This is the main function.  Read this to understand how the
- * collection process works. */
+ * collection process works.  The numbers of collected and uncollectable
+ * objects are stored in *n_collected and *n_uncollectable. */
 static Py_ssize_t
-collect(int generation)
+collect(int generation, Py_ssize_t *n_collected, Py_ssize_t *n_uncollectable)
 {
     int i;
     Py_ssize_t m = 0; /* # objects collected */
@@ -972,9 +976,73 @@ collect(int generation)
         PyErr_WriteUnraisable(gc_str);
         Py_FatalError("unexpected exception during garbage collection");
     }
+    *n_collected = m;
+    *n_uncollectable = n;
     return n+m;
 }
 
+/* Invoke the callables of gc.callbacks with the phase of the collection
+ * ("start" or "stop") and a dict describing it.  The duration is only
+ * reported at the end of the collection.
+ */
+static void
+invoke_gc_callback(const char *phase, int generation,
+                   Py_ssize_t collected, Py_ssize_t uncollectable,
+                   double duration)
+{
+    Py_ssize_t i;
+    PyObject *info;
+
+    assert(!PyErr_Occurred());
+    if (strcmp(phase, "start") == 0)
+        info = Py_BuildValue("{sisnsn}",
+                             "generation", generation,
+                             "collected", collected,
+                             "uncollectable", uncollectable);
+    else
+        info = Py_BuildValue("{sisnsnsd}",
+                             "generation", generation,
+                             "collected", collected,
+                             "uncollectable", uncollectable,
+                             "duration", duration);
+    if (info == NULL) {
+        PyErr_WriteUnraisable(NULL);
+        return;
+    }
+    /* the list may be modified by the callbacks */
+    for (i = 0; i < PyList_GET_SIZE(callbacks); i++) {
+        PyObject *r, *cb = PyList_GET_ITEM(callbacks, i);
+        Py_INCREF(cb);
+        r = PyObject_CallFunction(cb, "sO", phase, info);
+        if (r == NULL)
+            PyErr_WriteUnraisable(cb);
+        else
+            Py_DECREF(r);
+        Py_DECREF(cb);
+    }
+    Py_DECREF(info);
+    assert(!PyErr_Occurred());
+}
+
+/* Perform a collection of the given generation, and report it to the
+ * callbacks registered in gc.callbacks, if any.
+ */
+static Py_ssize_t
+collect_with_callback(int generation)
+{
+    Py_ssize_t result, collected, uncollectable;
+    double t1;
+
+    if (callbacks == NULL || PyList_GET_SIZE(callbacks) == 0)
+        return collect(generation, &collected, &uncollectable);
+    invoke_gc_callback("start", generation, 0, 0, 0.0);
+    t1 = get_time();
+    result = collect(generation, &collected, &uncollectable);
+    invoke_gc_callback("stop", generation, collected, uncollectable,
+                       get_time() - t1);
+    return result;
+}
+
 static Py_ssize_t
 collect_generations(void)
 {
@@ -993,7 +1061,7 @@ collect_generations(void)
             if (i == NUM_GENERATIONS - 1
                 && long_lived_pending < long_lived_total / 4)
                 continue;
-            n = collect(i);
+            n = collect_with_callback(i);
             break;
         }
     }
@@ -1064,7 +1132,7 @@ gc_collect(PyObject *self, PyObject *args, PyObject *kws)
         n = 0; /* already collecting, don't do anything */
     else {
         collecting = 1;
-        n = collect(genarg);
+        n = collect_with_callback(genarg);
         collecting = 0;
     }
 
@@ -1350,6 +1418,15 @@ initgc(void)
     if (PyModule_AddObject(m, "garbage", garbage) < 0)
         return;
 
+    if (callbacks == NULL) {
+        callbacks = PyList_New(0);
+        if (callbacks == NULL)
+            return;
+    }
+    Py_INCREF(callbacks);
+    if (PyModule_AddObject(m, "callbacks", callbacks) < 0)
+        return;
+
     /* Importing can't be done in collect() because collect()
      * can be called via PyGC_Collect() in Py_Finalize().
      * This wouldn't be a problem, except that <initialized> is
@@ -1383,7 +1460,7 @@ PyGC_Collect(void)
         n = 0; /* already collecting, don't do anything */
     else {
         collecting = 1;
-        n = collect(NUM_GENERATIONS - 1);
+        n = collect_with_callback(NUM_GENERATIONS - 1);
         collecting = 0;
     }
 
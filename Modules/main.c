@@ -101,6 +101,10 @@ PYTHONHOME   : alternate <prefix> directory (or <prefix>%c<exec_prefix>).\n\
                The default module search path uses %s.\n\
 PYTHONCASEOK : ignore case in 'import' statements (Windows).\n\
 PYTHONIOENCODING: Encoding[:errors] used for stdin/stdout/stderr.\n\
+PYTHONTRACEMALLOC: trace memory allocations from startup, storing that many\n\
+               frames per traceback (see the tracemalloc module).\n\
+PYTHONIMPORTTIME: show how long each import takes.\n\
+PYTHONSITECACHE: file caching the sys.path entries added by the site module.\n\
 ";
 
 
@@ -1464,9 +1464,9 @@ posix_do_stat(PyObject *self, PyObject *args,
     if (PyArg_ParseTuple(args, wformat, &po)) {
         Py_UNICODE *wpath = PyUnicode_AS_UNICODE(po);
 
+        if (wpath == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
-            /* PyUnicode_AS_UNICODE result OK without
-               thread lock as it is a simple dereference. */
         res = wstatfunc(wpath, &st);
         Py_END_ALLOW_THREADS
 
@@ -1522,9 +1522,11 @@ posix_access(PyObject *self, PyObject *args)
     DWORD attr;
     PyUnicodeObject *po;
     if (PyArg_ParseTuple(args, "Ui:access", &po, &mode)) {
+        if (PyUnicode_AS_UNICODE(po) == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
-        /* PyUnicode_AS_UNICODE OK without thread lock as
-           it is a simple dereference. */
+        /* PyUnicode_AS_UNICODE OK without thread lock now that
+           the buffer is built: it is a simple dereference. */
         attr = GetFileAttributesW(PyUnicode_AS_UNICODE(po));
         Py_END_ALLOW_THREADS
         goto finish;
@@ -1674,6 +1676,8 @@ posix_chmod(PyObject *self, PyObject *args)
     DWORD attr;
     PyUnicodeObject *po;
     if (PyArg_ParseTuple(args, "Ui|:chmod", &po, &i)) {
+        if (PyUnicode_AS_UNICODE(po) == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
         attr = GetFileAttributesW(PyUnicode_AS_UNICODE(po));
         if (attr != 0xFFFFFFFF) {
@@ -2091,6 +2095,8 @@ posix_listdir(PyObject *self, PyObject *args)
         WIN32_FIND_DATAW wFileData;
         Py_UNICODE *wnamebuf;
         /* Overallocate for \\*.*\0 */
+        if (PyUnicode_AS_UNICODE(po) == NULL)
+            return NULL;
         len = PyUnicode_GET_SIZE(po);
         wnamebuf = malloc((len + 5) * sizeof(wchar_t));
         if (!wnamebuf) {
@@ -2395,6 +2401,8 @@ posix__getfullpathname(PyObject *self, PyObject *args)
         Py_UNICODE *wtemp;
         DWORD result;
         PyObject *v;
+        if (wpath == NULL)
+            return NULL;
         result = GetFullPathNameW(wpath,
                                   sizeof(woutbuf)/sizeof(woutbuf[0]),
                                   woutbuf, &wtemp);
@@ -2445,9 +2453,11 @@ posix_mkdir(PyObject *self, PyObject *args)
 #ifdef MS_WINDOWS
     PyUnicodeObject *po;
     if (PyArg_ParseTuple(args, "U|i:mkdir", &po, &mode)) {
+        if (PyUnicode_AS_UNICODE(po) == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
-        /* PyUnicode_AS_UNICODE OK without thread lock as
-           it is a simple dereference. */
+        /* PyUnicode_AS_UNICODE OK without thread lock now that
+           the buffer is built: it is a simple dereference. */
         res = CreateDirectoryW(PyUnicode_AS_UNICODE(po), NULL);
         Py_END_ALLOW_THREADS
         if (!res)
@@ -2744,6 +2754,8 @@ posix_utime(PyObject *self, PyObject *args)
 
     if (PyArg_ParseTuple(args, "UO|:utime", &obwpath, &arg)) {
         wpath = PyUnicode_AS_UNICODE(obwpath);
+        if (wpath == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
         hFile = CreateFileW(wpath, FILE_WRITE_ATTRIBUTES, 0,
                             NULL, OPEN_EXISTING,
@@ -6320,9 +6332,11 @@ posix_open(PyObject *self, PyObject *args)
 #ifdef MS_WINDOWS
     PyUnicodeObject *po;
     if (PyArg_ParseTuple(args, "Ui|i:mkdir", &po, &flag, &mode)) {
+        if (PyUnicode_AS_UNICODE(po) == NULL)
+            return NULL;
         Py_BEGIN_ALLOW_THREADS
-        /* PyUnicode_AS_UNICODE OK without thread
-           lock as it is a simple dereference. */
+        /* PyUnicode_AS_UNICODE OK without thread lock now that
+           the buffer is built: it is a simple dereference. */
         fd = _wopen(PyUnicode_AS_UNICODE(po), flag, mode);
         Py_END_ALLOW_THREADS
         if (fd < 0)
@@ -8327,6 +8341,12 @@ win32_startfile(PyObject *self, PyObject *args)
         }
     }
 
+    if (PyUnicode_AS_UNICODE(unipath) == NULL ||
+        (woperation && PyUnicode_AS_UNICODE(woperation) == NULL)) {
+        Py_XDECREF(woperation);
+        return NULL;
+    }
+
     Py_BEGIN_ALLOW_THREADS
     rc = ShellExecuteW((HWND)0, woperation ? PyUnicode_AS_UNICODE(woperation) : 0,
         PyUnicode_AS_UNICODE(unipath),
@@ -1251,6 +1251,7 @@ PyUnknownEncodingHandler(void *encodingHandlerData,
                          XML_Encoding *info)
 {
     PyUnicodeObject *_u_string = NULL;
+    Py_UNICODE *u;
     int result = 0;
     int i;
 
@@ -1260,10 +1261,14 @@ PyUnknownEncodingHandler(void *encodingHandlerData,
 
     if (_u_string == NULL)
         return result;
+    u = PyUnicode_AS_UNICODE(_u_string);
+    if (u == NULL) {
+        Py_DECREF(_u_string);
+        return result;
+    }
 
     for (i = 0; i < 256; i++) {
-        /* Stupid to access directly, but fast */
-        Py_UNICODE c = _u_string->str[i];
+        Py_UNICODE c = u[i];
         if (c == Py_UNICODE_REPLACEMENT_CHARACTER)
             info->map[i] = -1;
         else
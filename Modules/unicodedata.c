@@ -776,6 +776,8 @@ unicodedata_normalize(PyObject *self, PyObject *args)
         Py_INCREF(input);
         return input;
     }
+    if (PyUnicode_AS_UNICODE(input) == NULL)
+        return NULL;
 
     if (strcmp(form, "NFC") == 0) {
         if (is_normalized(self, input, 1, 0)) {
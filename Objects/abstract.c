@@ -521,10 +521,10 @@ PyBuffer_ToContiguous(void *buf, Py_buffer *view, Py_ssize_t len, char fort)
      */
     elements = len / view->itemsize;
     while (elements--) {
-        addone(view->ndim, indices, view->shape);
         ptr = PyBuffer_GetPointer(view, indices);
         memcpy(dest, ptr, view->itemsize);
         dest += view->itemsize;
+        addone(view->ndim, indices, view->shape);
     }
     PyMem_Free(indices);
     return 0;
@@ -572,10 +572,10 @@ PyBuffer_FromContiguous(Py_buffer *view, void *buf, Py_ssize_t len, char fort)
      */
     elements = len / view->itemsize;
     while (elements--) {
-        addone(view->ndim, indices, view->shape);
         ptr = PyBuffer_GetPointer(view, indices);
         memcpy(ptr, src, view->itemsize);
         src += view->itemsize;
+        addone(view->ndim, indices, view->shape);
     }
 
     PyMem_Free(indices);
@@ -1661,10 +1661,13 @@ PyNumber_Int(PyObject *o)
         return int_from_string(PyString_AS_STRING(o),
                                PyString_GET_SIZE(o));
 #ifdef Py_USING_UNICODE
-    if (PyUnicode_Check(o))
+    if (PyUnicode_Check(o)) {
+        if (PyUnicode_AS_UNICODE(o) == NULL)
+            return NULL;
         return PyInt_FromUnicode(PyUnicode_AS_UNICODE(o),
                                  PyUnicode_GET_SIZE(o),
                                  10);
+    }
 #endif
     if (!PyObject_AsCharBuffer(o, &buffer, &buffer_len))
         return int_from_string((char*)buffer, buffer_len);
@@ -1752,11 +1755,14 @@ PyNumber_Long(PyObject *o)
         return long_from_string(PyString_AS_STRING(o),
                                 PyString_GET_SIZE(o));
 #ifdef Py_USING_UNICODE
-    if (PyUnicode_Check(o))
+    if (PyUnicode_Check(o)) {
         /* The above check is done in PyLong_FromUnicode(). */
+        if (PyUnicode_AS_UNICODE(o) == NULL)
+            return NULL;
         return PyLong_FromUnicode(PyUnicode_AS_UNICODE(o),
                                   PyUnicode_GET_SIZE(o),
                                   10);
+    }
 #endif
     if (!PyObject_AsCharBuffer(o, &buffer, &buffer_len))
         return long_from_string(buffer, buffer_len);
@@ -1,5 +1,6 @@
 #include "Python.h"
 #include "code.h"
+#include "opcode.h"
 #include "structmember.h"
 
 #define NAME_CHARS \
@@ -104,10 +105,61 @@ PyCode_New(int argcount, int nlocals, int stacksize, int flags,
         co->co_lnotab = lnotab;
         co->co_zombieframe = NULL;
         co->co_weakreflist = NULL;
+        co->co_opcache_map = NULL;
+        co->co_opcache = NULL;
+        co->co_opcache_flag = 0;
+        co->co_opcache_size = 0;
     }
     return co;
 }
 
+int
+_PyCode_InitOpcache(PyCodeObject *co)
+{
+    unsigned char *code = (unsigned char *)PyString_AS_STRING(co->co_code);
+    Py_ssize_t co_size = PyString_GET_SIZE(co->co_code);
+    Py_ssize_t i;
+    int opts = 0, opcode;
+
+    co->co_opcache_map = (unsigned char *)PyMem_MALLOC(co_size);
+    if (co->co_opcache_map == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    memset(co->co_opcache_map, 0, co_size);
+
+    /* The map is indexed by the offset of the byte following the
+       instruction, since that is what the eval loop has at hand once
+       the oparg has been decoded.  Only 255 entries fit in a byte. */
+    for (i = 0; i < co_size; ) {
+        opcode = code[i];
+        i += HAS_ARG(opcode) ? 3 : 1;
+        if ((opcode == LOAD_GLOBAL || opcode == LOAD_ATTR) &&
+            opts < 255) {
+            co->co_opcache_map[i - 1] = (unsigned char)++opts;
+        }
+    }
+
+    if (opts) {
+        co->co_opcache = (_PyOpcache *)PyMem_MALLOC(
+            opts * sizeof(_PyOpcache));
+        if (co->co_opcache == NULL) {
+            PyMem_FREE(co->co_opcache_map);
+            co->co_opcache_map = NULL;
+            PyErr_NoMemory();
+            return -1;
+        }
+        memset(co->co_opcache, 0, opts * sizeof(_PyOpcache));
+    }
+    else {
+        PyMem_FREE(co->co_opcache_map);
+        co->co_opcache_map = NULL;
+        co->co_opcache = NULL;
+    }
+    co->co_opcache_size = opts;
+    return 0;
+}
+
 PyCodeObject *
 PyCode_NewEmpty(const char *filename, const char *funcname, int firstlineno)
 {
@@ -317,6 +369,10 @@ code_dealloc(PyCodeObject *co)
         PyObject_GC_Del(co->co_zombieframe);
     if (co->co_weakreflist != NULL)
         PyObject_ClearWeakRefs((PyObject*)co);
+    if (co->co_opcache_map != NULL)
+        PyMem_FREE(co->co_opcache_map);
+    if (co->co_opcache != NULL)
+        PyMem_FREE(co->co_opcache);
     PyObject_DEL(co);
 }
 
@@ -984,6 +984,8 @@ complex_subtype_from_string(PyTypeObject *type, PyObject *v)
     }
 #ifdef Py_USING_UNICODE
     else if (PyUnicode_Check(v)) {
+        if (PyUnicode_AS_UNICODE(v) == NULL)
+            return NULL;
         s_buffer = (char *)PyMem_MALLOC(PyUnicode_GET_SIZE(v)+1);
         if (s_buffer == NULL)
             return PyErr_NoMemory();
@@ -149,6 +149,37 @@ _PyDict_Dummy(void)
 static PyDictEntry *
 lookdict_string(PyDictObject *mp, PyObject *key, long hash);
 
+/* The key table shared by split dicts (see Include/dictobject.h).  Only
+   me_hash and me_key of the entries are used; the table owns a reference
+   to each key and never contains dummies. */
+struct _dictkeysobject {
+    Py_ssize_t dk_refcnt;
+    Py_ssize_t dk_mask;         /* dk_table has dk_mask + 1 slots */
+    Py_ssize_t dk_used;         /* # keys in dk_table */
+    PyDictEntry dk_table[1];
+};
+
+#define DK_INCREF(dk) ((dk)->dk_refcnt++)
+#define DK_DECREF(dk) \
+    do { if (--(dk)->dk_refcnt == 0) free_keys_object(dk); } while (0)
+
+/* A new key can go in a shared table as long as the table stays less than
+   2/3 full, the load at which a combined table would be resized. */
+#define DK_HAS_ROOM(dk) (((dk)->dk_used + 1) * 3 < ((dk)->dk_mask + 1) * 2)
+
+/* A split dict doesn't use ma_smalltable for entries, so up to this many
+   values are stored there instead of in a separate allocation. */
+#define SMALL_VALUES (PyDict_MINSIZE * sizeof(PyDictEntry) / sizeof(PyObject *))
+#define VALUES_ARE_SMALL(mp) \
+    ((mp)->ma_values == (PyObject **)(mp)->ma_smalltable)
+
+/* The value in slot i of the table of mp */
+#define ENTRY_VALUE(mp, i) \
+    ((mp)->ma_values != NULL ? (mp)->ma_values[i] : (mp)->ma_table[i].me_value)
+
+static void free_keys_object(PyDictKeysObject *keys);
+static int dictresize(PyDictObject *mp, Py_ssize_t minused);
+
 #ifdef SHOW_CONVERSION_COUNTS
 static long created = 0L;
 static long converted = 0L;
@@ -218,6 +249,14 @@ show_track(void)
     INIT_NONZERO_DICT_SLOTS(mp);                                        \
     } while(0)
 
+/* Global counter used to set ma_version_tag field of dictionaries.
+ * It is incremented each time that a dictionary is created and each
+ * time that a dictionary is modified, so that two live dicts never share
+ * a version and a dict never sees the same version twice. */
+static _Py_dict_version_t pydict_global_version = 0;
+
+#define DICT_NEXT_VERSION() (++pydict_global_version)
+
 /* Dictionary reuse scheme to save calls to malloc, free, and memset */
 #ifndef PyDict_MAXFREELIST
 #define PyDict_MAXFREELIST 80
@@ -283,6 +322,9 @@ PyDict_New(void)
 #endif
     }
     mp->ma_lookup = lookdict_string;
+    mp->ma_version_tag = DICT_NEXT_VERSION();
+    mp->ma_keys = NULL;
+    mp->ma_values = NULL;
 #ifdef SHOW_TRACK_COUNT
     count_untracked++;
 #endif
@@ -492,7 +534,7 @@ _PyDict_MaybeUntrack(PyObject *op)
     ep = mp->ma_table;
     mask = mp->ma_mask;
     for (i = 0; i <= mask; i++) {
-        if ((value = ep[i].me_value) == NULL)
+        if ((value = ENTRY_VALUE(mp, i)) == NULL)
             continue;
         if (_PyObject_GC_MAY_BE_TRACKED(value) ||
             _PyObject_GC_MAY_BE_TRACKED(ep[i].me_key))
@@ -516,6 +558,41 @@ insertdict(register PyDictObject *mp, PyObject *key, long hash, PyObject *value)
     register PyDictEntry *ep;
     typedef PyDictEntry *(*lookupfunc)(PyDictObject *, PyObject *, long);
 
+    if (mp->ma_values != NULL) {
+        if (PyString_CheckExact(key)) {
+            ep = lookdict_string(mp, key, hash);
+            if (ep->me_key != NULL || DK_HAS_ROOM(mp->ma_keys)) {
+                Py_ssize_t ix = ep - mp->ma_table;
+                MAINTAIN_TRACKING(mp, key, value);
+                mp->ma_version_tag = DICT_NEXT_VERSION();
+                if (ep->me_key == NULL) {
+                    /* The key is added for all the dicts sharing the
+                       table, which takes over the reference. */
+                    ep->me_key = key;
+                    ep->me_hash = (Py_ssize_t)hash;
+                    mp->ma_keys->dk_used++;
+                }
+                else
+                    Py_DECREF(key);
+                old_value = mp->ma_values[ix];
+                mp->ma_values[ix] = value;
+                if (old_value == NULL) {
+                    mp->ma_used++;
+                    mp->ma_fill++;
+                }
+                else
+                    Py_DECREF(old_value); /* which **CAN** re-enter */
+                return 0;
+            }
+        }
+        /* The key can't go in the shared table: stop sharing it */
+        if (dictresize(mp, (mp->ma_used + 1) * 2) < 0) {
+            Py_DECREF(key);
+            Py_DECREF(value);
+            return -1;
+        }
+    }
+
     assert(mp->ma_lookup != NULL);
     ep = mp->ma_lookup(mp, key, hash);
     if (ep == NULL) {
@@ -524,6 +601,7 @@ insertdict(register PyDictObject *mp, PyObject *key, long hash, PyObject *value)
         return -1;
     }
     MAINTAIN_TRACKING(mp, key, value);
+    mp->ma_version_tag = DICT_NEXT_VERSION();
     if (ep->me_value != NULL) {
         old_value = ep->me_value;
         ep->me_value = value;
@@ -578,10 +656,50 @@ insertdict_clean(register PyDictObject *mp, PyObject *key, long hash,
     mp->ma_used++;
 }
 
+/*
+Turn the split table of mp into a combined table of the given size, dropping
+its reference to the shared keys.  newtable is either a fresh allocation or
+ma_smalltable.
+*/
+static void
+dict_unsplit(PyDictObject *mp, PyDictEntry *newtable, Py_ssize_t newsize)
+{
+    PyDictKeysObject *keys = mp->ma_keys;
+    PyObject **values = mp->ma_values;
+    PyObject *small_values[SMALL_VALUES];
+    PyDictEntry *ep;
+    Py_ssize_t i, size = mp->ma_mask + 1;
+
+    if (VALUES_ARE_SMALL(mp)) {
+        /* newtable may well be ma_smalltable */
+        memcpy(small_values, values, size * sizeof(PyObject *));
+        values = small_values;
+    }
+    mp->ma_keys = NULL;
+    mp->ma_values = NULL;
+    mp->ma_table = newtable;
+    mp->ma_mask = newsize - 1;
+    memset(newtable, 0, sizeof(PyDictEntry) * newsize);
+    mp->ma_used = 0;
+    mp->ma_fill = 0;
+
+    for (i = 0; i < size; i++) {
+        if (values[i] != NULL) {
+            ep = &keys->dk_table[i];
+            Py_INCREF(ep->me_key);
+            insertdict_clean(mp, ep->me_key, (long)ep->me_hash, values[i]);
+        }
+    }
+    if (values != small_values)
+        PyMem_FREE(values);
+    DK_DECREF(keys);
+}
+
 /*
 Restructure the table by allocating a new table and reinserting all
 items again.  When entries have been deleted, the new table may
-actually be smaller than the old one.
+actually be smaller than the old one.  A split table always becomes a
+combined one.
 */
 static int
 dictresize(PyDictObject *mp, Py_ssize_t minused)
@@ -604,6 +722,20 @@ dictresize(PyDictObject *mp, Py_ssize_t minused)
         return -1;
     }
 
+    if (mp->ma_values != NULL) {
+        if (newsize == PyDict_MINSIZE)
+            newtable = mp->ma_smalltable;
+        else {
+            newtable = PyMem_NEW(PyDictEntry, newsize);
+            if (newtable == NULL) {
+                PyErr_NoMemory();
+                return -1;
+            }
+        }
+        dict_unsplit(mp, newtable, newsize);
+        return 0;
+    }
+
     /* Get space for a new table. */
     oldtable = mp->ma_table;
     assert(oldtable != NULL);
@@ -735,7 +867,51 @@ PyDict_GetItem(PyObject *op, PyObject *key)
             return NULL;
         }
     }
-    return ep->me_value;
+    return _PyDict_ENTRY_VALUE(mp, ep);
+}
+
+/* Variant of PyDict_GetItem() used when the hash value is already known.
+   Unlike PyDict_GetItem(), the errors raised while comparing keys are not
+   suppressed: NULL is returned with an exception set. */
+PyObject *
+_PyDict_GetItem_KnownHash(PyObject *op, PyObject *key, long hash)
+{
+    PyDictObject *mp = (PyDictObject *)op;
+    PyDictEntry *ep;
+
+    if (!PyDict_Check(op)) {
+        PyErr_BadInternalCall();
+        return NULL;
+    }
+    ep = (mp->ma_lookup)(mp, key, hash);
+    if (ep == NULL)
+        return NULL;
+    return _PyDict_ENTRY_VALUE(mp, ep);
+}
+
+/* Return the index in the table of mp of the entry whose key is the object
+   key itself, or -1 if there is none.  Keys are only compared by identity,
+   so unlike the lookup functions this never runs Python code.  The C
+   OrderedDict uses it to find the slots of the keys it already holds. */
+Py_ssize_t
+_PyDict_KeyIndex(PyObject *op, PyObject *key, long hash)
+{
+    PyDictObject *mp = (PyDictObject *)op;
+    size_t i, perturb;
+    size_t mask = (size_t)mp->ma_mask;
+    PyDictEntry *ep0 = mp->ma_table;
+    PyDictEntry *ep;
+
+    assert(PyDict_Check(op));
+    i = (size_t)hash & mask;
+    ep = &ep0[i];
+    for (perturb = hash; ep->me_key != NULL; perturb >>= PERTURB_SHIFT) {
+        if (ep->me_key == key && _PyDict_ENTRY_VALUE(mp, ep) != NULL)
+            return ep - ep0;
+        i = (i << 2) + i + perturb + 1;
+        ep = &ep0[i & mask];
+    }
+    return -1;
 }
 
 /* CAUTION: PyDict_SetItem() must guarantee that it won't resize the
@@ -747,9 +923,7 @@ PyDict_GetItem(PyObject *op, PyObject *key)
 int
 PyDict_SetItem(register PyObject *op, PyObject *key, PyObject *value)
 {
-    register PyDictObject *mp;
     register long hash;
-    register Py_ssize_t n_used;
 
     if (!PyDict_Check(op)) {
         PyErr_BadInternalCall();
@@ -757,7 +931,6 @@ PyDict_SetItem(register PyObject *op, PyObject *key, PyObject *value)
     }
     assert(key);
     assert(value);
-    mp = (PyDictObject *)op;
     if (PyString_CheckExact(key)) {
         hash = ((PyStringObject *)key)->ob_shash;
         if (hash == -1)
@@ -768,6 +941,24 @@ PyDict_SetItem(register PyObject *op, PyObject *key, PyObject *value)
         if (hash == -1)
             return -1;
     }
+    return _PyDict_SetItem_KnownHash(op, key, value, hash);
+}
+
+/* Variant of PyDict_SetItem() used when the hash value is already known */
+int
+_PyDict_SetItem_KnownHash(PyObject *op, PyObject *key, PyObject *value,
+                          long hash)
+{
+    register PyDictObject *mp;
+    register Py_ssize_t n_used;
+
+    if (!PyDict_Check(op)) {
+        PyErr_BadInternalCall();
+        return -1;
+    }
+    assert(key);
+    assert(value);
+    mp = (PyDictObject *)op;
     assert(mp->ma_fill <= mp->ma_mask);  /* at least one empty slot */
     n_used = mp->ma_used;
     Py_INCREF(value);
@@ -796,10 +987,7 @@ PyDict_SetItem(register PyObject *op, PyObject *key, PyObject *value)
 int
 PyDict_DelItem(PyObject *op, PyObject *key)
 {
-    register PyDictObject *mp;
     register long hash;
-    register PyDictEntry *ep;
-    PyObject *old_value, *old_key;
 
     if (!PyDict_Check(op)) {
         PyErr_BadInternalCall();
@@ -812,20 +1000,47 @@ PyDict_DelItem(PyObject *op, PyObject *key)
         if (hash == -1)
             return -1;
     }
+    return _PyDict_DelItem_KnownHash(op, key, hash);
+}
+
+/* Variant of PyDict_DelItem() used when the hash value is already known */
+int
+_PyDict_DelItem_KnownHash(PyObject *op, PyObject *key, long hash)
+{
+    register PyDictObject *mp;
+    register PyDictEntry *ep;
+    PyObject *old_value, *old_key;
+
+    if (!PyDict_Check(op)) {
+        PyErr_BadInternalCall();
+        return -1;
+    }
+    assert(key);
     mp = (PyDictObject *)op;
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return -1;
-    if (ep->me_value == NULL) {
+    if (_PyDict_ENTRY_VALUE(mp, ep) == NULL) {
         set_key_error(key);
         return -1;
     }
+    if (mp->ma_values != NULL) {
+        /* The key stays in the shared table */
+        old_value = mp->ma_values[ep - mp->ma_table];
+        mp->ma_values[ep - mp->ma_table] = NULL;
+        mp->ma_used--;
+        mp->ma_fill--;
+        mp->ma_version_tag = DICT_NEXT_VERSION();
+        Py_DECREF(old_value);
+        return 0;
+    }
     old_key = ep->me_key;
     Py_INCREF(dummy);
     ep->me_key = dummy;
     old_value = ep->me_value;
     ep->me_value = NULL;
     mp->ma_used--;
+    mp->ma_version_tag = DICT_NEXT_VERSION();
     Py_DECREF(old_value);
     Py_DECREF(old_key);
     return 0;
@@ -846,6 +1061,28 @@ PyDict_Clear(PyObject *op)
     if (!PyDict_Check(op))
         return;
     mp = (PyDictObject *)op;
+    if (mp->ma_values != NULL) {
+        PyDictKeysObject *keys = mp->ma_keys;
+        PyObject **values = mp->ma_values;
+        PyObject *small_values[SMALL_VALUES];
+        Py_ssize_t j, size = mp->ma_mask + 1;
+
+        if (VALUES_ARE_SMALL(mp)) {
+            memcpy(small_values, values, size * sizeof(PyObject *));
+            values = small_values;
+        }
+        /* Same dance as below: empty the dict before any decref */
+        mp->ma_version_tag = DICT_NEXT_VERSION();
+        mp->ma_keys = NULL;
+        mp->ma_values = NULL;
+        EMPTY_TO_MINSIZE(mp);
+        for (j = 0; j < size; j++)
+            Py_XDECREF(values[j]);
+        if (values != small_values)
+            PyMem_FREE(values);
+        DK_DECREF(keys);
+        return;
+    }
 #ifdef Py_DEBUG
     n = mp->ma_mask + 1;
     i = 0;
@@ -862,6 +1099,8 @@ PyDict_Clear(PyObject *op)
      * clearing.
      */
     fill = mp->ma_fill;
+    if (fill > 0)
+        mp->ma_version_tag = DICT_NEXT_VERSION();
     if (table_is_malloced)
         EMPTY_TO_MINSIZE(mp);
 
@@ -921,15 +1160,16 @@ PyDict_Next(PyObject *op, Py_ssize_t *ppos, PyObject **pkey, PyObject **pvalue)
     register Py_ssize_t i;
     register Py_ssize_t mask;
     register PyDictEntry *ep;
+    PyDictObject *mp = (PyDictObject *)op;
 
     if (!PyDict_Check(op))
         return 0;
     i = *ppos;
     if (i < 0)
         return 0;
-    ep = ((PyDictObject *)op)->ma_table;
-    mask = ((PyDictObject *)op)->ma_mask;
-    while (i <= mask && ep[i].me_value == NULL)
+    ep = mp->ma_table;
+    mask = mp->ma_mask;
+    while (i <= mask && ENTRY_VALUE(mp, i) == NULL)
         i++;
     *ppos = i+1;
     if (i > mask)
@@ -937,7 +1177,7 @@ PyDict_Next(PyObject *op, Py_ssize_t *ppos, PyObject **pkey, PyObject **pvalue)
     if (pkey)
         *pkey = ep[i].me_key;
     if (pvalue)
-        *pvalue = ep[i].me_value;
+        *pvalue = ENTRY_VALUE(mp, i);
     return 1;
 }
 
@@ -948,15 +1188,16 @@ _PyDict_Next(PyObject *op, Py_ssize_t *ppos, PyObject **pkey, PyObject **pvalue,
     register Py_ssize_t i;
     register Py_ssize_t mask;
     register PyDictEntry *ep;
+    PyDictObject *mp = (PyDictObject *)op;
 
     if (!PyDict_Check(op))
         return 0;
     i = *ppos;
     if (i < 0)
         return 0;
-    ep = ((PyDictObject *)op)->ma_table;
-    mask = ((PyDictObject *)op)->ma_mask;
-    while (i <= mask && ep[i].me_value == NULL)
+    ep = mp->ma_table;
+    mask = mp->ma_mask;
+    while (i <= mask && ENTRY_VALUE(mp, i) == NULL)
         i++;
     *ppos = i+1;
     if (i > mask)
@@ -965,7 +1206,7 @@ _PyDict_Next(PyObject *op, Py_ssize_t *ppos, PyObject **pkey, PyObject **pvalue,
     if (pkey)
         *pkey = ep[i].me_key;
     if (pvalue)
-        *pvalue = ep[i].me_value;
+        *pvalue = ENTRY_VALUE(mp, i);
     return 1;
 }
 
@@ -978,15 +1219,29 @@ dict_dealloc(register PyDictObject *mp)
     Py_ssize_t fill = mp->ma_fill;
     PyObject_GC_UnTrack(mp);
     Py_TRASHCAN_SAFE_BEGIN(mp)
-    for (ep = mp->ma_table; fill > 0; ep++) {
-        if (ep->me_key) {
-            --fill;
-            Py_DECREF(ep->me_key);
-            Py_XDECREF(ep->me_value);
+    if (mp->ma_values != NULL) {
+        Py_ssize_t i;
+        for (i = 0; i <= mp->ma_mask; i++)
+            Py_XDECREF(mp->ma_values[i]);
+        if (!VALUES_ARE_SMALL(mp))
+            PyMem_FREE(mp->ma_values);
+        DK_DECREF(mp->ma_keys);
+        /* Free list entries are expected to be combined and empty */
+        mp->ma_keys = NULL;
+        mp->ma_values = NULL;
+        EMPTY_TO_MINSIZE(mp);
+    }
+    else {
+        for (ep = mp->ma_table; fill > 0; ep++) {
+            if (ep->me_key) {
+                --fill;
+                Py_DECREF(ep->me_key);
+                Py_XDECREF(ep->me_value);
+            }
         }
+        if (mp->ma_table != mp->ma_smalltable)
+            PyMem_DEL(mp->ma_table);
     }
-    if (mp->ma_table != mp->ma_smalltable)
-        PyMem_DEL(mp->ma_table);
     if (numfree < PyDict_MAXFREELIST && Py_TYPE(mp) == &PyDict_Type)
         free_list[numfree++] = mp;
     else
@@ -1017,7 +1272,7 @@ dict_print(register PyDictObject *mp, register FILE *fp, register int flags)
     any = 0;
     for (i = 0; i <= mp->ma_mask; i++) {
         PyDictEntry *ep = mp->ma_table + i;
-        PyObject *pvalue = ep->me_value;
+        PyObject *pvalue = _PyDict_ENTRY_VALUE(mp, ep);
         if (pvalue != NULL) {
             /* Prevent PyObject_Repr from deleting value during
                key format */
@@ -1151,7 +1406,7 @@ dict_subscript(PyDictObject *mp, register PyObject *key)
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return NULL;
-    v = ep->me_value;
+    v = _PyDict_ENTRY_VALUE(mp, ep);
     if (v == NULL) {
         if (!PyDict_CheckExact(mp)) {
             /* Look up __missing__ method if we're a subclass. */
@@ -1215,7 +1470,7 @@ dict_keys(register PyDictObject *mp)
     ep = mp->ma_table;
     mask = mp->ma_mask;
     for (i = 0, j = 0; i <= mask; i++) {
-        if (ep[i].me_value != NULL) {
+        if (ENTRY_VALUE(mp, i) != NULL) {
             PyObject *key = ep[i].me_key;
             Py_INCREF(key);
             PyList_SET_ITEM(v, j, key);
@@ -1231,7 +1486,6 @@ dict_values(register PyDictObject *mp)
 {
     register PyObject *v;
     register Py_ssize_t i, j;
-    PyDictEntry *ep;
     Py_ssize_t mask, n;
 
   again:
@@ -1246,11 +1500,10 @@ dict_values(register PyDictObject *mp)
         Py_DECREF(v);
         goto again;
     }
-    ep = mp->ma_table;
     mask = mp->ma_mask;
     for (i = 0, j = 0; i <= mask; i++) {
-        if (ep[i].me_value != NULL) {
-            PyObject *value = ep[i].me_value;
+        PyObject *value = ENTRY_VALUE(mp, i);
+        if (value != NULL) {
             Py_INCREF(value);
             PyList_SET_ITEM(v, j, value);
             j++;
@@ -1297,7 +1550,7 @@ dict_items(register PyDictObject *mp)
     ep = mp->ma_table;
     mask = mp->ma_mask;
     for (i = 0, j = 0; i <= mask; i++) {
-        if ((value=ep[i].me_value) != NULL) {
+        if ((value=ENTRY_VALUE(mp, i)) != NULL) {
             key = ep[i].me_key;
             item = PyList_GET_ITEM(v, j);
             Py_INCREF(key);
@@ -1549,15 +1802,16 @@ PyDict_Merge(PyObject *a, PyObject *b, int override)
                return -1;
         }
         for (i = 0; i <= other->ma_mask; i++) {
+            PyObject *value = ENTRY_VALUE(other, i);
             entry = &other->ma_table[i];
-            if (entry->me_value != NULL &&
+            if (value != NULL &&
                 (override ||
                  PyDict_GetItem(a, entry->me_key) == NULL)) {
                 Py_INCREF(entry->me_key);
-                Py_INCREF(entry->me_value);
+                Py_INCREF(value);
                 if (insertdict(mp, entry->me_key,
                                (long)entry->me_hash,
-                               entry->me_value) != 0)
+                               value) != 0)
                     return -1;
             }
         }
@@ -1691,7 +1945,7 @@ characterize(PyDictObject *a, PyDictObject *b, PyObject **pval)
 
     for (i = 0; i <= a->ma_mask; i++) {
         PyObject *thiskey, *thisaval, *thisbval;
-        if (a->ma_table[i].me_value == NULL)
+        if (ENTRY_VALUE(a, i) == NULL)
             continue;
         thiskey = a->ma_table[i].me_key;
         Py_INCREF(thiskey);  /* keep alive across compares */
@@ -1703,7 +1957,7 @@ characterize(PyDictObject *a, PyDictObject *b, PyObject **pval)
             }
             if (cmp > 0 ||
                 i > a->ma_mask ||
-                a->ma_table[i].me_value == NULL)
+                ENTRY_VALUE(a, i) == NULL)
             {
                 /* Not the *smallest* a key; or maybe it is
                  * but the compare shrunk the dict so we can't
@@ -1717,7 +1971,7 @@ characterize(PyDictObject *a, PyDictObject *b, PyObject **pval)
         }
 
         /* Compare a[thiskey] to b[thiskey]; cmp <- true iff equal. */
-        thisaval = a->ma_table[i].me_value;
+        thisaval = ENTRY_VALUE(a, i);
         assert(thisaval);
         Py_INCREF(thisaval);   /* keep alive */
         thisbval = PyDict_GetItem((PyObject *)b, thiskey);
@@ -1818,7 +2072,7 @@ dict_equal(PyDictObject *a, PyDictObject *b)
 
     /* Same # of entries -- check all of 'em.  Exit early on any diff. */
     for (i = 0; i <= a->ma_mask; i++) {
-        PyObject *aval = a->ma_table[i].me_value;
+        PyObject *aval = ENTRY_VALUE(a, i);
         if (aval != NULL) {
             int cmp;
             PyObject *bval;
@@ -1885,7 +2139,7 @@ dict_contains(register PyDictObject *mp, PyObject *key)
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return NULL;
-    return PyBool_FromLong(ep->me_value != NULL);
+    return PyBool_FromLong(_PyDict_ENTRY_VALUE(mp, ep) != NULL);
 }
 
 static PyObject *
@@ -1918,7 +2172,7 @@ dict_get(register PyDictObject *mp, PyObject *args)
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return NULL;
-    val = ep->me_value;
+    val = _PyDict_ENTRY_VALUE(mp, ep);
     if (val == NULL)
         val = failobj;
     Py_INCREF(val);
@@ -1947,7 +2201,7 @@ dict_setdefault(register PyDictObject *mp, PyObject *args)
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return NULL;
-    val = ep->me_value;
+    val = _PyDict_ENTRY_VALUE(mp, ep);
     if (val == NULL) {
         val = failobj;
         if (PyDict_SetItem((PyObject*)mp, key, failobj))
@@ -1993,7 +2247,7 @@ dict_pop(PyDictObject *mp, PyObject *args)
     ep = (mp->ma_lookup)(mp, key, hash);
     if (ep == NULL)
         return NULL;
-    if (ep->me_value == NULL) {
+    if (_PyDict_ENTRY_VALUE(mp, ep) == NULL) {
         if (deflt) {
             Py_INCREF(deflt);
             return deflt;
@@ -2001,12 +2255,21 @@ dict_pop(PyDictObject *mp, PyObject *args)
         set_key_error(key);
         return NULL;
     }
+    if (mp->ma_values != NULL) {
+        old_value = mp->ma_values[ep - mp->ma_table];
+        mp->ma_values[ep - mp->ma_table] = NULL;
+        mp->ma_used--;
+        mp->ma_fill--;
+        mp->ma_version_tag = DICT_NEXT_VERSION();
+        return old_value;
+    }
     old_key = ep->me_key;
     Py_INCREF(dummy);
     ep->me_key = dummy;
     old_value = ep->me_value;
     ep->me_value = NULL;
     mp->ma_used--;
+    mp->ma_version_tag = DICT_NEXT_VERSION();
     Py_DECREF(old_key);
     return old_value;
 }
@@ -2036,6 +2299,11 @@ dict_popitem(PyDictObject *mp)
                         "popitem(): dictionary is empty");
         return NULL;
     }
+    /* The search finger below can't live in a shared table */
+    if (mp->ma_values != NULL && dictresize(mp, mp->ma_used * 2) < 0) {
+        Py_DECREF(res);
+        return NULL;
+    }
     /* Set ep to "the first" dict entry with a value.  We abuse the hash
      * field of slot 0 to hold a search finger:
      * If slot 0 has a value, use slot 0.
@@ -2064,6 +2332,7 @@ dict_popitem(PyDictObject *mp)
     ep->me_key = dummy;
     ep->me_value = NULL;
     mp->ma_used--;
+    mp->ma_version_tag = DICT_NEXT_VERSION();
     assert(mp->ma_table[0].me_value == NULL);
     mp->ma_table[0].me_hash = i + 1;  /* next place to start */
     return res;
@@ -2120,7 +2389,16 @@ dict_sizeof(PyDictObject *mp)
     Py_ssize_t res;
 
     res = sizeof(PyDictObject);
-    if (mp->ma_table != mp->ma_smalltable)
+    if (mp->ma_values != NULL) {
+        if (!VALUES_ARE_SMALL(mp))
+            res = res + (mp->ma_mask + 1) * sizeof(PyObject *);
+        /* A shared key table is only accounted to a dict that is its
+           sole user. */
+        if (mp->ma_keys->dk_refcnt == 1)
+            res = res + sizeof(PyDictKeysObject) +
+                mp->ma_mask * sizeof(PyDictEntry);
+    }
+    else if (mp->ma_table != mp->ma_smalltable)
         res = res + (mp->ma_mask + 1) * sizeof(PyDictEntry);
     return PyInt_FromSsize_t(res);
 }
@@ -2257,7 +2535,7 @@ PyDict_Contains(PyObject *op, PyObject *key)
             return -1;
     }
     ep = (mp->ma_lookup)(mp, key, hash);
-    return ep == NULL ? -1 : (ep->me_value != NULL);
+    return ep == NULL ? -1 : (_PyDict_ENTRY_VALUE(mp, ep) != NULL);
 }
 
 /* Internal version of PyDict_Contains used when the hash value is already known */
@@ -2268,7 +2546,28 @@ _PyDict_Contains(PyObject *op, PyObject *key, long hash)
     PyDictEntry *ep;
 
     ep = (mp->ma_lookup)(mp, key, hash);
-    return ep == NULL ? -1 : (ep->me_value != NULL);
+    return ep == NULL ? -1 : (_PyDict_ENTRY_VALUE(mp, ep) != NULL);
+}
+
+/* Return the index in ma_table of the active entry for the string key, or
+   -1 if there is none.  Only dicts which still use lookdict_string() are
+   searched, so that no user code can run; no exception is ever set.  Used
+   by the LOAD_ATTR inline cache in ceval.c. */
+Py_ssize_t
+_PyDict_GetEntryIndex(PyObject *op, PyObject *key)
+{
+    PyDictObject *mp = (PyDictObject *)op;
+    PyDictEntry *ep;
+    long hash;
+
+    if (!PyString_CheckExact(key) || mp->ma_lookup != lookdict_string)
+        return -1;
+    if ((hash = ((PyStringObject *) key)->ob_shash) == -1)
+        hash = PyObject_Hash(key);
+    ep = lookdict_string(mp, key, hash);
+    if (ep == NULL || _PyDict_ENTRY_VALUE(mp, ep) == NULL)
+        return -1;
+    return ep - mp->ma_table;
 }
 
 /* Hack to implement "key in dict" */
@@ -2285,6 +2584,185 @@ static PySequenceMethods dict_as_sequence = {
     0,                          /* sq_inplace_repeat */
 };
 
+/* Key sharing */
+
+static PyDictKeysObject *
+new_keys_object(Py_ssize_t size)
+{
+    PyDictKeysObject *keys;
+
+    assert(size >= PyDict_MINSIZE && (size & (size - 1)) == 0);
+    keys = (PyDictKeysObject *)PyMem_MALLOC(sizeof(PyDictKeysObject) +
+                                            (size - 1) * sizeof(PyDictEntry));
+    if (keys == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    keys->dk_refcnt = 1;
+    keys->dk_mask = size - 1;
+    keys->dk_used = 0;
+    memset(keys->dk_table, 0, size * sizeof(PyDictEntry));
+    return keys;
+}
+
+static void
+free_keys_object(PyDictKeysObject *keys)
+{
+    Py_ssize_t i;
+
+    for (i = 0; i <= keys->dk_mask; i++)
+        Py_XDECREF(keys->dk_table[i].me_key);
+    PyMem_FREE(keys);
+}
+
+/* Create an empty split dict.  Steals a reference to keys. */
+static PyObject *
+new_dict_with_shared_keys(PyDictKeysObject *keys)
+{
+    PyDictObject *mp;
+    PyObject **values;
+    Py_ssize_t size = keys->dk_mask + 1;
+
+    mp = (PyDictObject *)PyDict_New();
+    if (mp == NULL) {
+        DK_DECREF(keys);
+        return NULL;
+    }
+    if (size <= SMALL_VALUES)
+        values = (PyObject **)mp->ma_smalltable;
+    else {
+        values = PyMem_NEW(PyObject *, size);
+        if (values == NULL) {
+            Py_DECREF(mp);
+            DK_DECREF(keys);
+            return PyErr_NoMemory();
+        }
+    }
+    memset(values, 0, size * sizeof(PyObject *));
+    mp->ma_keys = keys;
+    mp->ma_values = values;
+    mp->ma_table = keys->dk_table;
+    mp->ma_mask = keys->dk_mask;
+    return (PyObject *)mp;
+}
+
+/* Turn the combined dict mp into a split dict whose keys can be shared
+   with new dicts, and return a new reference to those keys.  Return NULL,
+   without an exception unless memory ran out, if mp doesn't qualify. */
+static PyDictKeysObject *
+make_keys_shared(PyDictObject *mp)
+{
+    PyDictKeysObject *keys;
+    PyDictEntry *oldtable = mp->ma_table;
+    PyObject **values;
+    PyObject *small_values[SMALL_VALUES];
+    Py_ssize_t i, size = mp->ma_mask + 1;
+
+    if (mp->ma_values != NULL || mp->ma_lookup != lookdict_string ||
+        mp->ma_fill != mp->ma_used)
+        return NULL;
+    keys = new_keys_object(size);
+    if (keys == NULL)
+        return NULL;
+    if (size <= SMALL_VALUES)
+        values = small_values;
+    else {
+        values = PyMem_NEW(PyObject *, size);
+        if (values == NULL) {
+            DK_DECREF(keys);
+            PyErr_NoMemory();
+            return NULL;
+        }
+    }
+    /* Move the keys to the new table; the references go with them */
+    for (i = 0; i < size; i++) {
+        keys->dk_table[i].me_hash = oldtable[i].me_hash;
+        keys->dk_table[i].me_key = oldtable[i].me_key;
+        values[i] = oldtable[i].me_value;
+    }
+    keys->dk_used = mp->ma_used;
+    if (oldtable != mp->ma_smalltable)
+        PyMem_DEL(oldtable);
+    if (values == small_values) {
+        memcpy(mp->ma_smalltable, small_values, size * sizeof(PyObject *));
+        values = (PyObject **)mp->ma_smalltable;
+    }
+    mp->ma_keys = keys;
+    mp->ma_values = values;
+    mp->ma_table = keys->dk_table;
+    DK_INCREF(keys);
+    return keys;
+}
+
+/* Return a new, empty key table for the instances of a heap type */
+PyDictKeysObject *
+_PyDict_NewKeysForClass(void)
+{
+    return new_keys_object(PyDict_MINSIZE);
+}
+
+void
+_PyDictKeys_DecRef(PyDictKeysObject *keys)
+{
+    DK_DECREF(keys);
+}
+
+/* Create the __dict__ of an instance of tp, sharing the keys cached on the
+   type if there are any. */
+PyObject *
+_PyObjectDict_New(PyTypeObject *tp)
+{
+    PyDictKeysObject *cached;
+
+    if (PyType_HasFeature(tp, Py_TPFLAGS_HEAPTYPE) &&
+        (cached = ((PyHeapTypeObject *)tp)->ht_cached_keys) != NULL) {
+        DK_INCREF(cached);
+        return new_dict_with_shared_keys(cached);
+    }
+    return PyDict_New();
+}
+
+/* Set (or delete, if value is NULL) an item of the __dict__ of an instance
+   of tp.  When the dict has to stop sharing the keys cached on the type,
+   either its new layout becomes the one shared by later instances, if no
+   other instance used the old keys, or the type stops sharing keys. */
+int
+_PyObjectDict_SetItem(PyTypeObject *tp, PyObject *dict, PyObject *key,
+                      PyObject *value)
+{
+    PyHeapTypeObject *et = (PyHeapTypeObject *)tp;
+    PyDictKeysObject *cached;
+    int res;
+
+    if (!PyType_HasFeature(tp, Py_TPFLAGS_HEAPTYPE) ||
+        (cached = et->ht_cached_keys) == NULL ||
+        ((PyDictObject *)dict)->ma_keys != cached) {
+        if (value == NULL)
+            return PyDict_DelItem(dict, key);
+        return PyDict_SetItem(dict, key, value);
+    }
+    /* The decref of an old value can run arbitrary code */
+    DK_INCREF(cached);
+    if (value == NULL)
+        res = PyDict_DelItem(dict, key);
+    else
+        res = PyDict_SetItem(dict, key, value);
+    if (((PyDictObject *)dict)->ma_keys != cached &&
+        et->ht_cached_keys == cached) {
+        /* Two references: the type's and ours */
+        if (cached->dk_refcnt == 2) {
+            et->ht_cached_keys = make_keys_shared((PyDictObject *)dict);
+            if (et->ht_cached_keys == NULL && PyErr_Occurred())
+                res = -1;
+        }
+        else
+            et->ht_cached_keys = NULL;
+        DK_DECREF(cached);
+    }
+    DK_DECREF(cached);
+    return res;
+}
+
 static PyObject *
 dict_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 {
@@ -2298,6 +2776,7 @@ dict_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         assert(d->ma_table == NULL && d->ma_fill == 0 && d->ma_used == 0);
         INIT_NONZERO_DICT_SLOTS(d);
         d->ma_lookup = lookdict_string;
+        d->ma_version_tag = DICT_NEXT_VERSION();
         /* The object has been implicitely tracked by tp_alloc */
         if (type == &PyDict_Type)
             _PyObject_GC_UNTRACK(d);
@@ -2512,7 +2991,7 @@ static PyObject *dictiter_iternextkey(dictiterobject *di)
         goto fail;
     ep = d->ma_table;
     mask = d->ma_mask;
-    while (i <= mask && ep[i].me_value == NULL)
+    while (i <= mask && ENTRY_VALUE(d, i) == NULL)
         i++;
     di->di_pos = i+1;
     if (i > mask)
@@ -2565,7 +3044,6 @@ static PyObject *dictiter_iternextvalue(dictiterobject *di)
 {
     PyObject *value;
     register Py_ssize_t i, mask;
-    register PyDictEntry *ep;
     PyDictObject *d = di->di_dict;
 
     if (d == NULL)
@@ -2583,8 +3061,7 @@ static PyObject *dictiter_iternextvalue(dictiterobject *di)
     mask = d->ma_mask;
     if (i < 0 || i > mask)
         goto fail;
-    ep = d->ma_table;
-    while ((value=ep[i].me_value) == NULL) {
+    while ((value=ENTRY_VALUE(d, i)) == NULL) {
         i++;
         if (i > mask)
             goto fail;
@@ -2656,7 +3133,7 @@ static PyObject *dictiter_iternextitem(dictiterobject *di)
         goto fail;
     ep = d->ma_table;
     mask = d->ma_mask;
-    while (i <= mask && ep[i].me_value == NULL)
+    while (i <= mask && ENTRY_VALUE(d, i) == NULL)
         i++;
     di->di_pos = i+1;
     if (i > mask)
@@ -2673,7 +3150,7 @@ static PyObject *dictiter_iternextitem(dictiterobject *di)
     }
     di->len--;
     key = ep[i].me_key;
-    value = ep[i].me_value;
+    value = ENTRY_VALUE(d, i);
     Py_INCREF(key);
     Py_INCREF(value);
     PyTuple_SET_ITEM(result, 0, key);
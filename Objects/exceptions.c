@@ -1654,8 +1654,12 @@ UnicodeEncodeError_str(PyObject *self)
         goto done;
 
     if (uself->start < PyUnicode_GET_SIZE(uself->object) && uself->end == uself->start+1) {
-        int badchar = (int)PyUnicode_AS_UNICODE(uself->object)[uself->start];
+        Py_UNICODE *s = PyUnicode_AS_UNICODE(uself->object);
+        int badchar;
         char badchar_str[20];
+        if (s == NULL)
+            goto done;
+        badchar = (int)s[uself->start];
         if (badchar <= 0xff)
             PyOS_snprintf(badchar_str, sizeof(badchar_str), "x%02x", badchar);
         else if (badchar <= 0xffff)
@@ -1833,8 +1837,12 @@ UnicodeTranslateError_str(PyObject *self)
         goto done;
 
     if (uself->start < PyUnicode_GET_SIZE(uself->object) && uself->end == uself->start+1) {
-        int badchar = (int)PyUnicode_AS_UNICODE(uself->object)[uself->start];
+        Py_UNICODE *s = PyUnicode_AS_UNICODE(uself->object);
+        int badchar;
         char badchar_str[20];
+        if (s == NULL)
+            goto done;
+        badchar = (int)s[uself->start];
         if (badchar <= 0xff)
             PyOS_snprintf(badchar_str, sizeof(badchar_str), "x%02x", badchar);
         else if (badchar <= 0xffff)
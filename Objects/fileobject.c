@@ -358,10 +358,12 @@ open_the_file(PyFileObject *f, char *name, char *mode)
     if (PyUnicode_Check(f->f_name)) {
         PyObject *wmode;
         wmode = PyUnicode_DecodeASCII(newmode, strlen(newmode), NULL);
-        if (f->f_name && wmode) {
+        if (f->f_name && wmode &&
+            PyUnicode_AS_UNICODE(f->f_name) != NULL &&
+            PyUnicode_AS_UNICODE(wmode) != NULL) {
             FILE_BEGIN_ALLOW_THREADS(f)
-            /* PyUnicode_AS_UNICODE OK without thread
-               lock as it is a simple dereference. */
+            /* PyUnicode_AS_UNICODE OK without thread lock now
+               that the buffers are built. */
             f->f_fp = _wfopen(PyUnicode_AS_UNICODE(f->f_name),
                               PyUnicode_AS_UNICODE(wmode));
             FILE_END_ALLOW_THREADS(f)
@@ -1554,7 +1556,11 @@ PyFile_GetLine(PyObject *f, int n)
     if (n < 0 && result != NULL && PyUnicode_Check(result)) {
         Py_UNICODE *s = PyUnicode_AS_UNICODE(result);
         Py_ssize_t len = PyUnicode_GET_SIZE(result);
-        if (len == 0) {
+        if (s == NULL) {
+            Py_DECREF(result);
+            result = NULL;
+        }
+        else if (len == 0) {
             Py_DECREF(result);
             result = NULL;
             PyErr_SetString(PyExc_EOFError,
@@ -190,6 +190,8 @@ PyFloat_FromString(PyObject *v, char **pend)
     }
 #ifdef Py_USING_UNICODE
     else if (PyUnicode_Check(v)) {
+        if (PyUnicode_AS_UNICODE(v) == NULL)
+            return NULL;
         s_buffer = (char *)PyMem_MALLOC(PyUnicode_GET_SIZE(v)+1);
         if (s_buffer == NULL)
             return PyErr_NoMemory();
@@ -1077,10 +1077,13 @@ int_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         return PyInt_FromString(string, NULL, base);
     }
 #ifdef Py_USING_UNICODE
-    if (PyUnicode_Check(x))
+    if (PyUnicode_Check(x)) {
+        if (PyUnicode_AS_UNICODE(x) == NULL)
+            return NULL;
         return PyInt_FromUnicode(PyUnicode_AS_UNICODE(x),
                                  PyUnicode_GET_SIZE(x),
                                  base);
+    }
 #endif
     PyErr_SetString(PyExc_TypeError,
                     "int() can't convert non-string with explicit base");
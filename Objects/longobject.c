@@ -24,6 +24,15 @@
  */
 #define FIVEARY_CUTOFF 8
 
+/* Convert between longs and decimal strings with the divide and conquer
+ * algorithms of Lib/_pylong.py, which rely on the Karatsuba multiplication,
+ * above these numbers of decimal digits; the quadratic algorithms below are
+ * faster for smaller numbers.  They must stay above the _DIGIT_LIMIT of
+ * _pylong.py, which uses the quadratic algorithms for the pieces.
+ */
+#define LONG_TO_DECIMAL_CUTOFF 7000
+#define LONG_FROM_DECIMAL_CUTOFF 7000
+
 #define ABS(x) ((x) < 0 ? -(x) : (x))
 
 #undef MIN
@@ -1311,6 +1320,67 @@ divrem1(PyLongObject *a, digit n, digit *prem)
     return long_normalize(z);
 }
 
+/* Call the function name of the _pylong module with the argument arg.
+   Return NULL without setting an exception if the module is not
+   available, e.g. at startup or if another thread holds the import lock. */
+
+static PyObject *
+call_pylong(char *name, PyObject *arg)
+{
+    PyObject *mod, *result;
+
+    mod = PyImport_ImportModuleNoBlock("_pylong");
+    if (mod == NULL) {
+        if (PyErr_ExceptionMatches(PyExc_ImportError))
+            PyErr_Clear();
+        return NULL;
+    }
+    result = PyObject_CallMethod(mod, name, "O", arg);
+    Py_DECREF(mod);
+    return result;
+}
+
+/* Convert a large long to a base 10 string with the divide and conquer
+   algorithm of _pylong.int_to_decimal_string().  Returns NULL without an
+   exception set if it is not available. */
+
+static PyObject *
+long_to_decimal_string_dc(PyObject *a, int addL)
+{
+    PyObject *digits, *str;
+    Py_ssize_t len;
+
+    if (PyLong_CheckExact(a)) {
+        digits = call_pylong("int_to_decimal_string", a);
+    }
+    else {
+        /* The Python code must not call the methods of a subclass */
+        a = _PyLong_Copy((PyLongObject *)a);
+        if (a == NULL)
+            return NULL;
+        digits = call_pylong("int_to_decimal_string", a);
+        Py_DECREF(a);
+    }
+    if (digits == NULL)
+        return NULL;
+    if (!PyString_Check(digits)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "_pylong.int_to_decimal_string() must return a str");
+        Py_DECREF(digits);
+        return NULL;
+    }
+    /* make a new non-shared string, with the suffix */
+    len = PyString_GET_SIZE(digits);
+    str = PyString_FromStringAndSize(NULL, len + (addL != 0));
+    if (str != NULL) {
+        memcpy(PyString_AS_STRING(str), PyString_AS_STRING(digits), len);
+        if (addL)
+            PyString_AS_STRING(str)[len] = 'L';
+    }
+    Py_DECREF(digits);
+    return str;
+}
+
 /* Convert a long integer to a base 10 string.  Returns a new non-shared
    string.  (Return value is non-shared so that callers can modify the
    returned value if necessary.) */
@@ -1333,6 +1403,13 @@ long_to_decimal_string(PyObject *aa, int addL)
     size_a = ABS(Py_SIZE(a));
     negative = Py_SIZE(a) < 0;
 
+    /* log10(PyLong_BASE) > 3 * PyLong_SHIFT / 10 */
+    if (size_a > LONG_TO_DECIMAL_CUTOFF / (3 * PyLong_SHIFT) * 10) {
+        str = long_to_decimal_string_dc(aa, addL);
+        if (str != NULL || PyErr_Occurred())
+            return str;
+    }
+
     /* quick and dirty upper bound for the number of digits
        required to express a in base _PyLong_DECIMAL_BASE:
 
@@ -1693,10 +1770,43 @@ long_from_binary_base(char **str, int base)
     return long_normalize(z);
 }
 
+/* Convert the decimal digits at *str into a long with the divide and
+   conquer algorithm of _pylong.int_from_string(), if there are enough of
+   them and the module is available.  Return 1 and advance *str past the
+   digits on success, 0 if nothing was done, and -1 on error. */
+
+static int
+long_from_decimal_string_dc(char **str, PyLongObject **res)
+{
+    char *scan = *str;
+    PyObject *digits, *z;
+
+    while (_PyLong_DigitValue[Py_CHARMASK(*scan)] < 10)
+        ++scan;
+    if (scan - *str <= LONG_FROM_DECIMAL_CUTOFF)
+        return 0;
+    digits = PyString_FromStringAndSize(*str, scan - *str);
+    if (digits == NULL)
+        return -1;
+    z = call_pylong("int_from_string", digits);
+    Py_DECREF(digits);
+    if (z == NULL)
+        return PyErr_Occurred() ? -1 : 0;
+    if (!PyLong_CheckExact(z)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "_pylong.int_from_string() must return a long");
+        Py_DECREF(z);
+        return -1;
+    }
+    *str = scan;
+    *res = (PyLongObject *)z;
+    return 1;
+}
+
 PyObject *
 PyLong_FromString(char *str, char **pend, int base)
 {
-    int sign = 1;
+    int sign = 1, dc;
     char *start, *orig_str = str;
     PyLongObject *z;
     PyObject *strobj, *strrepr;
@@ -1744,11 +1854,17 @@ PyLong_FromString(char *str, char **pend, int base)
     start = str;
     if ((base & (base - 1)) == 0)
         z = long_from_binary_base(&str, base);
+    else if (base == 10 && (dc = long_from_decimal_string_dc(&str, &z))) {
+        if (dc < 0)
+            return NULL;
+    }
     else {
 /***
 Binary bases can be converted in time linear in the number of digits, because
 Python's representation base is binary.  Other bases (including decimal!) use
 the simple quadratic-time algorithm below, complicated by some speed tricks.
+Very long decimal strings are handed to _pylong.py instead, see
+long_from_decimal_string_dc().
 
 First some math:  the largest integer that can be expressed in N base-B digits
 is B**N-1.  Consequently, if we have an N-digit input in base B, the worst-
@@ -4011,10 +4127,13 @@ long_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         return PyLong_FromString(PyString_AS_STRING(x), NULL, base);
     }
 #ifdef Py_USING_UNICODE
-    else if (PyUnicode_Check(x))
+    else if (PyUnicode_Check(x)) {
+        if (PyUnicode_AS_UNICODE(x) == NULL)
+            return NULL;
         return PyLong_FromUnicode(PyUnicode_AS_UNICODE(x),
                                   PyUnicode_GET_SIZE(x),
                                   base);
+    }
 #endif
     else {
         PyErr_SetString(PyExc_TypeError,
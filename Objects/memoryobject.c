@@ -1,8 +1,29 @@
-
 /* Memoryview object implementation */
 
 #include "Python.h"
 
+#include <stddef.h>
+
+/*
+   A memoryview owns the shape, strides and suboffsets of its view: they are
+   stored in ob_array, which has room for 3 * ndim items, so that slicing,
+   indexing and casting can describe a new layout of the same memory.
+
+   The views created from a memoryview (by slicing, indexing, casting or
+   through the buffer interface) refer to it through their obj member; the
+   memoryview itself holds the only buffer exported by the underlying
+   object, which is released when the memoryview is deallocated.
+*/
+
+#define MV_SHAPE(mv) ((mv)->ob_array)
+#define MV_STRIDES(mv) ((mv)->ob_array + Py_SIZE(mv) / 3)
+#define MV_SUBOFFSETS(mv) ((mv)->ob_array + 2 * (Py_SIZE(mv) / 3))
+
+/* Follow the pointer of an indirect dimension */
+#define ADJUST_PTR(ptr, suboffsets, dim) \
+    (((suboffsets) != NULL && (suboffsets)[dim] >= 0) ? \
+     *((char **)(ptr)) + (suboffsets)[dim] : (ptr))
+
 static Py_ssize_t
 get_shape0(Py_buffer *buf)
 {
@@ -16,38 +37,174 @@ get_shape0(Py_buffer *buf)
     return -1;
 }
 
-static void
-dup_buffer(Py_buffer *dest, Py_buffer *src)
+/* Allocate a memoryview with room for ndim dimensions; the caller fills in
+   the view and tracks the object. */
+static PyMemoryViewObject *
+memory_alloc(int ndim)
 {
-    *dest = *src;
-    if (src->ndim == 1 && src->shape != NULL) {
-        dest->shape = &(dest->smalltable[0]);
-        dest->shape[0] = get_shape0(src);
+    PyMemoryViewObject *mview;
+
+    if (ndim < 0 || ndim > PyBUF_MAX_NDIM) {
+        PyErr_Format(PyExc_ValueError,
+                     "memoryview: number of dimensions must not exceed %d",
+                     PyBUF_MAX_NDIM);
+        return NULL;
     }
-    if (src->ndim == 1 && src->strides != NULL) {
-        dest->strides = &(dest->smalltable[1]);
-        dest->strides[0] = src->strides[0];
+    mview = (PyMemoryViewObject *)
+        PyObject_GC_NewVar(PyMemoryViewObject, &PyMemoryView_Type, 3 * ndim);
+    if (mview == NULL)
+        return NULL;
+    mview->base = NULL;
+    memset(&mview->view, 0, sizeof(Py_buffer));
+    mview->view.ndim = ndim;
+    if (ndim > 0) {
+        mview->view.shape = MV_SHAPE(mview);
+        mview->view.strides = MV_STRIDES(mview);
     }
+    return mview;
 }
 
+static void
+init_len(Py_buffer *view)
+{
+    Py_ssize_t len;
+    int i;
+
+    len = view->itemsize;
+    for (i = 0; i < view->ndim; i++)
+        len *= view->shape[i];
+    view->len = len;
+}
+
+/* Copy src into the view of mview, filling in the shape and strides that
+   the exporter may have left out.  The reference to src->obj is stolen. */
 static int
-memory_getbuf(PyMemoryViewObject *self, Py_buffer *view, int flags)
+init_view(PyMemoryViewObject *mview, Py_buffer *src)
 {
-    int res = 0;
-    /* XXX for whatever reason fixing the flags seems necessary */
-    if (self->view.readonly)
-        flags &= ~PyBUF_WRITABLE;
-    if (self->view.obj != NULL)
-        res = PyObject_GetBuffer(self->view.obj, view, flags);
-    if (view)
-        dup_buffer(view, &self->view);
-    return res;
+    Py_buffer *dest = &mview->view;
+    int i, ndim = src->ndim;
+
+    if (src->shape == NULL && ndim > 1) {
+        PyErr_SetString(PyExc_TypeError,
+            "exported buffer does not have any shape information associated "
+            "to it");
+        return -1;
+    }
+    dest->obj = src->obj;
+    dest->buf = src->buf;
+    dest->len = src->len;
+    dest->readonly = src->readonly;
+    dest->itemsize = src->itemsize;
+    dest->format = src->format != NULL ? src->format : "B";
+    dest->internal = src->internal;
+    if (ndim == 0)
+        return 0;
+    if (src->shape != NULL) {
+        for (i = 0; i < ndim; i++)
+            dest->shape[i] = src->shape[i];
+    }
+    else
+        dest->shape[0] = src->itemsize > 0 ? src->len / src->itemsize : 0;
+    if (src->strides != NULL) {
+        for (i = 0; i < ndim; i++)
+            dest->strides[i] = src->strides[i];
+    }
+    else
+        PyBuffer_FillContiguousStrides(ndim, dest->shape, dest->strides,
+                                       (int)dest->itemsize, 'C');
+    if (src->suboffsets != NULL) {
+        dest->suboffsets = MV_SUBOFFSETS(mview);
+        for (i = 0; i < ndim; i++)
+            dest->suboffsets[i] = src->suboffsets[i];
+    }
+    return 0;
 }
 
-static void
-memory_releasebuf(PyMemoryViewObject *self, Py_buffer *view)
+/* Return a new untracked memoryview with the same layout as self, which
+   refers to the memory of self. */
+static PyMemoryViewObject *
+memory_subview(PyMemoryViewObject *self, int ndim)
 {
-    PyBuffer_Release(view);
+    PyMemoryViewObject *mview;
+    Py_buffer *view = &self->view;
+    int i;
+
+    mview = memory_alloc(ndim);
+    if (mview == NULL)
+        return NULL;
+    mview->view.obj = (PyObject *)self;
+    Py_INCREF(self);
+    mview->view.buf = view->buf;
+    mview->view.len = view->len;
+    mview->view.readonly = view->readonly;
+    mview->view.itemsize = view->itemsize;
+    mview->view.format = view->format;
+    if (ndim == view->ndim) {
+        for (i = 0; i < ndim; i++) {
+            mview->view.shape[i] = view->shape[i];
+            mview->view.strides[i] = view->strides[i];
+        }
+        if (view->suboffsets != NULL) {
+            mview->view.suboffsets = MV_SUBOFFSETS(mview);
+            for (i = 0; i < ndim; i++)
+                mview->view.suboffsets[i] = view->suboffsets[i];
+        }
+    }
+    return mview;
+}
+
+static int
+memory_getbuf(PyMemoryViewObject *self, Py_buffer *view, int flags)
+{
+    Py_buffer *base = &self->view;
+
+    if (view == NULL)
+        return 0;
+    if ((flags & PyBUF_WRITABLE) && base->readonly) {
+        PyErr_SetString(PyExc_BufferError,
+                        "memoryview: underlying buffer is not writable");
+        return -1;
+    }
+    if ((flags & PyBUF_INDIRECT) != PyBUF_INDIRECT &&
+        base->suboffsets != NULL) {
+        PyErr_SetString(PyExc_BufferError,
+                        "memoryview: underlying buffer requires suboffsets");
+        return -1;
+    }
+    if (((flags & PyBUF_C_CONTIGUOUS) == PyBUF_C_CONTIGUOUS ||
+         (flags & PyBUF_STRIDES) != PyBUF_STRIDES) &&
+        !PyBuffer_IsContiguous(base, 'C')) {
+        PyErr_SetString(PyExc_BufferError,
+                        "memoryview: underlying buffer is not C-contiguous");
+        return -1;
+    }
+    if ((flags & PyBUF_F_CONTIGUOUS) == PyBUF_F_CONTIGUOUS &&
+        !PyBuffer_IsContiguous(base, 'F')) {
+        PyErr_SetString(PyExc_BufferError,
+                        "memoryview: underlying buffer is not "
+                        "Fortran contiguous");
+        return -1;
+    }
+    if ((flags & PyBUF_ANY_CONTIGUOUS) == PyBUF_ANY_CONTIGUOUS &&
+        !PyBuffer_IsContiguous(base, 'A')) {
+        PyErr_SetString(PyExc_BufferError,
+                        "memoryview: underlying buffer is not contiguous");
+        return -1;
+    }
+
+    *view = *base;
+    view->obj = (PyObject *)self;
+    Py_INCREF(self);
+    view->internal = NULL;
+    if ((flags & PyBUF_FORMAT) != PyBUF_FORMAT)
+        view->format = NULL;
+    if ((flags & PyBUF_STRIDES) != PyBUF_STRIDES)
+        view->strides = NULL;
+    if ((flags & PyBUF_ND) != PyBUF_ND) {
+        view->ndim = 1;
+        view->shape = NULL;
+    }
+    return 0;
 }
 
 PyDoc_STRVAR(memory_doc,
@@ -60,14 +217,15 @@ PyMemoryView_FromBuffer(Py_buffer *info)
 {
     PyMemoryViewObject *mview;
 
-    mview = (PyMemoryViewObject *)
-        PyObject_GC_New(PyMemoryViewObject, &PyMemoryView_Type);
+    mview = memory_alloc(info->ndim);
     if (mview == NULL)
         return NULL;
-    mview->base = NULL;
-    dup_buffer(&mview->view, info);
-    /* NOTE: mview->view.obj should already have been incref'ed as
+    /* NOTE: info->obj should already have been incref'ed as
        part of PyBuffer_FillInfo(). */
+    if (init_view(mview, info) < 0) {
+        Py_DECREF(mview);
+        return NULL;
+    }
     _PyObject_GC_TRACK(mview);
     return (PyObject *)mview;
 }
@@ -209,10 +367,10 @@ _indirect_copy_nd(char *dest, Py_buffer *view, char fort)
         func = _add_one_to_index_C;
     }
     while (elements--) {
-        func(view->ndim, indices, view->shape);
         ptr = PyBuffer_GetPointer(view, indices);
         memcpy(dest, ptr, view->itemsize);
         dest += view->itemsize;
+        func(view->ndim, indices, view->shape);
     }
 
     PyMem_Free(indices);
@@ -247,7 +405,7 @@ PyMemoryView_GetContiguous(PyObject *obj, int buffertype, char fort)
 {
     PyMemoryViewObject *mem;
     PyObject *bytes;
-    Py_buffer *view;
+    Py_buffer buffer, *view;
     int flags;
     char *dest;
 
@@ -257,11 +415,6 @@ PyMemoryView_GetContiguous(PyObject *obj, int buffertype, char fort)
         return NULL;
     }
 
-    mem = PyObject_GC_New(PyMemoryViewObject, &PyMemoryView_Type);
-    if (mem == NULL)
-        return NULL;
-
-    view = &mem->view;
     flags = PyBUF_FULL_RO;
     switch(buffertype) {
     case PyBUF_WRITE:
@@ -269,10 +422,20 @@ PyMemoryView_GetContiguous(PyObject *obj, int buffertype, char fort)
         break;
     }
 
-    if (PyObject_GetBuffer(obj, view, flags) != 0) {
+    if (PyObject_GetBuffer(obj, &buffer, flags) != 0)
+        return NULL;
+
+    mem = memory_alloc(buffer.ndim);
+    if (mem == NULL) {
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
+    if (init_view(mem, &buffer) < 0) {
+        PyBuffer_Release(&buffer);
         Py_DECREF(mem);
         return NULL;
     }
+    view = &mem->view;
 
     if (PyBuffer_IsContiguous(view, fort)) {
         /* no copy needed */
@@ -312,7 +475,6 @@ PyMemoryView_GetContiguous(PyObject *obj, int buffertype, char fort)
     }
     if (buffertype == PyBUF_SHADOW) {
         /* return a shadowed memory-view object */
-        view->buf = dest;
         mem->base = PyTuple_Pack(2, obj, bytes);
         Py_DECREF(bytes);
         if (mem->base == NULL) {
@@ -325,6 +487,12 @@ PyMemoryView_GetContiguous(PyObject *obj, int buffertype, char fort)
         /* steal the reference */
         mem->base = bytes;
     }
+    /* the view now describes the contiguous copy */
+    view->buf = dest;
+    view->suboffsets = NULL;
+    PyBuffer_FillContiguousStrides(view->ndim, view->shape, view->strides,
+                                   (int)view->itemsize,
+                                   fort == 'F' ? 'F' : 'C');
     _PyObject_GC_TRACK(mem);
     return (PyObject *)mem;
 }
@@ -408,59 +576,362 @@ static PyGetSetDef memory_getsetlist[] ={
 };
 
 
+/* Copy the items of dimension dim and the following ones of view, starting
+   at ptr, to or from the contiguous memory mem in C order.  Return the end
+   of the memory copied. */
+static char *
+strided_copy(Py_buffer *view, int dim, char *ptr, char *mem, int to_mem)
+{
+    Py_ssize_t i, itemsize = view->itemsize;
+    Py_ssize_t nitems = view->shape[dim], stride = view->strides[dim];
+
+    if (dim == view->ndim - 1 && stride == itemsize &&
+        (view->suboffsets == NULL || view->suboffsets[dim] < 0)) {
+        /* the innermost items are contiguous */
+        if (to_mem)
+            memcpy(mem, ptr, nitems * itemsize);
+        else
+            memcpy(ptr, mem, nitems * itemsize);
+        return mem + nitems * itemsize;
+    }
+    for (i = 0; i < nitems; i++, ptr += stride) {
+        char *p = ADJUST_PTR(ptr, view->suboffsets, dim);
+        if (dim < view->ndim - 1)
+            mem = strided_copy(view, dim + 1, p, mem, to_mem);
+        else {
+            if (to_mem)
+                memcpy(mem, p, itemsize);
+            else
+                memcpy(p, mem, itemsize);
+            mem += itemsize;
+        }
+    }
+    return mem;
+}
+
+/* Copy the memory of view, in C order, to mem, which has room for
+   view->len bytes. */
+static void
+copy_to_contiguous(char *mem, Py_buffer *view)
+{
+    if (PyBuffer_IsContiguous(view, 'C'))
+        memcpy(mem, view->buf, view->len);
+    else
+        strided_copy(view, 0, (char *)view->buf, mem, 1);
+}
+
 static PyObject *
 memory_tobytes(PyMemoryViewObject *self, PyObject *noargs)
 {
-    Py_buffer view;
     PyObject *res;
 
-    if (PyObject_GetBuffer((PyObject *)self, &view, PyBUF_FULL) < 0)
+    res = PyBytes_FromStringAndSize(NULL, self->view.len);
+    if (res == NULL)
         return NULL;
-
-    res = PyBytes_FromStringAndSize(NULL, view.len);
-    PyBuffer_ToContiguous(PyBytes_AS_STRING(res), &view, view.len, 'C');
-    PyBuffer_Release(&view);
+    copy_to_contiguous(PyBytes_AS_STRING(res), &self->view);
     return res;
 }
 
-/* TODO: rewrite this function using the struct module to unpack
-   each buffer item */
 
+/* The native single character formats of the struct module which the
+   memoryview can unpack and cast to. */
+
+#ifdef HAVE_C99_BOOL
+#define BOOL_TYPE _Bool
+#else
+#define BOOL_TYPE char
+#endif
+
+static Py_ssize_t
+native_itemsize(int fmtchar)
+{
+    switch (fmtchar) {
+    case 'c': case 'b': case 'B': return 1;
+    case '?': return sizeof(BOOL_TYPE);
+    case 'h': case 'H': return sizeof(short);
+    case 'i': case 'I': return sizeof(int);
+    case 'l': case 'L': return sizeof(long);
+#ifdef HAVE_LONG_LONG
+    case 'q': case 'Q': return sizeof(PY_LONG_LONG);
+#endif
+    case 'f': return sizeof(float);
+    case 'd': return sizeof(double);
+    case 'P': return sizeof(void *);
+    }
+    return -1;
+}
+
+/* Return the format character of a native single character format,
+   optionally prefixed with '@', or -1. */
+static int
+native_fmtchar(const char *format)
+{
+    if (format[0] == '@')
+        format++;
+    if (format[0] == '\0' || format[1] != '\0' ||
+        native_itemsize(format[0]) < 0)
+        return -1;
+    return format[0];
+}
+
+/* Return a format string that stays valid for the lifetime of the
+   interpreter, for the views created by cast(). */
+static char *
+native_format(int fmtchar)
+{
+    static char formats[] = "c\0b\0B\0?\0h\0H\0i\0I\0l\0L\0q\0Q\0f\0d\0P";
+    char *p;
+
+    for (p = formats; p < formats + sizeof(formats); p += 2) {
+        if (*p == fmtchar)
+            return p;
+    }
+    return NULL;
+}
+
+/* Unpack the item at ptr, which has the native format fmtchar; the memory
+   may be unaligned. */
 static PyObject *
-memory_tolist(PyMemoryViewObject *mem, PyObject *noargs)
+unpack_item(const char *ptr, int fmtchar)
+{
+    switch (fmtchar) {
+    case 'c':
+        return PyString_FromStringAndSize(ptr, 1);
+    case 'b':
+        return PyInt_FromLong(*(signed char *)ptr);
+    case 'B':
+        return PyInt_FromLong(*(unsigned char *)ptr);
+    case '?': {
+        BOOL_TYPE x;
+        memcpy(&x, ptr, sizeof x);
+        return PyBool_FromLong(x != 0);
+    }
+    case 'h': {
+        short x;
+        memcpy(&x, ptr, sizeof x);
+        return PyInt_FromLong(x);
+    }
+    case 'H': {
+        unsigned short x;
+        memcpy(&x, ptr, sizeof x);
+        return PyInt_FromLong(x);
+    }
+    case 'i': {
+        int x;
+        memcpy(&x, ptr, sizeof x);
+        return PyInt_FromLong(x);
+    }
+    case 'I': {
+        unsigned int x;
+        memcpy(&x, ptr, sizeof x);
+        if (x <= (unsigned int)LONG_MAX)
+            return PyInt_FromLong((long)x);
+        return PyLong_FromUnsignedLong(x);
+    }
+    case 'l': {
+        long x;
+        memcpy(&x, ptr, sizeof x);
+        return PyInt_FromLong(x);
+    }
+    case 'L': {
+        unsigned long x;
+        memcpy(&x, ptr, sizeof x);
+        if (x <= LONG_MAX)
+            return PyInt_FromLong((long)x);
+        return PyLong_FromUnsignedLong(x);
+    }
+#ifdef HAVE_LONG_LONG
+    case 'q': {
+        PY_LONG_LONG x;
+        memcpy(&x, ptr, sizeof x);
+        if (x >= LONG_MIN && x <= LONG_MAX)
+            return PyInt_FromLong((long)x);
+        return PyLong_FromLongLong(x);
+    }
+    case 'Q': {
+        unsigned PY_LONG_LONG x;
+        memcpy(&x, ptr, sizeof x);
+        if (x <= LONG_MAX)
+            return PyInt_FromLong((long)x);
+        return PyLong_FromUnsignedLongLong(x);
+    }
+#endif
+    case 'f': {
+        float x;
+        memcpy(&x, ptr, sizeof x);
+        return PyFloat_FromDouble(x);
+    }
+    case 'd': {
+        double x;
+        memcpy(&x, ptr, sizeof x);
+        return PyFloat_FromDouble(x);
+    }
+    case 'P': {
+        void *x;
+        memcpy(&x, ptr, sizeof x);
+        return PyLong_FromVoidPtr(x);
+    }
+    }
+    PyErr_SetString(PyExc_SystemError, "memoryview: unknown format");
+    return NULL;
+}
+
+static PyObject *
+tolist_dim(Py_buffer *view, int dim, char *ptr, int fmtchar)
 {
-    Py_buffer *view = &(mem->view);
     Py_ssize_t i;
     PyObject *res, *item;
-    char *buf;
 
-    if (strcmp(view->format, "B") || view->itemsize != 1) {
-        PyErr_SetString(PyExc_NotImplementedError, 
-                "tolist() only supports byte views");
-        return NULL;
-    }
-    if (view->ndim != 1) {
-        PyErr_SetString(PyExc_NotImplementedError, 
-                "tolist() only supports one-dimensional objects");
-        return NULL;
-    }
-    res = PyList_New(view->len);
+    res = PyList_New(view->shape[dim]);
     if (res == NULL)
         return NULL;
-    buf = view->buf;
-    for (i = 0; i < view->len; i++) {
-        item = PyInt_FromLong((unsigned char) *buf);
+    for (i = 0; i < view->shape[dim]; i++, ptr += view->strides[dim]) {
+        char *p = ADJUST_PTR(ptr, view->suboffsets, dim);
+        if (dim < view->ndim - 1)
+            item = tolist_dim(view, dim + 1, p, fmtchar);
+        else
+            item = unpack_item(p, fmtchar);
         if (item == NULL) {
             Py_DECREF(res);
             return NULL;
         }
         PyList_SET_ITEM(res, i, item);
-        buf++;
     }
     return res;
 }
 
+static PyObject *
+memory_tolist(PyMemoryViewObject *mem, PyObject *noargs)
+{
+    Py_buffer *view = &(mem->view);
+    int fmtchar;
+
+    fmtchar = native_fmtchar(view->format);
+    if (fmtchar < 0 || native_itemsize(fmtchar) != view->itemsize) {
+        PyErr_Format(PyExc_NotImplementedError,
+                     "tolist() does not support the format '%.200s'",
+                     view->format);
+        return NULL;
+    }
+    if (view->ndim == 0)
+        return unpack_item((char *)view->buf, fmtchar);
+    return tolist_dim(view, 0, (char *)view->buf, fmtchar);
+}
+
+static PyObject *
+memory_cast(PyMemoryViewObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"format", "shape", 0};
+    PyMemoryViewObject *mview;
+    Py_buffer *view = &self->view;
+    PyObject *shape = NULL, *seq = NULL;
+    char *format;
+    int fmtchar, ndim, i;
+    Py_ssize_t itemsize, nitems;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "s|O:cast", kwlist,
+                                     &format, &shape))
+        return NULL;
+    if (!PyBuffer_IsContiguous(view, 'C')) {
+        PyErr_SetString(PyExc_TypeError,
+            "memoryview: casts are restricted to C-contiguous views");
+        return NULL;
+    }
+    fmtchar = native_fmtchar(format);
+    if (fmtchar < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "memoryview: destination format must be a native single "
+            "character format prefixed with an optional '@'");
+        return NULL;
+    }
+    itemsize = native_itemsize(fmtchar);
+
+    if (shape == NULL || shape == Py_None) {
+        if (view->len % itemsize) {
+            PyErr_SetString(PyExc_TypeError,
+                "memoryview: length is not a multiple of itemsize");
+            return NULL;
+        }
+        ndim = 1;
+    }
+    else {
+        if (!PyTuple_Check(shape) && !PyList_Check(shape)) {
+            PyErr_SetString(PyExc_TypeError,
+                "shape must be a list or a tuple");
+            return NULL;
+        }
+        seq = PySequence_Fast(shape, "shape must be a list or a tuple");
+        if (seq == NULL)
+            return NULL;
+        if (PySequence_Fast_GET_SIZE(seq) > PyBUF_MAX_NDIM) {
+            PyErr_Format(PyExc_ValueError,
+                "memoryview: number of dimensions must not exceed %d",
+                PyBUF_MAX_NDIM);
+            Py_DECREF(seq);
+            return NULL;
+        }
+        ndim = (int)PySequence_Fast_GET_SIZE(seq);
+    }
+
+    mview = memory_subview(self, ndim);
+    if (mview == NULL) {
+        Py_XDECREF(seq);
+        return NULL;
+    }
+    mview->view.format = native_format(fmtchar);
+    mview->view.itemsize = itemsize;
+    if (seq == NULL)
+        mview->view.shape[0] = view->len / itemsize;
+    else {
+        nitems = 1;
+        for (i = 0; i < ndim; i++) {
+            Py_ssize_t n;
+            n = PyNumber_AsSsize_t(PySequence_Fast_GET_ITEM(seq, i),
+                                   PyExc_OverflowError);
+            if (n == -1 && PyErr_Occurred())
+                goto error;
+            if (n <= 0) {
+                PyErr_SetString(PyExc_ValueError,
+                    "memoryview.cast(): elements of shape must be "
+                    "integers > 0");
+                goto error;
+            }
+            if (nitems > PY_SSIZE_T_MAX / n) {
+                PyErr_SetString(PyExc_ValueError,
+                    "memoryview.cast(): product(shape) > SSIZE_MAX");
+                goto error;
+            }
+            nitems *= n;
+            mview->view.shape[i] = n;
+        }
+        if (nitems > view->len / itemsize || nitems * itemsize != view->len) {
+            PyErr_SetString(PyExc_TypeError,
+                "memoryview: product(shape) * itemsize != buffer size");
+            goto error;
+        }
+        Py_DECREF(seq);
+    }
+    PyBuffer_FillContiguousStrides(ndim, mview->view.shape,
+                                   mview->view.strides, (int)itemsize, 'C');
+    _PyObject_GC_TRACK(mview);
+    return (PyObject *)mview;
+
+error:
+    Py_DECREF(seq);
+    Py_DECREF(mview);
+    return NULL;
+}
+
+PyDoc_STRVAR(memory_cast_doc,
+"cast(format[, shape]) -> memoryview\n\
+\n\
+Return a view of the same memory with a new format and shape.  The view\n\
+must be C-contiguous and format must be a native single character\n\
+struct format; the shape defaults to a single dimension.");
+
 static PyMethodDef memory_methods[] = {
+    {"cast", (PyCFunction)memory_cast, METH_VARARGS | METH_KEYWORDS,
+     memory_cast_doc},
     {"tobytes", (PyCFunction)memory_tobytes, METH_NOARGS, NULL},
     {"tolist", (PyCFunction)memory_tolist, METH_NOARGS, NULL},
     {NULL,          NULL}           /* sentinel */
@@ -470,7 +941,7 @@ static PyMethodDef memory_methods[] = {
 static void
 memory_dealloc(PyMemoryViewObject *self)
 {
-    _PyObject_GC_UNTRACK(self);
+    PyObject_GC_UnTrack(self);
     if (self->view.obj != NULL) {
         if (self->base && PyTuple_Check(self->base)) {
             /* Special case when first element is generic object
@@ -493,8 +964,8 @@ memory_dealloc(PyMemoryViewObject *self)
         else {
             PyBuffer_Release(&(self->view));
         }
-        Py_CLEAR(self->base);
     }
+    Py_CLEAR(self->base);
     PyObject_GC_Del(self);
 }
 
@@ -511,6 +982,142 @@ memory_length(PyMemoryViewObject *self)
     return get_shape0(&self->view);
 }
 
+/* Move the start of dimension dim of view by offset bytes.  When an earlier
+   dimension is indirect, the offset applies to the memory that its pointers
+   refer to. */
+static void
+add_offset(Py_buffer *view, int dim, Py_ssize_t offset)
+{
+    int n = dim - 1;
+
+    if (view->suboffsets != NULL) {
+        while (n >= 0 && view->suboffsets[n] < 0)
+            n--;
+    }
+    else
+        n = -1;
+    if (n < 0)
+        view->buf = (char *)view->buf + offset;
+    else
+        view->suboffsets[n] += offset;
+}
+
+/* Select the item index of dimension dim of view, and remove the
+   dimension. */
+static int
+index_dim(Py_buffer *view, int dim, Py_ssize_t index)
+{
+    int i;
+
+    if (index < 0)
+        index += view->shape[dim];
+    if (index < 0 || index >= view->shape[dim]) {
+        PyErr_SetString(PyExc_IndexError, "index out of bounds");
+        return -1;
+    }
+    if (view->suboffsets != NULL && view->suboffsets[dim] >= 0) {
+        if (dim > 0) {
+            PyErr_SetString(PyExc_NotImplementedError,
+                "memoryview: cannot index an indirect dimension "
+                "after a slice");
+            return -1;
+        }
+        view->buf = ADJUST_PTR((char *)view->buf + view->strides[0] * index,
+                               view->suboffsets, 0);
+    }
+    else
+        add_offset(view, dim, view->strides[dim] * index);
+    for (i = dim; i < view->ndim - 1; i++) {
+        view->shape[i] = view->shape[i + 1];
+        view->strides[i] = view->strides[i + 1];
+        if (view->suboffsets != NULL)
+            view->suboffsets[i] = view->suboffsets[i + 1];
+    }
+    view->ndim--;
+    return 0;
+}
+
+/* Restrict dimension dim of view to the items selected by the slice
+   key. */
+static int
+slice_dim(Py_buffer *view, int dim, PyObject *key)
+{
+    Py_ssize_t start, stop, step, slicelength;
+
+    if (PySlice_GetIndicesEx((PySliceObject *)key, view->shape[dim],
+                             &start, &stop, &step, &slicelength) < 0)
+        return -1;
+    add_offset(view, dim, view->strides[dim] * start);
+    view->shape[dim] = slicelength;
+    view->strides[dim] *= step;
+    return 0;
+}
+
+/* Apply the indices and slices of keys to the dimensions of view, from the
+   first one on.  Every index removes its dimension, so that a view
+   indexed in all of its dimensions has none left. */
+static int
+init_index(Py_buffer *view, PyObject **keys, Py_ssize_t nkeys)
+{
+    Py_ssize_t i;
+    int dim = 0;
+
+    if (nkeys > view->ndim) {
+        PyErr_Format(PyExc_TypeError,
+                     "cannot index %d-dimension memory with %zd indices",
+                     view->ndim, nkeys);
+        return -1;
+    }
+    for (i = 0; i < nkeys; i++) {
+        PyObject *key = keys[i];
+        if (PyIndex_Check(key)) {
+            Py_ssize_t index = PyNumber_AsSsize_t(key, NULL);
+            if (index == -1 && PyErr_Occurred())
+                return -1;
+            if (index_dim(view, dim, index) < 0)
+                return -1;
+        }
+        else if (PySlice_Check(key)) {
+            if (slice_dim(view, dim, key) < 0)
+                return -1;
+            dim++;
+        }
+        else {
+            PyErr_Format(PyExc_TypeError,
+                         "cannot index memory using \"%.200s\"",
+                         key->ob_type->tp_name);
+            return -1;
+        }
+    }
+    init_len(view);
+    return 0;
+}
+
+/* Return the item or the view of self selected by keys */
+static PyObject *
+memory_index(PyMemoryViewObject *self, PyObject **keys, Py_ssize_t nkeys)
+{
+    PyMemoryViewObject *mview;
+    PyObject *res;
+
+    mview = memory_subview(self, self->view.ndim);
+    if (mview == NULL)
+        return NULL;
+    if (init_index(&mview->view, keys, nkeys) < 0) {
+        Py_DECREF(mview);
+        return NULL;
+    }
+    if (mview->view.ndim == 0 && nkeys > 0) {
+        /* Return a bytes object */
+        res = PyBytes_FromStringAndSize(mview->view.buf,
+                                        mview->view.itemsize);
+        Py_DECREF(mview);
+        return res;
+    }
+    _PyObject_GC_TRACK(mview);
+    return (PyObject *)mview;
+}
+
 /* Alternate version of memory_subcript that only accepts indices.
    Used by PySeqIter_New().
 */
@@ -525,39 +1132,30 @@ memory_item(PyMemoryViewObject *self, Py_ssize_t result)
         return NULL;
     }
     if (view->ndim == 1) {
-        /* Return a bytes object */
-        char *ptr;
-        ptr = (char *)view->buf;
-        if (result < 0) {
-            result += get_shape0(view);
-        }
-        if ((result < 0) || (result >= get_shape0(view))) {
-            PyErr_SetString(PyExc_IndexError,
-                                "index out of bounds");
+        /* Return a bytes object; indexing the only dimension of a copy of
+           the view leaves the arrays of self untouched. */
+        Py_buffer item = *view;
+        if (index_dim(&item, 0, result) < 0)
             return NULL;
-        }
-        if (view->strides == NULL)
-            ptr += view->itemsize * result;
-        else
-            ptr += view->strides[0] * result;
-        if (view->suboffsets != NULL &&
-            view->suboffsets[0] >= 0) {
-            ptr = *((char **)ptr) + view->suboffsets[0];
-        }
-        return PyBytes_FromStringAndSize(ptr, view->itemsize);
-    } else {
+        return PyBytes_FromStringAndSize(item.buf, view->itemsize);
+    }
+    else {
         /* Return a new memory-view object */
-        Py_buffer newview;
-        memset(&newview, 0, sizeof(newview));
-        /* XXX:  This needs to be fixed so it actually returns a sub-view */
-        return PyMemoryView_FromBuffer(&newview);
+        PyObject *key, *res;
+        key = PyInt_FromSsize_t(result);
+        if (key == NULL)
+            return NULL;
+        res = memory_index(self, &key, 1);
+        Py_DECREF(key);
+        return res;
     }
 }
 
 /*
   mem[obj] returns a bytes object holding the data for one element if
            obj fully indexes the memory view or another memory-view object
-           if it does not.
+           if it does not.  obj may be an index, a slice or a tuple of
+           indices and slices, one for each of the first dimensions.
 
            0-d memory-view objects can be referenced using ... or () but
            not with anything else.
@@ -567,7 +1165,7 @@ memory_subscript(PyMemoryViewObject *self, PyObject *key)
 {
     Py_buffer *view;
     view = &(self->view);
-    
+
     if (view->ndim == 0) {
         if (key == Py_Ellipsis ||
             (PyTuple_Check(key) && PyTuple_GET_SIZE(key)==0)) {
@@ -588,41 +1186,14 @@ memory_subscript(PyMemoryViewObject *self, PyObject *key)
         return memory_item(self, result);
     }
     else if (PySlice_Check(key)) {
-        Py_ssize_t start, stop, step, slicelength;
-
-        if (PySlice_GetIndicesEx((PySliceObject*)key, get_shape0(view),
-                                 &start, &stop, &step, &slicelength) < 0) {
-            return NULL;
-        }
-    
-        if (step == 1 && view->ndim == 1) {
-            Py_buffer newview;
-            void *newbuf = (char *) view->buf
-                                    + start * view->itemsize;
-            int newflags = view->readonly
-                    ? PyBUF_CONTIG_RO : PyBUF_CONTIG;
-    
-            /* XXX There should be an API to create a subbuffer */
-            if (view->obj != NULL) {
-                if (PyObject_GetBuffer(view->obj, &newview, newflags) == -1)
-                    return NULL;
-            }
-            else {
-                newview = *view;
-            }
-            newview.buf = newbuf;
-            newview.len = slicelength * newview.itemsize;
-            newview.format = view->format;
-            newview.shape = &(newview.smalltable[0]);
-            newview.shape[0] = slicelength;
-            newview.strides = &(newview.itemsize);
-            return PyMemoryView_FromBuffer(&newview);
-        }
-        PyErr_SetNone(PyExc_NotImplementedError);
-        return NULL;
+        return memory_index(self, &key, 1);
+    }
+    else if (PyTuple_Check(key)) {
+        return memory_index(self, &PyTuple_GET_ITEM(key, 0),
+                            PyTuple_GET_SIZE(key));
     }
     PyErr_Format(PyExc_TypeError,
-        "cannot index memory using \"%.200s\"", 
+        "cannot index memory using \"%.200s\"",
         key->ob_type->tp_name);
     return NULL;
 }
@@ -632,85 +1203,87 @@ memory_subscript(PyMemoryViewObject *self, PyObject *key)
 static int
 memory_ass_sub(PyMemoryViewObject *self, PyObject *key, PyObject *value)
 {
-    Py_ssize_t start, len, bytelen, i;
-    Py_buffer srcview;
+    Py_ssize_t shape[PyBUF_MAX_NDIM], strides[PyBUF_MAX_NDIM];
+    Py_ssize_t suboffsets[PyBUF_MAX_NDIM];
+    Py_buffer srcview, dest;
     Py_buffer *view = &(self->view);
-    char *srcbuf, *destbuf;
+    PyObject **keys;
+    Py_ssize_t nkeys;
+    char *tmp;
+    int i;
 
     if (view->readonly) {
         PyErr_SetString(PyExc_TypeError,
             "cannot modify read-only memory");
         return -1;
     }
-    if (view->ndim != 1) {
-        PyErr_SetNone(PyExc_NotImplementedError);
+    if (value == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+            "cannot delete memory");
         return -1;
     }
-    if (PyIndex_Check(key)) {
-        start = PyNumber_AsSsize_t(key, NULL);
-        if (start == -1 && PyErr_Occurred())
-            return -1;
-        if (start < 0) {
-            start += get_shape0(view);
-        }
-        if ((start < 0) || (start >= get_shape0(view))) {
-            PyErr_SetString(PyExc_IndexError,
-                            "index out of bounds");
-            return -1;
-        }
-        len = 1;
+    if (PyIndex_Check(key) || PySlice_Check(key)) {
+        keys = &key;
+        nkeys = 1;
     }
-    else if (PySlice_Check(key)) {
-        Py_ssize_t stop, step;
-
-        if (PySlice_GetIndicesEx((PySliceObject*)key, get_shape0(view),
-                         &start, &stop, &step, &len) < 0) {
-            return -1;
-        }
-        if (step != 1) {
-            PyErr_SetNone(PyExc_NotImplementedError);
-            return -1;
-        }
+    else if (PyTuple_Check(key)) {
+        keys = &PyTuple_GET_ITEM(key, 0);
+        nkeys = PyTuple_GET_SIZE(key);
     }
     else {
         PyErr_Format(PyExc_TypeError,
-            "cannot index memory using \"%.200s\"", 
+            "cannot index memory using \"%.200s\"",
             key->ob_type->tp_name);
         return -1;
     }
-    if (PyObject_GetBuffer(value, &srcview, PyBUF_CONTIG_RO) == -1) {
+    /* Locate the destination in a copy of the view */
+    dest = *view;
+    dest.shape = shape;
+    dest.strides = strides;
+    dest.suboffsets = view->suboffsets != NULL ? suboffsets : NULL;
+    for (i = 0; i < view->ndim; i++) {
+        shape[i] = view->shape[i];
+        strides[i] = view->strides[i];
+        if (view->suboffsets != NULL)
+            suboffsets[i] = view->suboffsets[i];
+    }
+    if (init_index(&dest, keys, nkeys) < 0)
+        return -1;
+
+    if (PyObject_GetBuffer(value, &srcview, PyBUF_FULL_RO) == -1) {
         return -1;
     }
-    /* XXX should we allow assignment of different item sizes
-       as long as the byte length is the same?
-       (e.g. assign 2 shorts to a 4-byte slice) */
-    if (srcview.itemsize != view->itemsize) {
+    /* Items are returned as bytes, so any buffer of bytes can be assigned
+       as long as the byte length is the same, e.g. m[1] = m[1] for a cast
+       view.  Other item sizes must match. */
+    if (srcview.itemsize != view->itemsize && srcview.itemsize != 1) {
         PyErr_Format(PyExc_TypeError,
-            "mismatching item sizes for \"%.200s\" and \"%.200s\"", 
-            view->obj->ob_type->tp_name, srcview.obj->ob_type->tp_name);
+            "mismatching item sizes for \"%.200s\" and \"%.200s\"",
+            Py_TYPE(self)->tp_name, Py_TYPE(value)->tp_name);
         goto _error;
     }
-    bytelen = len * view->itemsize;
-    if (bytelen != srcview.len) {
+    if (dest.len != srcview.len) {
         PyErr_SetString(PyExc_ValueError,
             "cannot modify size of memoryview object");
         goto _error;
     }
-    /* Do the actual copy */
-    destbuf = (char *) view->buf + start * view->itemsize;
-    srcbuf = (char *) srcview.buf;
-    if (destbuf + bytelen < srcbuf || srcbuf + bytelen < destbuf)
-        /* No overlapping */
-        memcpy(destbuf, srcbuf, bytelen);
-    else if (destbuf < srcbuf) {
-        /* Copy in ascending order */
-        for (i = 0; i < bytelen; i++)
-            destbuf[i] = srcbuf[i];
+    /* Do the actual copy; the source and the destination may overlap */
+    if (PyBuffer_IsContiguous(&dest, 'C') &&
+        PyBuffer_IsContiguous(&srcview, 'C')) {
+        memmove(dest.buf, srcview.buf, dest.len);
     }
     else {
-        /* Copy in descencing order */
-        for (i = bytelen - 1; i >= 0; i--)
-            destbuf[i] = srcbuf[i];
+        tmp = PyMem_Malloc(dest.len ? dest.len : 1);
+        if (tmp == NULL) {
+            PyErr_NoMemory();
+            goto _error;
+        }
+        copy_to_contiguous(tmp, &srcview);
+        if (dest.ndim == 0)
+            memcpy(dest.buf, tmp, dest.itemsize);
+        else
+            strided_copy(&dest, 0, (char *)dest.buf, tmp, 0);
+        PyMem_Free(tmp);
     }
 
     PyBuffer_Release(&srcview);
@@ -726,17 +1299,18 @@ memory_richcompare(PyObject *v, PyObject *w, int op)
 {
     Py_buffer vv, ww;
     int equal = 0;
+    char *vbuf = NULL, *wbuf = NULL;
     PyObject *res;
 
     vv.obj = NULL;
     ww.obj = NULL;
     if (op != Py_EQ && op != Py_NE)
         goto _notimpl;
-    if (PyObject_GetBuffer(v, &vv, PyBUF_CONTIG_RO) == -1) {
+    if (PyObject_GetBuffer(v, &vv, PyBUF_FULL_RO) == -1) {
         PyErr_Clear();
         goto _notimpl;
     }
-    if (PyObject_GetBuffer(w, &ww, PyBUF_CONTIG_RO) == -1) {
+    if (PyObject_GetBuffer(w, &ww, PyBUF_FULL_RO) == -1) {
         PyErr_Clear();
         goto _notimpl;
     }
@@ -744,7 +1318,25 @@ memory_richcompare(PyObject *v, PyObject *w, int op)
     if (vv.itemsize != ww.itemsize || vv.len != ww.len)
         goto _end;
 
-    equal = !memcmp(vv.buf, ww.buf, vv.len);
+    if (PyBuffer_IsContiguous(&vv, 'C') && PyBuffer_IsContiguous(&ww, 'C')) {
+        equal = !memcmp(vv.buf, ww.buf, vv.len);
+        goto _end;
+    }
+    /* Compare contiguous copies of the memory */
+    vbuf = PyMem_Malloc(vv.len ? vv.len : 1);
+    wbuf = PyMem_Malloc(ww.len ? ww.len : 1);
+    if (vbuf == NULL || wbuf == NULL) {
+        PyMem_Free(vbuf);
+        PyMem_Free(wbuf);
+        PyBuffer_Release(&vv);
+        PyBuffer_Release(&ww);
+        return PyErr_NoMemory();
+    }
+    copy_to_contiguous(vbuf, &vv);
+    copy_to_contiguous(wbuf, &ww);
+    equal = !memcmp(vbuf, wbuf, vv.len);
+    PyMem_Free(vbuf);
+    PyMem_Free(wbuf);
 
 _end:
     PyBuffer_Release(&vv);
@@ -797,22 +1389,24 @@ static PySequenceMethods memory_as_sequence = {
 	(ssizeargfunc)memory_item,          /* sq_item */
 };
 
-/* Buffer methods */
+/* Buffer methods; the views exported refer to the memoryview itself, which
+   keeps the memory alive, so there is nothing to do when they are
+   released. */
 static PyBufferProcs memory_as_buffer = {
     0,                                    /* bf_getreadbuffer */
     0,                                    /* bf_getwritebuffer */
     0,                                    /* bf_getsegcount */
     0,                                    /* bf_getcharbuffer */
     (getbufferproc)memory_getbuf,         /* bf_getbuffer */
-    (releasebufferproc)memory_releasebuf, /* bf_releasebuffer */
+    0,                                    /* bf_releasebuffer */
 };
 
 
 PyTypeObject PyMemoryView_Type = {
     PyVarObject_HEAD_INIT(&PyType_Type, 0)
     "memoryview",
-    sizeof(PyMemoryViewObject),
-    0,
+    offsetof(PyMemoryViewObject, ob_array),
+    sizeof(Py_ssize_t),
     (destructor)memory_dealloc,               /* tp_dealloc */
     0,                                        /* tp_print */
     0,                                        /* tp_getattr */
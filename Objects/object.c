@@ -1498,17 +1498,14 @@ PyObject_GenericSetAttr(PyObject *obj, PyObject *name, PyObject *value)
     if (dictptr != NULL) {
         PyObject *dict = *dictptr;
         if (dict == NULL && value != NULL) {
-            dict = PyDict_New();
+            dict = _PyObjectDict_New(tp);
             if (dict == NULL)
                 goto done;
             *dictptr = dict;
         }
         if (dict != NULL) {
             Py_INCREF(dict);
-            if (value == NULL)
-                res = PyDict_DelItem(dict, name);
-            else
-                res = PyDict_SetItem(dict, name, value);
+            res = _PyObjectDict_SetItem(tp, dict, name, value);
             if (res < 0 && PyErr_ExceptionMatches(PyExc_KeyError))
                 PyErr_SetObject(PyExc_AttributeError, name);
             Py_DECREF(dict);
@@ -2284,27 +2281,6 @@ PyTypeObject *_Py_cobject_hack = &PyCObject_Type;
 Py_ssize_t (*_Py_abstract_hack)(PyObject *) = PyObject_Size;
 
 
-/* Python's malloc wrappers (see pymem.h) */
-
-void *
-PyMem_Malloc(size_t nbytes)
-{
-    return PyMem_MALLOC(nbytes);
-}
-
-void *
-PyMem_Realloc(void *p, size_t nbytes)
-{
-    return PyMem_REALLOC(p, nbytes);
-}
-
-void
-PyMem_Free(void *p)
-{
-    PyMem_FREE(p);
-}
-
-
 /* These methods are used to control infinite recursion in repr, str, print,
    etc.  Container objects that may recursively contain themselves,
    e.g. builtin dictionaries and lists, should used Py_ReprEnter() and
@@ -2,6 +2,13 @@
 
 #ifdef WITH_PYMALLOC
 
+#ifdef HAVE_MMAP
+ #include <sys/mman.h>
+ #ifdef MAP_ANONYMOUS
+  #define ARENAS_USE_MMAP
+ #endif
+#endif
+
 #ifdef WITH_VALGRIND
 #include <valgrind/valgrind.h>
 
@@ -505,15 +512,13 @@ static struct arena_object* usable_arenas = NULL;
  */
 #define INITIAL_ARENA_OBJECTS 16
 
-/* Number of arenas allocated that haven't been free()'d. */
+/* Number of arenas allocated that haven't been released. */
 static size_t narenas_currently_allocated = 0;
 
-#ifdef PYMALLOC_DEBUG
-/* Total number of times malloc() called to allocate an arena. */
+/* Total number of times an arena was allocated. */
 static size_t ntimes_arena_allocated = 0;
 /* High water mark (max value ever seen) for narenas_currently_allocated. */
 static size_t narenas_highwater = 0;
-#endif
 
 /* Allocate a new arena.  If we run out of memory, return NULL.  Else
  * allocate a new arena, and return the address of an arena_object
@@ -525,6 +530,8 @@ new_arena(void)
 {
     struct arena_object* arenaobj;
     uint excess;        /* number of bytes above pool alignment */
+    void *address;
+    int err;
 
 #ifdef PYMALLOC_DEBUG
     if (Py_GETENV("PYTHONMALLOCSTATS"))
@@ -577,8 +584,15 @@ new_arena(void)
     arenaobj = unused_arena_objects;
     unused_arena_objects = arenaobj->nextarena;
     assert(arenaobj->address == 0);
-    arenaobj->address = (uptr)malloc(ARENA_SIZE);
-    if (arenaobj->address == 0) {
+#ifdef ARENAS_USE_MMAP
+    address = mmap(NULL, ARENA_SIZE, PROT_READ|PROT_WRITE,
+                   MAP_PRIVATE|MAP_ANONYMOUS, -1, 0);
+    err = (address == MAP_FAILED);
+#else
+    address = malloc(ARENA_SIZE);
+    err = (address == 0);
+#endif
+    if (err) {
         /* The allocation failed: return NULL after putting the
          * arenaobj back.
          */
@@ -586,13 +600,12 @@ new_arena(void)
         unused_arena_objects = arenaobj;
         return NULL;
     }
+    arenaobj->address = (uptr)address;
 
     ++narenas_currently_allocated;
-#ifdef PYMALLOC_DEBUG
     ++ntimes_arena_allocated;
     if (narenas_currently_allocated > narenas_highwater)
         narenas_highwater = narenas_currently_allocated;
-#endif
     arenaobj->freepools = NULL;
     /* pool_address <- first pool-aligned address in the arena
        nfreepools <- number of whole pools that fit after alignment */
@@ -734,9 +747,8 @@ int Py_ADDRESS_IN_RANGE(void *P, poolp pool) Py_NO_INLINE;
  * Unless the optimizer reorders everything, being too smart...
  */
 
-#undef PyObject_Malloc
-void *
-PyObject_Malloc(size_t nbytes)
+static void *
+_PyObject_Malloc(void *ctx, size_t nbytes)
 {
     block *bp;
     poolp pool;
@@ -937,9 +949,8 @@ redirect:
 
 /* free */
 
-#undef PyObject_Free
-void
-PyObject_Free(void *p)
+static void
+_PyObject_Free(void *ctx, void *p)
 {
     poolp pool;
     block *lastfree;
@@ -1000,7 +1011,7 @@ PyObject_Free(void *p)
             /* All the rest is arena management.  We just freed
              * a pool, and there are 4 cases for arena mgmt:
              * 1. If all the pools are free, return the arena to
-             *    the system free().
+             *    the system.
              * 2. If this is the only free pool in the arena,
              *    add the arena back to the `usable_arenas` list.
              * 3. If the "next" arena has a smaller count of free
@@ -1042,8 +1053,15 @@ PyObject_Free(void *p)
                 ao->nextarena = unused_arena_objects;
                 unused_arena_objects = ao;
 
-                /* Free the entire arena. */
+                /* Free the entire arena.  When the arena came from
+                 * mmap() this returns its pages to the OS right away;
+                 * a malloc()ed arena may stay in the C heap.
+                 */
+#ifdef ARENAS_USE_MMAP
+                munmap((void *)ao->address, ARENA_SIZE);
+#else
                 free((void *)ao->address);
+#endif
                 ao->address = 0;                        /* mark unassociated */
                 --narenas_currently_allocated;
 
@@ -1160,16 +1178,15 @@ redirect:
  * return a non-NULL result.
  */
 
-#undef PyObject_Realloc
-void *
-PyObject_Realloc(void *p, size_t nbytes)
+static void *
+_PyObject_Realloc(void *ctx, void *p, size_t nbytes)
 {
     void *bp;
     poolp pool;
     size_t size;
 
     if (p == NULL)
-        return PyObject_Malloc(nbytes);
+        return _PyObject_Malloc(ctx, nbytes);
 
     /*
      * Limit ourselves to PY_SSIZE_T_MAX bytes to prevent security holes.
@@ -1206,10 +1223,10 @@ PyObject_Realloc(void *p, size_t nbytes)
             }
             size = nbytes;
         }
-        bp = PyObject_Malloc(nbytes);
+        bp = _PyObject_Malloc(ctx, nbytes);
         if (bp != NULL) {
             memcpy(bp, p, size);
-            PyObject_Free(p);
+            _PyObject_Free(ctx, p);
         }
         return bp;
     }
@@ -1238,29 +1255,6 @@ PyObject_Realloc(void *p, size_t nbytes)
     return bp ? bp : p;
 }
 
-#else   /* ! WITH_PYMALLOC */
-
-/*==========================================================================*/
-/* pymalloc not enabled:  Redirect the entry points to malloc.  These will
- * only be used by extensions that are compiled with pymalloc enabled. */
-
-void *
-PyObject_Malloc(size_t n)
-{
-    return PyMem_MALLOC(n);
-}
-
-void *
-PyObject_Realloc(void *p, size_t n)
-{
-    return PyMem_REALLOC(p, n);
-}
-
-void
-PyObject_Free(void *p)
-{
-    PyMem_FREE(p);
-}
 #endif /* WITH_PYMALLOC */
 
 #ifdef PYMALLOC_DEBUG
@@ -1325,31 +1319,6 @@ write_size_t(void *p, size_t n)
     }
 }
 
-#ifdef Py_DEBUG
-/* Is target in the list?  The list is traversed via the nextpool pointers.
- * The list may be NULL-terminated, or circular.  Return 1 if target is in
- * list, else 0.
- */
-static int
-pool_is_in_list(const poolp target, poolp list)
-{
-    poolp origlist = list;
-    assert(target != NULL);
-    if (list == NULL)
-        return 0;
-    do {
-        if (target == list)
-            return 1;
-        list = list->nextpool;
-    } while (list != NULL && list != origlist);
-    return 0;
-}
-
-#else
-#define pool_is_in_list(X, Y) 1
-
-#endif  /* Py_DEBUG */
-
 /* Let S = sizeof(size_t).  The debug malloc asks for 4*S extra bytes and
    fills them with useful stuff, here calling the underlying malloc's result p:
 
@@ -1428,7 +1397,7 @@ _PyObject_DebugMallocApi(char id, size_t nbytes)
         /* overflow:  can't represent total as a size_t */
         return NULL;
 
-    p = (uchar *)PyObject_Malloc(total);
+    p = (uchar *)_PyObject_Malloc(NULL, total);
     if (p == NULL)
         return NULL;
 
@@ -1466,7 +1435,7 @@ _PyObject_DebugFreeApi(char api, void *p)
     nbytes += 4*SST;
     if (nbytes > 0)
         memset(q, DEADBYTE, nbytes);
-    PyObject_Free(q);
+    _PyObject_Free(NULL, q);
 }
 
 void *
@@ -1498,7 +1467,7 @@ _PyObject_DebugReallocApi(char api, void *p, size_t nbytes)
      * case we didn't get the chance to mark the old memory with DEADBYTE,
      * but we live with that.
      */
-    q = (uchar *)PyObject_Realloc(q - 2*SST, total);
+    q = (uchar *)_PyObject_Realloc(NULL, q - 2*SST, total);
     if (q == NULL)
         return NULL;
 
@@ -1680,6 +1649,35 @@ _PyObject_DebugDumpAddress(const void *p)
     }
 }
 
+#endif  /* PYMALLOC_DEBUG */
+
+#ifdef WITH_PYMALLOC
+
+#ifdef Py_DEBUG
+/* Is target in the list?  The list is traversed via the nextpool pointers.
+ * The list may be NULL-terminated, or circular.  Return 1 if target is in
+ * list, else 0.
+ */
+static int
+pool_is_in_list(const poolp target, poolp list)
+{
+    poolp origlist = list;
+    assert(target != NULL);
+    if (list == NULL)
+        return 0;
+    do {
+        if (target == list)
+            return 1;
+        list = list->nextpool;
+    } while (list != NULL && list != origlist);
+    return 0;
+}
+
+#else
+#define pool_is_in_list(X, Y) 1
+
+#endif  /* Py_DEBUG */
+
 static size_t
 printone(const char* msg, size_t value)
 {
@@ -1716,7 +1714,9 @@ printone(const char* msg, size_t value)
     return origvalue;
 }
 
-/* Print summary info to stderr about the state of pymalloc's structures.
+/* Print summary info to stderr about the state of pymalloc's structures:
+ * per size class pool and block usage, arena counts, and where the bytes
+ * in the arenas went.  This is what sys._debugmallocstats() shows.
  * In Py_DEBUG mode, also perform some expensive internal consistency
  * checks.
  */
@@ -1829,7 +1829,9 @@ _PyObject_DebugMallocStats(void)
         quantization += p * ((POOL_SIZE - POOL_OVERHEAD) % size);
     }
     fputc('\n', stderr);
+#ifdef PYMALLOC_DEBUG
     (void)printone("# times object malloc called", serialno);
+#endif
 
     (void)printone("# arenas allocated total", ntimes_arena_allocated);
     (void)printone("# arenas reclaimed", ntimes_arena_allocated - narenas);
@@ -1856,8 +1858,158 @@ _PyObject_DebugMallocStats(void)
     (void)printone("Total", total);
 }
 
+#endif  /* WITH_PYMALLOC */
+
+/*==========================================================================*/
+/* The public entry points.  Each domain calls through a PyMemAllocator that
+ * PyMem_SetAllocator() can replace or wrap.
+ */
+
+#ifndef PYMALLOC_DEBUG
+/* The platform allocator.  malloc(0) and realloc(p, 0) may return NULL,
+ * which would be treated as an error, or a pointer with no memory behind
+ * it, which would break pymalloc:  allocate an extra byte instead.
+ */
+static void *
+_PyMem_RawMalloc(void *ctx, size_t size)
+{
+    return malloc(size ? size : 1);
+}
+
+static void *
+_PyMem_RawRealloc(void *ctx, void *ptr, size_t size)
+{
+    return realloc(ptr, size ? size : 1);
+}
+
+static void
+_PyMem_RawFree(void *ctx, void *ptr)
+{
+    free(ptr);
+}
+
+static PyMemAllocator _PyMem = {
+    NULL, _PyMem_RawMalloc, _PyMem_RawRealloc, _PyMem_RawFree
+};
+#ifdef WITH_PYMALLOC
+static PyMemAllocator _PyObject = {
+    NULL, _PyObject_Malloc, _PyObject_Realloc, _PyObject_Free
+};
+#else
+static PyMemAllocator _PyObject = {
+    NULL, _PyMem_RawMalloc, _PyMem_RawRealloc, _PyMem_RawFree
+};
+#endif
+
+#else
+/* The debugging allocator checks that blocks are released through the API
+ * that allocated them:  the context is the API id.
+ */
+static char _PyMem_Debug_mem_id = _PYMALLOC_MEM_ID;
+static char _PyMem_Debug_obj_id = _PYMALLOC_OBJ_ID;
+
+static void *
+_PyMem_DebugMallocCtx(void *ctx, size_t size)
+{
+    return _PyObject_DebugMallocApi(*(char *)ctx, size);
+}
+
+static void *
+_PyMem_DebugReallocCtx(void *ctx, void *ptr, size_t size)
+{
+    return _PyObject_DebugReallocApi(*(char *)ctx, ptr, size);
+}
+
+static void
+_PyMem_DebugFreeCtx(void *ctx, void *ptr)
+{
+    _PyObject_DebugFreeApi(*(char *)ctx, ptr);
+}
+
+static PyMemAllocator _PyMem = {
+    &_PyMem_Debug_mem_id,
+    _PyMem_DebugMallocCtx, _PyMem_DebugReallocCtx, _PyMem_DebugFreeCtx
+};
+static PyMemAllocator _PyObject = {
+    &_PyMem_Debug_obj_id,
+    _PyMem_DebugMallocCtx, _PyMem_DebugReallocCtx, _PyMem_DebugFreeCtx
+};
 #endif  /* PYMALLOC_DEBUG */
 
+void
+PyMem_GetAllocator(PyMemAllocatorDomain domain, PyMemAllocator *allocator)
+{
+    switch (domain) {
+    case PYMEM_DOMAIN_MEM: *allocator = _PyMem; break;
+    case PYMEM_DOMAIN_OBJ: *allocator = _PyObject; break;
+    default:
+        /* unknown domain */
+        allocator->ctx = NULL;
+        allocator->malloc = NULL;
+        allocator->realloc = NULL;
+        allocator->free = NULL;
+    }
+}
+
+void
+PyMem_SetAllocator(PyMemAllocatorDomain domain, PyMemAllocator *allocator)
+{
+    switch (domain) {
+    case PYMEM_DOMAIN_MEM: _PyMem = *allocator; break;
+    case PYMEM_DOMAIN_OBJ: _PyObject = *allocator; break;
+    /* ignore unknown domain */
+    }
+}
+
+/* Sizes larger than PY_SSIZE_T_MAX are rejected here, so that allocators
+ * never see them:  most Python internals blindly use a signed Py_ssize_t to
+ * track things without checking for overflows or negatives.
+ */
+
+void *
+PyMem_Malloc(size_t nbytes)
+{
+    if (nbytes > (size_t)PY_SSIZE_T_MAX)
+        return NULL;
+    return _PyMem.malloc(_PyMem.ctx, nbytes);
+}
+
+void *
+PyMem_Realloc(void *p, size_t nbytes)
+{
+    if (nbytes > (size_t)PY_SSIZE_T_MAX)
+        return NULL;
+    return _PyMem.realloc(_PyMem.ctx, p, nbytes);
+}
+
+void
+PyMem_Free(void *p)
+{
+    _PyMem.free(_PyMem.ctx, p);
+}
+
+void *
+PyObject_Malloc(size_t nbytes)
+{
+    if (nbytes > (size_t)PY_SSIZE_T_MAX)
+        return NULL;
+    return _PyObject.malloc(_PyObject.ctx, nbytes);
+}
+
+void *
+PyObject_Realloc(void *p, size_t nbytes)
+{
+    if (nbytes > (size_t)PY_SSIZE_T_MAX)
+        return NULL;
+    return _PyObject.realloc(_PyObject.ctx, p, nbytes);
+}
+
+void
+PyObject_Free(void *p)
+{
+    _PyObject.free(_PyObject.ctx, p);
+}
+
 #ifdef Py_USING_MEMORY_DEBUGGER
 /* Make this function last so gcc won't inline it since the definition is
  * after the reference.
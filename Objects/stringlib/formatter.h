@@ -710,6 +710,11 @@ format_string_internal(PyObject *value, const InternalFormatSpec *format)
 
     calc_padding(len, format->width, format->align, &lpad, &rpad, &total);
 
+#if STRINGLIB_IS_UNICODE
+    if (STRINGLIB_STR(value) == NULL)
+        goto done;
+#endif
+
     /* allocate the resulting string */
     result = STRINGLIB_NEW(NULL, total);
     if (result == NULL)
@@ -854,6 +859,10 @@ format_int_or_long_internal(PyObject *value, const InternalFormatSpec *format,
         tmp = tostring(value, base);
         if (tmp == NULL)
             goto done;
+#if STRINGLIB_IS_UNICODE
+        if (STRINGLIB_STR(tmp) == NULL)
+            goto done;
+#endif
 
         pnumeric_chars = STRINGLIB_STR(tmp);
         n_digits = STRINGLIB_LEN(tmp);
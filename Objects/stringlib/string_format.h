@@ -626,6 +626,10 @@ render_field(PyObject *fieldobj, SubString *format_spec, OutputString *output)
     }
 #endif
 
+#if STRINGLIB_IS_UNICODE
+    if (STRINGLIB_STR(result) == NULL)
+        goto done;
+#endif
     ok = output_data(output,
                      STRINGLIB_STR(result), STRINGLIB_LEN(result));
 done:
@@ -1039,6 +1043,11 @@ do_string_format(PyObject *self, PyObject *args, PyObject *kwargs)
 
     AutoNumber auto_number;
 
+#if STRINGLIB_IS_UNICODE
+    if (STRINGLIB_STR(self) == NULL)
+        return NULL;
+#endif
+
     AutoNumber_Init(&auto_number);
     SubString_init(&input, STRINGLIB_STR(self), STRINGLIB_LEN(self));
     return build_string(&input, args, kwargs, recursion_depth, &auto_number);
@@ -1189,6 +1198,11 @@ formatter_parser(STRINGLIB_OBJECT *self)
 {
     formatteriterobject *it;
 
+#if STRINGLIB_IS_UNICODE
+    if (STRINGLIB_STR(self) == NULL)
+        return NULL;
+#endif
+
     it = PyObject_New(formatteriterobject, &PyFormatterIter_Type);
     if (it == NULL)
         return NULL;
@@ -1329,6 +1343,11 @@ formatter_field_name_split(STRINGLIB_OBJECT *self)
     PyObject *first_obj = NULL;
     PyObject *result = NULL;
 
+#if STRINGLIB_IS_UNICODE
+    if (STRINGLIB_STR(self) == NULL)
+        return NULL;
+#endif
+
     it = PyObject_New(fieldnameiterobject, &PyFieldNameIter_Type);
     if (it == NULL)
         return NULL;
@@ -1837,7 +1837,7 @@ subtype_dict(PyObject *obj, void *context)
     }
     dict = *dictptr;
     if (dict == NULL)
-        *dictptr = dict = PyDict_New();
+        *dictptr = dict = _PyObjectDict_New(Py_TYPE(obj));
     Py_XINCREF(dict);
     return dict;
 }
@@ -2444,6 +2444,15 @@ type_new(PyTypeObject *metatype, PyObject *args, PyObject *kwds)
     /* Put the proper slots in place */
     fixup_slot_dispatchers(type);
 
+    /* The __dict__ of the instances share their keys */
+    if (type->tp_dictoffset) {
+        et->ht_cached_keys = _PyDict_NewKeysForClass();
+        if (et->ht_cached_keys == NULL) {
+            Py_DECREF(type);
+            return NULL;
+        }
+    }
+
     return (PyObject *)type;
 }
 
@@ -2616,6 +2625,8 @@ type_dealloc(PyTypeObject *type)
     PyObject_Free((char *)type->tp_doc);
     Py_XDECREF(et->ht_name);
     Py_XDECREF(et->ht_slots);
+    if (et->ht_cached_keys != NULL)
+        _PyDictKeys_DecRef(et->ht_cached_keys);
     Py_TYPE(type)->tp_free((PyObject *)type);
 }
 
@@ -72,6 +72,59 @@ OF OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
 #define KEEPALIVE_SIZE_LIMIT       9
 
+/* Compact representation.
+
+   Unicode objects created from characters which all fit in fewer bytes
+   than a Py_UNICODE are allocated with a compact copy of them in their
+   str buffer, using 1 byte per character for Latin-1 text, or 2 bytes
+   for BMP text in UCS4 builds.  The kind field tells the number of
+   bytes per character of the compact data, and is 0 when str is a
+   Py_UNICODE buffer.
+
+   The Py_UNICODE buffer of a compact object is only built when a
+   Py_UNICODE pointer is requested, by PyUnicode_AsUnicode(), which
+   then releases the compact data: from then on, the object is like the
+   ones created with a Py_UNICODE buffer, and never uses more memory
+   than them.  Compact objects have at least COMPACT_MIN_LENGTH
+   characters, so getting the buffer of an empty or single character
+   object never fails.
+
+   The hash, comparison, concatenation, slicing, stripping, startswith()
+   and endswith(), and the strict ASCII, Latin-1 and UTF-8 encoders work
+   on the compact data directly, other operations use the Py_UNICODE
+   buffer.
+
+*/
+
+typedef unsigned char Py_UCS1;
+typedef unsigned short Py_UCS2;
+
+#ifdef Py_UNICODE_WIDE
+#define MAX_COMPACT_KIND 2
+#else
+#define MAX_COMPACT_KIND 1
+#endif
+
+/* Shorter strings are not stored compact, since that would not save
+   memory once allocated */
+#ifdef Py_UNICODE_WIDE
+#define COMPACT_MIN_LENGTH          2
+#else
+#define COMPACT_MIN_LENGTH          16
+#endif
+
+/* Bytes per character of the compact data of op, or 0 if its str buffer
+   holds Py_UNICODE characters */
+#define COMPACT_KIND(op) ((op)->kind)
+#define COMPACT_DATA(op) ((void *)((PyUnicodeObject *)(op))->str)
+
+/* Read the i-th character of data, of the given kind (0 for a Py_UNICODE
+   buffer) */
+#define COMPACT_READ(kind, data, i)                                     \
+    ((kind) == 1 ? (Py_UNICODE)((const Py_UCS1 *)(data))[i] :           \
+     (kind) == 2 ? (Py_UNICODE)((const Py_UCS2 *)(data))[i] :           \
+     ((const Py_UNICODE *)(data))[i])
+
 /* Endianness switches; defaults to little endian */
 
 #ifdef WORDS_BIGENDIAN
@@ -253,6 +306,9 @@ int unicode_resize(register PyUnicodeObject *unicode,
     if (unicode->length == length)
         goto reset;
 
+    if (unicode->kind && PyUnicode_AsUnicode((PyObject *)unicode) == NULL)
+        return -1;
+
     /* Resizing shared object (unicode_empty or single character
        objects) in-place is not allowed. Use PyUnicode_Resize()
        instead ! */
@@ -362,6 +418,7 @@ PyUnicodeObject *_PyUnicode_New(Py_ssize_t length)
     unicode->length = length;
     unicode->hash = -1;
     unicode->defenc = NULL;
+    unicode->kind = 0;
     return unicode;
 
   onError:
@@ -372,16 +429,324 @@ PyUnicodeObject *_PyUnicode_New(Py_ssize_t length)
     return NULL;
 }
 
+/* Return the number of bytes per character needed to store the n
+   characters at s in compact form, or 0 if they don't fit */
+
+static
+int compact_kind(const Py_UNICODE *s, Py_ssize_t n)
+{
+    const Py_UNICODE *end = s + n;
+    Py_UNICODE bits = 0;
+
+    /* The bits of all the characters tell their maximum order of
+       magnitude */
+    while (s < end)
+        bits |= *s++;
+    if (bits < 0x100)
+        return 1;
+#if MAX_COMPACT_KIND == 2
+    if (bits < 0x10000)
+        return 2;
+#endif
+    return 0;
+}
+
+/* Copy n characters of the given kind from data to the Py_UNICODE buffer
+   dest */
+
+static
+void compact_to_unicode(Py_UNICODE *dest, int kind, const void *data,
+                        Py_ssize_t n)
+{
+    Py_ssize_t i;
+
+    if (kind == 1) {
+        const Py_UCS1 *p = (const Py_UCS1 *)data;
+        for (i = 0; i < n; i++)
+            dest[i] = p[i];
+    }
+    else {
+        const Py_UCS2 *p = (const Py_UCS2 *)data;
+        for (i = 0; i < n; i++)
+            dest[i] = p[i];
+    }
+}
+
+/* Copy the characters of the Unicode object src to dest, without building
+   the str buffer of a compact src */
+
+static
+void unicode_copy_chars(Py_UNICODE *dest, PyUnicodeObject *src)
+{
+    if (src->kind)
+        compact_to_unicode(dest, src->kind, COMPACT_DATA(src), src->length);
+    else
+        Py_UNICODE_COPY(dest, src->str, src->length);
+}
+
+/* Build the Py_UNICODE buffer of unicode if it is compact, so that its
+   str field can be used.  Return -1 with an exception set if that
+   fails. */
+
+static
+int unicode_ready(PyUnicodeObject *unicode)
+{
+    if (unicode->kind && PyUnicode_AsUnicode((PyObject *)unicode) == NULL)
+        return -1;
+    return 0;
+}
+
+/* Create a Unicode object with room for length characters of the given
+   kind in its compact data, which the caller must fill in.  The caller
+   takes care of the shared empty and single character objects. */
+
+static
+PyUnicodeObject *_PyUnicode_NewCompact(Py_ssize_t length, int kind)
+{
+    register PyUnicodeObject *unicode;
+    void *data;
+
+    assert(kind == 1 || kind == 2);
+    /* Ensure we won't overflow the size. */
+    if (length > PY_SSIZE_T_MAX / kind - 1) {
+        return (PyUnicodeObject *)PyErr_NoMemory();
+    }
+
+    /* Unicode freelist & memory allocation */
+    if (free_list) {
+        unicode = free_list;
+        free_list = *(PyUnicodeObject **)unicode;
+        numfree--;
+        PyObject_INIT(unicode, &PyUnicode_Type);
+    }
+    else {
+        unicode = PyObject_New(PyUnicodeObject, &PyUnicode_Type);
+        if (unicode == NULL)
+            return NULL;
+        unicode->str = NULL;
+    }
+    /* The buffer kept alive by the free list is reused if there is one */
+    data = PyObject_REALLOC(unicode->str, (size_t)(length + 1) * kind);
+    if (data == NULL) {
+        PyErr_NoMemory();
+        goto onError;
+    }
+    unicode->str = (Py_UNICODE *)data;
+    unicode->length = length;
+    unicode->hash = -1;
+    unicode->defenc = NULL;
+    unicode->kind = kind;
+    if (kind == 1)
+        ((Py_UCS1 *)data)[length] = 0;
+    else
+        ((Py_UCS2 *)data)[length] = 0;
+    return unicode;
+
+  onError:
+    _Py_DEC_REFTOTAL;
+    _Py_ForgetReference((PyObject *)unicode);
+    PyObject_DEL(unicode->str);
+    PyObject_Del(unicode);
+    return NULL;
+}
+
+/* Return a compact Unicode object of the given kind for the length
+   characters at u, which must fit in it */
+
+static
+PyUnicodeObject *unicode_from_unicode_compact(const Py_UNICODE *u,
+                                              Py_ssize_t length, int kind)
+{
+    PyUnicodeObject *unicode;
+    Py_ssize_t i;
+
+    unicode = _PyUnicode_NewCompact(length, kind);
+    if (unicode == NULL)
+        return NULL;
+    if (kind == 1) {
+        Py_UCS1 *p = (Py_UCS1 *)COMPACT_DATA(unicode);
+        for (i = 0; i < length; i++)
+            p[i] = (Py_UCS1)u[i];
+    }
+    else {
+        Py_UCS2 *p = (Py_UCS2 *)COMPACT_DATA(unicode);
+        for (i = 0; i < length; i++)
+            p[i] = (Py_UCS2)u[i];
+    }
+    return unicode;
+}
+
+/* Store the characters of the new, not yet shared, object unicode
+   compact if they allow it.  This is used by the functions building
+   their result in a Py_UNICODE buffer. */
+
+static
+void unicode_compact(PyUnicodeObject *unicode)
+{
+    Py_ssize_t i, length = unicode->length;
+    void *data;
+    int kind;
+
+    if (!PyUnicode_CheckExact(unicode) || unicode->kind ||
+        length < COMPACT_MIN_LENGTH)
+        return;
+    kind = compact_kind(unicode->str, length);
+    if (kind == 0)
+        return;
+    /* Narrow the characters in place, then shrink the buffer */
+    data = unicode->str;
+    if (kind == 1) {
+        Py_UCS1 *p = (Py_UCS1 *)data;
+        for (i = 0; i <= length; i++)
+            p[i] = (Py_UCS1)unicode->str[i];
+    }
+    else {
+        Py_UCS2 *p = (Py_UCS2 *)data;
+        for (i = 0; i <= length; i++)
+            p[i] = (Py_UCS2)unicode->str[i];
+    }
+    data = PyObject_REALLOC(data, (size_t)(length + 1) * kind);
+    if (data != NULL)
+        unicode->str = (Py_UNICODE *)data;
+    unicode->kind = kind;
+}
+
+/* Copy the compact data of src to the one of dest, starting at position
+   pos.  dest must use at least as many bytes per character as src. */
+
+static
+void compact_copy(PyUnicodeObject *dest, Py_ssize_t pos,
+                  PyUnicodeObject *src)
+{
+    if (src->kind == dest->kind)
+        memcpy((char *)COMPACT_DATA(dest) + pos * dest->kind,
+               COMPACT_DATA(src), src->length * src->kind);
+    else {
+        Py_UCS2 *d = (Py_UCS2 *)COMPACT_DATA(dest) + pos;
+        const Py_UCS1 *p = (const Py_UCS1 *)COMPACT_DATA(src);
+        Py_ssize_t i;
+        assert(src->kind == 1 && dest->kind == 2);
+        for (i = 0; i < src->length; i++)
+            d[i] = p[i];
+    }
+}
+
+/* Return 1 if the characters of substring are found in string at
+   position offset, which must be valid.  Either may be compact. */
+
+static
+int compact_match(PyUnicodeObject *string, Py_ssize_t offset,
+                  PyUnicodeObject *substring)
+{
+    int kind = string->kind, subkind = substring->kind;
+    const char *data = (const char *)string->str;
+    const void *subdata = substring->str;
+    Py_ssize_t i;
+
+    if (kind == subkind) {
+        size_t charsize = kind ? kind : sizeof(Py_UNICODE);
+        return !memcmp(data + offset * charsize, subdata,
+                       substring->length * charsize);
+    }
+    data += offset * (kind ? kind : sizeof(Py_UNICODE));
+    for (i = 0; i < substring->length; i++)
+        if (COMPACT_READ(kind, data, i) != COMPACT_READ(subkind, subdata, i))
+            return 0;
+    return 1;
+}
+
+/* Return a new Unicode object for the length characters of self starting
+   at start, stored like the ones of self */
+
+static
+PyObject *unicode_substring(PyUnicodeObject *self, Py_ssize_t start,
+                            Py_ssize_t length)
+{
+    PyUnicodeObject *unicode;
+    int kind = COMPACT_KIND(self);
+
+    if (kind == 0)
+        return PyUnicode_FromUnicode(self->str + start, length);
+    if (length < COMPACT_MIN_LENGTH) {
+        Py_UNICODE buffer[COMPACT_MIN_LENGTH];
+        compact_to_unicode(buffer, kind,
+                           (char *)COMPACT_DATA(self) + start * kind, length);
+        return PyUnicode_FromUnicode(buffer, length);
+    }
+    unicode = _PyUnicode_NewCompact(length, kind);
+    if (unicode == NULL)
+        return NULL;
+    memcpy(COMPACT_DATA(unicode),
+           (char *)COMPACT_DATA(self) + start * kind, length * kind);
+    return (PyObject *)unicode;
+}
+
+/* Return 1 if the size bytes at s are all ASCII characters */
+
+static
+int is_ascii(const char *s, Py_ssize_t size)
+{
+    const unsigned char *p = (const unsigned char *)s;
+    const unsigned char *end = p + size;
+
+    while (p < end)
+        if (*p++ & 0x80)
+            return 0;
+    return 1;
+}
+
+/* Return a new Unicode object for the size Latin-1 characters at s */
+
+static
+PyObject *unicode_from_latin1(const char *s, Py_ssize_t size)
+{
+    PyUnicodeObject *unicode;
+
+    if (size < COMPACT_MIN_LENGTH) {
+        Py_UNICODE buffer[COMPACT_MIN_LENGTH];
+        compact_to_unicode(buffer, 1, s, size);
+        return PyUnicode_FromUnicode(buffer, size);
+    }
+    unicode = _PyUnicode_NewCompact(size, 1);
+    if (unicode == NULL)
+        return NULL;
+    memcpy(COMPACT_DATA(unicode), s, size);
+    return (PyObject *)unicode;
+}
+
+/* Encode the compact object u without errors handler, using a temporary
+   Py_UNICODE copy of its data instead of building its str buffer */
+
+static
+PyObject *compact_encode(PyUnicodeObject *u,
+                         PyObject *(*encoder)(const Py_UNICODE *,
+                                              Py_ssize_t, const char *))
+{
+    Py_UNICODE *buffer;
+    PyObject *v;
+
+    if ((size_t)u->length > PY_SSIZE_T_MAX / sizeof(Py_UNICODE) - 1)
+        return PyErr_NoMemory();
+    buffer = PyMem_NEW(Py_UNICODE, u->length + 1);
+    if (buffer == NULL)
+        return PyErr_NoMemory();
+    compact_to_unicode(buffer, u->kind, COMPACT_DATA(u), u->length + 1);
+    v = encoder(buffer, u->length, NULL);
+    PyMem_DEL(buffer);
+    return v;
+}
+
 static
 void unicode_dealloc(register PyUnicodeObject *unicode)
 {
     if (PyUnicode_CheckExact(unicode) &&
         numfree < PyUnicode_MAXFREELIST) {
         /* Keep-Alive optimization */
-        if (unicode->length >= KEEPALIVE_SIZE_LIMIT) {
+        if (unicode->length >= KEEPALIVE_SIZE_LIMIT || unicode->kind) {
             PyObject_DEL(unicode->str);
             unicode->str = NULL;
             unicode->length = 0;
+            unicode->kind = 0;
         }
         if (unicode->defenc) {
             Py_DECREF(unicode->defenc);
@@ -421,9 +786,12 @@ int _PyUnicode_Resize(PyUnicodeObject **unicode, Py_ssize_t length)
     if (v->length != length &&
         (v == unicode_empty || v->length == 1)) {
         PyUnicodeObject *w = _PyUnicode_New(length);
-        if (w == NULL)
+        Py_UNICODE *s = PyUnicode_AS_UNICODE(v);
+        if (w == NULL || s == NULL) {
+            Py_XDECREF(w);
             return -1;
-        Py_UNICODE_COPY(w->str, v->str,
+        }
+        Py_UNICODE_COPY(w->str, s,
                         length < v->length ? length : v->length);
         Py_DECREF(*unicode);
         *unicode = w;
@@ -444,6 +812,7 @@ PyObject *PyUnicode_FromUnicode(const Py_UNICODE *u,
                                 Py_ssize_t size)
 {
     PyUnicodeObject *unicode;
+    int kind;
 
     /* If the Unicode data is known at construction time, we can apply
        some optimizations which share commonly used objects. */
@@ -469,6 +838,15 @@ PyObject *PyUnicode_FromUnicode(const Py_UNICODE *u,
             Py_INCREF(unicode);
             return (PyObject *)unicode;
         }
+
+        /* The contents may not be modified, store them compact if
+           possible */
+        if (size >= COMPACT_MIN_LENGTH) {
+            kind = compact_kind(u, size);
+            if (kind)
+                return (PyObject *)unicode_from_unicode_compact(u, size,
+                                                                kind);
+        }
     }
 
     unicode = _PyUnicode_New(size);
@@ -918,8 +1296,7 @@ PyUnicode_FromFormatV(const char *format, va_list vargs)
             {
                 /* unused, since we already have the result */
                 (void) va_arg(vargs, char *);
-                Py_UNICODE_COPY(s, PyUnicode_AS_UNICODE(*callresult),
-                                PyUnicode_GET_SIZE(*callresult));
+                unicode_copy_chars(s, (PyUnicodeObject *)*callresult);
                 s += PyUnicode_GET_SIZE(*callresult);
                 /* We're done with the unicode()/repr() => forget it */
                 Py_DECREF(*callresult);
@@ -930,9 +1307,8 @@ PyUnicode_FromFormatV(const char *format, va_list vargs)
             case 'U':
             {
                 PyObject *obj = va_arg(vargs, PyObject *);
-                Py_ssize_t size = PyUnicode_GET_SIZE(obj);
-                Py_UNICODE_COPY(s, PyUnicode_AS_UNICODE(obj), size);
-                s += size;
+                unicode_copy_chars(s, (PyUnicodeObject *)obj);
+                s += PyUnicode_GET_SIZE(obj);
                 break;
             }
             case 'V':
@@ -940,9 +1316,8 @@ PyUnicode_FromFormatV(const char *format, va_list vargs)
                 PyObject *obj = va_arg(vargs, PyObject *);
                 const char *str = va_arg(vargs, const char *);
                 if (obj) {
-                    Py_ssize_t size = PyUnicode_GET_SIZE(obj);
-                    Py_UNICODE_COPY(s, PyUnicode_AS_UNICODE(obj), size);
-                    s += size;
+                    unicode_copy_chars(s, (PyUnicodeObject *)obj);
+                    s += PyUnicode_GET_SIZE(obj);
                 } else {
                     appendstring(str);
                 }
@@ -951,15 +1326,10 @@ PyUnicode_FromFormatV(const char *format, va_list vargs)
             case 'S':
             case 'R':
             {
-                Py_UNICODE *ucopy;
-                Py_ssize_t usize;
-                Py_ssize_t upos;
                 /* unused, since we already have the result */
                 (void) va_arg(vargs, PyObject *);
-                ucopy = PyUnicode_AS_UNICODE(*callresult);
-                usize = PyUnicode_GET_SIZE(*callresult);
-                for (upos = 0; upos<usize;)
-                    *s++ = ucopy[upos++];
+                unicode_copy_chars(s, (PyUnicodeObject *)*callresult);
+                s += PyUnicode_GET_SIZE(*callresult);
                 /* We're done with the unicode()/repr() => forget it */
                 Py_DECREF(*callresult);
                 /* switch to next unicode()/repr() result */
@@ -1032,22 +1402,27 @@ Py_ssize_t PyUnicode_AsWideChar(PyUnicodeObject *unicode,
                                 wchar_t *w,
                                 Py_ssize_t size)
 {
+    Py_UNICODE *str;
+
     if (unicode == NULL) {
         PyErr_BadInternalCall();
         return -1;
     }
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return -1;
 
     /* If possible, try to copy the 0-termination as well */
     if (size > PyUnicode_GET_SIZE(unicode))
         size = PyUnicode_GET_SIZE(unicode) + 1;
 
 #ifdef HAVE_USABLE_WCHAR_T
-    memcpy(w, unicode->str, size * sizeof(wchar_t));
+    memcpy(w, str, size * sizeof(wchar_t));
 #else
     {
         register Py_UNICODE *u;
         register Py_ssize_t i;
-        u = PyUnicode_AS_UNICODE(unicode);
+        u = str;
         for (i = size; i > 0; i--)
             *w++ = *u++;
     }
@@ -1344,11 +1719,41 @@ PyObject *_PyUnicode_AsDefaultEncodedString(PyObject *unicode,
 
 Py_UNICODE *PyUnicode_AsUnicode(PyObject *unicode)
 {
+    PyUnicodeObject *u = (PyUnicodeObject *)unicode;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         goto onError;
     }
-    return PyUnicode_AS_UNICODE(unicode);
+    if (u->kind) {
+        /* Widen the characters of a compact object in place, starting
+           from the end */
+        Py_UNICODE *str;
+        Py_ssize_t i;
+        if ((size_t)u->length > PY_SSIZE_T_MAX / sizeof(Py_UNICODE) - 1) {
+            PyErr_NoMemory();
+            goto onError;
+        }
+        str = (Py_UNICODE *)PyObject_REALLOC(u->str, sizeof(Py_UNICODE) *
+                                             (u->length + 1));
+        if (str == NULL) {
+            PyErr_NoMemory();
+            goto onError;
+        }
+        if (u->kind == 1) {
+            const Py_UCS1 *p = (const Py_UCS1 *)str;
+            for (i = u->length; i >= 0; i--)
+                str[i] = p[i];
+        }
+        else {
+            const Py_UCS2 *p = (const Py_UCS2 *)str;
+            for (i = u->length; i >= 0; i--)
+                str[i] = p[i];
+        }
+        u->str = str;
+        u->kind = 0;
+    }
+    return u->str;
 
   onError:
     return NULL;
@@ -1411,7 +1816,6 @@ int unicode_decode_call_errorhandler(const char *errors, PyObject **errorHandler
     Py_ssize_t outsize = PyUnicode_GET_SIZE(*output);
     Py_ssize_t requiredsize;
     Py_ssize_t newpos;
-    Py_UNICODE *repptr;
     Py_ssize_t repsize;
     int res = -1;
 
@@ -1456,7 +1860,6 @@ int unicode_decode_call_errorhandler(const char *errors, PyObject **errorHandler
        have+the replacement+the rest of the string (starting
        at the new input position), so we won't have to check space
        when there are no errors in the rest of the string) */
-    repptr = PyUnicode_AS_UNICODE(repunicode);
     repsize = PyUnicode_GET_SIZE(repunicode);
     requiredsize = *outpos + repsize + insize-newpos;
     if (requiredsize > outsize) {
@@ -1468,7 +1871,7 @@ int unicode_decode_call_errorhandler(const char *errors, PyObject **errorHandler
     }
     *endinpos = newpos;
     *inptr = input + newpos;
-    Py_UNICODE_COPY(*outptr, repptr, repsize);
+    unicode_copy_chars(*outptr, (PyUnicodeObject *)repunicode);
     *outptr += repsize;
     *outpos += repsize;
     /* we made it! */
@@ -1908,6 +2311,13 @@ PyObject *PyUnicode_DecodeUTF8Stateful(const char *s,
     PyObject *errorHandler = NULL;
     PyObject *exc = NULL;
 
+    /* ASCII is a subset of UTF-8 */
+    if (size > 1 && is_ascii(s, size)) {
+        if (consumed)
+            *consumed = size;
+        return unicode_from_latin1(s, size);
+    }
+
     /* Note: size will always be longer than the resulting Unicode
        character count */
     unicode = _PyUnicode_New(size);
@@ -2058,6 +2468,7 @@ PyObject *PyUnicode_DecodeUTF8Stateful(const char *s,
     /* Adjust length */
     if (_PyUnicode_Resize(&unicode, p - unicode->str) < 0)
         goto onError;
+    unicode_compact(unicode);
 
     Py_XDECREF(errorHandler);
     Py_XDECREF(exc);
@@ -2173,13 +2584,17 @@ PyUnicode_EncodeUTF8(const Py_UNICODE *s,
 
 PyObject *PyUnicode_AsUTF8String(PyObject *unicode)
 {
+    PyUnicodeObject *u = (PyUnicodeObject *)unicode;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeUTF8(PyUnicode_AS_UNICODE(unicode),
-                                PyUnicode_GET_SIZE(unicode),
-                                NULL);
+    if (COMPACT_KIND(u) == 1 && is_ascii(COMPACT_DATA(u), u->length))
+        return PyString_FromStringAndSize(COMPACT_DATA(u), u->length);
+    if (COMPACT_KIND(u))
+        return compact_encode(u, PyUnicode_EncodeUTF8);
+    return PyUnicode_EncodeUTF8(u->str, u->length, NULL);
 }
 
 /* --- UTF-32 Codec ------------------------------------------------------- */
@@ -2445,11 +2860,16 @@ PyUnicode_EncodeUTF32(const Py_UNICODE *s,
 
 PyObject *PyUnicode_AsUTF32String(PyObject *unicode)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeUTF32(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeUTF32(str,
                                  PyUnicode_GET_SIZE(unicode),
                                  NULL,
                                  0);
@@ -2713,11 +3133,16 @@ PyUnicode_EncodeUTF16(const Py_UNICODE *s,
 
 PyObject *PyUnicode_AsUTF16String(PyObject *unicode)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeUTF16(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeUTF16(str,
                                  PyUnicode_GET_SIZE(unicode),
                                  NULL,
                                  0);
@@ -3140,11 +3565,16 @@ PyObject *PyUnicode_EncodeUnicodeEscape(const Py_UNICODE *s,
 
 PyObject *PyUnicode_AsUnicodeEscapeString(PyObject *unicode)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeUnicodeEscape(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeUnicodeEscape(str,
                                          PyUnicode_GET_SIZE(unicode));
 }
 
@@ -3356,11 +3786,16 @@ PyObject *PyUnicode_EncodeRawUnicodeEscape(const Py_UNICODE *s,
 
 PyObject *PyUnicode_AsRawUnicodeEscapeString(PyObject *unicode)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeRawUnicodeEscape(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeRawUnicodeEscape(str,
                                             PyUnicode_GET_SIZE(unicode));
 }
 
@@ -3448,28 +3883,8 @@ PyObject *PyUnicode_DecodeLatin1(const char *s,
                                  Py_ssize_t size,
                                  const char *errors)
 {
-    PyUnicodeObject *v;
-    Py_UNICODE *p;
-
     /* Latin-1 is equivalent to the first 256 ordinals in Unicode. */
-    if (size == 1) {
-        Py_UNICODE r = *(unsigned char*)s;
-        return PyUnicode_FromUnicode(&r, 1);
-    }
-
-    v = _PyUnicode_New(size);
-    if (v == NULL)
-        goto onError;
-    if (size == 0)
-        return (PyObject *)v;
-    p = PyUnicode_AS_UNICODE(v);
-    while (size-- > 0)
-        *p++ = (unsigned char)*s++;
-    return (PyObject *)v;
-
-  onError:
-    Py_XDECREF(v);
-    return NULL;
+    return unicode_from_latin1(s, size);
 }
 
 /* create or adjust a UnicodeEncodeError */
@@ -3558,6 +3973,11 @@ static PyObject *unicode_encode_call_errorhandler(const char *errors,
         Py_DECREF(restuple);
         return NULL;
     }
+    /* The callers read the replacement from its Py_UNICODE buffer */
+    if (PyUnicode_AS_UNICODE(resunicode) == NULL) {
+        Py_DECREF(restuple);
+        return NULL;
+    }
     Py_INCREF(resunicode);
     Py_DECREF(restuple);
     return resunicode;
@@ -3747,13 +4167,17 @@ PyObject *PyUnicode_EncodeLatin1(const Py_UNICODE *p,
 
 PyObject *PyUnicode_AsLatin1String(PyObject *unicode)
 {
+    PyUnicodeObject *u = (PyUnicodeObject *)unicode;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeLatin1(PyUnicode_AS_UNICODE(unicode),
-                                  PyUnicode_GET_SIZE(unicode),
-                                  NULL);
+    if (COMPACT_KIND(u) == 1)
+        return PyString_FromStringAndSize(COMPACT_DATA(u), u->length);
+    if (COMPACT_KIND(u))
+        return compact_encode(u, PyUnicode_EncodeLatin1);
+    return PyUnicode_EncodeLatin1(u->str, u->length, NULL);
 }
 
 /* --- 7-bit ASCII Codec -------------------------------------------------- */
@@ -3773,10 +4197,8 @@ PyObject *PyUnicode_DecodeASCII(const char *s,
     PyObject *exc = NULL;
 
     /* ASCII is equivalent to the first 128 ordinals in Unicode. */
-    if (size == 1 && *(unsigned char*)s < 128) {
-        Py_UNICODE r = *(unsigned char*)s;
-        return PyUnicode_FromUnicode(&r, 1);
-    }
+    if (is_ascii(s, size))
+        return unicode_from_latin1(s, size);
 
     v = _PyUnicode_New(size);
     if (v == NULL)
@@ -3826,13 +4248,17 @@ PyObject *PyUnicode_EncodeASCII(const Py_UNICODE *p,
 
 PyObject *PyUnicode_AsASCIIString(PyObject *unicode)
 {
+    PyUnicodeObject *u = (PyUnicodeObject *)unicode;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeASCII(PyUnicode_AS_UNICODE(unicode),
-                                 PyUnicode_GET_SIZE(unicode),
-                                 NULL);
+    if (COMPACT_KIND(u) == 1 && is_ascii(COMPACT_DATA(u), u->length))
+        return PyString_FromStringAndSize(COMPACT_DATA(u), u->length);
+    if (COMPACT_KIND(u))
+        return compact_encode(u, PyUnicode_EncodeASCII);
+    return PyUnicode_EncodeASCII(u->str, u->length, NULL);
 }
 
 #if defined(MS_WINDOWS) && defined(HAVE_USABLE_WCHAR_T)
@@ -4037,11 +4463,16 @@ PyObject *PyUnicode_EncodeMBCS(const Py_UNICODE *p,
 
 PyObject *PyUnicode_AsMBCSString(PyObject *unicode)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode)) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeMBCS(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeMBCS(str,
                                 PyUnicode_GET_SIZE(unicode),
                                 NULL);
 }
@@ -4083,6 +4514,8 @@ PyObject *PyUnicode_DecodeCharmap(const char *s,
     e = s + size;
     if (PyUnicode_CheckExact(mapping)) {
         mapstring = PyUnicode_AS_UNICODE(mapping);
+        if (mapstring == NULL)
+            goto onError;
         maplen = PyUnicode_GET_SIZE(mapping);
         while (s < e) {
             unsigned char ch = *s;
@@ -4180,9 +4613,7 @@ PyObject *PyUnicode_DecodeCharmap(const char *s,
                         }
                         p = PyUnicode_AS_UNICODE(v) + oldpos;
                     }
-                    Py_UNICODE_COPY(p,
-                                    PyUnicode_AS_UNICODE(x),
-                                    targetsize);
+                    unicode_copy_chars(p, (PyUnicodeObject *)x);
                     p += targetsize;
                     extrachars -= targetsize;
                 }
@@ -4304,6 +4735,8 @@ PyUnicode_BuildEncodingMap(PyObject* string)
         return NULL;
     }
     decode = PyUnicode_AS_UNICODE(string);
+    if (decode == NULL)
+        return NULL;
     memset(level1, 0xFF, sizeof level1);
     memset(level2, 0xFF, sizeof level2);
 
@@ -4735,11 +5168,16 @@ PyObject *PyUnicode_EncodeCharmap(const Py_UNICODE *p,
 PyObject *PyUnicode_AsCharmapString(PyObject *unicode,
                                     PyObject *mapping)
 {
+    Py_UNICODE *str;
+
     if (!PyUnicode_Check(unicode) || mapping == NULL) {
         PyErr_BadArgument();
         return NULL;
     }
-    return PyUnicode_EncodeCharmap(PyUnicode_AS_UNICODE(unicode),
+    str = PyUnicode_AS_UNICODE(unicode);
+    if (str == NULL)
+        return NULL;
+    return PyUnicode_EncodeCharmap(str,
                                    PyUnicode_GET_SIZE(unicode),
                                    mapping,
                                    NULL);
@@ -4832,6 +5270,11 @@ static PyObject *unicode_translate_call_errorhandler(const char *errors,
         Py_DECREF(restuple);
         return NULL;
     }
+    /* The callers read the replacement from its Py_UNICODE buffer */
+    if (PyUnicode_AS_UNICODE(resunicode) == NULL) {
+        Py_DECREF(restuple);
+        return NULL;
+    }
     Py_INCREF(resunicode);
     Py_DECREF(restuple);
     return resunicode;
@@ -4943,7 +5386,7 @@ int charmaptranslate_output(const Py_UNICODE *startinp, const Py_UNICODE *curinp
                 repsize - 1;
             if (charmaptranslate_makespace(outobj, outp, requiredsize))
                 return -1;
-            memcpy(*outp, PyUnicode_AS_UNICODE(*res), sizeof(Py_UNICODE)*repsize);
+            unicode_copy_chars(*outp, (PyUnicodeObject *)*res);
             *outp += repsize;
         }
     }
@@ -5099,11 +5542,15 @@ PyObject *PyUnicode_Translate(PyObject *str,
                               const char *errors)
 {
     PyObject *result;
+    Py_UNICODE *s;
 
     str = PyUnicode_FromObject(str);
     if (str == NULL)
         goto onError;
-    result = PyUnicode_TranslateCharmap(PyUnicode_AS_UNICODE(str),
+    s = PyUnicode_AS_UNICODE(str);
+    if (s == NULL)
+        goto onError;
+    result = PyUnicode_TranslateCharmap(s,
                                         PyUnicode_GET_SIZE(str),
                                         mapping,
                                         errors);
@@ -5289,6 +5736,12 @@ Py_ssize_t PyUnicode_Count(PyObject *str,
         return -1;
     }
 
+    if (unicode_ready(str_obj) < 0 || unicode_ready(sub_obj) < 0) {
+        Py_DECREF(sub_obj);
+        Py_DECREF(str_obj);
+        return -1;
+    }
+
     ADJUST_INDICES(start, end, str_obj->length);
     result = stringlib_count(
         str_obj->str + start, end - start, sub_obj->str, sub_obj->length,
@@ -5318,6 +5771,13 @@ Py_ssize_t PyUnicode_Find(PyObject *str,
         return -2;
     }
 
+    if (unicode_ready((PyUnicodeObject *)str) < 0 ||
+        unicode_ready((PyUnicodeObject *)sub) < 0) {
+        Py_DECREF(str);
+        Py_DECREF(sub);
+        return -2;
+    }
+
     if (direction > 0)
         result = stringlib_find_slice(
             PyUnicode_AS_UNICODE(str), PyUnicode_GET_SIZE(str),
@@ -5352,6 +5812,9 @@ int tailmatch(PyUnicodeObject *self,
     if (end < start)
         return 0;
 
+    if (self->kind || substring->kind)
+        return compact_match(self, direction > 0 ? end : start, substring);
+
     if (direction > 0) {
         if (Py_UNICODE_MATCH(self, end, substring))
             return 1;
@@ -5402,7 +5865,7 @@ PyObject *fixup(PyUnicodeObject *self,
     if (u == NULL)
         return NULL;
 
-    Py_UNICODE_COPY(u->str, self->str, self->length);
+    unicode_copy_chars(u->str, self);
 
     if (!fixfct(u) && PyUnicode_CheckExact(self)) {
         /* fixfct should return TRUE if it modified the buffer. If
@@ -5596,6 +6059,8 @@ PyUnicode_Join(PyObject *separator, PyObject *seq)
             if (internal_separator == NULL)
                 goto onError;
             sep = PyUnicode_AS_UNICODE(internal_separator);
+            if (sep == NULL)
+                goto onError;
             seplen = PyUnicode_GET_SIZE(internal_separator);
             /* In case PyUnicode_FromObject() mutated seq. */
             seqlen = PySequence_Fast_GET_SIZE(fseq);
@@ -5655,7 +6120,7 @@ PyUnicode_Join(PyObject *separator, PyObject *seq)
         }
 
         /* Copy item, and maybe the separator. */
-        Py_UNICODE_COPY(res_p, PyUnicode_AS_UNICODE(item), itemlen);
+        unicode_copy_chars(res_p, (PyUnicodeObject *)item);
         res_p += itemlen;
         if (i < seqlen - 1) {
             Py_UNICODE_COPY(res_p, sep, seplen);
@@ -5716,7 +6181,7 @@ PyUnicodeObject *pad(PyUnicodeObject *self,
     if (u) {
         if (left)
             Py_UNICODE_FILL(u->str, fill, left);
-        Py_UNICODE_COPY(u->str + left, self->str, self->length);
+        unicode_copy_chars(u->str + left, self);
         if (right)
             Py_UNICODE_FILL(u->str + left + self->length, fill, right);
     }
@@ -5731,6 +6196,10 @@ PyObject *PyUnicode_Splitlines(PyObject *string, int keepends)
     string = PyUnicode_FromObject(string);
     if (string == NULL)
         return NULL;
+    if (unicode_ready((PyUnicodeObject *)string) < 0) {
+        Py_DECREF(string);
+        return NULL;
+    }
 
     list = stringlib_splitlines(
         (PyObject*) string, PyUnicode_AS_UNICODE(string),
@@ -5748,6 +6217,10 @@ PyObject *split(PyUnicodeObject *self,
     if (maxcount < 0)
         maxcount = PY_SSIZE_T_MAX;
 
+    if (unicode_ready(self) < 0 ||
+        (substring != NULL && unicode_ready(substring) < 0))
+        return NULL;
+
     if (substring == NULL)
         return stringlib_split_whitespace(
             (PyObject*) self,  self->str, self->length, maxcount
@@ -5768,6 +6241,10 @@ PyObject *rsplit(PyUnicodeObject *self,
     if (maxcount < 0)
         maxcount = PY_SSIZE_T_MAX;
 
+    if (unicode_ready(self) < 0 ||
+        (substring != NULL && unicode_ready(substring) < 0))
+        return NULL;
+
     if (substring == NULL)
         return stringlib_rsplit_whitespace(
             (PyObject*) self,  self->str, self->length, maxcount
@@ -5788,6 +6265,10 @@ PyObject *replace(PyUnicodeObject *self,
 {
     PyUnicodeObject *u;
 
+    if (unicode_ready(self) < 0 || unicode_ready(str1) < 0 ||
+        unicode_ready(str2) < 0)
+        return NULL;
+
     if (maxcount < 0)
         maxcount = PY_SSIZE_T_MAX;
     else if (maxcount == 0 || self->length == 0)
@@ -6057,7 +6538,7 @@ static short utf16Fixup[32] =
 };
 
 static int
-unicode_compare(PyUnicodeObject *str1, PyUnicodeObject *str2)
+unicode_compare_wide(PyUnicodeObject *str1, PyUnicodeObject *str2)
 {
     Py_ssize_t len1, len2;
 
@@ -6091,7 +6572,7 @@ unicode_compare(PyUnicodeObject *str1, PyUnicodeObject *str2)
 #else
 
 static int
-unicode_compare(PyUnicodeObject *str1, PyUnicodeObject *str2)
+unicode_compare_wide(PyUnicodeObject *str1, PyUnicodeObject *str2)
 {
     register Py_ssize_t len1, len2;
 
@@ -6118,6 +6599,40 @@ unicode_compare(PyUnicodeObject *str1, PyUnicodeObject *str2)
 
 #endif
 
+static int
+unicode_compare(PyUnicodeObject *str1, PyUnicodeObject *str2)
+{
+    int kind1 = COMPACT_KIND(str1), kind2 = COMPACT_KIND(str2);
+    const void *s1, *s2;
+    Py_ssize_t len1, len2, len, i;
+
+    if (kind1 == 0 && kind2 == 0)
+        return unicode_compare_wide(str1, str2);
+
+    /* In UCS2 builds, compact characters are below the surrogates that
+       unicode_compare_wide() reorders: comparing the character values
+       gives the code point order */
+    len1 = str1->length;
+    len2 = str2->length;
+    len = len1 < len2 ? len1 : len2;
+    s1 = kind1 ? COMPACT_DATA(str1) : str1->str;
+    s2 = kind2 ? COMPACT_DATA(str2) : str2->str;
+    if (kind1 == 1 && kind2 == 1) {
+        int cmp = memcmp(s1, s2, len);
+        if (cmp != 0)
+            return cmp < 0 ? -1 : 1;
+    }
+    else {
+        for (i = 0; i < len; i++) {
+            Py_UNICODE c1 = COMPACT_READ(kind1, s1, i);
+            Py_UNICODE c2 = COMPACT_READ(kind2, s2, i);
+            if (c1 != c2)
+                return (c1 < c2) ? -1 : 1;
+        }
+    }
+    return (len1 < len2) ? -1 : (len1 != len2);
+}
+
 int PyUnicode_Compare(PyObject *left,
                       PyObject *right)
 {
@@ -6245,7 +6760,11 @@ int PyUnicode_Contains(PyObject *container,
         return -1;
     }
 
-    result = stringlib_contains_obj(str, sub);
+    if (unicode_ready((PyUnicodeObject *)str) < 0 ||
+        unicode_ready((PyUnicodeObject *)sub) < 0)
+        result = -1;
+    else
+        result = stringlib_contains_obj(str, sub);
 
     Py_DECREF(str);
     Py_DECREF(sub);
@@ -6259,6 +6778,7 @@ PyObject *PyUnicode_Concat(PyObject *left,
                            PyObject *right)
 {
     PyUnicodeObject *u = NULL, *v = NULL, *w;
+    int ukind, vkind;
 
     /* Coerce the two arguments */
     u = (PyUnicodeObject *)PyUnicode_FromObject(left);
@@ -6278,12 +6798,31 @@ PyObject *PyUnicode_Concat(PyObject *left,
         return (PyObject *)v;
     }
 
-    /* Concat the two Unicode strings */
-    w = _PyUnicode_New(u->length + v->length);
-    if (w == NULL)
+    if (u->length > PY_SSIZE_T_MAX - v->length) {
+        PyErr_SetString(PyExc_OverflowError,
+                        "strings are too large to concat");
         goto onError;
-    Py_UNICODE_COPY(w->str, u->str, u->length);
-    Py_UNICODE_COPY(w->str + u->length, v->str, v->length);
+    }
+
+    /* Concat the two Unicode strings */
+    ukind = COMPACT_KIND(u);
+    vkind = COMPACT_KIND(v);
+    if (ukind && vkind) {
+        /* Both are compact, so is the result */
+        int kind = ukind > vkind ? ukind : vkind;
+        w = _PyUnicode_NewCompact(u->length + v->length, kind);
+        if (w == NULL)
+            goto onError;
+        compact_copy(w, 0, u);
+        compact_copy(w, u->length, v);
+    }
+    else {
+        w = _PyUnicode_New(u->length + v->length);
+        if (w == NULL)
+            goto onError;
+        unicode_copy_chars(w->str, u);
+        unicode_copy_chars(w->str + u->length, v);
+    }
 
     Py_DECREF(u);
     Py_DECREF(v);
@@ -6318,6 +6857,10 @@ unicode_count(PyUnicodeObject *self, PyObject *args)
         (PyObject *)substring);
     if (substring == NULL)
         return NULL;
+    if (unicode_ready(self) < 0 || unicode_ready(substring) < 0) {
+        Py_DECREF(substring);
+        return NULL;
+    }
 
     ADJUST_INDICES(start, end, self->length);
     result = PyInt_FromSsize_t(
@@ -6426,6 +6969,8 @@ unicode_expandtabs(PyUnicodeObject *self, PyObject *args)
 
     if (!PyArg_ParseTuple(args, "|i:expandtabs", &tabsize))
         return NULL;
+    if (unicode_ready(self) < 0)
+        return NULL;
 
     /* First pass: determine size of output string */
     i = 0; /* chars up to and including most recent \n or \r */
@@ -6513,6 +7058,11 @@ unicode_find(PyUnicodeObject *self, PyObject *args)
 
     if (!_ParseTupleFinds(args, &substring, &start, &end))
         return NULL;
+    if (unicode_ready(self) < 0 ||
+        unicode_ready((PyUnicodeObject *)substring) < 0) {
+        Py_DECREF(substring);
+        return NULL;
+    }
 
     result = stringlib_find_slice(
         PyUnicode_AS_UNICODE(self), PyUnicode_GET_SIZE(self),
@@ -6533,6 +7083,10 @@ unicode_getitem(PyUnicodeObject *self, Py_ssize_t index)
         return NULL;
     }
 
+    if (COMPACT_KIND(self)) {
+        Py_UNICODE ch = COMPACT_READ(self->kind, COMPACT_DATA(self), index);
+        return PyUnicode_FromUnicode(&ch, 1);
+    }
     return (PyObject*) PyUnicode_FromUnicode(&self->str[index], 1);
 }
 
@@ -6546,16 +7100,33 @@ unicode_hash(PyUnicodeObject *self)
        dictionary keys. */
 
     register Py_ssize_t len;
-    register Py_UNICODE *p;
     register long x;
 
     if (self->hash != -1)
         return self->hash;
     len = PyUnicode_GET_SIZE(self);
-    p = PyUnicode_AS_UNICODE(self);
-    x = *p << 7;
-    while (--len >= 0)
-        x = (1000003*x) ^ *p++;
+    switch (COMPACT_KIND(self)) {
+    case 1: {
+        register const Py_UCS1 *p = (const Py_UCS1 *)COMPACT_DATA(self);
+        x = *p << 7;
+        while (--len >= 0)
+            x = (1000003*x) ^ *p++;
+        break;
+    }
+    case 2: {
+        register const Py_UCS2 *p = (const Py_UCS2 *)COMPACT_DATA(self);
+        x = *p << 7;
+        while (--len >= 0)
+            x = (1000003*x) ^ *p++;
+        break;
+    }
+    default: {
+        register const Py_UNICODE *p = self->str;
+        x = *p << 7;
+        while (--len >= 0)
+            x = (1000003*x) ^ *p++;
+    }
+    }
     x ^= PyUnicode_GET_SIZE(self);
     if (x == -1)
         x = -2;
@@ -6578,6 +7149,11 @@ unicode_index(PyUnicodeObject *self, PyObject *args)
 
     if (!_ParseTupleFinds(args, &substring, &start, &end))
         return NULL;
+    if (unicode_ready(self) < 0 ||
+        unicode_ready((PyUnicodeObject *)substring) < 0) {
+        Py_DECREF(substring);
+        return NULL;
+    }
 
     result = stringlib_find_slice(
         PyUnicode_AS_UNICODE(self), PyUnicode_GET_SIZE(self),
@@ -6608,6 +7184,9 @@ unicode_islower(PyUnicodeObject *self)
     register const Py_UNICODE *e;
     int cased;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1)
         return PyBool_FromLong(Py_UNICODE_ISLOWER(*p));
@@ -6642,6 +7221,9 @@ unicode_isupper(PyUnicodeObject *self)
     register const Py_UNICODE *e;
     int cased;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1)
         return PyBool_FromLong(Py_UNICODE_ISUPPER(*p) != 0);
@@ -6678,6 +7260,9 @@ unicode_istitle(PyUnicodeObject *self)
     register const Py_UNICODE *e;
     int cased, previous_is_cased;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1)
         return PyBool_FromLong((Py_UNICODE_ISTITLE(*p) != 0) ||
@@ -6723,6 +7308,9 @@ unicode_isspace(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISSPACE(*p))
@@ -6752,6 +7340,9 @@ unicode_isalpha(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISALPHA(*p))
@@ -6781,6 +7372,9 @@ unicode_isalnum(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISALNUM(*p))
@@ -6810,6 +7404,9 @@ unicode_isdecimal(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISDECIMAL(*p))
@@ -6839,6 +7436,9 @@ unicode_isdigit(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISDIGIT(*p))
@@ -6868,6 +7468,9 @@ unicode_isnumeric(PyUnicodeObject *self)
     register const Py_UNICODE *p = PyUnicode_AS_UNICODE(self);
     register const Py_UNICODE *e;
 
+    if (p == NULL)
+        return NULL;
+
     /* Shortcut for single character strings */
     if (PyUnicode_GET_SIZE(self) == 1 &&
         Py_UNICODE_ISNUMERIC(*p))
@@ -6950,17 +7553,26 @@ static const char *stripformat[] = {"|O:lstrip", "|O:rstrip", "|O:strip"};
 PyObject *
 _PyUnicode_XStrip(PyUnicodeObject *self, int striptype, PyObject *sepobj)
 {
-    Py_UNICODE *s = PyUnicode_AS_UNICODE(self);
+    int kind;
+    const void *s;
     Py_ssize_t len = PyUnicode_GET_SIZE(self);
     Py_UNICODE *sep = PyUnicode_AS_UNICODE(sepobj);
     Py_ssize_t seplen = PyUnicode_GET_SIZE(sepobj);
     Py_ssize_t i, j;
+    BLOOM_MASK sepmask;
 
-    BLOOM_MASK sepmask = make_bloom_mask(sep, seplen);
+    if (sep == NULL)
+        return NULL;
+    /* Getting the buffer of sepobj widens self if they are the same
+       object, so only look at the data of self afterwards */
+    kind = self->kind;
+    s = self->str;
+    sepmask = make_bloom_mask(sep, seplen);
 
     i = 0;
     if (striptype != RIGHTSTRIP) {
-        while (i < len && BLOOM_MEMBER(sepmask, s[i], sep, seplen)) {
+        while (i < len && BLOOM_MEMBER(sepmask, COMPACT_READ(kind, s, i),
+                                       sep, seplen)) {
             i++;
         }
     }
@@ -6969,7 +7581,8 @@ _PyUnicode_XStrip(PyUnicodeObject *self, int striptype, PyObject *sepobj)
     if (striptype != LEFTSTRIP) {
         do {
             j--;
-        } while (j >= i && BLOOM_MEMBER(sepmask, s[j], sep, seplen));
+        } while (j >= i && BLOOM_MEMBER(sepmask, COMPACT_READ(kind, s, j),
+                                        sep, seplen));
         j++;
     }
 
@@ -6978,19 +7591,20 @@ _PyUnicode_XStrip(PyUnicodeObject *self, int striptype, PyObject *sepobj)
         return (PyObject*)self;
     }
     else
-        return PyUnicode_FromUnicode(s+i, j-i);
+        return unicode_substring(self, i, j-i);
 }
 
 
 static PyObject *
 do_strip(PyUnicodeObject *self, int striptype)
 {
-    Py_UNICODE *s = PyUnicode_AS_UNICODE(self);
+    int kind = self->kind;
+    const void *s = self->str;
     Py_ssize_t len = PyUnicode_GET_SIZE(self), i, j;
 
     i = 0;
     if (striptype != RIGHTSTRIP) {
-        while (i < len && Py_UNICODE_ISSPACE(s[i])) {
+        while (i < len && Py_UNICODE_ISSPACE(COMPACT_READ(kind, s, i))) {
             i++;
         }
     }
@@ -6999,7 +7613,7 @@ do_strip(PyUnicodeObject *self, int striptype)
     if (striptype != LEFTSTRIP) {
         do {
             j--;
-        } while (j >= i && Py_UNICODE_ISSPACE(s[j]));
+        } while (j >= i && Py_UNICODE_ISSPACE(COMPACT_READ(kind, s, j)));
         j++;
     }
 
@@ -7008,7 +7622,7 @@ do_strip(PyUnicodeObject *self, int striptype)
         return (PyObject*)self;
     }
     else
-        return PyUnicode_FromUnicode(s+i, j-i);
+        return unicode_substring(self, i, j-i);
 }
 
 
@@ -7139,7 +7753,7 @@ unicode_repeat(PyUnicodeObject *str, Py_ssize_t len)
     } else {
         Py_ssize_t done = 0; /* number of characters copied this far */
         if (done < nchars) {
-            Py_UNICODE_COPY(p, str->str, str->length);
+            unicode_copy_chars(p, str);
             done = str->length;
         }
         while (done < nchars) {
@@ -7222,7 +7836,11 @@ unicode_replace(PyUnicodeObject *self, PyObject *args)
 static
 PyObject *unicode_repr(PyObject *unicode)
 {
-    return unicodeescape_string(PyUnicode_AS_UNICODE(unicode),
+    Py_UNICODE *s = PyUnicode_AS_UNICODE(unicode);
+
+    if (s == NULL)
+        return NULL;
+    return unicodeescape_string(s,
                                 PyUnicode_GET_SIZE(unicode),
                                 1);
 }
@@ -7246,6 +7864,11 @@ unicode_rfind(PyUnicodeObject *self, PyObject *args)
 
     if (!_ParseTupleFinds(args, &substring, &start, &end))
         return NULL;
+    if (unicode_ready(self) < 0 ||
+        unicode_ready((PyUnicodeObject *)substring) < 0) {
+        Py_DECREF(substring);
+        return NULL;
+    }
 
     result = stringlib_rfind_slice(
         PyUnicode_AS_UNICODE(self), PyUnicode_GET_SIZE(self),
@@ -7273,6 +7896,11 @@ unicode_rindex(PyUnicodeObject *self, PyObject *args)
 
     if (!_ParseTupleFinds(args, &substring, &start, &end))
         return NULL;
+    if (unicode_ready(self) < 0 ||
+        unicode_ready((PyUnicodeObject *)substring) < 0) {
+        Py_DECREF(substring);
+        return NULL;
+    }
 
     result = stringlib_rfind_slice(
         PyUnicode_AS_UNICODE(self), PyUnicode_GET_SIZE(self),
@@ -7330,8 +7958,7 @@ unicode_slice(PyUnicodeObject *self, Py_ssize_t start, Py_ssize_t end)
     if (start > end)
         start = end;
     /* copy slice */
-    return (PyObject*) PyUnicode_FromUnicode(self->str + start,
-                                             end - start);
+    return unicode_substring(self, start, end - start);
 }
 
 PyObject *PyUnicode_Split(PyObject *s,
@@ -7399,6 +8026,12 @@ PyUnicode_Partition(PyObject *str_in, PyObject *sep_in)
         Py_DECREF(str_obj);
         return NULL;
     }
+    if (unicode_ready((PyUnicodeObject *)str_obj) < 0 ||
+        unicode_ready((PyUnicodeObject *)sep_obj) < 0) {
+        Py_DECREF(sep_obj);
+        Py_DECREF(str_obj);
+        return NULL;
+    }
 
     out = stringlib_partition(
         str_obj, PyUnicode_AS_UNICODE(str_obj), PyUnicode_GET_SIZE(str_obj),
@@ -7427,6 +8060,12 @@ PyUnicode_RPartition(PyObject *str_in, PyObject *sep_in)
         Py_DECREF(str_obj);
         return NULL;
     }
+    if (unicode_ready((PyUnicodeObject *)str_obj) < 0 ||
+        unicode_ready((PyUnicodeObject *)sep_obj) < 0) {
+        Py_DECREF(sep_obj);
+        Py_DECREF(str_obj);
+        return NULL;
+    }
 
     out = stringlib_rpartition(
         str_obj, PyUnicode_AS_UNICODE(str_obj), PyUnicode_GET_SIZE(str_obj),
@@ -7563,6 +8202,8 @@ are deleted.");
 static PyObject*
 unicode_translate(PyUnicodeObject *self, PyObject *table)
 {
+    if (unicode_ready(self) < 0)
+        return NULL;
     return PyUnicode_TranslateCharmap(self->str,
                                       self->length,
                                       table,
@@ -7752,6 +8393,8 @@ unicode__format__(PyObject *self, PyObject *args)
     if (tmp == NULL)
         goto done;
     format_spec = tmp;
+    if (PyUnicode_AS_UNICODE(format_spec) == NULL)
+        goto done;
 
     result = _PyUnicode_FormatAdvanced(self,
                                        PyUnicode_AS_UNICODE(format_spec),
@@ -7769,8 +8412,10 @@ PyDoc_STRVAR(p_format__doc__,
 static PyObject *
 unicode__sizeof__(PyUnicodeObject *v)
 {
+    size_t charsize = v->kind ? v->kind : sizeof(Py_UNICODE);
+
     return PyInt_FromSsize_t(sizeof(PyUnicodeObject) +
-                             sizeof(Py_UNICODE) * (v->length + 1));
+                             charsize * (v->length + 1));
 }
 
 PyDoc_STRVAR(sizeof__doc__,
@@ -7781,7 +8426,7 @@ PyDoc_STRVAR(sizeof__doc__,
 static PyObject *
 unicode_getnewargs(PyUnicodeObject *v)
 {
-    return Py_BuildValue("(u#)", v->str, v->length);
+    return Py_BuildValue("(N)", unicode_substring(v, 0, v->length));
 }
 
 
@@ -7889,7 +8534,6 @@ unicode_subscript(PyUnicodeObject* self, PyObject* item)
         return unicode_getitem(self, i);
     } else if (PySlice_Check(item)) {
         Py_ssize_t start, stop, step, slicelength, cur, i;
-        Py_UNICODE* source_buf;
         Py_UNICODE* result_buf;
         PyObject* result;
 
@@ -7905,9 +8549,10 @@ unicode_subscript(PyUnicodeObject* self, PyObject* item)
             Py_INCREF(self);
             return (PyObject *)self;
         } else if (step == 1) {
-            return PyUnicode_FromUnicode(self->str + start, slicelength);
+            return unicode_substring(self, start, slicelength);
         } else {
-            source_buf = PyUnicode_AS_UNICODE((PyObject*)self);
+            int kind = COMPACT_KIND(self);
+            const void *source = kind ? COMPACT_DATA(self) : self->str;
             result_buf = (Py_UNICODE *)PyObject_MALLOC(slicelength*
                                                        sizeof(Py_UNICODE));
 
@@ -7915,7 +8560,7 @@ unicode_subscript(PyUnicodeObject* self, PyObject* item)
                 return PyErr_NoMemory();
 
             for (cur = start, i = 0; i < slicelength; cur += step, i++) {
-                result_buf[i] = source_buf[cur];
+                result_buf[i] = COMPACT_READ(kind, source, cur);
             }
 
             result = PyUnicode_FromUnicode(result_buf, slicelength);
@@ -7944,7 +8589,9 @@ unicode_buffer_getreadbuf(PyUnicodeObject *self,
                         "accessing non-existent unicode segment");
         return -1;
     }
-    *ptr = (void *) self->str;
+    *ptr = (void *) PyUnicode_AS_UNICODE(self);
+    if (*ptr == NULL)
+        return -1;
     return PyUnicode_GET_DATA_SIZE(self);
 }
 
@@ -8252,6 +8899,10 @@ PyObject *PyUnicode_Format(PyObject *format,
     if (uformat == NULL)
         return NULL;
     fmt = PyUnicode_AS_UNICODE(uformat);
+    if (fmt == NULL) {
+        Py_DECREF(uformat);
+        return NULL;
+    }
     fmtcnt = PyUnicode_GET_SIZE(uformat);
 
     reslen = rescnt = fmtcnt + 100;
@@ -8491,6 +9142,10 @@ PyObject *PyUnicode_Format(PyObject *format,
                     }
                 }
                 pbuf = PyUnicode_AS_UNICODE(temp);
+                if (pbuf == NULL) {
+                    Py_DECREF(temp);
+                    goto onError;
+                }
                 len = PyUnicode_GET_SIZE(temp);
                 if (prec >= 0 && len > prec)
                     len = prec;
@@ -8534,6 +9189,10 @@ PyObject *PyUnicode_Format(PyObject *format,
                             if (!temp)
                                 goto onError;
                             pbuf = PyUnicode_AS_UNICODE(temp);
+                            if (pbuf == NULL) {
+                                Py_DECREF(temp);
+                                goto onError;
+                            }
                             len = PyUnicode_GET_SIZE(temp);
                             sign = 1;
                         }
@@ -8562,6 +9221,10 @@ PyObject *PyUnicode_Format(PyObject *format,
                 if (temp == NULL)
                     goto onError;
                 pbuf = PyUnicode_AS_UNICODE(temp);
+                if (pbuf == NULL) {
+                    Py_DECREF(temp);
+                    goto onError;
+                }
                 len = PyUnicode_GET_SIZE(temp);
                 sign = 1;
                 if (flags & F_ZERO)
@@ -8744,7 +9407,10 @@ unicode_subtype_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         Py_DECREF(tmp);
         return PyErr_NoMemory();
     }
-    Py_UNICODE_COPY(pnew->str, tmp->str, n+1);
+    if (COMPACT_KIND(tmp))
+        compact_to_unicode(pnew->str, tmp->kind, COMPACT_DATA(tmp), n+1);
+    else
+        Py_UNICODE_COPY(pnew->str, tmp->str, n+1);
     pnew->length = n;
     pnew->hash = tmp->hash;
     Py_DECREF(tmp);
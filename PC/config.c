@@ -14,6 +14,7 @@ extern void initcmath(void);
 extern void initerrno(void);
 extern void initfuture_builtins(void);
 extern void initgc(void);
+extern void init_tracemalloc(void);
 #ifndef MS_WINI64
 extern void initimageop(void);
 #endif
@@ -65,6 +66,7 @@ extern void init_codecs_kr(void);
 extern void init_codecs_tw(void);
 extern void init_subprocess(void);
 extern void init_lsprof(void);
+extern void init_trace(void);
 extern void init_ast(void);
 extern void init_io(void);
 extern void _PyWarnings_Init(void);
@@ -89,6 +91,7 @@ struct _inittab _PyImport_Inittab[] = {
     {"errno", initerrno},
     {"future_builtins", initfuture_builtins},
     {"gc", initgc},
+    {"_tracemalloc", init_tracemalloc},
 #ifndef MS_WINI64
     {"imageop", initimageop},
 #endif
@@ -121,6 +124,7 @@ struct _inittab _PyImport_Inittab[] = {
     {"_bisect", init_bisect},
     {"_heapq", init_heapq},
     {"_lsprof", init_lsprof},
+    {"_trace", init_trace},
     {"itertools", inititertools},
     {"_collections", init_collections},
     {"_symtable", init_symtable},
@@ -2991,6 +2991,11 @@ filterunicode(PyObject *func, PyObject *strobj)
                 /* do we need more space? */
                 Py_ssize_t need = j + reslen + len - i - 1;
 
+                if (PyUnicode_AS_UNICODE(item) == NULL) {
+                    Py_DECREF(item);
+                    goto Fail_1;
+                }
+
                 /* check that didnt overflow */
                 if ((j > PY_SSIZE_T_MAX - reslen) ||
                     ((j + reslen) > PY_SSIZE_T_MAX - len) ||
@@ -565,6 +565,10 @@ PyObject *PyCodec_XMLCharRefReplaceErrors(PyObject *exc)
         if (!(object = PyUnicodeEncodeError_GetObject(exc)))
             return NULL;
         startp = PyUnicode_AS_UNICODE(object);
+        if (startp == NULL) {
+            Py_DECREF(object);
+            return NULL;
+        }
         for (p = startp+start, ressize = 0; p < startp+end; ++p) {
             if (*p<10)
                 ressize += 2+1+1;
@@ -677,6 +681,10 @@ PyObject *PyCodec_BackslashReplaceErrors(PyObject *exc)
         if (!(object = PyUnicodeEncodeError_GetObject(exc)))
             return NULL;
         startp = PyUnicode_AS_UNICODE(object);
+        if (startp == NULL) {
+            Py_DECREF(object);
+            return NULL;
+        }
         for (p = startp+start, ressize = 0; p < startp+end; ++p) {
 #ifdef Py_UNICODE_WIDE
             if (*p >= 0x00010000)
@@ -134,6 +134,7 @@ managed by compiler_enter_scope() and compiler_exit_scope().
 
 struct compiler {
     const char *c_filename;
+    PyObject *c_filename_obj;    /* c_filename shared by the code objects */
     struct symtable *c_st;
     PyFutureFeatures *c_future; /* pointer to module's __future__ */
     PyCompilerFlags *c_flags;
@@ -316,6 +317,7 @@ compiler_free(struct compiler *c)
         PySymtable_Free(c->c_st);
     if (c->c_future)
         PyObject_Free(c->c_future);
+    Py_XDECREF(c->c_filename_obj);
     Py_DECREF(c->c_stack);
 }
 
@@ -1481,8 +1483,18 @@ static int
 compiler_ifexp(struct compiler *c, expr_ty e)
 {
     basicblock *end, *next;
+    int constant;
 
     assert(e->kind == IfExp_kind);
+    constant = expr_constant(e->v.IfExp.test);
+    if (constant == 0) {
+        VISIT(c, expr, e->v.IfExp.orelse);
+        return 1;
+    }
+    else if (constant == 1) {
+        VISIT(c, expr, e->v.IfExp.body);
+        return 1;
+    }
     end = compiler_new_block(c);
     if (end == NULL)
         return 0;
@@ -2876,11 +2888,19 @@ compiler_visit_keyword(struct compiler *c, keyword_ty k)
 static int
 expr_constant(expr_ty e)
 {
+    int constant;
+
     switch (e->kind) {
     case Num_kind:
         return PyObject_IsTrue(e->v.Num.n);
     case Str_kind:
         return PyObject_IsTrue(e->v.Str.s);
+    case UnaryOp_kind:
+        /* "if not __debug__" */
+        if (e->v.UnaryOp.op != Not)
+            return -1;
+        constant = expr_constant(e->v.UnaryOp.operand);
+        return constant < 0 ? -1 : !constant;
     case Name_kind:
         /* __debug__ is not assignable, so we can optimize
          * it away in if and while statements */
@@ -3847,9 +3867,14 @@ makecode(struct compiler *c, struct assembler *a)
     freevars = dict_keys_inorder(c->u->u_freevars, PyTuple_Size(cellvars));
     if (!freevars)
         goto error;
-    filename = PyString_FromString(c->c_filename);
-    if (!filename)
-        goto error;
+    if (!c->c_filename_obj) {
+        /* a single object, so that marshal can share it */
+        c->c_filename_obj = PyString_FromString(c->c_filename);
+        if (!c->c_filename_obj)
+            goto error;
+    }
+    filename = c->c_filename_obj;
+    Py_INCREF(filename);
 
     nlocals = PyDict_Size(c->u->u_varnames);
     flags = compute_code_flags(c);
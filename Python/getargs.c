@@ -1172,6 +1172,9 @@ convertsimple(PyObject *arg, const char **p_format, va_list *p_va, int flags,
             FETCH_SIZE;
             if (PyUnicode_Check(arg)) {
                 *p = PyUnicode_AS_UNICODE(arg);
+                if (*p == NULL)
+                    return converterr("(memory error)",
+                                      arg, msgbuf, bufsize);
                 STORE_SIZE(PyUnicode_GET_SIZE(arg));
             }
             else {
@@ -1181,8 +1184,12 @@ convertsimple(PyObject *arg, const char **p_format, va_list *p_va, int flags,
             format++;
         } else {
             Py_UNICODE **p = va_arg(*p_va, Py_UNICODE **);
-            if (PyUnicode_Check(arg))
+            if (PyUnicode_Check(arg)) {
                 *p = PyUnicode_AS_UNICODE(arg);
+                if (*p == NULL)
+                    return converterr("(memory error)",
+                                      arg, msgbuf, bufsize);
+            }
             else
                 return converterr("unicode", arg, msgbuf, bufsize);
         }
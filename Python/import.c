@@ -77,9 +77,10 @@ typedef unsigned short mode_t;
        Python 2.7a0  62191 (introduce SETUP_WITH)
        Python 2.7a0  62201 (introduce BUILD_SET)
        Python 2.7a0  62211 (introduce MAP_ADD and SET_ADD)
+       Python 2.7a0  62221 (marshal version 3: references to shared objects)
 .
 */
-#define MAGIC (62211 | ((long)'\r'<<16) | ((long)'\n'<<24))
+#define MAGIC (62221 | ((long)'\r'<<16) | ((long)'\n'<<24))
 
 /* Magic word as global; note that _PyImport_Init() can change the
    value of this global to accommodate for alterations of how the
@@ -89,6 +90,9 @@ static long pyc_magic = MAGIC;
 /* See _PyImport_FixupExtension() below */
 static PyObject *extensions = NULL;
 
+/* Set by PYTHONIMPORTTIME, see import_submodule() */
+static int import_time = 0;
+
 /* This table is defined in config.c: */
 extern struct _inittab _PyImport_Inittab[];
 
@@ -124,6 +128,7 @@ _PyImport_Init(void)
     struct filedescr *filetab;
     int countD = 0;
     int countS = 0;
+    char *p;
 
     /* prepare _PyImport_Filetab: copy entries from
        _PyImport_DynLoadFiletab and _PyImport_StandardFiletab.
@@ -166,6 +171,10 @@ _PyImport_Init(void)
            code created in normal operation mode. */
         pyc_magic = MAGIC + 1;
     }
+
+    p = Py_GETENV("PYTHONIMPORTTIME");
+    if (p != NULL && *p != '\0')
+        import_time = 1;
 }
 
 void
@@ -238,6 +247,8 @@ _PyImportHooks_Init(void)
     Py_DECREF(path_hooks);
 }
 
+static void dircache_clear(void); /* Forward */
+
 void
 _PyImport_Fini(void)
 {
@@ -245,6 +256,7 @@ _PyImport_Fini(void)
     extensions = NULL;
     PyMem_DEL(_PyImport_Filetab);
     _PyImport_Filetab = NULL;
+    dircache_clear();
 }
 
 
@@ -351,6 +363,14 @@ imp_release_lock(PyObject *self, PyObject *noargs)
     return Py_None;
 }
 
+static PyObject *
+imp_invalidate_caches(PyObject *self, PyObject *noargs)
+{
+    dircache_clear();
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 static void
 imp_modules_reloading_clear(void)
 {
@@ -1184,6 +1204,240 @@ PyImport_GetImporter(PyObject *path) {
     return importer;
 }
 
+/* Cache of the directory listings of the sys.path and package __path__
+   entries.  find_module() would otherwise try to stat() or open every
+   suffix of the module name in every directory, which is a lot of failed
+   system calls on slow (network) filesystems.  Instead, each directory
+   is listed once and only the names found in the listing are tried.  A
+   listing is reused as long as the stat() of the directory (device,
+   inode and mtime) is unchanged.  Since the mtime resolution may be
+   coarse, a directory modified less than DIRCACHE_DELAY seconds before
+   it was listed is listed again at the next lookup.  imp.invalidate_caches()
+   forgets all the listings.
+
+   On case-insensitive filesystems, the names of the listing are compared
+   with the case of the module name, like case_ok() does; the cache is
+   not used when PYTHONCASEOK is set. */
+
+#if defined(HAVE_STAT) && defined(HAVE_DIRENT_H) && \
+    !defined(PYOS_OS2) && !defined(RISCOS)
+#define USE_DIRCACHE
+#endif
+
+#ifdef USE_DIRCACHE
+#include <dirent.h>
+
+#define DIRCACHE_DELAY 2
+
+typedef struct {
+    dev_t dev;
+    ino_t ino;
+    time_t mtime;
+    long mtime_nsec;
+    PyObject *names;  /* set of the names of the directory entries */
+} dirlisting;
+
+/* directory name -> PyCapsule of a dirlisting */
+static PyObject *dircache = NULL;
+
+static const char dirlisting_capsule_name[] = "import.dirlisting";
+
+static long
+dircache_mtime_nsec(struct stat *st)
+{
+#if defined(HAVE_STAT_TV_NSEC)
+    return st->st_mtim.tv_nsec;
+#elif defined(HAVE_STAT_TV_NSEC2)
+    return st->st_mtimespec.tv_nsec;
+#else
+    return 0;
+#endif
+}
+
+static void
+dirlisting_free(PyObject *capsule)
+{
+    dirlisting *listing = (dirlisting *)PyCapsule_GetPointer(
+        capsule, dirlisting_capsule_name);
+    Py_XDECREF(listing->names);
+    PyMem_Free(listing);
+}
+
+/* Return a new set of the names of the entries of the directory, or
+   None if it cannot be read. */
+static PyObject *
+dircache_listdir(const char *dirname)
+{
+    DIR *dirp;
+    struct dirent *ep;
+    PyObject *names, *name;
+
+    dirp = opendir(dirname);
+    if (dirp == NULL) {
+        /* an unreadable directory may still be searchable */
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    names = PySet_New(NULL);
+    if (names == NULL) {
+        closedir(dirp);
+        return NULL;
+    }
+    while ((ep = readdir(dirp)) != NULL) {
+        name = PyString_FromString(ep->d_name);
+        if (name == NULL || PySet_Add(names, name) < 0) {
+            Py_XDECREF(name);
+            Py_DECREF(names);
+            closedir(dirp);
+            return NULL;
+        }
+        Py_DECREF(name);
+    }
+    closedir(dirp);
+    return names;
+}
+
+/* Look up the listing of the directory buf[0:len] in the cache, listing
+   it if needed.  Return 0 if the directory does not exist (no module can
+   be found in it), 1 otherwise, and -1 on error.  *p_names is set to a
+   new reference to the set of the names of its entries, or to NULL if
+   they are unknown and every file must be tried. */
+static int
+dircache_lookup(char *buf, size_t len, PyObject **p_names)
+{
+    char dirname[MAXPATHLEN+1];
+    struct stat st;
+    PyObject *key, *capsule, *names;
+    dirlisting *listing;
+    time_t now;
+    int err;
+
+    *p_names = NULL;
+#if (defined(__MACH__) && defined(__APPLE__)) || defined(__CYGWIN__)
+    if (Py_GETENV("PYTHONCASEOK") != NULL)
+        return 1;
+#endif
+    if (len > MAXPATHLEN)
+        return 1;
+    if (len == 0)
+        strcpy(dirname, ".");
+    else {
+        memcpy(dirname, buf, len);
+        dirname[len] = '\0';
+    }
+    if (stat(dirname, &st) != 0 || !S_ISDIR(st.st_mode)) {
+        /* no file can be opened below a missing directory or a file */
+        return 0;
+    }
+
+    if (dircache == NULL) {
+        dircache = PyDict_New();
+        if (dircache == NULL)
+            return -1;
+    }
+    key = PyString_FromString(dirname);
+    if (key == NULL)
+        return -1;
+    capsule = PyDict_GetItem(dircache, key);
+    if (capsule != NULL) {
+        listing = (dirlisting *)PyCapsule_GetPointer(
+            capsule, dirlisting_capsule_name);
+        if (listing->dev == st.st_dev && listing->ino == st.st_ino &&
+            listing->mtime == st.st_mtime &&
+            listing->mtime_nsec == dircache_mtime_nsec(&st)) {
+            Py_DECREF(key);
+            Py_INCREF(listing->names);
+            *p_names = listing->names;
+            return 1;
+        }
+        /* stale listing */
+        if (PyDict_DelItem(dircache, key) < 0) {
+            Py_DECREF(key);
+            return -1;
+        }
+    }
+
+    now = time(NULL);
+    names = dircache_listdir(dirname);
+    if (names == NULL) {
+        Py_DECREF(key);
+        return -1;
+    }
+    if (names == Py_None) {
+        Py_DECREF(names);
+        Py_DECREF(key);
+        return 1;
+    }
+    if (st.st_mtime > now - DIRCACHE_DELAY) {
+        /* a file added in the same clock tick as the listing would not
+           change the mtime: use the listing for this lookup only */
+        Py_DECREF(key);
+        *p_names = names;
+        return 1;
+    }
+    listing = PyMem_New(dirlisting, 1);
+    if (listing == NULL) {
+        Py_DECREF(names);
+        Py_DECREF(key);
+        PyErr_NoMemory();
+        return -1;
+    }
+    listing->dev = st.st_dev;
+    listing->ino = st.st_ino;
+    listing->mtime = st.st_mtime;
+    listing->mtime_nsec = dircache_mtime_nsec(&st);
+    listing->names = names;
+    capsule = PyCapsule_New(listing, dirlisting_capsule_name,
+                            dirlisting_free);
+    if (capsule == NULL) {
+        Py_DECREF(names);
+        PyMem_Free(listing);
+        Py_DECREF(key);
+        return -1;
+    }
+    err = PyDict_SetItem(dircache, key, capsule);
+    Py_DECREF(capsule);
+    Py_DECREF(key);
+    if (err < 0)
+        return -1;
+    Py_INCREF(names);
+    *p_names = names;
+    return 1;
+}
+
+/* Return 1 if the directory listing names is known and has no entry
+   called name, else 0: the file must be tried. */
+static int
+dircache_missing(PyObject *names, char *name)
+{
+    PyObject *key;
+    int found;
+
+    if (names == NULL)
+        return 0;
+    key = PyString_FromString(name);
+    if (key == NULL) {
+        PyErr_Clear();
+        return 0;
+    }
+    found = PySet_Contains(names, key);
+    Py_DECREF(key);
+    if (found < 0) {
+        PyErr_Clear();
+        return 0;
+    }
+    return !found;
+}
+#endif /* USE_DIRCACHE */
+
+static void
+dircache_clear(void)
+{
+#ifdef USE_DIRCACHE
+    Py_CLEAR(dircache);
+#endif
+}
+
 /* Search the path (default sys.path) for a module.  Return the
    corresponding filedescr struct, and (via return arguments) the
    pathname and an open file.  Return NULL if the module is not found. */
@@ -1214,6 +1468,9 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
     static struct filedescr fd_builtin = {"", "", C_BUILTIN};
     static struct filedescr fd_package = {"", "", PKG_DIRECTORY};
     char name[MAXPATHLEN+1];
+#ifdef USE_DIRCACHE
+    PyObject *names = NULL;
+#endif
 #if defined(PYOS_OS2)
     size_t saved_len;
     size_t saved_namelen;
@@ -1333,8 +1590,8 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
             return NULL;
 #ifdef Py_USING_UNICODE
         if (PyUnicode_Check(v)) {
-            copy = PyUnicode_Encode(PyUnicode_AS_UNICODE(v),
-                PyUnicode_GET_SIZE(v), Py_FileSystemDefaultEncoding, NULL);
+            copy = PyUnicode_AsEncodedString(v,
+                Py_FileSystemDefaultEncoding, NULL);
             if (copy == NULL)
                 return NULL;
             v = copy;
@@ -1384,6 +1641,17 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
         }
         /* no hook was found, use builtin import */
 
+#ifdef USE_DIRCACHE
+        switch (dircache_lookup(buf, len, &names)) {
+        case -1:
+            Py_XDECREF(copy);
+            return NULL;
+        case 0:
+            Py_XDECREF(copy);
+            continue;
+        }
+#endif
+
         if (len > 0 && buf[len-1] != SEP
 #ifdef ALTSEP
             && buf[len-1] != ALTSEP
@@ -1396,11 +1664,18 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
         /* Check for package import (buf holds a directory name,
            and there's an __init__ module in that directory */
 #ifdef HAVE_STAT
-        if (stat(buf, &statbuf) == 0 &&         /* it exists */
+        if (
+#ifdef USE_DIRCACHE
+            !dircache_missing(names, name) &&
+#endif
+            stat(buf, &statbuf) == 0 &&         /* it exists */
             S_ISDIR(statbuf.st_mode) &&         /* it's a directory */
             case_ok(buf, len, namelen, name)) { /* case matches */
             if (find_init_module(buf)) { /* and has __init__.py */
                 Py_XDECREF(copy);
+#ifdef USE_DIRCACHE
+                Py_XDECREF(names);
+#endif
                 return &fd_package;
             }
             else {
@@ -1411,6 +1686,9 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
                 if (PyErr_Warn(PyExc_ImportWarning,
                                warnstr)) {
                     Py_XDECREF(copy);
+#ifdef USE_DIRCACHE
+                    Py_XDECREF(names);
+#endif
                     return NULL;
                 }
             }
@@ -1472,6 +1750,10 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
             }
 #endif /* PYOS_OS2 */
             strcpy(buf+len, fdp->suffix);
+#ifdef USE_DIRCACHE
+            if (dircache_missing(names, buf + len - namelen))
+                continue;
+#endif
             if (Py_VerboseFlag > 1)
                 PySys_WriteStderr("# trying %s\n", buf);
             filemode = fdp->mode;
@@ -1502,6 +1784,9 @@ find_module(char *fullname, char *subname, PyObject *path, char *buf,
         }
 #endif
         Py_XDECREF(copy);
+#ifdef USE_DIRCACHE
+        Py_CLEAR(names);
+#endif
         if (fp != NULL)
             break;
     }
@@ -2551,6 +2836,78 @@ add_submodule(PyObject *mod, PyObject *submod, char *fullname, char *subname,
     return 1;
 }
 
+/* Find and load a module which is not in sys.modules yet, see
+   import_submodule() */
+static PyObject *
+find_and_load_submodule(PyObject *mod, char *subname, char *fullname,
+                        PyObject *modules)
+{
+    PyObject *m, *path, *loader = NULL;
+    char buf[MAXPATHLEN+1];
+    struct filedescr *fdp;
+    FILE *fp = NULL;
+
+    if (mod == Py_None)
+        path = NULL;
+    else {
+        path = PyObject_GetAttrString(mod, "__path__");
+        if (path == NULL) {
+            PyErr_Clear();
+            Py_INCREF(Py_None);
+            return Py_None;
+        }
+    }
+
+    buf[0] = '\0';
+    fdp = find_module(fullname, subname, path, buf, MAXPATHLEN+1,
+                      &fp, &loader);
+    Py_XDECREF(path);
+    if (fdp == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_ImportError))
+            return NULL;
+        PyErr_Clear();
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    m = load_module(fullname, fp, buf, fdp->type, loader);
+    Py_XDECREF(loader);
+    if (fp)
+        fclose(fp);
+    if (!add_submodule(mod, m, fullname, subname, modules)) {
+        Py_XDECREF(m);
+        m = NULL;
+    }
+    return m;
+}
+
+/* Clock of PYTHONIMPORTTIME, in microseconds */
+static double
+import_clock(void)
+{
+#if defined(MS_WINDOWS)
+    static double unit = 0.0;
+    LARGE_INTEGER li;
+    if (unit == 0.0) {
+        if (QueryPerformanceFrequency(&li))
+            unit = 1e6 / li.QuadPart;
+        else
+            unit = 1.0;  /* unlikely */
+    }
+    QueryPerformanceCounter(&li);
+    return li.QuadPart * unit;
+#elif defined(HAVE_GETTIMEOFDAY)
+    struct timeval tv;
+#ifdef GETTIMEOFDAY_NO_TZ
+    gettimeofday(&tv);
+#else
+    gettimeofday(&tv, (struct timezone *)NULL);
+#endif
+    return tv.tv_sec * 1e6 + tv.tv_usec;
+#else
+    return clock() * (1e6 / CLOCKS_PER_SEC);
+#endif
+}
+
 static PyObject *
 import_submodule(PyObject *mod, char *subname, char *fullname)
 {
@@ -2565,42 +2922,34 @@ import_submodule(PyObject *mod, char *subname, char *fullname)
     if ((m = PyDict_GetItemString(modules, fullname)) != NULL) {
         Py_INCREF(m);
     }
+    else if (!import_time) {
+        m = find_and_load_submodule(mod, subname, fullname, modules);
+    }
     else {
-        PyObject *path, *loader = NULL;
-        char buf[MAXPATHLEN+1];
-        struct filedescr *fdp;
-        FILE *fp = NULL;
-
-        if (mod == Py_None)
-            path = NULL;
-        else {
-            path = PyObject_GetAttrString(mod, "__path__");
-            if (path == NULL) {
-                PyErr_Clear();
-                Py_INCREF(Py_None);
-                return Py_None;
-            }
-        }
-
-        buf[0] = '\0';
-        fdp = find_module(fullname, subname, path, buf, MAXPATHLEN+1,
-                          &fp, &loader);
-        Py_XDECREF(path);
-        if (fdp == NULL) {
-            if (!PyErr_ExceptionMatches(PyExc_ImportError))
-                return NULL;
-            PyErr_Clear();
-            Py_INCREF(Py_None);
-            return Py_None;
-        }
-        m = load_module(fullname, fp, buf, fdp->type, loader);
-        Py_XDECREF(loader);
-        if (fp)
-            fclose(fp);
-        if (!add_submodule(mod, m, fullname, subname, modules)) {
-            Py_XDECREF(m);
-            m = NULL;
+        /* Write the time spent importing each module, including (cumulative)
+           or not (self) the modules it imports, indented by nesting level */
+        static int header = 1;
+        static int level = 0;
+        static double nested = 0.0;  /* cumulative time of the nested imports */
+        double start, elapsed, outer_nested;
+
+        if (header) {
+            PySys_WriteStderr("import time: self [us] | cumulative | "
+                              "imported package\n");
+            header = 0;
         }
+        outer_nested = nested;
+        nested = 0.0;
+        level++;
+        start = import_clock();
+        m = find_and_load_submodule(mod, subname, fullname, modules);
+        elapsed = import_clock() - start;
+        level--;
+        if (m != Py_None)
+            PySys_WriteStderr("import time: %9ld | %10ld | %*s%.200s\n",
+                              (long)(elapsed - nested), (long)elapsed,
+                              level * 2, "", fullname);
+        nested = outer_nested + elapsed;
     }
 
     return m;
@@ -3143,6 +3492,12 @@ PyDoc_STRVAR(doc_release_lock,
 Release the interpreter's import lock.\n\
 On platforms without threads, this function does nothing.");
 
+PyDoc_STRVAR(doc_invalidate_caches,
+"invalidate_caches() -> None\n\
+Forget the directory listings cached by the import system.\n\
+Call it if modules may have been created since the last import\n\
+from the same directory, less than a few seconds before.");
+
 static PyMethodDef imp_methods[] = {
     {"reload",           imp_reload,       METH_O,       doc_reload},
     {"find_module",      imp_find_module,  METH_VARARGS, doc_find_module},
@@ -3153,6 +3508,8 @@ static PyMethodDef imp_methods[] = {
     {"lock_held",        imp_lock_held,    METH_NOARGS,  doc_lock_held},
     {"acquire_lock", imp_acquire_lock, METH_NOARGS,  doc_acquire_lock},
     {"release_lock", imp_release_lock, METH_NOARGS,  doc_release_lock},
+    {"invalidate_caches", imp_invalidate_caches, METH_NOARGS,
+     doc_invalidate_caches},
     /* The rest are obsolete */
     {"get_frozen_object",       imp_get_frozen_object,  METH_VARARGS},
     {"init_builtin",            imp_init_builtin,       METH_VARARGS},
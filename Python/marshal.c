@@ -43,6 +43,15 @@
 #define TYPE_UNKNOWN            '?'
 #define TYPE_SET                '<'
 #define TYPE_FROZENSET          '>'
+#define TYPE_REF                'r'
+#define TYPE_SHORT_STRING       'z'
+#define TYPE_SHORT_INTERNED     'Z'
+#define TYPE_SMALL_TUPLE        ')'
+
+/* Since version 3, this bit is set in the type code of the objects which
+   are referred to later by a TYPE_REF code followed by the index of the
+   object in the order of the flagged objects. */
+#define FLAG_REF                '\x80'
 
 #define WFERR_OK 0
 #define WFERR_UNMARSHALLABLE 1
@@ -58,6 +67,9 @@ typedef struct {
     char *ptr;
     char *end;
     PyObject *strings; /* dict on marshal, list on unmarshal */
+    PyObject *refs; /* dict on marshal, list on unmarshal, see w_ref() */
+    int counting; /* first pass of w_root(), nothing is written */
+    long nrefs; /* number of objects flagged with FLAG_REF */
     int version;
 } WFILE;
 
@@ -93,7 +105,7 @@ w_string(char *s, int n, WFILE *p)
     if (p->fp != NULL) {
         fwrite(s, 1, n, p->fp);
     }
-    else {
+    else if (p->str != NULL) {
         while (--n >= 0) {
             w_byte(*s, p);
             s++;
@@ -139,12 +151,12 @@ w_long64(long x, WFILE *p)
 #define PyLong_MARSHAL_RATIO (PyLong_SHIFT / PyLong_MARSHAL_SHIFT)
 
 static void
-w_PyLong(const PyLongObject *ob, WFILE *p)
+w_PyLong(const PyLongObject *ob, char flag, WFILE *p)
 {
     Py_ssize_t i, j, n, l;
     digit d;
 
-    w_byte(TYPE_LONG, p);
+    w_byte(TYPE_LONG | flag, p);
     if (Py_SIZE(ob) == 0) {
         w_long((long)0, p);
         return;
@@ -176,10 +188,78 @@ w_PyLong(const PyLongObject *ob, WFILE *p)
     } while (d != 0);
 }
 
+/* Since version 3, the objects reached several times are only written
+   once, flagged with FLAG_REF, then replaced by a TYPE_REF code and their
+   index in the order of the flagged objects.  p->refs maps the address of
+   the objects to the number of times they are reached, computed by the
+   first pass of w_root(), then to -1 - index once written.  The objects
+   are kept alive by the object being marshalled, so their addresses
+   cannot be reused.  Only flagging the shared objects keeps the reader
+   from storing the others.
+   Return 1 if the object must not be written (a reference was written,
+   the counting pass reached it again, or on error), else 0 and set
+   FLAG_REF in *flag if the object will be referred to later. */
+static int
+w_ref(PyObject *v, char *flag, WFILE *p)
+{
+    PyObject *id, *idx;
+    long n;
+    int ok;
+
+    if (p->version < 3 || p->refs == NULL)
+        return 0;
+    /* the object cannot be reached twice if we hold its only reference */
+    if (Py_REFCNT(v) == 1)
+        return 0;
+
+    id = PyLong_FromVoidPtr((void *)v);
+    if (id == NULL)
+        goto err;
+    idx = PyDict_GetItem(p->refs, id);
+    if (p->counting) {
+        /* don't count the items of an object reached again */
+        n = (idx == NULL) ? 1 : PyInt_AS_LONG(idx) + 1;
+    }
+    else {
+        n = (idx == NULL) ? 1 : PyInt_AS_LONG(idx);
+        if (n < 0) {
+            Py_DECREF(id);
+            w_byte(TYPE_REF, p);
+            w_long(-1 - n, p);
+            return 1;
+        }
+        if (n == 1) {
+            Py_DECREF(id);
+            return 0;
+        }
+        if (p->nrefs >= 0x7fffffff) {
+            Py_DECREF(id);
+            p->error = WFERR_UNMARSHALLABLE;
+            return 1;
+        }
+        n = -1 - p->nrefs++;
+        *flag |= FLAG_REF;
+    }
+    idx = PyInt_FromLong(n);
+    ok = idx != NULL && PyDict_SetItem(p->refs, id, idx) == 0;
+    Py_DECREF(id);
+    Py_XDECREF(idx);
+    if (!ok)
+        goto err;
+    return p->counting && n > 1;
+
+  err:
+    p->error = WFERR_NOMEMORY;
+    return 1;
+}
+
+static void
+w_complex_object(PyObject *v, char flag, WFILE *p);
+
 static void
 w_object(PyObject *v, WFILE *p)
 {
-    Py_ssize_t i, n;
+    char flag = '\0';
 
     p->depth++;
 
@@ -204,24 +284,37 @@ w_object(PyObject *v, WFILE *p)
     else if (v == Py_True) {
         w_byte(TYPE_TRUE, p);
     }
-    else if (PyInt_CheckExact(v)) {
+    else if (!w_ref(v, &flag, p)) {
+        w_complex_object(v, flag, p);
+    }
+    p->depth--;
+}
+
+#define W_TYPE(t, p) w_byte((t) | flag, (p))
+
+static void
+w_complex_object(PyObject *v, char flag, WFILE *p)
+{
+    Py_ssize_t i, n;
+
+    if (PyInt_CheckExact(v)) {
         long x = PyInt_AS_LONG((PyIntObject *)v);
 #if SIZEOF_LONG > 4
         long y = Py_ARITHMETIC_RIGHT_SHIFT(long, x, 31);
         if (y && y != -1) {
-            w_byte(TYPE_INT64, p);
+            W_TYPE(TYPE_INT64, p);
             w_long64(x, p);
         }
         else
 #endif
             {
-            w_byte(TYPE_INT, p);
+            W_TYPE(TYPE_INT, p);
             w_long(x, p);
         }
     }
     else if (PyLong_CheckExact(v)) {
         PyLongObject *ob = (PyLongObject *)v;
-        w_PyLong(ob, p);
+        w_PyLong(ob, flag, p);
     }
     else if (PyFloat_CheckExact(v)) {
         if (p->version > 1) {
@@ -231,7 +324,7 @@ w_object(PyObject *v, WFILE *p)
                 p->error = WFERR_UNMARSHALLABLE;
                 return;
             }
-            w_byte(TYPE_BINARY_FLOAT, p);
+            W_TYPE(TYPE_BINARY_FLOAT, p);
             w_string((char*)buf, 8, p);
         }
         else {
@@ -242,7 +335,7 @@ w_object(PyObject *v, WFILE *p)
                 return;
             }
             n = strlen(buf);
-            w_byte(TYPE_FLOAT, p);
+            W_TYPE(TYPE_FLOAT, p);
             w_byte((int)n, p);
             w_string(buf, (int)n, p);
             PyMem_Free(buf);
@@ -257,7 +350,7 @@ w_object(PyObject *v, WFILE *p)
                 p->error = WFERR_UNMARSHALLABLE;
                 return;
             }
-            w_byte(TYPE_BINARY_COMPLEX, p);
+            W_TYPE(TYPE_BINARY_COMPLEX, p);
             w_string((char*)buf, 8, p);
             if (_PyFloat_Pack8(PyComplex_ImagAsDouble(v),
                                buf, 1) < 0) {
@@ -268,7 +361,7 @@ w_object(PyObject *v, WFILE *p)
         }
         else {
             char *buf;
-            w_byte(TYPE_COMPLEX, p);
+            W_TYPE(TYPE_COMPLEX, p);
             buf = PyOS_double_to_string(PyComplex_RealAsDouble(v),
                                         'g', 17, 0, NULL);
             if (!buf) {
@@ -293,13 +386,27 @@ w_object(PyObject *v, WFILE *p)
     }
 #endif
     else if (PyString_CheckExact(v)) {
-        if (p->strings && PyString_CHECK_INTERNED(v)) {
+        n = PyString_GET_SIZE(v);
+        if (p->version >= 3 && n < 256) {
+            /* the interned strings are shared by w_ref() */
+            if (PyString_CHECK_INTERNED(v))
+                W_TYPE(TYPE_SHORT_INTERNED, p);
+            else
+                W_TYPE(TYPE_SHORT_STRING, p);
+            w_byte((int)n, p);
+            w_string(PyString_AS_STRING(v), (int)n, p);
+            return;
+        }
+        if (p->version >= 3 && PyString_CHECK_INTERNED(v)) {
+            W_TYPE(TYPE_INTERNED, p);
+        }
+        else if (p->strings && PyString_CHECK_INTERNED(v)) {
             PyObject *o = PyDict_GetItem(p->strings, v);
             if (o) {
                 long w = PyInt_AsLong(o);
                 w_byte(TYPE_STRINGREF, p);
                 w_long(w, p);
-                goto exit;
+                return;
             }
             else {
                 int ok;
@@ -308,20 +415,17 @@ w_object(PyObject *v, WFILE *p)
                      PyDict_SetItem(p->strings, v, o) >= 0;
                 Py_XDECREF(o);
                 if (!ok) {
-                    p->depth--;
                     p->error = WFERR_UNMARSHALLABLE;
                     return;
                 }
-                w_byte(TYPE_INTERNED, p);
+                W_TYPE(TYPE_INTERNED, p);
             }
         }
         else {
-            w_byte(TYPE_STRING, p);
+            W_TYPE(TYPE_STRING, p);
         }
-        n = PyString_GET_SIZE(v);
         if (n > INT_MAX) {
             /* huge strings are not supported */
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
@@ -333,14 +437,12 @@ w_object(PyObject *v, WFILE *p)
         PyObject *utf8;
         utf8 = PyUnicode_AsUTF8String(v);
         if (utf8 == NULL) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
-        w_byte(TYPE_UNICODE, p);
+        W_TYPE(TYPE_UNICODE, p);
         n = PyString_GET_SIZE(utf8);
         if (n > INT_MAX) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
@@ -350,15 +452,21 @@ w_object(PyObject *v, WFILE *p)
     }
 #endif
     else if (PyTuple_CheckExact(v)) {
-        w_byte(TYPE_TUPLE, p);
         n = PyTuple_Size(v);
-        w_long((long)n, p);
+        if (p->version >= 3 && n < 256) {
+            W_TYPE(TYPE_SMALL_TUPLE, p);
+            w_byte((int)n, p);
+        }
+        else {
+            W_TYPE(TYPE_TUPLE, p);
+            w_long((long)n, p);
+        }
         for (i = 0; i < n; i++) {
             w_object(PyTuple_GET_ITEM(v, i), p);
         }
     }
     else if (PyList_CheckExact(v)) {
-        w_byte(TYPE_LIST, p);
+        W_TYPE(TYPE_LIST, p);
         n = PyList_GET_SIZE(v);
         w_long((long)n, p);
         for (i = 0; i < n; i++) {
@@ -368,7 +476,7 @@ w_object(PyObject *v, WFILE *p)
     else if (PyDict_CheckExact(v)) {
         Py_ssize_t pos;
         PyObject *key, *value;
-        w_byte(TYPE_DICT, p);
+        W_TYPE(TYPE_DICT, p);
         /* This one is NULL object terminated! */
         pos = 0;
         while (PyDict_Next(v, &pos, &key, &value)) {
@@ -381,19 +489,17 @@ w_object(PyObject *v, WFILE *p)
         PyObject *value, *it;
 
         if (PyObject_TypeCheck(v, &PySet_Type))
-            w_byte(TYPE_SET, p);
+            W_TYPE(TYPE_SET, p);
         else
-            w_byte(TYPE_FROZENSET, p);
+            W_TYPE(TYPE_FROZENSET, p);
         n = PyObject_Size(v);
         if (n == -1) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
         w_long((long)n, p);
         it = PyObject_GetIter(v);
         if (it == NULL) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
@@ -403,14 +509,13 @@ w_object(PyObject *v, WFILE *p)
         }
         Py_DECREF(it);
         if (PyErr_Occurred()) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
     }
     else if (PyCode_Check(v)) {
         PyCodeObject *co = (PyCodeObject *)v;
-        w_byte(TYPE_CODE, p);
+        W_TYPE(TYPE_CODE, p);
         w_long(co->co_argcount, p);
         w_long(co->co_nlocals, p);
         w_long(co->co_stacksize, p);
@@ -430,10 +535,9 @@ w_object(PyObject *v, WFILE *p)
         /* Write unknown buffer-style objects as a string */
         char *s;
         PyBufferProcs *pb = v->ob_type->tp_as_buffer;
-        w_byte(TYPE_STRING, p);
+        W_TYPE(TYPE_STRING, p);
         n = (*pb->bf_getreadbuffer)(v, 0, (void **)&s);
         if (n > INT_MAX) {
-            p->depth--;
             p->error = WFERR_UNMARSHALLABLE;
             return;
         }
@@ -441,11 +545,39 @@ w_object(PyObject *v, WFILE *p)
         w_string(s, (int)n, p);
     }
     else {
-        w_byte(TYPE_UNKNOWN, p);
+        W_TYPE(TYPE_UNKNOWN, p);
         p->error = WFERR_UNMARSHALLABLE;
     }
-   exit:
-    p->depth--;
+}
+
+#undef W_TYPE
+
+/* Write the object x, counting first how many times each object is
+   reached for version 3, see w_ref(). */
+static void
+w_root(PyObject *x, WFILE *p)
+{
+    p->refs = NULL;
+    p->counting = 0;
+    p->nrefs = 0;
+    if (p->version >= 3) {
+        WFILE counter = *p;
+        p->refs = PyDict_New();
+        if (p->refs == NULL) {
+            p->error = WFERR_NOMEMORY;
+            return;
+        }
+        counter.fp = NULL;
+        counter.str = NULL;
+        counter.ptr = counter.end = NULL;
+        counter.refs = p->refs;
+        counter.counting = 1;
+        w_object(x, &counter);
+        p->error = counter.error;
+    }
+    if (p->error == WFERR_OK)
+        w_object(x, p);
+    Py_CLEAR(p->refs);
 }
 
 /* version currently has no effect for writing longs. */
@@ -457,6 +589,8 @@ PyMarshal_WriteLongToFile(long x, FILE *fp, int version)
     wf.error = WFERR_OK;
     wf.depth = 0;
     wf.strings = NULL;
+    wf.refs = NULL;
+    wf.counting = 0;
     wf.version = version;
     w_long(x, &wf);
 }
@@ -466,11 +600,13 @@ PyMarshal_WriteObjectToFile(PyObject *x, FILE *fp, int version)
 {
     WFILE wf;
     wf.fp = fp;
+    wf.str = NULL;
+    wf.ptr = wf.end = NULL;
     wf.error = WFERR_OK;
     wf.depth = 0;
-    wf.strings = (version > 0) ? PyDict_New() : NULL;
+    wf.strings = (version > 0 && version < 3) ? PyDict_New() : NULL;
     wf.version = version;
-    w_object(x, &wf);
+    w_root(x, &wf);
     Py_XDECREF(wf.strings);
 }
 
@@ -618,6 +754,56 @@ r_PyLong(RFILE *p)
     return NULL;
 }
 
+/* The objects read with FLAG_REF set in their type code are appended to
+   p->refs, in the order of the writer's w_ref() calls.  The containers
+   are added before their items are read, so a slot is reserved for the
+   immutable ones until they are complete; the Py_None placeholder cannot
+   be confused with a real object, since None is never referred to. */
+
+static PyObject *
+r_ref(PyObject *o, RFILE *p)
+{
+    if (o == NULL)
+        return NULL;
+    if (p->refs == NULL || PyList_Append(p->refs, o) < 0) {
+        Py_DECREF(o);
+        return NULL;
+    }
+    return o;
+}
+
+static Py_ssize_t
+r_ref_reserve(int flag, RFILE *p)
+{
+    Py_ssize_t idx;
+    if (!flag)
+        return 0;
+    if (p->refs == NULL)
+        return -1;
+    idx = PyList_GET_SIZE(p->refs);
+    if (idx >= 0x7ffffffe) {
+        PyErr_SetString(PyExc_ValueError,
+                        "bad marshal data (index list too large)");
+        return -1;
+    }
+    if (PyList_Append(p->refs, Py_None) < 0)
+        return -1;
+    return idx;
+}
+
+static PyObject *
+r_ref_insert(PyObject *o, Py_ssize_t idx, int flag, RFILE *p)
+{
+    if (o != NULL && flag) {
+        PyObject *tmp = PyList_GET_ITEM(p->refs, idx);
+        Py_INCREF(o);
+        PyList_SET_ITEM(p->refs, idx, o);
+        Py_DECREF(tmp);
+    }
+    return o;
+}
+
+#define R_REF(o) do { if (flag) (o) = r_ref((o), p); } while (0)
 
 static PyObject *
 r_object(RFILE *p)
@@ -626,7 +812,9 @@ r_object(RFILE *p)
        an exception is set. */
     PyObject *v, *v2;
     long i, n;
-    int type = r_byte(p);
+    int code = r_byte(p);
+    int type, flag;
+    Py_ssize_t idx = 0;
     PyObject *retval;
 
     p->depth++;
@@ -637,13 +825,16 @@ r_object(RFILE *p)
         return NULL;
     }
 
-    switch (type) {
-
-    case EOF:
+    if (code == EOF) {
+        p->depth--;
         PyErr_SetString(PyExc_EOFError,
                         "EOF read where object expected");
-        retval = NULL;
-        break;
+        return NULL;
+    }
+    flag = code & FLAG_REF;
+    type = code & ~FLAG_REF;
+
+    switch (type) {
 
     case TYPE_NULL:
         retval = NULL;
@@ -676,14 +867,17 @@ r_object(RFILE *p)
 
     case TYPE_INT:
         retval = PyInt_FromLong(r_long(p));
+        R_REF(retval);
         break;
 
     case TYPE_INT64:
         retval = r_long64(p);
+        R_REF(retval);
         break;
 
     case TYPE_LONG:
         retval = r_PyLong(p);
+        R_REF(retval);
         break;
 
     case TYPE_FLOAT:
@@ -704,6 +898,7 @@ r_object(RFILE *p)
                 break;
             }
             retval = PyFloat_FromDouble(dx);
+            R_REF(retval);
             break;
         }
 
@@ -723,6 +918,7 @@ r_object(RFILE *p)
                 break;
             }
             retval = PyFloat_FromDouble(x);
+            R_REF(retval);
             break;
         }
 
@@ -758,6 +954,7 @@ r_object(RFILE *p)
                 break;
             }
             retval = PyComplex_FromCComplex(c);
+            R_REF(retval);
             break;
         }
 
@@ -788,10 +985,22 @@ r_object(RFILE *p)
                 break;
             }
             retval = PyComplex_FromCComplex(c);
+            R_REF(retval);
             break;
         }
 #endif
 
+    case TYPE_SHORT_INTERNED:
+    case TYPE_SHORT_STRING:
+        n = r_byte(p);
+        if (n == EOF) {
+            PyErr_SetString(PyExc_EOFError,
+                            "EOF read where object expected");
+            retval = NULL;
+            break;
+        }
+        goto read_string;
+
     case TYPE_INTERNED:
     case TYPE_STRING:
         n = r_long(p);
@@ -800,6 +1009,7 @@ r_object(RFILE *p)
             retval = NULL;
             break;
         }
+      read_string:
         v = PyString_FromStringAndSize((char *)NULL, n);
         if (v == NULL) {
             retval = NULL;
@@ -812,13 +1022,17 @@ r_object(RFILE *p)
             retval = NULL;
             break;
         }
-        if (type == TYPE_INTERNED) {
+        if (type == TYPE_INTERNED || type == TYPE_SHORT_INTERNED) {
             PyString_InternInPlace(&v);
-            if (PyList_Append(p->strings, v) < 0) {
+            /* version 3 shares the interned strings with TYPE_REF */
+            if (type == TYPE_INTERNED &&
+                PyList_Append(p->strings, v) < 0) {
+                Py_DECREF(v);
                 retval = NULL;
                 break;
             }
         }
+        R_REF(v);
         retval = v;
         break;
 
@@ -859,13 +1073,19 @@ r_object(RFILE *p)
         }
         v = PyUnicode_DecodeUTF8(buffer, n, NULL);
         PyMem_DEL(buffer);
+        R_REF(v);
         retval = v;
         break;
         }
 #endif
 
+    case TYPE_SMALL_TUPLE:
+        n = r_byte(p);
+        goto read_tuple;
+
     case TYPE_TUPLE:
         n = r_long(p);
+      read_tuple:
         if (n < 0 || n > INT_MAX) {
             PyErr_SetString(PyExc_ValueError, "bad marshal data (tuple size out of range)");
             retval = NULL;
@@ -876,6 +1096,12 @@ r_object(RFILE *p)
             retval = NULL;
             break;
         }
+        idx = r_ref_reserve(flag, p);
+        if (idx < 0) {
+            Py_DECREF(v);
+            retval = NULL;
+            break;
+        }
         for (i = 0; i < n; i++) {
             v2 = r_object(p);
             if ( v2 == NULL ) {
@@ -888,7 +1114,7 @@ r_object(RFILE *p)
             }
             PyTuple_SET_ITEM(v, (int)i, v2);
         }
-        retval = v;
+        retval = r_ref_insert(v, idx, flag, p);
         break;
 
     case TYPE_LIST:
@@ -899,6 +1125,7 @@ r_object(RFILE *p)
             break;
         }
         v = PyList_New((int)n);
+        R_REF(v);
         if (v == NULL) {
             retval = NULL;
             break;
@@ -920,6 +1147,7 @@ r_object(RFILE *p)
 
     case TYPE_DICT:
         v = PyDict_New();
+        R_REF(v);
         if (v == NULL) {
             retval = NULL;
             break;
@@ -950,7 +1178,17 @@ r_object(RFILE *p)
             retval = NULL;
             break;
         }
-        v = (type == TYPE_SET) ? PySet_New(NULL) : PyFrozenSet_New(NULL);
+        if (type == TYPE_SET) {
+            v = PySet_New(NULL);
+            R_REF(v);
+        }
+        else {
+            /* PySet_Add() requires a frozenset not shared yet */
+            v = PyFrozenSet_New(NULL);
+            idx = r_ref_reserve(flag, p);
+            if (idx < 0)
+                Py_CLEAR(v);
+        }
         if (v == NULL) {
             retval = NULL;
             break;
@@ -973,6 +1211,8 @@ r_object(RFILE *p)
             }
             Py_DECREF(v2);
         }
+        if (type == TYPE_FROZENSET)
+            v = r_ref_insert(v, idx, flag, p);
         retval = v;
         break;
 
@@ -1001,6 +1241,9 @@ r_object(RFILE *p)
             PyObject *lnotab = NULL;
 
             v = NULL;
+            idx = r_ref_reserve(flag, p);
+            if (idx < 0)
+                goto code_error;
 
             /* XXX ignore long->int overflows for now */
             argcount = (int)r_long(p);
@@ -1041,6 +1284,7 @@ r_object(RFILE *p)
                             code, consts, names, varnames,
                             freevars, cellvars, filename, name,
                             firstlineno, lnotab);
+            v = r_ref_insert(v, idx, flag, p);
 
           code_error:
             Py_XDECREF(code);
@@ -1057,6 +1301,26 @@ r_object(RFILE *p)
         retval = v;
         break;
 
+    case TYPE_REF:
+        n = r_long(p);
+        if (p->refs == NULL || n < 0 || n >= PyList_GET_SIZE(p->refs)) {
+            PyErr_SetString(PyExc_ValueError,
+                            "bad marshal data (invalid reference)");
+            retval = NULL;
+            break;
+        }
+        v = PyList_GET_ITEM(p->refs, n);
+        if (v == Py_None) {
+            /* a tuple, frozenset or code object being read */
+            PyErr_SetString(PyExc_ValueError,
+                            "bad marshal data (invalid reference)");
+            retval = NULL;
+            break;
+        }
+        Py_INCREF(v);
+        retval = v;
+        break;
+
     default:
         /* Bogus data got written, which isn't ideal.
            This will let you keep working and recover. */
@@ -1090,6 +1354,7 @@ PyMarshal_ReadShortFromFile(FILE *fp)
     assert(fp);
     rf.fp = fp;
     rf.strings = NULL;
+    rf.refs = NULL;
     rf.end = rf.ptr = NULL;
     return r_short(&rf);
 }
@@ -1100,6 +1365,7 @@ PyMarshal_ReadLongFromFile(FILE *fp)
     RFILE rf;
     rf.fp = fp;
     rf.strings = NULL;
+    rf.refs = NULL;
     rf.ptr = rf.end = NULL;
     return r_long(&rf);
 }
@@ -1161,10 +1427,12 @@ PyMarshal_ReadObjectFromFile(FILE *fp)
     PyObject *result;
     rf.fp = fp;
     rf.strings = PyList_New(0);
+    rf.refs = PyList_New(0);
     rf.depth = 0;
     rf.ptr = rf.end = NULL;
     result = r_object(&rf);
     Py_DECREF(rf.strings);
+    Py_XDECREF(rf.refs);
     return result;
 }
 
@@ -1177,9 +1445,11 @@ PyMarshal_ReadObjectFromString(char *str, Py_ssize_t len)
     rf.ptr = str;
     rf.end = str + len;
     rf.strings = PyList_New(0);
+    rf.refs = PyList_New(0);
     rf.depth = 0;
     result = r_object(&rf);
     Py_DECREF(rf.strings);
+    Py_XDECREF(rf.refs);
     return result;
 }
 
@@ -1214,8 +1484,8 @@ PyMarshal_WriteObjectToString(PyObject *x, int version)
     wf.error = WFERR_OK;
     wf.depth = 0;
     wf.version = version;
-    wf.strings = (version > 0) ? PyDict_New() : NULL;
-    w_object(x, &wf);
+    wf.strings = (version > 0 && version < 3) ? PyDict_New() : NULL;
+    w_root(x, &wf);
     Py_XDECREF(wf.strings);
     if (wf.str != NULL) {
         char *base = PyString_AS_STRING((PyStringObject *)wf.str);
@@ -1257,9 +1527,9 @@ marshal_dump(PyObject *self, PyObject *args)
     wf.ptr = wf.end = NULL;
     wf.error = WFERR_OK;
     wf.depth = 0;
-    wf.strings = (version > 0) ? PyDict_New() : 0;
+    wf.strings = (version > 0 && version < 3) ? PyDict_New() : NULL;
     wf.version = version;
-    w_object(x, &wf);
+    w_root(x, &wf);
     Py_XDECREF(wf.strings);
     if (wf.error != WFERR_OK) {
         set_error(wf.error);
@@ -1295,9 +1565,11 @@ marshal_load(PyObject *self, PyObject *f)
     }
     rf.fp = PyFile_AsFile(f);
     rf.strings = PyList_New(0);
+    rf.refs = PyList_New(0);
     rf.depth = 0;
     result = read_object(&rf);
     Py_DECREF(rf.strings);
+    Py_XDECREF(rf.refs);
     return result;
 }
 
@@ -1348,9 +1620,11 @@ marshal_loads(PyObject *self, PyObject *args)
     rf.ptr = s;
     rf.end = s + n;
     rf.strings = PyList_New(0);
+    rf.refs = PyList_New(0);
     rf.depth = 0;
     result = read_object(&rf);
     Py_DECREF(rf.strings);
+    Py_XDECREF(rf.refs);
     return result;
 }
 
@@ -1381,15 +1655,16 @@ None, integers, long integers, floating point numbers, strings, Unicode\n\
 objects, tuples, lists, sets, dictionaries, and code objects, where it\n\
 should be understood that tuples, lists and dictionaries are only\n\
 supported as long as the values contained therein are themselves\n\
-supported; and recursive lists and dictionaries should not be written\n\
-(they will cause infinite loops).\n\
+supported; and recursive lists and dictionaries can only be written\n\
+with version 3 or later.\n\
 \n\
 Variables:\n\
 \n\
 version -- indicates the format that the module uses. Version 0 is the\n\
     historical format, version 1 (added in Python 2.4) shares interned\n\
-    strings and version 2 (added in Python 2.5) uses a binary format for\n\
-    floating point numbers. (New in version 2.4)\n\
+    strings, version 2 (added in Python 2.5) uses a binary format for\n\
+    floating point numbers and version 3 (added in Python 2.7) shares\n\
+    the objects reached several times. (New in version 2.4)\n\
 \n\
 Functions:\n\
 \n\
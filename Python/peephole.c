@@ -13,6 +13,9 @@
 
 #define GETARG(arr, i) ((int)((arr[i+2]<<8) + arr[i+1]))
 #define UNCONDITIONAL_JUMP(op)  (op==JUMP_ABSOLUTE || op==JUMP_FORWARD)
+#define UNCONDITIONAL_TRANSFER(op) (UNCONDITIONAL_JUMP(op) \
+    || op==RETURN_VALUE || op==RAISE_VARARGS || op==BREAK_LOOP \
+    || op==CONTINUE_LOOP)
 #define CONDITIONAL_JUMP(op) (op==POP_JUMP_IF_FALSE || op==POP_JUMP_IF_TRUE \
     || op==JUMP_IF_FALSE_OR_POP || op==JUMP_IF_TRUE_OR_POP)
 #define ABSOLUTE_JUMP(op) (op==JUMP_ABSOLUTE || op==CONTINUE_LOOP \
@@ -24,6 +27,7 @@
 #define CODESIZE(op)  (HAS_ARG(op) ? 3 : 1)
 #define ISBASICBLOCK(blocks, start, bytes) \
     (blocks[start]==blocks[start+bytes-1])
+#define ISLABEL(blocks, i) ((i) > 0 && blocks[i] != blocks[(i)-1])
 
 /* Replace LOAD_CONST c1. LOAD_CONST c2 ... LOAD_CONST cn BUILD_TUPLE n
    with    LOAD_CONST (c1, c2, ... cn).
@@ -31,7 +35,9 @@
    new constant (c1, c2, ... cn) can be appended.
    Called with codestr pointing to the first LOAD_CONST.
    Bails out with no change if one or more of the LOAD_CONSTs is missing.
-   Also works for BUILD_LIST when followed by an "in" or "not in" test.
+   Also works for BUILD_LIST when followed by an "in" or "not in" test,
+   and for BUILD_SET in the same case, which is replaced with a frozenset
+   constant.
 */
 static int
 tuple_of_constants(unsigned char *codestr, Py_ssize_t n, PyObject *consts)
@@ -41,7 +47,8 @@ tuple_of_constants(unsigned char *codestr, Py_ssize_t n, PyObject *consts)
 
     /* Pre-conditions */
     assert(PyList_CheckExact(consts));
-    assert(codestr[n*3] == BUILD_TUPLE || codestr[n*3] == BUILD_LIST);
+    assert(codestr[n*3] == BUILD_TUPLE || codestr[n*3] == BUILD_LIST ||
+           codestr[n*3] == BUILD_SET);
     assert(GETARG(codestr, (n*3)) == n);
     for (i=0 ; i<n ; i++)
         assert(codestr[i*3] == LOAD_CONST);
@@ -59,6 +66,18 @@ tuple_of_constants(unsigned char *codestr, Py_ssize_t n, PyObject *consts)
         PyTuple_SET_ITEM(newconst, i, constant);
     }
 
+    /* A set display used for an "in" test becomes a frozenset.  Give up
+       if a constant is not hashable. */
+    if (codestr[n*3] == BUILD_SET) {
+        constant = newconst;
+        newconst = PyFrozenSet_New(constant);
+        Py_DECREF(constant);
+        if (newconst == NULL) {
+            PyErr_Clear();
+            return 0;
+        }
+    }
+
     /* Append folded constant onto consts */
     if (PyList_Append(consts, newconst)) {
         Py_DECREF(newconst);
@@ -283,7 +302,8 @@ markblocks(unsigned char *code, Py_ssize_t len)
    the lineno table has complex encoding for gaps >= 255.
 
    Optimizations are restricted to simple transformations occuring within a
-   single basic block.  All transformations keep the code size the same or
+   single basic block, except for the threading of jumps and the removal
+   of unreachable code.  All transformations keep the code size the same or
    smaller.  For those that reduce size, the gaps are initially filled with
    NOPs.  Later those NOPs are removed and the jump addresses retargeted in
    a single pass.  Line numbering is adjusted accordingly. */
@@ -363,6 +383,7 @@ PyCode_Optimize(PyObject *code, PyObject* consts, PyObject *names,
                 codestr[i] = POP_JUMP_IF_TRUE;
                 SETARG(codestr, i, j);
                 codestr[i+3] = NOP;
+                cumlc = lastlc;
                 goto reoptimize_current;
 
                 /* not a is b -->  a is not b
@@ -423,13 +444,14 @@ PyCode_Optimize(PyObject *code, PyObject* consts, PyObject *names,
                    Replace BUILD_SEQN 3 UNPACK_SEQN 3 with ROT3 ROT2. */
             case BUILD_TUPLE:
             case BUILD_LIST:
+            case BUILD_SET:
                 j = GETARG(codestr, i);
                 h = i - 3 * j;
                 if (h >= 0  &&
                     j <= lastlc                  &&
                     ((opcode == BUILD_TUPLE &&
                       ISBASICBLOCK(blocks, h, 3*(j+1))) ||
-                     (opcode == BUILD_LIST &&
+                     ((opcode == BUILD_LIST || opcode == BUILD_SET) &&
                       codestr[i+3]==COMPARE_OP &&
                       ISBASICBLOCK(blocks, h, 3*(j+2)) &&
                       (GETARG(codestr,i+3)==6 ||
@@ -439,7 +461,8 @@ PyCode_Optimize(PyObject *code, PyObject* consts, PyObject *names,
                     cumlc = 1;
                     break;
                 }
-                if (codestr[i+3] != UNPACK_SEQUENCE  ||
+                if (opcode == BUILD_SET ||
+                    codestr[i+3] != UNPACK_SEQUENCE  ||
                     !ISBASICBLOCK(blocks,i,6) ||
                     j != GETARG(codestr, i+3))
                     continue;
@@ -544,6 +567,28 @@ PyCode_Optimize(PyObject *code, PyObject* consts, PyObject *names,
                 /* Replace jumps to unconditional jumps */
             case POP_JUMP_IF_FALSE:
             case POP_JUMP_IF_TRUE:
+                /* LOAD_CONST c POP_JUMP_IF_xxx: the constant can come
+                   from a folded expression, as in "if 2 - 2:".  Remove
+                   the test if the jump is never taken, otherwise make it
+                   an unconditional jump; the code it skips is removed
+                   as unreachable below. */
+                if ((opcode == POP_JUMP_IF_FALSE ||
+                     opcode == POP_JUMP_IF_TRUE) &&
+                    lastlc >= 1 && ISBASICBLOCK(blocks, i-3, 6)) {
+                    j = GETARG(codestr, i-3);
+                    h = PyObject_IsTrue(PyList_GET_ITEM(consts, j));
+                    if (h < 0) {
+                        PyErr_Clear();
+                        continue;
+                    }
+                    memset(codestr+i-3, NOP, 3);
+                    if (h == (opcode == POP_JUMP_IF_TRUE)) {
+                        codestr[i] = JUMP_ABSOLUTE;
+                        goto reoptimize_current;
+                    }
+                    memset(codestr+i, NOP, 3);
+                    continue;
+                }
             case FOR_ITER:
             case JUMP_FORWARD:
             case JUMP_ABSOLUTE:
@@ -591,6 +636,44 @@ PyCode_Optimize(PyObject *code, PyObject* consts, PyObject *names,
         }
     }
 
+    /* Remove unreachable code: the instructions following an
+       unconditional transfer of control up to the next jump target.
+       The block setup and teardown instructions are kept for the static
+       analysis of frame_setlineno(), as is the final RETURN_VALUE. */
+    for (i=0, h=0 ; i<codelen-1 ; i += CODESIZE(codestr[i])) {
+        opcode = codestr[i];
+        if (ISLABEL(blocks, i))
+            h = 0;
+        else if (h) {
+            switch (opcode) {
+                case SETUP_LOOP:
+                case SETUP_EXCEPT:
+                case SETUP_FINALLY:
+                case SETUP_WITH:
+                case POP_BLOCK:
+                case END_FINALLY:
+                    break;
+                default:
+                    memset(codestr+i, NOP, CODESIZE(opcode));
+            }
+            continue;
+        }
+        if (UNCONDITIONAL_TRANSFER(opcode))
+            h = 1;
+    }
+
+    /* Remove unconditional jumps to the next remaining instruction */
+    for (i=0 ; i<codelen ; i += CODESIZE(codestr[i])) {
+        opcode = codestr[i];
+        if (!UNCONDITIONAL_JUMP(opcode))
+            continue;
+        tgt = GETJUMPTGT(codestr, i);
+        for (j=i+3 ; j<tgt && codestr[j]==NOP ; j++)
+            ;
+        if (j == tgt)
+            memset(codestr+i, NOP, 3);
+    }
+
     /* Fixup linenotab */
     for (i=0, nops=0 ; i<codelen ; i += CODESIZE(codestr[i])) {
         addrmap[i] = i - nops;
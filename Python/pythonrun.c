@@ -254,6 +254,11 @@ Py_InitializeEx(int install_sigs)
     _PyGILState_Init(interp, tstate);
 #endif /* WITH_THREAD */
 
+    if ((p = Py_GETENV("PYTHONTRACEMALLOC")) && *p != '\0') {
+        if (_PyTraceMalloc_Start(atoi(p)) < 0)
+            Py_FatalError("Py_Initialize: can't start tracemalloc");
+    }
+
     if (!Py_NoSiteFlag)
         initsite(); /* Module site */
 
@@ -465,6 +470,10 @@ Py_Finalize(void)
     PyGC_Collect();
 #endif
 
+    /* Stop tracing memory allocations once the modules are gone; the
+       remaining traces would keep references to their filenames. */
+    _PyTraceMalloc_Stop();
+
     /* Destroy the database used by _PyImport_{Fixup,Find}Extension */
     _PyImport_Fini();
 
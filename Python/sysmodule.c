@@ -473,8 +473,8 @@ sys_setcheckinterval(PyObject *self, PyObject *args)
 PyDoc_STRVAR(setcheckinterval_doc,
 "setcheckinterval(n)\n\
 \n\
-Tell the Python interpreter to check for asynchronous events every\n\
-n instructions.  This also affects how often thread switches occur."
+Obsolete.  Thread switches and asynchronous events are no longer driven\n\
+by an instruction count; use setswitchinterval() instead."
 );
 
 static PyObject *
@@ -487,6 +487,65 @@ PyDoc_STRVAR(getcheckinterval_doc,
 "getcheckinterval() -> current check interval; see setcheckinterval()."
 );
 
+#ifdef WITH_THREAD
+static PyObject *
+sys_setswitchinterval(PyObject *self, PyObject *args)
+{
+    double d;
+    if (!PyArg_ParseTuple(args, "d:setswitchinterval", &d))
+        return NULL;
+    if (d <= 0.0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "switch interval must be strictly positive");
+        return NULL;
+    }
+    _PyEval_SetSwitchInterval((unsigned long) (1e6 * d));
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+PyDoc_STRVAR(setswitchinterval_doc,
+"setswitchinterval(n)\n\
+\n\
+Set the ideal thread switching delay inside the Python interpreter.\n\
+The actual frequency of switching threads can be lower if the\n\
+interpreter executes long sequences of uninterruptible code\n\
+(this is implementation-specific and workload-dependent).\n\
+\n\
+The parameter must represent the desired switching delay in seconds.\n\
+A typical value is 0.005 (5 milliseconds)."
+);
+
+static PyObject *
+sys_getswitchinterval(PyObject *self, PyObject *args)
+{
+    return PyFloat_FromDouble(1e-6 * _PyEval_GetSwitchInterval());
+}
+
+PyDoc_STRVAR(getswitchinterval_doc,
+"getswitchinterval() -> current thread switch interval; see setswitchinterval()."
+);
+
+static PyObject *
+sys_getswitchstats(PyObject *self, PyObject *args)
+{
+    unsigned long switches, requested, forced;
+
+    _PyEval_GetSwitchStats(&switches, &requested, &forced);
+    return Py_BuildValue("(kkk)", switches, requested, forced);
+}
+
+PyDoc_STRVAR(getswitchstats_doc,
+"getswitchstats() -> (switches, requested, forced)\n\
+\n\
+Return counters describing the thread switching activity since the\n\
+interpreter started: the number of times the GIL changed hands, the\n\
+number of drop requests made by threads which waited longer than the\n\
+switch interval, and the number of times the GIL holder had to wait\n\
+for another thread to take the GIL before reacquiring it."
+);
+#endif /* WITH_THREAD */
+
 #ifdef WITH_TSC
 static PyObject *
 sys_settscdump(PyObject *self, PyObject *args)
@@ -897,6 +956,25 @@ PyDoc_STRVAR(sys_clear_type_cache__doc__,
 "_clear_type_cache() -> None\n\
 Clear the internal type lookup cache.");
 
+static PyObject *
+sys_debugmallocstats(PyObject *self, PyObject *args)
+{
+#ifdef WITH_PYMALLOC
+    _PyObject_DebugMallocStats();
+#endif
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(debugmallocstats_doc,
+"_debugmallocstats()\n\
+\n\
+Print summary info to stderr about the state of\n\
+pymalloc's structures.\n\
+\n\
+In Py_DEBUG mode, also perform some expensive internal consistency\n\
+checks.\n\
+");
+
 
 static PyMethodDef sys_methods[] = {
     /* Might as well keep this in alphabetic order */
@@ -906,6 +984,8 @@ static PyMethodDef sys_methods[] = {
      sys_clear_type_cache__doc__},
     {"_current_frames", sys_current_frames, METH_NOARGS,
      current_frames_doc},
+    {"_debugmallocstats", sys_debugmallocstats, METH_NOARGS,
+     debugmallocstats_doc},
     {"displayhook",     sys_displayhook, METH_O, displayhook_doc},
     {"exc_info",        sys_exc_info, METH_NOARGS, exc_info_doc},
     {"exc_clear",       sys_exc_clear, METH_NOARGS, exc_clear_doc},
@@ -956,6 +1036,14 @@ static PyMethodDef sys_methods[] = {
      setcheckinterval_doc},
     {"getcheckinterval",        sys_getcheckinterval, METH_NOARGS,
      getcheckinterval_doc},
+#ifdef WITH_THREAD
+    {"setswitchinterval",       sys_setswitchinterval, METH_VARARGS,
+     setswitchinterval_doc},
+    {"getswitchinterval",       sys_getswitchinterval, METH_NOARGS,
+     getswitchinterval_doc},
+    {"getswitchstats",          sys_getswitchstats, METH_NOARGS,
+     getswitchstats_doc},
+#endif
 #ifdef HAVE_DLOPEN
     {"setdlopenflags", sys_setdlopenflags, METH_VARARGS,
      setdlopenflags_doc},
@@ -1125,11 +1213,14 @@ getprofile() -- get the global profiling function\n\
 getrefcount() -- return the reference count for an object (plus one :-)\n\
 getrecursionlimit() -- return the max recursion depth for the interpreter\n\
 getsizeof() -- return the size of an object in bytes\n\
+getswitchinterval() -- get the thread switch interval\n\
+getswitchstats() -- return thread switching counters\n\
 gettrace() -- get the global debug tracing function\n\
 setcheckinterval() -- control how often the interpreter checks for events\n\
 setdlopenflags() -- set the flags to be used for dlopen() calls\n\
 setprofile() -- set the global profiling function\n\
 setrecursionlimit() -- set the max recursion depth for the interpreter\n\
+setswitchinterval() -- set the thread switch interval\n\
 settrace() -- set the global debug tracing function\n\
 "
 )
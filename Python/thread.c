@@ -173,6 +173,42 @@ PyThread_set_stacksize(size_t size)
 #endif
 }
 
+#ifndef Py_HAVE_NATIVE_TIMED_LOCK
+/* If the platform has not supplied a lock acquisition with a timeout,
+   emulate it by polling the lock, sleeping longer and longer between
+   the attempts.  The time spent is approximated by the sum of the sleeps,
+   and intr_flag is ignored.
+*/
+PyLockStatus
+PyThread_acquire_lock_timed(PyThread_type_lock lock, PY_TIMEOUT_T microseconds,
+                            int intr_flag)
+{
+    PY_TIMEOUT_T delay = 500, waited = 0;
+
+    if (microseconds < 0)
+        return PyThread_acquire_lock(lock, WAIT_LOCK) ?
+            PY_LOCK_ACQUIRED : PY_LOCK_FAILURE;
+    while (!PyThread_acquire_lock(lock, NOWAIT_LOCK)) {
+        if (waited >= microseconds)
+            return PY_LOCK_FAILURE;
+        if (delay > microseconds - waited)
+            delay = microseconds - waited;
+#ifdef HAVE_SELECT
+        {
+            struct timeval t;
+            t.tv_sec = (long)(delay / 1000000);
+            t.tv_usec = (long)(delay % 1000000);
+            select(0, (fd_set *)0, (fd_set *)0, (fd_set *)0, &t);
+        }
+#endif
+        waited += delay;
+        if (delay < 50000)
+            delay *= 2;
+    }
+    return PY_LOCK_ACQUIRED;
+}
+#endif /* Py_HAVE_NATIVE_TIMED_LOCK */
+
 #ifndef Py_HAVE_NATIVE_TLS
 /* If the platform has not supplied a platform specific
    TLS implementation, provide our own.
@@ -64,7 +64,8 @@
 /* Whether or not to use semaphores directly rather than emulating them with
  * mutexes and condition variables:
  */
-#if defined(_POSIX_SEMAPHORES) && !defined(HAVE_BROKEN_POSIX_SEMAPHORES)
+#if defined(_POSIX_SEMAPHORES) && !defined(HAVE_BROKEN_POSIX_SEMAPHORES) && \
+    defined(HAVE_SEM_TIMEDWAIT)
 #  define USE_SEMAPHORES
 #else
 #  undef USE_SEMAPHORES
@@ -107,6 +108,45 @@ typedef struct {
 
 #define CHECK_STATUS(name)  if (status != 0) { perror(name); error = 1; }
 
+#ifdef GETTIMEOFDAY_NO_TZ
+#define GETTIMEOFDAY(ptv) gettimeofday(ptv)
+#else
+#define GETTIMEOFDAY(ptv) gettimeofday(ptv, (struct timezone *)NULL)
+#endif
+
+/* The largest deadline of a timed wait */
+#if SIZEOF_TIME_T == SIZEOF_LONG
+#define TIME_T_MAX LONG_MAX
+#elif defined(HAVE_LONG_LONG) && SIZEOF_TIME_T == SIZEOF_LONG_LONG
+#define TIME_T_MAX PY_LLONG_MAX
+#else
+#define TIME_T_MAX INT_MAX
+#endif
+
+/* Convert a relative timeout in microseconds to the absolute time used by
+ * sem_timedwait() and pthread_cond_timedwait().  Deadlines which don't fit
+ * in a time_t are clamped, so that huge timeouts don't expire at once.
+ */
+static void
+microseconds_to_timespec(PY_TIMEOUT_T microseconds, struct timespec *ts)
+{
+    struct timeval tv;
+    PY_TIMEOUT_T sec;
+
+    GETTIMEOFDAY(&tv);
+    tv.tv_usec += (long)(microseconds % 1000000);
+    sec = microseconds / 1000000 + tv.tv_usec / 1000000;
+    tv.tv_usec %= 1000000;
+    if (sec > TIME_T_MAX - tv.tv_sec) {
+        ts->tv_sec = TIME_T_MAX;
+        ts->tv_nsec = 0;
+    }
+    else {
+        ts->tv_sec = tv.tv_sec + (time_t)sec;
+        ts->tv_nsec = tv.tv_usec * 1000;
+    }
+}
+
 /*
  * Initialization.
  */
@@ -234,6 +274,9 @@ PyThread_exit_thread(void)
     }
 }
 
+/* locks can be acquired with a timeout */
+#define Py_HAVE_NATIVE_TIMED_LOCK
+
 #ifdef USE_SEMAPHORES
 
 /*
@@ -295,34 +338,65 @@ fix_status(int status)
     return (status == -1) ? errno : status;
 }
 
-int
-PyThread_acquire_lock(PyThread_type_lock lock, int waitflag)
+PyLockStatus
+PyThread_acquire_lock_timed(PyThread_type_lock lock, PY_TIMEOUT_T microseconds,
+                            int intr_flag)
 {
-    int success;
+    PyLockStatus success;
     sem_t *thelock = (sem_t *)lock;
     int status, error = 0;
+    struct timespec ts;
 
-    dprintf(("PyThread_acquire_lock(%p, %d) called\n", lock, waitflag));
+    dprintf(("PyThread_acquire_lock_timed(%p, %lld, %d) called\n",
+             lock, (long long)microseconds, intr_flag));
 
+    if (microseconds > 0)
+        microseconds_to_timespec(microseconds, &ts);
     do {
-        if (waitflag)
-            status = fix_status(sem_wait(thelock));
-        else
+        if (microseconds > 0)
+            status = fix_status(sem_timedwait(thelock, &ts));
+        else if (microseconds == 0)
             status = fix_status(sem_trywait(thelock));
-    } while (status == EINTR); /* Retry if interrupted by a signal */
-
-    if (waitflag) {
-        CHECK_STATUS("sem_wait");
-    } else if (status != EAGAIN) {
-        CHECK_STATUS("sem_trywait");
+        else
+            status = fix_status(sem_wait(thelock));
+        /* Retry if interrupted by a signal, unless the caller wants to be
+           notified.  */
+    } while (!intr_flag && status == EINTR);
+
+    /* Don't check the status if we're stopping because of an interrupt.  */
+    if (!(intr_flag && status == EINTR)) {
+        if (microseconds > 0) {
+            if (status != ETIMEDOUT)
+                CHECK_STATUS("sem_timedwait");
+        }
+        else if (microseconds == 0) {
+            if (status != EAGAIN)
+                CHECK_STATUS("sem_trywait");
+        }
+        else {
+            CHECK_STATUS("sem_wait");
+        }
     }
 
-    success = (status == 0) ? 1 : 0;
+    if (status == 0) {
+        success = PY_LOCK_ACQUIRED;
+    } else if (intr_flag && status == EINTR) {
+        success = PY_LOCK_INTR;
+    } else {
+        success = PY_LOCK_FAILURE;
+    }
 
-    dprintf(("PyThread_acquire_lock(%p, %d) -> %d\n", lock, waitflag, success));
+    dprintf(("PyThread_acquire_lock_timed(%p, %lld, %d) -> %d\n",
+             lock, (long long)microseconds, intr_flag, success));
     return success;
 }
 
+int
+PyThread_acquire_lock(PyThread_type_lock lock, int waitflag)
+{
+    return PyThread_acquire_lock_timed(lock, waitflag ? -1 : 0, 0);
+}
+
 void
 PyThread_release_lock(PyThread_type_lock lock)
 {
@@ -390,40 +464,64 @@ PyThread_free_lock(PyThread_type_lock lock)
     free((void *)thelock);
 }
 
-int
-PyThread_acquire_lock(PyThread_type_lock lock, int waitflag)
+PyLockStatus
+PyThread_acquire_lock_timed(PyThread_type_lock lock, PY_TIMEOUT_T microseconds,
+                            int intr_flag)
 {
-    int success;
+    PyLockStatus success;
     pthread_lock *thelock = (pthread_lock *)lock;
     int status, error = 0;
 
-    dprintf(("PyThread_acquire_lock(%p, %d) called\n", lock, waitflag));
+    dprintf(("PyThread_acquire_lock_timed(%p, %lld, %d) called\n",
+             lock, (long long)microseconds, intr_flag));
 
     status = pthread_mutex_lock( &thelock->mut );
     CHECK_STATUS("pthread_mutex_lock[1]");
     success = thelock->locked == 0;
 
-    if ( !success && waitflag ) {
+    if ( !success && microseconds != 0 ) {
+        struct timespec ts;
+        if (microseconds > 0)
+            microseconds_to_timespec(microseconds, &ts);
         /* continue trying until we get the lock */
 
         /* mut must be locked by me -- part of the condition
-         * protocol */
+         * protocol.  The condition variable can't be interrupted by
+         * signals, so intr_flag is ignored. */
         while ( thelock->locked ) {
-            status = pthread_cond_wait(&thelock->lock_released,
-                                       &thelock->mut);
-            CHECK_STATUS("pthread_cond_wait");
+            if (microseconds > 0) {
+                status = pthread_cond_timedwait(
+                    &thelock->lock_released,
+                    &thelock->mut, &ts);
+                if (status == ETIMEDOUT)
+                    break;
+                CHECK_STATUS("pthread_cond_timed_wait");
+            }
+            else {
+                status = pthread_cond_wait(
+                    &thelock->lock_released,
+                    &thelock->mut);
+                CHECK_STATUS("pthread_cond_wait");
+            }
         }
-        success = 1;
+        success = thelock->locked == 0;
     }
     if (success) thelock->locked = 1;
     status = pthread_mutex_unlock( &thelock->mut );
     CHECK_STATUS("pthread_mutex_unlock[1]");
 
-    if (error) success = 0;
-    dprintf(("PyThread_acquire_lock(%p, %d) -> %d\n", lock, waitflag, success));
+    if (error) success = PY_LOCK_FAILURE;
+    dprintf(("PyThread_acquire_lock_timed(%p, %lld, %d) -> %d\n",
+             lock, (long long)microseconds, intr_flag, success));
     return success;
 }
 
+int
+PyThread_acquire_lock(PyThread_type_lock lock, int waitflag)
+{
+    return PyThread_acquire_lock_timed(lock, waitflag ? -1 : 0, 0);
+}
+
 void
 PyThread_release_lock(PyThread_type_lock lock)
 {
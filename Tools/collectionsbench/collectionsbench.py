@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Measure the speed of some operations of the collections module.
+
+Each benchmark is timed several times and the best time is reported, next
+to the time of the equivalent pure Python code where there is one.  Run the
+script with several interpreters to compare them.
+"""
+
+import sys
+import random
+import time
+from optparse import OptionParser
+from collections import Counter, namedtuple
+
+out = sys.stdout
+
+
+def best_time(func, args, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func(*args)
+        t = time.time() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+def make_words(n, nwords):
+    """Return a list of n words drawn from a vocabulary of nwords words,
+    with a skewed distribution like that of the tokens of a log file."""
+    vocabulary = ["w%d" % i for i in range(nwords)]
+    return [vocabulary[int(random.paretovariate(1.0)) % nwords]
+            for i in xrange(n)]
+
+def python_count(words):
+    # What Counter.update() used to do
+    c = Counter()
+    c_get = c.get
+    for word in words:
+        c[word] = c_get(word, 0) + 1
+    return c
+
+def counter_count(words):
+    return Counter(words)
+
+def counter_update(chunks):
+    c = Counter()
+    for chunk in chunks:
+        c.update(chunk)
+    return c
+
+def bench_counter(options):
+    out.write("%-40s %12s %12s\n" % ("Counter", "time [ms]", "python [ms]"))
+    for nwords in (100, 10000):
+        words = make_words(options.size, nwords)
+        chunks = [words[i:i + 20] for i in xrange(0, len(words), 20)]
+        py_t = best_time(python_count, (words,), options.repeat)
+        for label, func, arg in [
+                ("Counter(words), %d distinct" % nwords, counter_count, words),
+                ("update() by lines, %d distinct" % nwords, counter_update,
+                 chunks),
+                ]:
+            t = best_time(func, (arg,), options.repeat)
+            out.write("%-40s %12.2f %12.2f\n" % (label, t * 1e3, py_t * 1e3))
+            out.flush()
+
+def create_namedtuples(names):
+    for name in names:
+        namedtuple(name, "name date size owner group permissions")
+
+def access_index(points):
+    for p in points:
+        p[0]; p[1]; p[2]; p[0]; p[1]; p[2]
+
+def access_attribute(points):
+    for p in points:
+        p.x; p.y; p.z; p.x; p.y; p.z
+
+def bench_namedtuple(options):
+    n = max(options.size // 1000, 1)
+    names = ["Record%d" % i for i in xrange(n)]
+    t = best_time(create_namedtuples, (names,), options.repeat)
+    out.write("%-40s %12s\n" % ("namedtuple", "time [us]"))
+    out.write("%-40s %12.2f\n" % ("namedtuple() with 6 fields",
+                                   t * 1e6 / n))
+    Point = namedtuple("Point", "x y z")
+    n = options.size
+    points = [Point(i, i, i) for i in xrange(n)]
+    tuples = [(i, i, i) for i in xrange(n)]
+    for label, func, arg in [
+            ("tuple: t[0]", access_index, tuples),
+            ("namedtuple: p[0]", access_index, points),
+            ("namedtuple: p.x", access_attribute, points),
+            ]:
+        t = best_time(func, (arg,), options.repeat)
+        out.write("%-40s %12.3f\n" % (label + " (per access)",
+                                       t * 1e6 / (6 * n)))
+        out.flush()
+
+BENCHMARKS = {
+    "counter": bench_counter,
+    "namedtuple": bench_namedtuple,
+}
+
+def main():
+    usage = "usage: %prog [-h|--help] [options] [benchmark ...]"
+    parser = OptionParser(usage=usage)
+    parser.add_option("-n", "--repeat", dest="repeat", type="int",
+                      default=5, help="number of runs (default 5)")
+    parser.add_option("-s", "--size", dest="size", type="int",
+                      default=1000000,
+                      help="number of elements (default 1000000)")
+    options, args = parser.parse_args()
+    for name in args:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark %r (choose from %s)"
+                         % (name, ", ".join(sorted(BENCHMARKS))))
+    if not args:
+        args = sorted(BENCHMARKS)
+
+    random.seed(0)
+    out.write("%s\n" % sys.version.split()[0])
+    for name in args:
+        BENCHMARKS[name](options)
+
+if __name__ == "__main__":
+    main()
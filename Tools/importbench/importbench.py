@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Measure the start-up time of interpreters importing a large package tree.
+
+A tree of packages and modules is generated in a temporary directory (or
+in the directory given with -d, e.g. on a network filesystem), together
+with a number of other directories put in front of it on sys.path, as
+site-packages and .pth files do.  Each interpreter is then started
+several times to import the whole tree, and the best and average wall
+clock times are reported.  The .pyc files are written by a first run
+which is not timed.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from optparse import OptionParser
+
+out = sys.stdout
+
+
+def write_file(path, text):
+    f = open(path, 'w')
+    try:
+        f.write(text)
+    finally:
+        f.close()
+
+def make_tree(root, npackages, nmodules, nentries):
+    """Create the package tree and the other sys.path entries under root,
+    and return the list of directories to put on sys.path."""
+    path = []
+    for i in range(nentries):
+        entry = os.path.join(root, 'entry%d' % i)
+        os.mkdir(entry)
+        # some unrelated modules, to make the directories non empty
+        for j in range(10):
+            write_file(os.path.join(entry, 'other%d_%d.py' % (i, j)), '')
+        path.append(entry)
+    tree = os.path.join(root, 'tree')
+    os.mkdir(tree)
+    path.append(tree)
+    top = os.path.join(tree, 'benchpkg')
+    os.mkdir(top)
+    write_file(os.path.join(top, '__init__.py'),
+               ''.join('import benchpkg.sub%d\n' % i
+                       for i in range(npackages)))
+    for i in range(npackages):
+        sub = os.path.join(top, 'sub%d' % i)
+        os.mkdir(sub)
+        write_file(os.path.join(sub, '__init__.py'),
+                   ''.join('from . import mod%d\n' % j
+                           for j in range(nmodules)))
+        for j in range(nmodules):
+            # modules commonly try optional dependencies
+            write_file(os.path.join(sub, 'mod%d.py' % j),
+                       'import os, sys\n'
+                       'try:\n'
+                       '    import _missing_speedups_%d\n'
+                       'except ImportError:\n'
+                       '    pass\n'
+                       'def f(x):\n'
+                       '    return x + %d\n' % (j, j))
+    return path
+
+def age_directories(root, seconds=3600):
+    # The import system does not trust the listing of a directory modified
+    # in the last seconds, which would be the case of all of them right
+    # after the .pyc files are written.
+    when = time.time() - seconds
+    for dirpath, dirnames, filenames in os.walk(root):
+        os.utime(dirpath, (when, when))
+
+def run(executable, path, repeat):
+    code = ('import sys; sys.path[:0] = %r; import benchpkg' % (path,))
+    args = [executable, '-E', '-c', code]
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        subprocess.check_call(args)
+        times.append(time.time() - start)
+    return times
+
+def main():
+    usage = "usage: %prog [-h|--help] [options] [executable ...]"
+    parser = OptionParser(usage=usage)
+    parser.add_option("-d", "--directory", dest="directory", default=None,
+                      help="create the tree in DIRECTORY (default: a "
+                           "temporary directory)")
+    parser.add_option("-p", "--packages", dest="npackages", type="int",
+                      default=20, help="number of subpackages (default 20)")
+    parser.add_option("-m", "--modules", dest="nmodules", type="int",
+                      default=25,
+                      help="number of modules per subpackage (default 25)")
+    parser.add_option("-e", "--entries", dest="nentries", type="int",
+                      default=10,
+                      help="number of other sys.path entries (default 10)")
+    parser.add_option("-n", "--repeat", dest="repeat", type="int",
+                      default=10, help="number of runs (default 10)")
+    options, executables = parser.parse_args()
+    if not executables:
+        executables = [sys.executable]
+
+    root = tempfile.mkdtemp(prefix='importbench', dir=options.directory)
+    try:
+        path = make_tree(root, options.npackages, options.nmodules,
+                         options.nentries)
+        out.write("%d modules, %d sys.path entries before the tree\n"
+                  % (options.npackages * (options.nmodules + 1) + 1,
+                     options.nentries))
+        for executable in executables:
+            run(executable, path, 1)
+            age_directories(root)
+            times = run(executable, path, options.repeat)
+            out.write("%s: best %.1f ms, average %.1f ms\n"
+                      % (executable, min(times) * 1e3,
+                         sum(times) / len(times) * 1e3))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Measure the conversions of large longs to and from decimal strings.
+
+For each number of digits, a random long is converted with str() and its
+string converted back with long(), and the best time of several runs is
+reported.  Run the script with several interpreters to compare them.
+"""
+
+import sys
+import random
+import time
+from optparse import OptionParser
+
+out = sys.stdout
+
+DEFAULT_DIGITS = "1000,3000,10000,30000,100000,300000,1000000"
+
+
+def best_time(func, arg, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func(arg)
+        t = time.time() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+def main():
+    usage = "usage: %prog [-h|--help] [options]"
+    parser = OptionParser(usage=usage)
+    parser.add_option("-d", "--digits", dest="digits",
+                      default=DEFAULT_DIGITS,
+                      help="comma separated list of numbers of digits "
+                           "(default %s)" % DEFAULT_DIGITS)
+    parser.add_option("-n", "--repeat", dest="repeat", type="int",
+                      default=3, help="number of runs (default 3)")
+    options, args = parser.parse_args()
+    if args:
+        parser.error("no arguments expected")
+
+    random.seed(0)
+    out.write("%s\n" % sys.version.split()[0])
+    out.write("%10s %12s %12s\n" % ("digits", "str() [ms]", "long() [ms]"))
+    for ndigits in [int(d) for d in options.digits.split(",")]:
+        n = random.randrange(10L ** (ndigits - 1), 10L ** ndigits)
+        s = str(n)
+        to_str = best_time(str, n, options.repeat)
+        from_str = best_time(long, s, options.repeat)
+        out.write("%10d %12.2f %12.2f\n" % (ndigits, to_str * 1e3,
+                                            from_str * 1e3))
+        out.flush()
+
+if __name__ == "__main__":
+    main()
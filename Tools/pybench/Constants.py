@@ -0,0 +1,102 @@
+from pybench import Test
+
+class ConstantConditions(Test):
+
+    version = 2.0
+    operations = 5 * 4
+    rounds = 200000
+
+    def test(self):
+
+        a = b = c = 1
+        for i in xrange(self.rounds):
+
+            if not __debug__:
+                a = 2
+            if a:
+                b = 2
+            c = 3 if __debug__ else 4
+            if 2 - 2:
+                c = 5
+
+            if not __debug__:
+                a = 2
+            if a:
+                b = 2
+            c = 3 if __debug__ else 4
+            if 2 - 2:
+                c = 5
+
+            if not __debug__:
+                a = 2
+            if a:
+                b = 2
+            c = 3 if __debug__ else 4
+            if 2 - 2:
+                c = 5
+
+            if not __debug__:
+                a = 2
+            if a:
+                b = 2
+            c = 3 if __debug__ else 4
+            if 2 - 2:
+                c = 5
+
+            if not __debug__:
+                a = 2
+            if a:
+                b = 2
+            c = 3 if __debug__ else 4
+            if 2 - 2:
+                c = 5
+
+    def calibrate(self):
+
+        a = b = c = 1
+        for i in xrange(self.rounds):
+            pass
+
+class ConstantSetMembership(Test):
+
+    version = 2.0
+    operations = 5 * 4
+    rounds = 100000
+
+    def test(self):
+
+        a = 1
+        b = "b"
+        for i in xrange(self.rounds):
+
+            a in {1, 2, 3, 4}
+            b in {1, 2, 3, 4}
+            a not in {"a", "b", "c"}
+            b not in {"a", "b", "c"}
+
+            a in {1, 2, 3, 4}
+            b in {1, 2, 3, 4}
+            a not in {"a", "b", "c"}
+            b not in {"a", "b", "c"}
+
+            a in {1, 2, 3, 4}
+            b in {1, 2, 3, 4}
+            a not in {"a", "b", "c"}
+            b not in {"a", "b", "c"}
+
+            a in {1, 2, 3, 4}
+            b in {1, 2, 3, 4}
+            a not in {"a", "b", "c"}
+            b not in {"a", "b", "c"}
+
+            a in {1, 2, 3, 4}
+            b in {1, 2, 3, 4}
+            a not in {"a", "b", "c"}
+            b not in {"a", "b", "c"}
+
+    def calibrate(self):
+
+        a = 1
+        b = "b"
+        for i in xrange(self.rounds):
+            pass
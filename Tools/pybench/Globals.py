@@ -0,0 +1,98 @@
+from pybench import Test
+
+# Module level names used by the global lookup tests
+g1 = 1
+g2 = 2
+g3 = 3
+
+###
+
+class GlobalLookups(Test):
+
+    version = 2.0
+    operations = 5 * (6 + 4)
+    rounds = 200000
+
+    def test(self):
+
+        for i in xrange(self.rounds):
+
+            g1; g2; g3; g1; g2; g3
+            len; abs; min; max
+
+            g1; g2; g3; g1; g2; g3
+            len; abs; min; max
+
+            g1; g2; g3; g1; g2; g3
+            len; abs; min; max
+
+            g1; g2; g3; g1; g2; g3
+            len; abs; min; max
+
+            g1; g2; g3; g1; g2; g3
+            len; abs; min; max
+
+    def calibrate(self):
+
+        for i in xrange(self.rounds):
+            pass
+
+class InstanceAttributeLookups(Test):
+
+    version = 2.0
+    operations = 5 * (3 + 3)
+    rounds = 200000
+
+    def test(self):
+
+        class c(object):
+            def __init__(self):
+                self.a = 1
+                self.b = 2
+                self.c = 3
+
+        class d:
+            def __init__(self):
+                self.a = 1
+                self.b = 2
+                self.c = 3
+
+        o = c()
+        p = d()
+
+        for i in xrange(self.rounds):
+
+            o.a; o.b; o.c
+            p.a; p.b; p.c
+
+            o.a; o.b; o.c
+            p.a; p.b; p.c
+
+            o.a; o.b; o.c
+            p.a; p.b; p.c
+
+            o.a; o.b; o.c
+            p.a; p.b; p.c
+
+            o.a; o.b; o.c
+            p.a; p.b; p.c
+
+    def calibrate(self):
+
+        class c(object):
+            def __init__(self):
+                self.a = 1
+                self.b = 2
+                self.c = 3
+
+        class d:
+            def __init__(self):
+                self.a = 1
+                self.b = 2
+                self.c = 3
+
+        o = c()
+        p = d()
+
+        for i in xrange(self.rounds):
+            pass
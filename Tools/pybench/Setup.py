@@ -21,6 +21,7 @@ from Arithmetic import *
 from Calls import *
 from Constructs import *
 from Lookups import *
+from Globals import *
 from Instances import *
 try:
     from NewInstances import *
@@ -35,6 +36,10 @@ try:
 except SyntaxError:
     pass
 from Imports import *
+try:
+    from Constants import *
+except SyntaxError:
+    pass
 from Strings import *
 from Numbers import *
 try:
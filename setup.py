@@ -502,6 +502,8 @@ class PyBuildExt(build_ext):
         # profilers (_lsprof is for cProfile.py)
         exts.append( Extension('_hotshot', ['_hotshot.c']) )
         exts.append( Extension('_lsprof', ['_lsprof.c', 'rotatingtree.c']) )
+        # line counter for trace.py
+        exts.append( Extension('_trace', ['_trace.c']) )
         # static Unicode character database
         if have_unicode:
             exts.append( Extension('unicodedata', ['unicodedata.c']) )